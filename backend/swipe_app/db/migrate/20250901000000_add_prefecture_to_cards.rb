@@ -0,0 +1,9 @@
+class AddPrefectureToCards < ActiveRecord::Migration[8.0]
+  def change
+    # 都道府県（「都/府/県」なしの短縮名）と地方コード（kanto 等）。data_collector が取り込み時に設定し、
+    # 既存行は data_collector/backfill_card_prefectures.py で補完する
+    add_column :cards, :prefecture, :string, limit: 8
+    add_column :cards, :region_code, :string, limit: 16
+    add_index :cards, [:genre, :prefecture]
+  end
+end
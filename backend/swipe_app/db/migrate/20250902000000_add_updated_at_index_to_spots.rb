@@ -0,0 +1,6 @@
+class AddUpdatedAtIndexToSpots < ActiveRecord::Migration[8.0]
+  def change
+    # data_collector/utils/spot_sync.py が (updated_at, id) の水位線以降の行だけを順に読むための索引
+    add_index :spots, [:updated_at, :id]
+  end
+end
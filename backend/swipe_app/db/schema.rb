@@ -10,7 +10,7 @@
 #
 # It's strongly recommended that you check this file into your version control system.
 
-ActiveRecord::Schema[8.0].define(version: 2025_08_23_060000) do
+ActiveRecord::Schema[8.0].define(version: 2025_09_02_000000) do
   create_table "cards", charset: "utf8mb4", collation: "utf8mb4_0900_ai_ci", force: :cascade do |t|
     t.string "genre", limit: 32
     t.string "title", limit: 128, null: false
@@ -25,6 +25,9 @@ ActiveRecord::Schema[8.0].define(version: 2025_08_23_060000) do
     t.datetime "created_at", null: false
     t.datetime "updated_at", null: false
     t.string "place_id", limit: 128
+    t.string "prefecture", limit: 8
+    t.string "region_code", limit: 16
+    t.index ["genre", "prefecture"], name: "index_cards_on_genre_and_prefecture"
     t.index ["place_id"], name: "index_cards_on_place_id", unique: true
   end
 
@@ -62,6 +65,7 @@ ActiveRecord::Schema[8.0].define(version: 2025_08_23_060000) do
     t.index ["place_id"], name: "idx_place_id"
     t.index ["place_id"], name: "place_id", unique: true
     t.index ["region"], name: "idx_region"
+    t.index ["updated_at", "id"], name: "index_spots_on_updated_at_and_id"
   end
 
   create_table "user_cards", charset: "utf8mb4", collation: "utf8mb4_0900_ai_ci", force: :cascade do |t|
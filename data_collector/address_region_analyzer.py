@@ -3,48 +3,21 @@
 """
 住所解析による自動地域判定システム
 Google Places APIのaddressから都道府県を抽出し、地域を自動判定
+使い方:
+  python address_region_analyzer.py [--update [--dry-run]]
 """
 
-import re
-import mysql.connector
-import os
+import time
+import argparse
+from utils.db_pool import get_connection, db_config
+from utils.region_resolver import address_prefecture, full_name, resolver
+from utils.region_remapper import REMAP_CHUNK, remap_regions, print_remap_result
 from dotenv import load_dotenv
 
 class AddressRegionAnalyzer:
     def __init__(self):
-        # 都道府県→地域マッピング
-        self.prefecture_to_region = {
-            # 北海道
-            '北海道': 'hokkaido',
-
-            # 東北
-            '青森県': 'tohoku', '岩手県': 'tohoku', '宮城県': 'tohoku',
-            '秋田県': 'tohoku', '山形県': 'tohoku', '福島県': 'tohoku',
-
-            # 関東
-            '茨城県': 'kanto', '栃木県': 'kanto', '群馬県': 'kanto',
-            '埼玉県': 'kanto', '千葉県': 'kanto', '東京都': 'kanto', '神奈川県': 'kanto',
-
-            # 中部
-            '新潟県': 'chubu', '富山県': 'chubu', '石川県': 'chubu', '福井県': 'chubu',
-            '山梨県': 'chubu', '長野県': 'chubu', '岐阜県': 'chubu',
-            '静岡県': 'chubu', '愛知県': 'chubu',
-
-            # 関西
-            '三重県': 'kansai', '滋賀県': 'kansai', '京都府': 'kansai', '京都': 'kansai',  # 京都の両パターンに対応
-            '大阪府': 'kansai', '兵庫県': 'kansai', '奈良県': 'kansai', '和歌山県': 'kansai',
-
-            # 中国・四国
-            '鳥取県': 'chugoku_shikoku', '島根県': 'chugoku_shikoku',
-            '岡山県': 'chugoku_shikoku', '広島県': 'chugoku_shikoku', '山口県': 'chugoku_shikoku',
-            '徳島県': 'chugoku_shikoku', '香川県': 'chugoku_shikoku',
-            '愛媛県': 'chugoku_shikoku', '高知県': 'chugoku_shikoku',
-
-            # 九州・沖縄
-            '福岡県': 'kyushu_okinawa', '佐賀県': 'kyushu_okinawa', '長崎県': 'kyushu_okinawa',
-            '熊本県': 'kyushu_okinawa', '大分県': 'kyushu_okinawa', '宮崎県': 'kyushu_okinawa',
-            '鹿児島県': 'kyushu_okinawa', '沖縄県': 'kyushu_okinawa'
-        }
+        # 都道府県→地域（utils/region_resolver.py の collector 区分）
+        self.region_resolver = resolver('collector')
 
         # 地域名（日本語）
         self.region_names = {
@@ -58,52 +31,21 @@ class AddressRegionAnalyzer:
         }
 
     def extract_prefecture_from_address(self, address):
-        """住所から都道府県を抽出"""
-        if not address:
-            return None
-
-        # パターン1: 日本、〒XXX-XXXX 都道府県
-        pattern1 = r'日本、〒[0-9]{3}-[0-9]{4}\s+([^市区町村]+?[県都府])'
-        match1 = re.search(pattern1, address)
-        if match1:
-            return match1.group(1)
-
-        # パターン2: 日本、都道府県（郵便番号なし）
-        pattern2 = r'日本、([^市区町村]+?[県都府])'
-        match2 = re.search(pattern2, address)
-        if match2:
-            return match2.group(1)
-
-        # パターン3: 都道府県を直接検索（最長マッチ）
-        found_prefectures = []
-        for prefecture in self.prefecture_to_region.keys():
-            if prefecture in address:
-                found_prefectures.append(prefecture)
-
-        # 最長の県名を返す（京都 < 京都府）
-        if found_prefectures:
-            return max(found_prefectures, key=len)
-
-        return None
+        """住所から都道府県を抽出（utils/region_resolver.py）"""
+        return full_name(address_prefecture(address))
 
     def get_region_from_address(self, address):
         """住所から地域を判定"""
         prefecture = self.extract_prefecture_from_address(address)
         if prefecture:
-            return self.prefecture_to_region.get(prefecture)
+            return self.region_resolver.region_of(prefecture)
         return None
 
     def analyze_existing_data(self):
         """既存データの地域判定精度を分析"""
         load_dotenv()
 
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='Haruto',
-            password=os.getenv('MYSQL_PASSWORD'),
-            database='swipe_app_production',
-            charset='utf8mb4'
-        )
+        connection = get_connection(database='swipe_app_production')
 
         cursor = connection.cursor()
         cursor.execute('SELECT id, title, address, region FROM cards WHERE address IS NOT NULL LIMIT 100')
@@ -145,51 +87,28 @@ class AddressRegionAnalyzer:
         cursor.close()
         connection.close()
 
-    def update_regions_by_address(self):
-        """住所解析による地域情報の一括更新"""
+    def update_regions_by_address(self, dry_run=False, chunk=REMAP_CHUNK):
+        """住所解析による地域情報の一括更新（一時テーブル経由の一括UPDATE。dry_run=True なら件数のみ）"""
         load_dotenv()
 
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='Haruto',
-            password=os.getenv('MYSQL_PASSWORD'),
-            database='swipe_app_production',
-            charset='utf8mb4'
-        )
-
-        cursor = connection.cursor()
-        cursor.execute('SELECT id, address, region FROM cards WHERE address IS NOT NULL')
-        results = cursor.fetchall()
-
-        print(f'🔄 {len(results)}件の地域情報を住所解析で更新中...\n')
-
-        updated = 0
-        failed = 0
-
-        for card_id, address, current_region in results:
-            predicted_region = self.get_region_from_address(address)
-
-            if predicted_region and predicted_region != current_region:
-                cursor.execute(
-                    'UPDATE cards SET region = %s WHERE id = %s',
-                    (predicted_region, card_id)
-                )
-                updated += 1
-                print(f'✅ 更新: ID {card_id} {current_region} → {predicted_region}')
-            elif not predicted_region:
-                failed += 1
-
-        connection.commit()
-        cursor.close()
-        connection.close()
-
-        print(f'\n📊 更新完了:')
-        print(f'   更新件数: {updated}件')
-        print(f'   失敗件数: {failed}件')
+        print('🔄 cardsの地域情報を住所解析で更新中...' + ('（dry-run）' if dry_run else ''))
+        started = time.time()
+        stats = remap_regions(db_config('swipe_app_production'), scheme='collector', chunk=chunk, dry_run=dry_run)
+        print_remap_result(stats, time.time() - started, self.region_names, dry_run=dry_run)
+        return stats
 
 def main():
+    parser = argparse.ArgumentParser(description='住所解析による地域判定')
+    parser.add_argument('--update', action='store_true', help='全件の地域を住所解析で更新する')
+    parser.add_argument('--dry-run', action='store_true', help='--update で更新せず変更内容のみ表示')
+    args = parser.parse_args()
+
     analyzer = AddressRegionAnalyzer()
 
+    if args.update:
+        analyzer.update_regions_by_address(dry_run=args.dry_run)
+        return
+
     print('🎯 住所解析による地域判定システム\n')
 
     # テスト住所
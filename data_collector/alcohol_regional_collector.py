@@ -2,12 +2,14 @@
 # -*- coding: utf-8 -*-
 
 import requests
-import mysql.connector
 import os
 import time
 import re
 from dotenv import load_dotenv
 from utils.request_guard import get_json, already_fetched_place, mark_fetched_place
+from utils.db_pool import get_connection, db_config
+from utils.region_resolver import resolver
+from utils.dedupe_index import DedupeIndex
 
 # 環境変数の読み込み
 load_dotenv()
@@ -17,13 +19,10 @@ API_KEY = os.getenv('GOOGLE_API_KEY')
 BASE_URL = "https://maps.googleapis.com/maps/api/place"
 
 # データベース接続設定
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'Haruto',
-    'password': os.getenv('MYSQL_PASSWORD'),
-    'database': 'swipe_app_production',
-    'charset': 'utf8mb4'
-}
+DB_CONFIG = db_config('swipe_app_production')
+
+# 住所・座標 → 地域（REGIONS のキー）
+REGION_RESOLVER = resolver('collector')
 
 # 地域定義と主要都市
 REGIONS = {
@@ -54,48 +53,9 @@ ALCOHOL_KEYWORDS = [
      'おでん屋', 'もつ焼き', '串カツ', 'せんべろ', '角打ち'
 ]
 
-# 都道府県マッピング
-PREFECTURE_MAPPING = {
-    # 北海道
-    '北海道': 'hokkaido',
-
-    # 東北
-    '青森県': 'tohoku', '岩手県': 'tohoku', '宮城県': 'tohoku',
-    '秋田県': 'tohoku', '山形県': 'tohoku', '福島県': 'tohoku',
-
-    # 関東
-    '茨城県': 'kanto', '栃木県': 'kanto', '群馬県': 'kanto',
-    '埼玉県': 'kanto', '千葉県': 'kanto', '東京都': 'kanto', '神奈川県': 'kanto',
-
-    # 中部
-    '新潟県': 'chubu', '富山県': 'chubu', '石川県': 'chubu', '福井県': 'chubu',
-    '山梨県': 'chubu', '長野県': 'chubu', '岐阜県': 'chubu', '静岡県': 'chubu', '愛知県': 'chubu',
-
-    # 関西
-    '三重県': 'kansai', '滋賀県': 'kansai', '京都府': 'kansai',
-    '大阪府': 'kansai', '兵庫県': 'kansai', '奈良県': 'kansai', '和歌山県': 'kansai',
-
-    # 中国・四国
-    '鳥取県': 'chugoku_shikoku', '島根県': 'chugoku_shikoku', '岡山県': 'chugoku_shikoku',
-    '広島県': 'chugoku_shikoku', '山口県': 'chugoku_shikoku',
-    '徳島県': 'chugoku_shikoku', '香川県': 'chugoku_shikoku', '愛媛県': 'chugoku_shikoku', '高知県': 'chugoku_shikoku',
-
-    # 九州・沖縄
-    '福岡県': 'kyushu_okinawa', '佐賀県': 'kyushu_okinawa', '長崎県': 'kyushu_okinawa',
-    '熊本県': 'kyushu_okinawa', '大分県': 'kyushu_okinawa', '宮崎県': 'kyushu_okinawa',
-    '鹿児島県': 'kyushu_okinawa', '沖縄県': 'kyushu_okinawa'
-}
-
-def extract_region_from_address(address):
-    """住所から地域を抽出"""
-    if not address:
-        return 'unknown'
-
-    for prefecture, region in PREFECTURE_MAPPING.items():
-        if prefecture in address:
-            return region
-
-    return 'unknown'
+def extract_region_from_address(address, lat=None, lng=None):
+    """住所（決まらなければ座標）から地域を抽出"""
+    return REGION_RESOLVER.region(address, lat, lng) or 'unknown'
 
 def search_places(query, location=None):
     """Google Places APIで場所を検索"""
@@ -138,27 +98,27 @@ def get_place_details(place_id):
         print(f"  ❌ 詳細取得エラー: {e}")
         return None
 
-def check_duplicate(cursor, title, address):
-    """重複チェック"""
-    cursor.execute("""
-        SELECT COUNT(*) FROM cards
-        WHERE title = %s AND address = %s
-    """, (title, address))
-
-    return cursor.fetchone()[0] > 0
+def load_dedupe_index():
+    """既存カード（タイトル・住所・座標）を登録した近似重複索引（utils/dedupe_index）
+    候補ごとに SELECT COUNT(*) を発行する代わりに、起動時に1回だけ読み込む"""
+    index = DedupeIndex.for_category('gourmet_alcohol', ALCOHOL_KEYWORDS)
+    try:
+        connection = get_connection(DB_CONFIG)
+        cursor = connection.cursor()
+        count = index.load_cards(cursor)
+        cursor.close()
+        connection.close()
+        print(f"🧹 重複判定用に既存カード {count}件を読み込み")
+    except Exception as e:
+        print(f"  ⚠️ 既存カードの読み込みエラー: {e}")
+    return index
 
 def save_to_database(place_data, region):
     """データベースに保存"""
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = get_connection(DB_CONFIG)
         cursor = connection.cursor()
 
-        # 重複チェック
-        if check_duplicate(cursor, place_data['title'], place_data['address']):
-            cursor.close()
-            connection.close()
-            return False
-
         # cardsテーブルに挿入
         insert_card_query = """
             INSERT INTO cards (title, address, rating, review_count, genre, region, created_at, updated_at)
@@ -195,13 +155,15 @@ def save_to_database(place_data, region):
         print(f"  ❌ DB保存エラー: {e}")
         return False
 
-def collect_region_data(region_name):
-    """指定地域のバー・居酒屋データを収集"""
+def collect_region_data(region_name, dedupe=None):
+    """指定地域のバー・居酒屋データを収集（dedupe: 近似重複索引、省略時は既存カードから作成）"""
     print(f"\n🍺 地域: {region_name.upper()}")
     print("=" * 60)
     print(f"📊 目標: 100件")
 
     cities = REGIONS[region_name]
+    if dedupe is None:
+        dedupe = load_dedupe_index()
     collected_count = 0
     target_per_region = 100
 
@@ -226,6 +188,11 @@ def collect_region_data(region_name):
                 if collected_count >= target_per_region:
                     break
 
+                # 既存カード・収集済みと名前と位置で重複する候補は詳細取得しない
+                if dedupe.find_place(place):
+                    print(f"  ⏭️ 重複: {place.get('name', '')}")
+                    continue
+
                 # 詳細情報取得
                 details = get_place_details(place['place_id'])
                 if not details or 'result' not in details:
@@ -242,8 +209,9 @@ def collect_region_data(region_name):
                 if not title or not address:
                     continue
 
-                # 住所から地域を抽出して検証
-                detected_region = extract_region_from_address(address)
+                # 住所（決まらなければ座標）から地域を抽出して検証
+                location = result.get('geometry', {}).get('location', {})
+                detected_region = extract_region_from_address(address, location.get('lat'), location.get('lng'))
                 if detected_region != region_name and detected_region != 'unknown':
                     continue  # 対象地域外はスキップ
 
@@ -261,9 +229,12 @@ def collect_region_data(region_name):
                     'reviews': reviews
                 }
 
-                # データベース保存
-                if save_to_database(place_data, region_name):
+                # データベース保存（詳細の名前・住所・座標でも重複を確認）
+                if dedupe.find(title, address, location.get('lat'), location.get('lng')):
+                    print(f"  ⚠️ スキップ: {title}")
+                elif save_to_database(place_data, region_name):
                     print(f"  ✅ {title}")
+                    dedupe.add(place['place_id'], title, address, location.get('lat'), location.get('lng'))
                     collected_count += 1
                 else:
                     print(f"  ⚠️ スキップ: {title}")
@@ -286,9 +257,10 @@ def main():
     print("=" * 70)
 
     total_collected = 0
+    dedupe = load_dedupe_index()
 
     for region in REGIONS.keys():
-        collected = collect_region_data(region)
+        collected = collect_region_data(region, dedupe)
         total_collected += collected
 
         print("⏱️ 次の地域まで3秒休憩...")
@@ -4,24 +4,17 @@ Google Places 画像URL パターン解析
 photo_referenceの構造から直接URLを推測できるか検証
 """
 
-import os
 import json
 import re
 from dotenv import load_dotenv
-import mysql.connector
+from utils.db_pool import get_connection
 
 load_dotenv()
 
 def analyze_photo_references():
     """photo_referenceのパターン分析"""
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='Haruto',
-            password=os.getenv('MYSQL_PASSWORD'),
-            database='swipe_app_development',
-            charset='utf8mb4'
-        )
+        connection = get_connection(database='swipe_app_development')
 
         cursor = connection.cursor()
 
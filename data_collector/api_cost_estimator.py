@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API実行前コスト見積もりツール（dry-run）
+収集計画のクエリをローカルキャッシュ（.cache/google_cache.sqlite）に照らして辿り、
+実行時に発生する実コール数と金額をSKU別に出力する（API呼び出し・DB書き込みなし）。
+- relax: collect_all_relax_categories.py の collect_all_categories
+- mega : mega_relax_collector.py の collect_all
+チェックポイントで完了済みの地域×カテゴリーは見積もりから除外する。
+"""
+
+import argparse
+
+from utils.api_budget import CostEstimator
+from utils.checkpoint import RunCheckpoint
+from utils.prefecture_geo import REGION_PREFECTURES, place_in_prefectures
+from utils.request_guard import peek_json, already_fetched_place, photo_request
+
+
+def _completed_pairs(name: str):
+    ckpt = RunCheckpoint(name)
+    return set((ckpt.state.get('run') or {}).get('completed', {}).keys())
+
+
+def estimate_relax(estimator: CostEstimator, target_count: int = 100):
+    from collect_all_relax_categories import RelaxCategoryCollector
+
+    collector = RelaxCategoryCollector()
+    completed = _completed_pairs("relax_collect_all_categories")
+    for category_key, category in collector.categories.items():
+        for region_key, region in collector.regions.items():
+            if f"{region_key}:{category_key}" in completed:
+                continue
+            searches = (collector.text_search_request(f"{city} {keyword}", region['center'])
+                        for city in region['cities'] for keyword in category['keywords'])
+            # 取得済みマークの候補はDetailsを呼ばないが、件数には含まれる
+            estimator.walk_group(
+                target_count, searches, collector.details_request,
+                photo=lambda ref: photo_request(ref, maxwidth=800), photos_per_place=3,
+                skip_place=already_fetched_place, skipped_counts=True,
+            )
+
+
+def estimate_mega(estimator: CostEstimator, target_count: int = 100):
+    from mega_relax_collector import MegaRelaxCollector
+
+    collector = MegaRelaxCollector()
+    completed = _completed_pairs("mega_relax_collect_all")
+    for region_key in collector.regions:
+        for category_key, category in collector.categories.items():
+            if f"{region_key}:{category_key}" in completed:
+                continue
+            searches = (collector.text_search_request(region_key, category_key, q, area)
+                        for q, area in collector.search_units(region_key, category_key))
+            # 取得済みマークの候補・地域外の結果は収集対象外
+            prefectures = REGION_PREFECTURES[region_key]
+            estimator.walk_group(
+                target_count, searches, collector.details_request,
+                photo=lambda ref: photo_request(ref, maxwidth=400), photos_per_place=3,
+                skip_place=already_fetched_place,
+                accept=lambda place: place_in_prefectures(place, prefectures),
+            )
+
+
+TARGETS = {
+    'relax': ('全リラックスカテゴリー収集 (collect_all_relax_categories.py)', estimate_relax),
+    'mega': ('メガリラックス収集 (mega_relax_collector.py all)', estimate_mega),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='収集実行前のAPIコール数・金額見積もり（dry-run）')
+    parser.add_argument('--target', action='append', choices=sorted(TARGETS), help='見積もり対象（複数指定可、省略時は全て）')
+    parser.add_argument('--results-per-query', type=int, default=None,
+                        help='未キャッシュの検索1回で得られるとみなす新規候補数（既定: ESTIMATE_RESULTS_PER_QUERY または15）')
+    args = parser.parse_args()
+
+    for target in args.target or sorted(TARGETS):
+        title, estimate = TARGETS[target]
+        estimator = CostEstimator(peek_json, results_per_query=args.results_per_query)
+        estimate(estimator)
+        print(estimator.report(title))
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cards.latitude / longitude の一括補完
+- spots とキャッシュ済み Details の座標を一時テーブルに集めて UPDATE ... JOIN 1回で反映
+- 残りのみ Details（geometry のみ）を並列取得（utils/coordinate_backfill.py）
+使い方:
+  python backfill_card_coordinates.py [--database swipe_app_production --spots-db swipe_app_development]
+                                      [--max-details 1000] [--workers 3] [--dry-run]
+"""
+
+import time
+import argparse
+
+from dotenv import load_dotenv
+
+from utils.coordinate_backfill import backfill_coordinates, print_backfill_result, BACKFILL_WORKERS
+from utils.db_pool import get_connection, db_config
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='cards.latitude / longitude の一括補完')
+    parser.add_argument('--database', default=None, help='cards のあるDB（省略時は MYSQL_DB）')
+    parser.add_argument('--spots-db', default=None, help='spots のあるDB（省略時は --database と同じ）')
+    parser.add_argument('--max-details', type=int, default=1000, help='Details を呼ぶ上限件数（0 でAPIを使わない）')
+    parser.add_argument('--workers', type=int, default=BACKFILL_WORKERS, help='Details の並列数')
+    parser.add_argument('--dry-run', action='store_true', help='cards を更新せず件数のみ表示')
+    args = parser.parse_args()
+
+    conn = get_connection(db_config(args.database))
+    try:
+        started = time.time()
+        stats = backfill_coordinates(conn, spots_db=args.spots_db, max_details=args.max_details,
+                                     workers=args.workers, dry_run=args.dry_run)
+        print_backfill_result(stats, time.time() - started, dry_run=args.dry_run)
+
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM cards WHERE latitude IS NULL OR longitude IS NULL")
+        print(f"📊 座標未設定の残り: {cur.fetchone()[0]}件")
+        cur.close()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
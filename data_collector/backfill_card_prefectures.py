@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cards.prefecture / region_code の一括補完
+- prefecture が未設定（NULL）の行を住所・座標から判定し、バッチ単位のUPDATEで更新
+- 判定できなかった行は空文字にして再判定しない（--recompute で全行を再判定）
+使い方:
+  python backfill_card_prefectures.py [--genre relax_onsen] [--batch 1000] [--recompute]
+事前に Rails 側のマイグレーション（AddPrefectureToCards）を適用しておくこと
+"""
+
+import time
+import argparse
+
+from dotenv import load_dotenv
+
+from utils.card_prefecture import backfill_prefectures, BACKFILL_BATCH
+from utils.db_pool import get_connection, db_config
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='cards.prefecture / region_code の一括補完')
+    parser.add_argument('--genre', default=None, help='対象ジャンル（省略時は全件）')
+    parser.add_argument('--batch', type=int, default=BACKFILL_BATCH, help='1回のUPDATEで更新する行数')
+    parser.add_argument('--recompute', action='store_true', help='設定済みの行も再判定する')
+    args = parser.parse_args()
+
+    config = db_config()
+    conn = get_connection(config)
+    try:
+        started = time.time()
+        stats = backfill_prefectures(conn, genre=args.genre, batch=args.batch, recompute=args.recompute)
+        print(f"✅ 都道府県補完: 判定 {stats['resolved']}件 / 判定不可 {stats['unresolved']}件 "
+              f"({time.time() - started:.1f}秒)")
+
+        cur = conn.cursor()
+        cur.execute("SELECT region_code, COUNT(*) FROM cards GROUP BY region_code ORDER BY region_code")
+        print("📊 地方別件数")
+        for region_code, count in cur.fetchall():
+            print(f"  • {region_code or '未判定'}: {count}件")
+        cur.close()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
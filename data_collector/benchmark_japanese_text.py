@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日本語レビュー判定のマイクロベンチマーク（utils/japanese_text.py と従来実装の比較）
+- 従来実装: fetch_* にあった is_japanese_text（replace で空白を除き、1文字ずつ3つの範囲を比較）
+- レビュー本文は記録済みのものを使う
+  - 既定: Google API キャッシュ（.cache/google_cache.sqlite）の Details 応答に含まれる reviews[].text
+  - --from-db N: review_comments.comment を N 件
+- 判定結果が従来実装と1件でも異なれば終了コード 1
+使い方:
+  python benchmark_japanese_text.py [--repeat 20] [--from-db 20000] [--limit 50000]
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+
+from utils.japanese_text import is_japanese_text, japanese_flags, script_language
+
+CACHE_DB = os.path.join(os.path.dirname(__file__), ".cache", "google_cache.sqlite")
+
+
+def legacy_is_japanese_text(text):
+    if not text:
+        return False
+    japanese_chars = 0
+    total_chars = len(text.replace(' ', '').replace('\n', ''))
+    if total_chars == 0:
+        return False
+    for char in text:
+        if ('\u3040' <= char <= '\u309F' or
+                '\u30A0' <= char <= '\u30FF' or
+                '\u4E00' <= char <= '\u9FAF'):
+            japanese_chars += 1
+    return (japanese_chars / total_chars) >= 0.3
+
+
+def cached_reviews(limit):
+    if not os.path.exists(CACHE_DB):
+        return []
+    conn = sqlite3.connect(CACHE_DB)
+    try:
+        texts = []
+        for (raw,) in conn.execute("SELECT v FROM kv_cache WHERE v LIKE ?", ('%"reviews"%',)):
+            try:
+                result = json.loads(raw).get('result') or {}
+            except (ValueError, AttributeError):
+                continue
+            texts += [review.get('text', '') for review in result.get('reviews') or []]
+            if len(texts) >= limit:
+                break
+        return texts[:limit]
+    finally:
+        conn.close()
+
+
+def db_reviews(limit):
+    from dotenv import load_dotenv
+    from utils.db_pool import get_connection
+    load_dotenv()
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT comment FROM review_comments LIMIT %s", (limit,))
+        return [row[0] for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def bench(label, run, count, repeat, base=None):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    per = (time.perf_counter() - started) / (repeat * count) * 1e6
+    print(f"   {label:26s}: {per:6.2f} µs/件" + (f" (x{base / per:.1f})" if base else ''))
+    return per
+
+
+def main():
+    parser = argparse.ArgumentParser(description='日本語レビュー判定のマイクロベンチマーク')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--from-db', type=int, default=0, help='review_comments.comment を指定件数使う')
+    parser.add_argument('--limit', type=int, default=50000, help='キャッシュから読むレビューの上限')
+    args = parser.parse_args()
+
+    texts = db_reviews(args.from_db) if args.from_db else cached_reviews(args.limit)
+    if not texts:
+        print("❌ レビュー本文がありません（キャッシュが空なら --from-db を指定）")
+        sys.exit(1)
+    chars = sum(len(t or '') for t in texts)
+    print(f"🧪 レビュー {len(texts)}件（平均 {chars / len(texts):.0f}文字） × {args.repeat}回\n")
+
+    expected = [legacy_is_japanese_text(t) for t in texts]
+    base = bench('従来実装', lambda: [legacy_is_japanese_text(t) for t in texts], len(texts), args.repeat)
+    bench('is_japanese_text(1件ずつ)', lambda: [is_japanese_text(t) for t in texts], len(texts), args.repeat, base)
+    bench('japanese_flags(一括)', lambda: japanese_flags(texts), len(texts), args.repeat, base)
+
+    mismatches = sum(1 for t, e in zip(texts, expected) if is_japanese_text(t) != e)
+    mismatches += sum(1 for f, e in zip(japanese_flags(texts), expected) if f != e)
+    print(f"\n   日本語と判定: {sum(expected)}件 / 従来実装との相違: {mismatches}件")
+
+    languages = {}
+    for t in texts:
+        lang = script_language(t)
+        languages[lang] = languages.get(lang, 0) + 1
+    print(f"   script_language: {', '.join(f'{k} {v}件' for k, v in sorted(languages.items(), key=lambda x: -x[1]))}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+住所 → 都道府県判定のマイクロベンチマーク（utils/region_resolver.py と従来実装の比較）
+- 従来実装: 各モジュールにあった判定ロジックをそのまま再現
+  - regex_longest: japan_region_mapper 等（〒パターンの正規表現 → 47件の部分一致を全走査して最長）
+  - substring_loop: chinese_regional_collector 等（短縮名の部分一致を順に走査）
+  - findall: realtime_mapping_concept 等（「〇〇県/府/都」を findall して辞書引き）
+- 住所は合成データ（全都道府県 × 〒あり/なし × 市区町村）か、--from-db で cards.address を使う
+- 判定結果が region_resolver と異なった件数も表示する
+使い方:
+  python benchmark_region_resolver.py [--repeat 20] [--from-db 5000]
+"""
+
+import re
+import time
+import argparse
+
+from utils.prefecture_geo import PREFECTURE_FULL_NAMES, normalize_prefecture
+from utils.region_resolver import address_prefecture, resolver, POSTAL_PREFIX_RANGES
+
+_FULL = list(PREFECTURE_FULL_NAMES.values()) + ['京都']
+_SHORT = list(PREFECTURE_FULL_NAMES)
+
+
+def regex_longest(address):
+    if not address:
+        return None
+    match1 = re.search(r'日本、〒[0-9]{3}-[0-9]{4}\s+([^市区町村]+?[県都府])', address)
+    if match1:
+        return match1.group(1)
+    match2 = re.search(r'日本、([^市区町村]+?[県都府])', address)
+    if match2:
+        return match2.group(1)
+    found = [p for p in _FULL if p in address]
+    return max(found, key=len) if found else None
+
+
+def substring_loop(address):
+    if not address:
+        return None
+    for prefecture in _SHORT:
+        if prefecture in address:
+            return prefecture
+    return None
+
+
+def findall(address):
+    if not address:
+        return None
+    for match in re.findall(r'(北海道|[^\s]+県|[^\s]+府|[^\s]+都)', address):
+        if match in _FULL:
+            return match
+    return None
+
+
+LEGACY = {'regex_longest': regex_longest, 'substring_loop': substring_loop, 'findall': findall}
+
+
+def synthetic_addresses():
+    postal = {pref: start for start, _, pref in reversed(POSTAL_PREFIX_RANGES)}
+    towns = ['中央区本町1丁目2−3', '北区東町４丁目５', '大字西山１２３', '港町2-10-1 ビル3F']
+    addresses = []
+    for short, full in PREFECTURE_FULL_NAMES.items():
+        for town in towns:
+            addresses.append(f"日本、〒{postal[short]:03d}-0001 {full}{short}市{town}")
+            addresses.append(f"日本、{full}{short}市{town}")
+            addresses.append(f"{full}{short}市{town}")
+    # 部分一致で誤りやすい住所（東京都 ⊃ 京都、大阪市福島区、広島県福山市 など）
+    addresses += ['日本、〒100-0005 東京都千代田区丸の内１丁目', '東京都港区芝公園４丁目２−８', '京都市東山区清水1丁目',
+                  '日本、〒553-0003 大阪府大阪市福島区福島１丁目', '日本、〒183-0023 東京都府中市宮町１丁目',
+                  '日本、〒720-0065 広島県福山市東桜町', '日本、〒870-0021 大分県大分市府内町３丁目']
+    return addresses
+
+
+def db_addresses(limit):
+    from dotenv import load_dotenv
+    from utils.db_pool import get_connection
+    load_dotenv()
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT address FROM cards WHERE address IS NOT NULL LIMIT %s", (limit,))
+        return [row[0] for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def bench(func, addresses, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for address in addresses:
+            func(address)
+    return (time.perf_counter() - started) / (repeat * len(addresses)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='都道府県判定のマイクロベンチマーク')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--from-db', type=int, default=0, help='cards.address を指定件数使う')
+    args = parser.parse_args()
+
+    addresses = db_addresses(args.from_db) if args.from_db else synthetic_addresses()
+    print(f"🧪 住所 {len(addresses)}件 × {args.repeat}回\n")
+
+    expected = [address_prefecture(a) for a in addresses]
+    base = bench(address_prefecture, addresses, args.repeat)
+    print(f"   region_resolver(1件ずつ): {base:6.2f} µs/件")
+    res = resolver()
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        res.prefectures(addresses)
+    batch = (time.perf_counter() - started) / (args.repeat * len(addresses)) * 1e6
+    print(f"   region_resolver(一括):    {batch:6.2f} µs/件")
+
+    for name, func in LEGACY.items():
+        per = bench(func, addresses, args.repeat)
+        diff = sum(1 for a, e in zip(addresses, expected) if normalize_prefecture(func(a) or '') != (e or ''))
+        print(f"   {name:24s}: {per:6.2f} µs/件 (x{per / base:.1f})  判定相違 {diff}件")
+
+
+if __name__ == '__main__':
+    main()
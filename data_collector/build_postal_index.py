@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+郵便番号 → 都道府県・市区町村 のオフライン索引を生成（utils/postal_index.py）
+- 入力は日本郵便の郵便番号データ（KEN_ALL.CSV / utf_ken_all.csv / JIGYOSYO.CSV、zip のままでも可）
+  https://www.post.japanpost.jp/zipcode/download.html
+- 出力は data/postal_index.bin（環境変数 POSTAL_INDEX_PATH で変更可）
+- --check で cards.address の郵便番号から索引で引いた都道府県と、住所文字列からの判定を比較する
+使い方:
+  python build_postal_index.py --ken-all KEN_ALL.CSV [--jigyosyo JIGYOSYO.CSV] [--output data/postal_index.bin]
+  python build_postal_index.py --check 5000
+"""
+
+import io
+import csv
+import time
+import zipfile
+import argparse
+
+from utils.postal_index import INDEX_PATH, PostalIndex, merge_entries, postal_code
+from utils.prefecture_geo import normalize_prefecture
+
+# (郵便番号, 都道府県, 市区町村) の列位置
+KEN_ALL_COLUMNS = (2, 6, 7)
+JIGYOSYO_COLUMNS = (7, 3, 4)
+
+
+def read_text(path):
+    """CSV（zip 内の CSV も可）を文字列で読む。UTF-8 版と Shift_JIS 版の両方に対応"""
+    if path.lower().endswith('.zip'):
+        with zipfile.ZipFile(path) as z:
+            name = next(n for n in z.namelist() if n.lower().endswith('.csv'))
+            data = z.read(name)
+    else:
+        with open(path, 'rb') as f:
+            data = f.read()
+    try:
+        return data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return data.decode('cp932')
+
+
+def read_rows(path, columns):
+    code_col, pref_col, muni_col = columns
+    for row in csv.reader(io.StringIO(read_text(path))):
+        if len(row) <= max(columns):
+            continue
+        code = row[code_col].strip()
+        if len(code) != 7 or not code.isdigit():
+            continue
+        yield int(code), normalize_prefecture(row[pref_col].strip()), row[muni_col].strip()
+
+
+def build(args):
+    started = time.time()
+    rows = list(read_rows(args.ken_all, KEN_ALL_COLUMNS))
+    print(f"📥 {args.ken_all}: {len(rows)}行")
+    if args.jigyosyo:
+        business = list(read_rows(args.jigyosyo, JIGYOSYO_COLUMNS))
+        print(f"📥 {args.jigyosyo}: {len(business)}行")
+        rows += business
+    entries, conflicts = merge_entries(rows)
+    PostalIndex.write(args.output, entries)
+    index = PostalIndex.load(args.output)
+    print(f"✅ {args.output}: 郵便番号 {len(index)}件 / 文字列 {len(index.strings)}件 ({time.time() - started:.1f}秒)")
+    if conflicts:
+        print(f"   ⚠️ 市区町村が複数ある郵便番号 {conflicts}件（最初の行を採用）")
+
+
+def check(args):
+    from dotenv import load_dotenv
+    from utils.db_pool import get_connection
+    from utils.region_resolver import text_prefecture
+    load_dotenv()
+
+    index = PostalIndex.load(args.output)
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT id, address FROM cards WHERE address LIKE %s LIMIT %s", ('%〒%', args.check))
+        rows = cur.fetchall()
+    finally:
+        conn.close()
+
+    found = missing = differ = 0
+    for card_id, address in rows:
+        pref = index.prefecture(postal_code(address))
+        if pref is None:
+            missing += 1
+            continue
+        found += 1
+        by_text = text_prefecture(address)
+        if by_text != pref:
+            differ += 1
+            if differ <= 10:
+                print(f"   🔀 ID {card_id}: 郵便番号 {pref} / 住所文字列 {by_text or '判定不可'} ({address[:50]})")
+    print(f"\n📊 {len(rows)}件: 索引で判定 {found}件 / 索引に無い郵便番号 {missing}件 / 住所文字列と相違 {differ}件")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='郵便番号 → 都道府県・市区町村 の索引を生成')
+    parser.add_argument('--ken-all', help='KEN_ALL.CSV / utf_ken_all.csv（zip 可）')
+    parser.add_argument('--jigyosyo', help='JIGYOSYO.CSV（大口事業所の個別番号、zip 可）')
+    parser.add_argument('--output', default=INDEX_PATH, help='出力先')
+    parser.add_argument('--check', type=int, default=0, help='cards.address を指定件数使って住所文字列の判定と比較')
+    args = parser.parse_args()
+
+    if not args.ken_all and not args.check:
+        parser.error('--ken-all か --check を指定してください')
+    if args.ken_all:
+        build(args)
+    if args.check:
+        check(args)
+
+
+if __name__ == '__main__':
+    main()
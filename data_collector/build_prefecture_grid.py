@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+座標 → 都道府県 の逆ジオコーダ用グリッド索引を生成（utils/reverse_geocoder.py）
+- 入力は都道府県（または市区町村）ポリゴンの GeoJSON
+  例: 国土数値情報 行政区域データ（N03、属性 N03_001）、dataofjapan/land の japan.geojson（属性 nam_ja）
+- ポリゴンを Douglas-Peucker で簡略化し、一様グリッド（既定 0.02度 ≒ 2km）に塗り分ける
+  境界を含むセルには、その行にかかる都道府県の辺を保存する
+- 出力は data/prefecture_grid.bin（環境変数 PREFECTURE_GRID_PATH で変更可）
+  同梱の索引は echarts-countries-pypkg 0.1.6（MIT）の Japan.js を GeoJSON（属性 nam_ja）に変換し、
+  --step 0.1 --simplify 0.002 で生成したもの
+- --bench で生成した索引のランダムな点での判定時間を表示（NumPy があれば一括判定も）
+使い方:
+  python build_prefecture_grid.py --geojson japan.geojson [--step 0.02] [--simplify 0.001] [--bench 100000]
+"""
+
+import json
+import math
+import time
+import random
+import argparse
+from collections import defaultdict
+
+from utils.prefecture_geo import PREFECTURE_REGION, normalize_prefecture
+from utils.reverse_geocoder import GRID_PATH, CELL_MIXED, PrefectureGrid
+
+# 日本全域（沖ノ鳥島・南鳥島を含む）
+SOUTH, WEST, NORTH, EAST = 20.0, 122.0, 46.0, 154.0
+NAME_PROPERTIES = ('N03_001', 'nam_ja', 'name_ja', 'name')
+
+
+def simplify(points, tolerance):
+    """Douglas-Peucker（points は (lng, lat) の閉じたリング）"""
+    if tolerance <= 0 or len(points) < 4:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = points[first], points[last]
+        dx, dy = x2 - x1, y2 - y1
+        norm = math.hypot(dx, dy)
+        index, dmax = None, tolerance
+        for i in range(first + 1, last):
+            x, y = points[i]
+            d = abs(dy * (x - x1) - dx * (y - y1)) / norm if norm else math.hypot(x - x1, y - y1)
+            if d > dmax:
+                index, dmax = i, d
+        if index is not None:
+            keep[index] = True
+            stack += [(first, index), (index, last)]
+    return [p for p, k in zip(points, keep) if k]
+
+
+def read_rings(path, name_property, tolerance):
+    """GeoJSON → {都道府県: [リング, ...]}（リングは (lng, lat) の並び）"""
+    with open(path, encoding='utf-8') as f:
+        features = json.load(f)['features']
+    rings = defaultdict(list)
+    skipped = set()
+    for feature in features:
+        props = feature.get('properties') or {}
+        key = name_property or next((k for k in NAME_PROPERTIES if props.get(k)), None)
+        pref = normalize_prefecture((props.get(key) or '').strip()) if key else ''
+        geometry = feature.get('geometry') or {}
+        if pref not in PREFECTURE_REGION:
+            skipped.add(pref or '(名前なし)')
+            continue
+        polygons = geometry.get('coordinates') or []
+        if geometry.get('type') == 'Polygon':
+            polygons = [polygons]
+        elif geometry.get('type') != 'MultiPolygon':
+            continue
+        for polygon in polygons:
+            for ring in polygon:
+                ring = simplify([(float(p[0]), float(p[1])) for p in ring], tolerance)
+                if len(ring) >= 4:
+                    rings[pref].append(ring)
+    if skipped:
+        print(f"   ⚠️ 都道府県名として扱えない属性値: {', '.join(sorted(skipped))[:200]}")
+    return rings
+
+
+def ring_edges(ring):
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+        if (x1, y1) != (x2, y2):
+            yield (y1, x1, y2, x2)
+
+
+def build_grid(rings, step):
+    rows = int(math.ceil((NORTH - SOUTH) / step))
+    cols = int(math.ceil((EAST - WEST) / step))
+    names = sorted(rings, key=list(PREFECTURE_REGION).index)
+    cells = bytearray(rows * cols)
+    row_bands = [[] for _ in range(rows)]
+
+    for pref_id, pref in enumerate(names, start=1):
+        bands = defaultdict(list)
+        for ring in rings[pref]:
+            for edge in ring_edges(ring):
+                y1, x1, y2, x2 = edge
+                lo_row = max(0, int((min(y1, y2) - SOUTH) // step))
+                hi_row = min(rows - 1, int((max(y1, y2) - SOUTH) // step))
+                for r in range(lo_row, hi_row + 1):
+                    bands[r].append(edge)
+                    # 辺のうちこの行に入る部分の経度範囲のセルを「境界を含む」に
+                    band_lo, band_hi = SOUTH + r * step, SOUTH + (r + 1) * step
+                    if y1 == y2:
+                        xa, xb = x1, x2
+                    else:
+                        ya = max(min(y1, y2), band_lo)
+                        yb = min(max(y1, y2), band_hi)
+                        xa = x1 + (ya - y1) * (x2 - x1) / (y2 - y1)
+                        xb = x1 + (yb - y1) * (x2 - x1) / (y2 - y1)
+                    lo_col = max(0, int((min(xa, xb) - WEST) // step))
+                    hi_col = min(cols - 1, int((max(xa, xb) - WEST) // step))
+                    for c in range(lo_col, hi_col + 1):
+                        cells[r * cols + c] = CELL_MIXED
+        for r, band in sorted(bands.items()):
+            row_bands[r].append((pref_id, band))
+
+    # 境界を含まないセルはセル中心の内外で塗る（行の中心線との交点を並べて内側の区間を取る）
+    for r, bands in enumerate(row_bands):
+        lat = SOUTH + (r + 0.5) * step
+        for pref_id, band in bands:
+            xs = sorted(x1 + (lat - y1) * (x2 - x1) / (y2 - y1)
+                        for y1, x1, y2, x2 in band if (y1 > lat) != (y2 > lat))
+            for xa, xb in zip(xs[0::2], xs[1::2]):
+                first = max(0, int(math.ceil((xa - WEST) / step - 0.5)))
+                last = min(cols - 1, int(math.floor((xb - WEST) / step - 0.5)))
+                for c in range(first, last + 1):
+                    if cells[r * cols + c] != CELL_MIXED:
+                        cells[r * cols + c] = pref_id
+    return rows, cols, names, cells, row_bands
+
+
+def bench(path, count):
+    from utils.reverse_geocoder import np
+    grid = PrefectureGrid.load(path)
+    rng = random.Random(0)
+    points = [(rng.uniform(30.0, 45.5), rng.uniform(129.0, 146.0)) for _ in range(count)]
+    started = time.perf_counter()
+    results = [grid.prefecture(lat, lng) for lat, lng in points]
+    per = (time.perf_counter() - started) / count * 1e6
+    mixed = sum(1 for lat, lng in points if grid.cell(lat, lng)[2] == CELL_MIXED)
+    print(f"🧪 ランダムな点 {count}件: {per:.2f} µs/件（境界セル {mixed}件 / 判定あり {sum(1 for p in results if p)}件）")
+    if np is not None:
+        from utils import reverse_geocoder
+        reverse_geocoder._grid, reverse_geocoder._loaded = grid, True
+        lats, lngs = np.array([p[0] for p in points]), np.array([p[1] for p in points])
+        started = time.perf_counter()
+        reverse_geocoder.locate_prefectures(lats, lngs)
+        print(f"   一括判定（NumPy）: {(time.perf_counter() - started) / count * 1e6:.2f} µs/件")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='座標 → 都道府県 のグリッド索引を生成')
+    parser.add_argument('--geojson', help='都道府県（または市区町村）ポリゴンの GeoJSON')
+    parser.add_argument('--name-property', default=None, help=f"都道府県名の属性（省略時は {', '.join(NAME_PROPERTIES)} の順に探す）")
+    parser.add_argument('--step', type=float, default=0.02, help='セルの大きさ（度）')
+    parser.add_argument('--simplify', type=float, default=0.001, help='簡略化の許容誤差（度、0 で簡略化しない）')
+    parser.add_argument('--output', default=GRID_PATH, help='出力先')
+    parser.add_argument('--bench', type=int, default=0, help='生成後にランダムな点で判定時間を測る件数')
+    args = parser.parse_args()
+
+    if args.geojson:
+        started = time.time()
+        rings = read_rings(args.geojson, args.name_property, args.simplify)
+        print(f"📥 {args.geojson}: {len(rings)}都道府県 / リング {sum(len(r) for r in rings.values())}件 / "
+              f"頂点 {sum(len(ring) for r in rings.values() for ring in r)}件")
+        rows, cols, names, cells, row_bands = build_grid(rings, args.step)
+        PrefectureGrid.write(args.output, SOUTH, WEST, args.step, rows, cols, names, cells, row_bands)
+        mixed = cells.count(CELL_MIXED)
+        filled = rows * cols - cells.count(0) - mixed
+        print(f"✅ {args.output}: {rows}×{cols}セル（内部 {filled} / 境界 {mixed}） ({time.time() - started:.1f}秒)")
+    elif not args.bench:
+        parser.error('--geojson か --bench を指定してください')
+    if args.bench:
+        bench(args.output, args.bench)
+
+
+if __name__ == '__main__':
+    main()
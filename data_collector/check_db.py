@@ -1,19 +1,13 @@
 #!/usr/bin/env python3
-import os
-import mysql.connector
+from utils.db_pool import get_connection, db_config
 from dotenv import load_dotenv
 
 load_dotenv(dotenv_path='.env')
 
-config = {
-    'host': 'localhost',
-    'user': 'Haruto',
-    'password': os.getenv('MYSQL_PASSWORD'),
-    'database': 'swipe_app_development'
-}
+config = db_config('swipe_app_development')
 
 try:
-    conn = mysql.connector.connect(**config)
+    conn = get_connection(config)
     cur = conn.cursor()
 
     print("=== ジャンル別件数 ===")
@@ -36,19 +30,22 @@ try:
         print(f"{row[0]:12s} | {row[1]:25s} | {row[2]:40s} | {row[3]}")
 
     print("\n=== active_sauna 都県別分布 ===")
-    cur.execute("SELECT address FROM cards WHERE genre='active_sauna'")
     prefectures = ['東京', '神奈川', '千葉', '埼玉', '茨城', '栃木', '群馬']
+    cur.execute(
+        "SELECT prefecture, COUNT(*) FROM cards WHERE genre='active_sauna' GROUP BY prefecture"
+    )
     pref_count = {p: 0 for p in prefectures}
-
-    for (addr,) in cur.fetchall():
-        if addr:
-            for pref in prefectures:
-                if pref in addr:
-                    pref_count[pref] += 1
-                    break
+    other = 0
+    for pref, count in cur.fetchall():
+        if pref in pref_count:
+            pref_count[pref] = count
+        else:
+            other += count
 
     for pref, count in pref_count.items():
         print(f"{pref}: {count}件")
+    if other:
+        print(f"その他・未判定: {other}件（未判定は backfill_card_prefectures.py で補完）")
 
     conn.close()
 
@@ -4,33 +4,35 @@
 全リラックスカテゴリー大規模収集システム
 公園・サウナ・カフェ・散歩コース × 100件 × 7地域 = 2800件
 レビューコメント・永続画像URL付き完全版
+--stage: カードとレビューを .cache/staging/ のTSVに追記し、全件収集後に LOAD DATA で一括取り込み
 """
 
 import requests
-import mysql.connector
 import json
 import time
 import os
 import random
-from datetime import datetime
 from dotenv import load_dotenv
 from utils.request_guard import get_json, get_photo_direct_url, already_fetched_place, mark_fetched_place
+from utils.checkpoint import RunCheckpoint
+from utils.api_budget import BudgetExceeded, get_guard, set_budget
+from utils.db_pool import get_connection, db_config
+from utils.staged_loader import StagingWriter, load_staged, print_load_result
+from utils.bulk_writer import write_cards, print_card_result
+
+STAGE_NAME = "relax_collect_all_categories"
 
 load_dotenv()
 
 class RelaxCategoryCollector:
-    def __init__(self):
+    def __init__(self, stage: bool = False):
+        self.stage_enabled = stage
+        self.stage = None
         self.api_key = os.getenv('GOOGLE_API_KEY')  # .envファイルのキー名に合わせて修正
         self.base_url = "https://maps.googleapis.com/maps/api/place"
 
         # DB接続設定（本番環境）
-        self.db_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': 'swipe_app_production',  # 本番データベースに変更
-            'charset': 'utf8mb4'
-        }
+        self.db_config = db_config('swipe_app_production')  # 本番データベースに変更
 
         # 地域定義
         self.regions = {
@@ -93,7 +95,7 @@ class RelaxCategoryCollector:
 
     def connect_db(self):
         """データベース接続"""
-        return mysql.connector.connect(**self.db_config)
+        return get_connection(self.db_config)
 
     def search_places(self, region_key, category_key, target_count=100):
         """指定地域・カテゴリーでスポット検索"""
@@ -134,8 +136,8 @@ class RelaxCategoryCollector:
         print(f"✅ {region['name']}の{category['name']}: {len(collected_places)}件収集完了")
         return collected_places
 
-    def _text_search(self, query, location=None):
-        """テキスト検索API"""
+    def text_search_request(self, query, location=None):
+        """テキスト検索のURL・パラメータ（見積もりツールと共用）"""
         url = f"{self.base_url}/textsearch/json"
 
         params = {
@@ -149,6 +151,26 @@ class RelaxCategoryCollector:
             params['location'] = f"{location['lat']},{location['lng']}"
             params['radius'] = 50000  # 50km
 
+        return url, params
+
+    def details_request(self, place_id):
+        """詳細取得のURL・パラメータ（見積もりツールと共用）"""
+        url = f"{self.base_url}/details/json"
+
+        params = {
+            'place_id': place_id,
+            'key': self.api_key,
+            'fields': 'name,formatted_address,geometry,photos,rating,user_ratings_total,reviews,website,formatted_phone_number,opening_hours',
+            'language': 'ja',
+            'reviews_sort': 'newest'
+        }
+
+        return url, params
+
+    def _text_search(self, query, location=None):
+        """テキスト検索API"""
+        url, params = self.text_search_request(query, location)
+
         try:
             data = get_json(url, params, ttl_sec=60*60*24*7)
 
@@ -164,15 +186,7 @@ class RelaxCategoryCollector:
 
     def get_place_details(self, place_id):
         """詳細情報取得（レビュー含む）"""
-        url = f"{self.base_url}/details/json"
-
-        params = {
-            'place_id': place_id,
-            'key': self.api_key,
-            'fields': 'name,formatted_address,geometry,photos,rating,user_ratings_total,reviews,website,formatted_phone_number,opening_hours',
-            'language': 'ja',
-            'reviews_sort': 'newest'
-        }
+        url, params = self.details_request(place_id)
 
         try:
             if already_fetched_place(place_id):
@@ -201,106 +215,73 @@ class RelaxCategoryCollector:
         except Exception as e:
             print(f"    ❌ 画像URL抽出エラー: {e}")
 
-    return None
+        return None
+
+    def _to_card(self, region_label, place_data):
+        """ステージング・一括保存用のカード（bulk_writer.CARD_COLUMNS の形式）"""
+        image_urls = place_data.get('image_urls', [])
+        return {
+            'genre': 'relax',
+            'title': place_data['name'],
+            'rating': place_data.get('rating'),
+            'review_count': place_data.get('user_ratings_total', 0),
+            'image_url': image_urls[0] if image_urls else "",
+            'external_link': f"https://www.google.com/maps/place/?q=place_id:{place_data['place_id']}",
+            'region': region_label,
+            'address': place_data.get('address', ''),
+            'latitude': place_data.get('latitude'),
+            'longitude': place_data.get('longitude'),
+            'place_id': place_data['place_id'],
+            'reviews': place_data.get('reviews', [])[:5],  # 最大5件のレビュー
+        }
+
+    def stage_places(self, region_key, category_key, places_data):
+        """カードとレビューをステージングTSVに追記（取り込みは collect_all_categories の最後）"""
+        region_label = self.regions.get(region_key, {}).get('name', region_key)
+        staged = sum(1 for place_data in places_data if self.stage.add_card(self._to_card(region_label, place_data)))
+        print(f"📝 {region_label}の{self.categories[category_key]['name']}: {staged}件をステージング")
+        return staged
 
     def save_to_database(self, region_key, category_key, places_data):
-        """データベース保存（本番cardsテーブル用）"""
+        """データベース保存（本番cardsテーブル用、utils/bulk_writer でまとめて挿入、既存place_idはスキップ）"""
+        if self.stage is not None:
+            return self.stage_places(region_key, category_key, places_data)
         region_label = self.regions.get(region_key, {}).get('name', region_key)
         print(f"\n💾 {region_label}の{self.categories[category_key]['name']}をDB保存中...")
 
         connection = self.connect_db()
-        cursor = connection.cursor()
-
-        saved_count = 0
-
-        for place_data in places_data:
-            try:
-                # 重複チェック
-                cursor.execute(
-                    "SELECT id FROM cards WHERE place_id = %s",
-                    (place_data['place_id'],)
-                )
-
-                if cursor.fetchone():
-                    print(f"  ⏭️ スキップ（重複）: {place_data['name']}")
-                    continue
-
-                # レビューコメント保存用の準備
-                reviews = place_data.get('reviews', [])
-                review_text = ""
-                if reviews:
-                    # 最初のレビューをテキストとして保存
-                    review_text = reviews[0].get('text', '')[:500]  # 500文字制限
-
-                # 外部リンク生成
-                place_id = place_data['place_id']
-                external_link = f"https://www.google.com/maps/place/?q=place_id:{place_id}"
-
-                # 画像URL（最初の1枚を使用）
-                image_urls = place_data.get('image_urls', [])
-                image_url = image_urls[0] if image_urls else ""
-
-                # データ挿入（cardsテーブル用）
-                insert_query = """
-                INSERT INTO cards (
-                    genre, title, rating, review_count, image_url, external_link,
-                    region, address, place_id, latitude, longitude, created_at, updated_at
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-
-                cursor.execute(insert_query, (
-                    "relax",  # relax系は'genre'を'relax'に統一
-                    place_data['name'],       # title
-                    place_data.get('rating'),
-                    place_data.get('user_ratings_total', 0),  # review_count
-                    image_url,
-                    external_link,
-                    region_label,  # 日本語地域名を保存
-                    place_data.get('address', ''),
-                    place_data['place_id'],
-                    place_data.get('latitude'),
-                    place_data.get('longitude'),
-                    datetime.now(),
-                    datetime.now()
-                ))
-
-                card_id = cursor.lastrowid
-
-                # レビューコメントを別テーブルに保存
-                if reviews:
-                    for review in reviews[:5]:  # 最大5件のレビュー
-                        review_insert = """
-                        INSERT INTO review_comments (
-                            card_id, comment, created_at, updated_at
-                        ) VALUES (%s, %s, %s, %s)
-                        """
-
-                        cursor.execute(review_insert, (
-                            card_id,
-                            review.get('text', '')[:1000],  # 1000文字制限
-                            datetime.now(),
-                            datetime.now()
-                        ))
-
-                saved_count += 1
-                print(f"  ✅ 保存: {place_data['name']} (レビュー: {len(reviews)}件)")
-
-            except Exception as e:
-                print(f"  ❌ 保存エラー: {place_data.get('name', '不明')} - {e}")
-
-        connection.commit()
-        cursor.close()
-        connection.close()
-
-        print(f"✅ {saved_count}件をデータベースに保存完了")
-        return saved_count
+        try:
+            result = write_cards(connection, [self._to_card(region_label, place_data) for place_data in places_data])
+            connection.commit()
+        except Exception as e:
+            print(f"  ❌ 保存エラー: {e}")
+            connection.rollback()
+            return 0
+        finally:
+            connection.close()
 
-    def collect_region_category(self, region_key, category_key, target_count=100):
-        """地域・カテゴリー別収集"""
+        print_card_result(result)
+        print(f"✅ {result['inserted']}件をデータベースに保存完了")
+        return result['inserted']
+
+    def collect_region_category(self, region_key, category_key, target_count=100, checkpoint=None):
+        """地域・カテゴリー別収集
+        checkpoint を渡すと検索結果と詳細取得済みの候補を保存し、再実行時は続きから再開する"""
         print(f"\n🎯 {self.regions[region_key]['name']} × {self.categories[category_key]['name']} 収集開始")
 
-        # 基本検索
-        places = self.search_places(region_key, category_key, target_count)
+        pair = f"{region_key}:{category_key}"
+        current = checkpoint.state.get('current') if checkpoint is not None else None
+        if current and current.get('pair') == pair:
+            places = current['places']
+            enriched_places = current['enriched']
+            print(f"  ♻️ チェックポイントから再開 (詳細取得済み {len(enriched_places)}/{len(places)}件)")
+        else:
+            # 基本検索
+            places = self.search_places(region_key, category_key, target_count)
+            enriched_places = []
+            if checkpoint is not None:
+                checkpoint.state['current'] = {'pair': pair, 'places': places, 'enriched': enriched_places}
+                checkpoint.save()
 
         if not places:
             print("❌ スポットが見つかりませんでした")
@@ -308,9 +289,10 @@ class RelaxCategoryCollector:
 
         # 詳細情報・レビュー・画像収集
         print(f"\n📋 詳細情報・レビュー・画像収集中...")
-        enriched_places = []
 
         for i, place in enumerate(places):
+            if i < len(enriched_places):
+                continue
             print(f"  処理中 ({i+1}/{len(places)}): {place['name']}")
 
             # 詳細情報取得
@@ -367,6 +349,8 @@ class RelaxCategoryCollector:
 
             print(f"    ✅ 画像: {len(enriched_place['image_urls'])}件, レビュー: {len(enriched_place['reviews'])}件")
             enriched_places.append(enriched_place)
+            if checkpoint is not None:
+                checkpoint.save()
 
             # API制限対策
             time.sleep(0.2)
@@ -376,26 +360,60 @@ class RelaxCategoryCollector:
 
         return saved_count
 
-    def collect_all_categories(self):
-        """全カテゴリー・全地域収集"""
+    def collect_all_categories(self, fresh=False):
+        """全カテゴリー・全地域収集
+        地域×カテゴリー単位の完了状況をチェックポイントに保存し、中断・予算到達後は続きから再開する"""
         print("🚀 全リラックスカテゴリー大規模収集開始！")
         print(f"目標: {len(self.categories)}カテゴリー × 100件 × {len(self.regions)}地域 = {len(self.categories) * 100 * len(self.regions)}件\n")
 
-        total_collected = 0
+        ckpt = RunCheckpoint("relax_collect_all_categories", fresh=fresh)
+        if ckpt.resumed:
+            print(f"♻️ チェックポイントから再開: {ckpt.path}")
+        if self.stage_enabled:
+            self.stage = StagingWriter(STAGE_NAME, fresh=fresh)
+        run_state = ckpt.section('run', {'completed': {}})
+        total_collected = sum(run_state['completed'].values())
         results = {}
 
-        for category_key in self.categories.keys():
-            results[category_key] = {}
-
-            for region_key in self.regions.keys():
-                collected = self.collect_region_category(region_key, category_key, 100)
-                results[category_key][region_key] = collected
-                total_collected += collected
-
-                print(f"📊 進捗: {total_collected}件 / {len(self.categories) * 100 * len(self.regions)}件")
-
-                # 地域間の待機時間
-                time.sleep(1)
+        try:
+            for category_key in self.categories.keys():
+                results[category_key] = {}
+
+                for region_key in self.regions.keys():
+                    pair = f"{region_key}:{category_key}"
+                    if pair in run_state['completed']:
+                        results[category_key][region_key] = run_state['completed'][pair]
+                        print(f"⏭️ {pair}: チェックポイントで完了済み ({run_state['completed'][pair]}件)")
+                        continue
+
+                    collected = self.collect_region_category(region_key, category_key, 100, checkpoint=ckpt)
+                    results[category_key][region_key] = collected
+                    total_collected += collected
+                    run_state['completed'][pair] = collected
+                    ckpt.state.pop('current', None)
+                    ckpt.save()
+
+                    print(f"📊 進捗: {total_collected}件 / {len(self.categories) * 100 * len(self.regions)}件")
+
+                    # 地域間の待機時間
+                    time.sleep(1)
+        except BudgetExceeded as e:
+            if self.stage is not None:
+                self.stage.close()
+            ckpt.save()
+            print(f"\n🛑 {e}")
+            print(get_guard().summary())
+            print(f"💾 チェックポイント保存済み: {ckpt.path}（再実行で続きから再開）")
+            return
+
+        if self.stage is not None:
+            # 取り込みに失敗した場合はチェックポイントとTSVを残す（再実行で取り込みだけやり直す）
+            self.stage.close()
+            print(f"\n📥 ステージングTSVを一括取り込み中... ({self.stage.path})")
+            print_load_result(load_staged(self.db_config, STAGE_NAME))
+
+        ckpt.clear()
+        print(get_guard().summary())
 
         # 最終レポート
         print(f"\n🎉 全収集完了！")
@@ -409,8 +427,18 @@ class RelaxCategoryCollector:
                 print(f"  {self.regions[region_key]['name']}: {count}件")
 
 def main():
-    collector = RelaxCategoryCollector()
-    collector.collect_all_categories()
+    import argparse
+    parser = argparse.ArgumentParser(description='全リラックスカテゴリー大規模収集')
+    parser.add_argument('--fresh', action='store_true', help='チェックポイントを破棄して最初から実行')
+    parser.add_argument('--max-usd', type=float, default=None, help='API予算上限（USD）。到達時はチェックポイントを残して停止')
+    parser.add_argument('--stage', action='store_true', help='TSVにステージングし、最後に LOAD DATA で一括取り込み')
+    args = parser.parse_args()
+
+    if args.max_usd is not None:
+        set_budget(args.max_usd)
+
+    collector = RelaxCategoryCollector(stage=args.stage)
+    collector.collect_all_categories(fresh=args.fresh)
 
 if __name__ == "__main__":
     main()
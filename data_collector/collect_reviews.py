@@ -8,7 +8,7 @@ import os
 import json
 import requests
 import time
-import mysql.connector
+from utils.db_pool import get_connection, db_config
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -18,12 +18,7 @@ class ReviewCollector:
 
     def __init__(self):
         self.api_key = os.getenv('GOOGLE_API_KEY')
-        self.mysql_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config()
         self.api_usage = 0
         self.collected_reviews = 0
 
@@ -67,15 +62,15 @@ class ReviewCollector:
 
         try:
             # 開発環境からplace_id取得
-            dev_connection = mysql.connector.connect(
-                **self.mysql_config,
+            dev_connection = get_connection(
+                self.mysql_config,
                 database='swipe_app_development'
             )
             dev_cursor = dev_connection.cursor()
 
             # 本番環境にレビュー保存
-            prod_connection = mysql.connector.connect(
-                **self.mysql_config,
+            prod_connection = get_connection(
+                self.mysql_config,
                 database='swipe_app_production'
             )
             prod_cursor = prod_connection.cursor()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常駐型コレクタ（ローカル制御API）
+- 起動時に .env・DB接続プール・既存place_id索引・HTTPセッション・メモリキャッシュを準備し、以降の収集で使い回す
+- 127.0.0.1 のHTTP（またはUnixソケット）でトップアップ要求を受け付ける
+使い方:
+  python collector_daemon.py [--port 8765] [--socket /tmp/collector.sock] [--pool-size 10]
+  curl -X POST localhost:8765/collect -d '{"category": "active_sauna", "prefecture": "群馬", "count": 5}'
+  curl localhost:8765/status
+  curl -X POST localhost:8765/refresh   # 既存place_id索引を全件から再構築
+"""
+
+import os
+import json
+import time
+import socket
+import argparse
+import threading
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingUnixStreamServer
+from typing import Dict, Tuple
+
+from fetch_onsen_tokyo import MultiCategoryDataCollector
+from utils.request_guard import cache_stats
+from utils.api_budget import BudgetExceeded, get_guard
+from utils.db_pool import pool_stats, set_pool_size
+
+DEFAULT_PORT = int(os.getenv('COLLECTOR_DAEMON_PORT', '8765'))
+MAX_BODY = 64 * 1024
+
+
+class CollectorService:
+    """ウォーム状態のコレクタを保持し、同じカテゴリ×都県の同時収集を直列化する"""
+
+    def __init__(self, pool_size: int = 10):
+        self.started_at = time.time()
+        set_pool_size(pool_size)
+        self.collector = MultiCategoryDataCollector()
+        self.collector.validate_config()
+        self.locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self.locks_guard = threading.Lock()
+        self.running: Dict[str, float] = {}
+        self.served = 0
+        ids = self.collector._load_existing_place_ids()
+        print(f"♻️ 既存place_id索引 {len(ids)}件")
+
+    def refresh(self) -> Dict:
+        """既存place_id索引を全件から再構築（行の削除を反映したい場合）"""
+        started = time.time()
+        ids = self.collector._load_existing_place_ids(refresh=True)
+        elapsed = time.time() - started
+        print(f"♻️ 既存place_id索引 {len(ids)}件を再構築 ({elapsed:.2f}秒)")
+        return {'existing_ids': len(ids), 'elapsed_sec': round(elapsed, 3)}
+
+    def _lock_for(self, category: str, prefecture: str) -> threading.Lock:
+        with self.locks_guard:
+            return self.locks.setdefault((category, prefecture), threading.Lock())
+
+    def collect(self, category: str, prefecture: str, count: int) -> Dict:
+        label = f"{category}:{prefecture}"
+        with self._lock_for(category, prefecture):
+            self.running[label] = time.time()
+            started = time.time()
+            try:
+                result = self.collector.collect_prefecture(category, prefecture, count)
+            finally:
+                self.running.pop(label, None)
+                self.served += 1
+        result['elapsed_sec'] = round(time.time() - started, 3)
+        return result
+
+    def status(self) -> Dict:
+        return {
+            'uptime_sec': int(time.time() - self.started_at),
+            'served': self.served,
+            'running': {k: int(time.time() - v) for k, v in self.running.items()},
+            'existing_ids': len(self.collector._existing_ids or ()),
+            'cache': cache_stats(),
+            'db_pool': pool_stats(),
+            'budget': get_guard().summary(),
+        }
+
+
+class ControlHandler(BaseHTTPRequestHandler):
+    service: CollectorService = None
+
+    def address_string(self):
+        # Unixソケットでは client_address が空文字のため
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def _reply(self, code: int, body: Dict):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY:
+            raise ValueError('リクエストが大きすぎます')
+        raw = self.rfile.read(length) if length else b''
+        return json.loads(raw.decode('utf-8')) if raw else {}
+
+    def do_GET(self):
+        if self.path == '/status':
+            self._reply(200, self.service.status())
+        else:
+            self._reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        try:
+            if self.path == '/collect':
+                body = self._body()
+                category, prefecture = body.get('category'), body.get('prefecture')
+                if not category or not prefecture:
+                    self._reply(400, {'error': 'category と prefecture が必要です'})
+                    return
+                self._reply(200, self.service.collect(category, prefecture, int(body.get('count', 5))))
+            elif self.path == '/refresh':
+                self._reply(200, self.service.refresh())
+            else:
+                self._reply(404, {'error': 'not found'})
+        except BudgetExceeded as e:
+            self._reply(429, {'error': str(e), 'budget': get_guard().summary()})
+        except (ValueError, KeyError) as e:
+            self._reply(400, {'error': str(e)})
+        except Exception as e:
+            traceback.print_exc()
+            self._reply(500, {'error': f"{type(e).__name__}: {e}"})
+
+
+class UnixControlServer(ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+        # BaseHTTPRequestHandler が参照する属性
+        self.server_name = socket.gethostname()
+        self.server_port = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='常駐型コレクタ（ローカル制御API）')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='待受ポート（127.0.0.1）')
+    parser.add_argument('--socket', default=None, help='Unixソケットのパス（指定時はTCPを使わない）')
+    parser.add_argument('--pool-size', type=int, default=int(os.getenv('MYSQL_POOL_SIZE', '10')), help='MySQL接続プールのサイズ')
+    args = parser.parse_args()
+
+    print("🚀 常駐コレクタを起動します")
+    ControlHandler.service = CollectorService(pool_size=args.pool_size)
+    if args.socket:
+        server = UnixControlServer(args.socket, ControlHandler)
+        where = f"unix:{args.socket}"
+    else:
+        server = ThreadingHTTPServer(('127.0.0.1', args.port), ControlHandler)
+        where = f"http://127.0.0.1:{args.port}"
+    print(f"✅ 待受開始: {where} (POST /collect, POST /refresh, GET /status)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⚠️ 停止します")
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+        print(get_guard().summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -11,7 +11,7 @@ import requests
 import time
 from datetime import datetime
 from dotenv import load_dotenv
-import mysql.connector
+from utils.db_pool import get_connection, db_config
 
 load_dotenv()
 
@@ -20,13 +20,7 @@ class PermanentImageUrlExtractor:
 
     def __init__(self):
         self.api_key = os.getenv('GOOGLE_API_KEY')
-        self.mysql_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': 'swipe_app_development',
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config('swipe_app_development')
         self.success_count = 0
         self.api_usage = 0
 
@@ -72,7 +66,7 @@ class PermanentImageUrlExtractor:
     def process_all_spots(self, batch_size=5):
         """全スポットの画像を永続化"""
         try:
-            connection = mysql.connector.connect(**self.mysql_config)
+            connection = get_connection(self.mysql_config)
             cursor = connection.cursor()
 
             print("🚀 全スポット画像永続化開始\n")
@@ -8,7 +8,6 @@ Google Places APIを使用して北海道の温泉・公園・サウナ・カフ
 import os
 import sys
 import requests
-import mysql.connector
 from mysql.connector import Error
 from dotenv import load_dotenv
 from typing import List, Dict, Optional
@@ -19,6 +18,12 @@ from utils.request_guard import (
     mark_fetched_place,
     get_photo_direct_url,
 )
+from utils.place_id_index import PlaceIdIndex
+from utils.card_prefecture import prefecture_counts
+from utils.bulk_writer import write_cards
+from utils.db_pool import get_connection, db_config
+from utils.category_matcher import CategoryMatcher
+from utils.japanese_text import is_japanese_text, extract_japanese_reviews
 
 # .env読み込み
 load_dotenv()
@@ -26,14 +31,7 @@ load_dotenv()
 class HokkaidoDataCollector:
     def __init__(self):
         self.google_api_key = os.getenv('GOOGLE_API_KEY')
-        self.mysql_config = {
-            'host': os.getenv('MYSQL_HOST', 'localhost'),
-            'user': os.getenv('MYSQL_USER', 'Haruto'),
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': os.getenv('MYSQL_DB', 'swipe_app_development'),
-            'port': int(os.getenv('MYSQL_PORT', '3306')),
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config()
         self.places_api_base = 'https://maps.googleapis.com/maps/api/place'
         self.text_search_url = f"{self.places_api_base}/textsearch/json"
         self.place_details_url = f"{self.places_api_base}/details/json"
@@ -99,6 +97,7 @@ class HokkaidoDataCollector:
                 'target_count': 100
             }
         }
+        self.category_matcher = CategoryMatcher(self.search_categories)
         self.total_target_count = 400
 
     def _generate_regional_queries(self, base_terms: List[str]) -> List[str]:
@@ -183,56 +182,15 @@ class HokkaidoDataCollector:
             return False
 
     def is_japanese_text(self, text: str) -> bool:
-        if not text:
-            return False
-        stripped = text.replace(' ','').replace('\n','')
-        if not stripped:
-            return False
-        jp = 0
-        for ch in stripped:
-            if ('\u3040' <= ch <= '\u309F') or ('\u30A0' <= ch <= '\u30FF') or ('\u4E00' <= ch <= '\u9FAF'):
-                jp += 1
-        return jp/len(stripped) >= 0.3
+        return is_japanese_text(text)
 
     def extract_japanese_reviews(self, reviews: List[Dict], max_count: int = 10) -> List[Dict]:
-        if not reviews:
-            return []
-        jr = []
-        for rv in reviews:
-            txt = rv.get('text','')
-            if self.is_japanese_text(txt):
-                jr.append({
-                    'text': txt,
-                    'rating': rv.get('rating',0),
-                    'time': rv.get('time',0),
-                    'author_name': rv.get('author_name',''),
-                    'relative_time_description': rv.get('relative_time_description','')
-                })
-        jr.sort(key=lambda x: x['time'], reverse=True)
-        return jr[:max_count]
+        return extract_japanese_reviews(reviews, max_count)
 
     def filter_places_by_category(self, places: List[Dict], category: str) -> List[Dict]:
         if category not in self.search_categories:
             return []
-        cfg = self.search_categories[category]
-        keywords = cfg['keywords']
-        exclude = cfg['exclude_types']
-        out = []
-        for p in places:
-            name = (p.get('name','') or '').lower()
-            types = p.get('types',[]) or []
-            has_kw = any(k in name for k in keywords)
-            if not has_kw and category == 'active_sauna':
-                sauna_frag = any(f in name for f in ['サウナ','整','ととの'])
-                type_hint = any(t in types for t in ['spa','gym','health','establishment'])
-                if sauna_frag and type_hint:
-                    has_kw = True
-            if not has_kw:
-                continue
-            if any(ex in types for ex in exclude):
-                continue
-            out.append(p)
-        return out
+        return self.category_matcher.filter(places, category)
 
     def format_place_data(self, place: Dict, category: str, details: Optional[Dict]=None) -> Dict:
         src = details or place
@@ -282,7 +240,7 @@ class HokkaidoDataCollector:
 
     def connect_database(self):
         try:
-            conn = mysql.connector.connect(**self.mysql_config)
+            conn = get_connection(self.mysql_config)
             if conn.is_connected():
                 try:
                     cur = conn.cursor(); cur.execute('SELECT DATABASE()'); (current_db,) = cur.fetchone(); cur.close()
@@ -299,40 +257,9 @@ class HokkaidoDataCollector:
         if not conn:
             return False
         try:
-            cur = conn.cursor()
-            check_q = 'SELECT id FROM cards WHERE place_id=%s'
-            insert_card = (
-                'INSERT INTO cards (genre,title,rating,review_count,image_url,external_link,region,address,latitude,longitude,place_id,created_at,updated_at) '
-                'VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,NOW(),NOW())'
-            )
-            insert_rev = 'INSERT INTO review_comments (comment,card_id,created_at,updated_at) VALUES (%s,%s,NOW(),NOW())'
-            ins = dup = rev_sum = 0
-            for r in rows:
-                pid = r.get('place_id')
-                if not pid:
-                    dup += 1
-                    continue
-                cur.execute(check_q,(pid,))
-                if cur.fetchone():
-                    dup += 1
-                    continue
-                cur.execute(insert_card,(
-                    r['genre'],r['title'],r['rating'],r['review_count'],r['image_url'],r['external_link'],
-                    r['region'],r['address'],r['latitude'],r['longitude'],r['place_id']
-                ))
-                card_id = cur.lastrowid
-                added_rev = 0
-                for rev in r.get('reviews',[]):
-                    txt = rev['text']
-                    if len(txt) > 1000:
-                        txt = txt[:997]+'...'
-                    cur.execute(insert_rev,(txt,card_id))
-                    added_rev += 1
-                rev_sum += added_rev
-                ins += 1
-                print(f"✅ 保存: {r['title']} (レビュー{added_rev})")
+            res = write_cards(conn, rows)
             conn.commit()
-            print(f"\n📊 挿入 {ins} / 重複 {dup}  レビュー {rev_sum}")
+            print(f"\n📊 挿入 {res['inserted']} / 重複 {res['duplicates'] + res['invalid']}  レビュー {res['reviews']}")
             return True
         except Error as e:
             print(f'❌ DBエラー: {e}')
@@ -340,22 +267,19 @@ class HokkaidoDataCollector:
             return False
         finally:
             if conn.is_connected():
-                cur.close(); conn.close(); print('✅ DB切断')
+                conn.close(); print('✅ DB切断')
 
-    def _load_existing_place_ids(self) -> set:
+    def _load_existing_place_ids(self) -> PlaceIdIndex:
+        idx = PlaceIdIndex('cards')
         conn = self.connect_database()
-        ids = set()
         if not conn:
-            return ids
+            return idx
         try:
-            cur = conn.cursor()
-            cur.execute('SELECT place_id FROM cards WHERE place_id IS NOT NULL')
-            for (pid,) in cur.fetchall():
-                if pid: ids.add(pid)
+            idx.refresh(conn)
         finally:
             if conn.is_connected():
-                cur.close(); conn.close()
-        return ids
+                conn.close()
+        return idx
 
     def _get_existing_counts(self, category: str):
         conn = self.connect_database()
@@ -364,18 +288,11 @@ class HokkaidoDataCollector:
         if not conn:
             return total, pref_counts
         try:
-            cur = conn.cursor()
-            cur.execute("SELECT COUNT(*) FROM cards WHERE genre=%s AND region='北海道'", (category,))
-            total = cur.fetchone()[0]
-            cur.execute("SELECT address FROM cards WHERE genre=%s AND region='北海道'", (category,))
-            for (addr,) in cur.fetchall():
-                if not addr:
-                    continue
-                if '北海道' in addr:
-                    pref_counts['北海道'] += 1
+            pref_counts.update(prefecture_counts(conn, category, self.prefectures))
+            total = sum(pref_counts.values())
         finally:
             if conn.is_connected():
-                cur.close(); conn.close()
+                conn.close()
         return total, pref_counts
 
     def collect_data(self, category: Optional[str]=None):
@@ -7,7 +7,6 @@ Google Places APIを使用して関西の温泉・公園・サウナ・カフェ
 import os
 import sys
 import requests
-import mysql.connector
 from mysql.connector import Error
 from dotenv import load_dotenv
 import json
@@ -19,6 +18,15 @@ from utils.request_guard import (
     mark_fetched_place,
     get_photo_direct_url,
 )
+from utils.place_id_index import PlaceIdIndex
+from utils.card_prefecture import prefecture_counts
+from utils.bulk_writer import write_cards, print_card_result
+from utils.db_pool import get_connection, db_config
+from utils.category_matcher import CategoryMatcher
+from utils.spillover import SpilloverPools
+from utils.quota_allocator import deficit_first_quotas
+from utils.dedupe_index import DedupeIndex
+from utils.japanese_text import is_japanese_text, extract_japanese_reviews
 
 # .envファイルを読み込み
 load_dotenv()
@@ -27,14 +35,7 @@ class KansaiDataCollector:
     def __init__(self):
         """初期化"""
         self.google_api_key = os.getenv('GOOGLE_API_KEY')
-        self.mysql_config = {
-            'host': os.getenv('MYSQL_HOST', 'localhost'),
-            'user': os.getenv('MYSQL_USER', 'Haruto'),
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': os.getenv('MYSQL_DB', 'swipe_app_development'),
-            'port': int(os.getenv('MYSQL_PORT', '3306')),
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config()
 
         # API設定
         self.places_api_base = "https://maps.googleapis.com/maps/api/place"
@@ -104,6 +105,9 @@ class KansaiDataCollector:
             }
         }
 
+        # カテゴリ判定（キーワード・除外タイプ・active_sauna の緩和を事前にまとめたもの）
+        self.category_matcher = CategoryMatcher(self.search_categories)
+
         self.total_target_count = 400  # 全体の取得目標件数（各カテゴリ100件ずつ）
 
     def _generate_regional_queries(self, base_terms: List[str]) -> List[str]:
@@ -232,86 +236,18 @@ class KansaiDataCollector:
             return False
 
     def is_japanese_text(self, text: str) -> bool:
-        """テキストが日本語かどうかを判定"""
-        if not text:
-            return False
-
-        # ひらがな、カタカナ、漢字の文字数をカウント
-        japanese_chars = 0
-        total_chars = len(text.replace(' ', '').replace('\n', ''))
-
-        if total_chars == 0:
-            return False
-
-        for char in text:
-            # ひらがな: U+3040-U+309F
-            # カタカナ: U+30A0-U+30FF
-            # 漢字: U+4E00-U+9FAF
-            if ('\u3040' <= char <= '\u309F' or
-                '\u30A0' <= char <= '\u30FF' or
-                '\u4E00' <= char <= '\u9FAF'):
-                japanese_chars += 1
-
-        # 日本語文字が全体の30%以上なら日本語とみなす
-        return (japanese_chars / total_chars) >= 0.3
+        """テキストが日本語かどうかを判定（utils/japanese_text.py）"""
+        return is_japanese_text(text)
 
     def extract_japanese_reviews(self, reviews: List[Dict], max_count: int = 10) -> List[Dict]:
-        """日本語レビューを抽出・ソート"""
-        if not reviews:
-            return []
-
-        japanese_reviews = []
-
-        for review in reviews:
-            text = review.get('text', '')
-            if self.is_japanese_text(text):
-                japanese_reviews.append({
-                    'text': text,
-                    'rating': review.get('rating', 0),
-                    'time': review.get('time', 0),  # Unixタイムスタンプ
-                    'author_name': review.get('author_name', ''),
-                    'relative_time_description': review.get('relative_time_description', '')
-                })
-
-        # 新しい順にソート（timeの降順）
-        japanese_reviews.sort(key=lambda x: x['time'], reverse=True)
-
-        # 最大件数に制限
-        return japanese_reviews[:max_count]
+        """日本語レビューを抽出・ソート（新しい順に最大 max_count 件）"""
+        return extract_japanese_reviews(reviews, max_count)
 
     def filter_places_by_category(self, places: List[Dict], category: str) -> List[Dict]:
-        """カテゴリ別に施設をフィルタリング"""
+        """カテゴリ別に施設をフィルタリング（名前のキーワード・除外タイプ。utils/category_matcher.py）"""
         if category not in self.search_categories:
             return []
-
-        category_config = self.search_categories[category]
-        keywords = category_config['keywords']
-        exclude_types = category_config['exclude_types']
-
-        filtered = []
-
-        for place in places:
-            # 名前にカテゴリ関連キーワードが含まれているかチェック
-            name = place.get('name', '').lower()
-            types = place.get('types', []) or []
-
-            # キーワードチェック
-            has_keyword = any(k in name for k in keywords)
-
-            # active_sauna 緩和: types に spa / gym / health / establishment があり、名前にサウナ系断片("サウナ"/"整"/"ととの") があれば許容
-            if not has_keyword and category == 'active_sauna':
-                sauna_frag = any(frag in name for frag in ['サウナ', '整', 'ととの'])
-                type_hint = any(t in types for t in ['spa', 'gym', 'health', 'establishment'])
-                if sauna_frag and type_hint:
-                    has_keyword = True
-
-            # 除外タイプチェック
-            has_exclude_type = any(exc_type in types for exc_type in exclude_types)
-
-            if has_keyword and not has_exclude_type:
-                filtered.append(place)
-
-        return filtered
+        return self.category_matcher.filter(places, category)
 
     def format_place_data(self, place: Dict, category: str, details: Optional[Dict] = None) -> Dict:
         """場所データを整形"""
@@ -400,7 +336,7 @@ class KansaiDataCollector:
     def connect_database(self):
         """データベース接続"""
         try:
-            connection = mysql.connector.connect(**self.mysql_config)
+            connection = get_connection(self.mysql_config)
             if connection.is_connected():
                 try:
                     cur = connection.cursor()
@@ -416,88 +352,15 @@ class KansaiDataCollector:
             return None
 
     def save_to_database(self, places_data: List[Dict]):
-        """データベースに保存"""
+        """データベースに保存（utils/bulk_writer でまとめて挿入、既存place_idはスキップ）"""
         connection = self.connect_database()
         if not connection:
             return False
 
         try:
-            cursor = connection.cursor()
-
-            # 重複チェック用クエリ（place_idベースに変更）
-            check_query = "SELECT id FROM cards WHERE place_id = %s"
-
-            # カード挿入クエリ
-            insert_card_query = """
-                INSERT INTO cards (genre, title, rating, review_count, image_url, external_link, region, address, latitude, longitude, place_id, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-            """
-
-            # レビュー挿入クエリ
-            insert_review_query = """
-                INSERT INTO review_comments (comment, card_id, created_at, updated_at)
-                VALUES (%s, %s, NOW(), NOW())
-            """
-
-            inserted_count = 0
-            duplicate_count = 0
-            total_reviews_inserted = 0
-
-            for place_data in places_data:
-                # place_idの有効性チェック
-                if not place_data.get('place_id'):
-                    print(f"⚠️  place_idが見つかりません: {place_data['title']}")
-                    duplicate_count += 1
-                    continue
-
-                # 重複チェック（place_idベース）
-                cursor.execute(check_query, (place_data['place_id'],))
-                existing = cursor.fetchone()
-
-                if existing:
-                    print(f"⚠️  スキップ（重複）: {place_data['title']} (place_id: {place_data['place_id']})")
-                    duplicate_count += 1
-                    continue
-
-                # カードデータ挿入
-                card_values = (
-                    place_data['genre'],
-                    place_data['title'],
-                    place_data['rating'],
-                    place_data['review_count'],
-                    place_data['image_url'],
-                    place_data['external_link'],
-                    place_data['region'],
-                    place_data['address'],
-                    place_data['latitude'],
-                    place_data['longitude'],
-                    place_data['place_id']
-                )
-
-                cursor.execute(insert_card_query, card_values)
-                card_id = cursor.lastrowid  # 挿入されたカードのIDを取得
-
-                # レビューデータ挿入
-                reviews = place_data.get('reviews', [])
-                reviews_inserted = 0
-
-                for review in reviews:
-                    review_text = review['text']
-                    # コメントの長さ制限（TEXTフィールドなので65535文字まで可能だが、実用的な長さに制限）
-                    if len(review_text) > 1000:
-                        review_text = review_text[:997] + "..."
-
-                    cursor.execute(insert_review_query, (review_text, card_id))
-                    reviews_inserted += 1
-
-                inserted_count += 1
-                total_reviews_inserted += reviews_inserted
-                print(f"✅ 保存完了: {place_data['title']} (レビュー{reviews_inserted}件)")
-
+            result = write_cards(connection, places_data)
             connection.commit()
-            print(f"\n📊 保存結果: {inserted_count}件挿入, {duplicate_count}件重複スキップ")
-            print(f"💬 レビュー保存結果: {total_reviews_inserted}件挿入")
-
+            print_card_result(result)
             return True
 
         except Error as e:
@@ -507,34 +370,21 @@ class KansaiDataCollector:
 
         finally:
             if connection.is_connected():
-                cursor.close()
                 connection.close()
                 print("✅ データベース接続終了")
 
     def _get_existing_counts(self, category: str):
-        """指定カテゴリの既存総数と都府県別カウントを取得"""
+        """指定カテゴリの既存総数と都府県別カウントを取得（cards.prefecture の GROUP BY）"""
         connection = self.connect_database()
         total = 0
         prefect_counts = {p: 0 for p in self.kansai_prefectures}
         if not connection:
             return total, prefect_counts
         try:
-            cur = connection.cursor()
-            # 総数
-            cur.execute("SELECT COUNT(*) FROM cards WHERE genre=%s AND region='関西'", (category,))
-            total = cur.fetchone()[0]
-            # 住所を取得して都府県判定
-            cur.execute("SELECT address FROM cards WHERE genre=%s AND region='関西'", (category,))
-            for (addr,) in cur.fetchall():
-                if not addr:
-                    continue
-                for pref in self.kansai_prefectures:
-                    if pref in addr:
-                        prefect_counts[pref] += 1
-                        break
+            prefect_counts.update(prefecture_counts(connection, category, self.kansai_prefectures))
+            total = sum(prefect_counts.values())
         finally:
             if connection.is_connected():
-                cur.close()
                 connection.close()
         return total, prefect_counts
 
@@ -552,18 +402,24 @@ class KansaiDataCollector:
         ]
         SAUNA_EXPAND_TERMS = ["テントサウナ", "外気浴", "水風呂", "ととのい", "整い", "高温サウナ", "低温サウナ", "サウナラウンジ", "サ活", "発汗"]
 
-        def build_prefecture_quotas(total: int) -> Dict[str, int]:
-            base = total // len(self.kansai_prefectures)
-            rem = total % len(self.kansai_prefectures)
-            quotas = {}
-            for i, pref in enumerate(self.kansai_prefectures):
-                quotas[pref] = base + (1 if i < rem else 0)
-            return quotas
-
         # 対象カテゴリリスト
         categories = [category] if category else list(self.search_categories.keys())
 
+        # 既存件数（トップアップ用途）。既存分を考慮した都府県別追加クォータ（理想=目標件数の均等割当に対する不足を優先）
+        existing = {c: self._get_existing_counts(c) for c in categories if c in self.search_categories}
+
+        def additional_quotas(cat: str) -> Dict[str, int]:
+            full_target = self.search_categories[cat]['target_count']
+            existing_total, existing_pref_counts = existing[cat]
+            if existing_total >= full_target:
+                return {p: 0 for p in self.kansai_prefectures}
+            return deficit_first_quotas(full_target, full_target - existing_total, self.kansai_prefectures,
+                                        existing_pref_counts)
+
         all_formatted = []
+        # 検索結果のうち他カテゴリに一致した候補は、そのカテゴリのプールへ（上限はそのカテゴリの都府県別追加クォータ）
+        pools = SpilloverPools(self.category_matcher, self.kansai_prefectures,
+                               {c: additional_quotas(c) for c in existing})
 
         for cat in categories:
             if cat not in self.search_categories:
@@ -573,46 +429,16 @@ class KansaiDataCollector:
             full_target = cfg['target_count']
 
             # 既存数取得（トップアップ用途）
-            existing_total, existing_pref_counts = self._get_existing_counts(cat)
+            existing_total = existing[cat][0]
             existing_place_ids = self._load_existing_place_ids()  # 追加: 既存除外
             if existing_total >= full_target:
                 print(f"✅ {cat}: 既に目標{full_target}件に達しているためスキップ")
+                pools.close(cat)
                 continue
             remaining_target = full_target - existing_total
             print(f"\n🔍 {cat}: 既存 {existing_total}/{full_target} → 追加取得目標 {remaining_target}件")
 
-            # 既存分を考慮した都府県別不足計算 (理想=full_targetを均等割当)
-            ideal_full = build_prefecture_quotas(full_target)
-            deficits = {p: max(0, ideal_full[p] - existing_pref_counts.get(p, 0)) for p in self.kansai_prefectures}
-            total_deficit = sum(deficits.values())
-
-            # 追加クォータ決定
-            if total_deficit == 0:
-                # 理論上均等 → 残り件数を均等割り
-                quotas = build_prefecture_quotas(remaining_target)
-            else:
-                # 不足が多い都府県を優先しつつ remaining_target を配分
-                quotas = {p: 0 for p in self.kansai_prefectures}
-                need = remaining_target
-                ordered = sorted(deficits.items(), key=lambda x: x[1], reverse=True)
-                # ラウンドロビンで deficit 消化
-                while need > 0:
-                    progress = 0
-                    for pref, deficit in ordered:
-                        if need <= 0:
-                            break
-                        if quotas[pref] >= deficit:
-                            continue
-                        quotas[pref] += 1
-                        need -= 1
-                        progress += 1
-                    if progress == 0:
-                        break
-                # 念のため: 未割当があれば均等配分
-                if need > 0:
-                    tmp = build_prefecture_quotas(need)
-                    for p, v in tmp.items():
-                        quotas[p] += v
+            quotas = additional_quotas(cat)
             # 0割当都府県は収集ループでスキップされる
             print(f"🧮 都府県別追加クォータ: {quotas}")
 
@@ -628,6 +454,9 @@ class KansaiDataCollector:
             counts = {p: 0 for p in self.kansai_prefectures}
             exhausted = {p: quotas.get(p, 0) == 0 for p in self.kansai_prefectures}
             zero_gain_streak = {p: 0 for p in self.kansai_prefectures}
+            pooled = pools.fill(cat, collected_places, counts, quotas, existing_place_ids)
+            if pooled:
+                print(f"♻️ {cat}: 他カテゴリの検索結果から +{pooled}件")
 
             rounds = 0
             target = remaining_target  # 以降この変数で不足分ターゲットを扱う
@@ -643,7 +472,7 @@ class KansaiDataCollector:
                         continue
                     query = prefecture_query_map[pref].pop(0)
                     places = self.search_places(query)
-                    filtered = self.filter_places_by_category(places, cat)
+                    filtered = pools.harvest(places, cat, existing_place_ids)
                     added = 0
                     for place in filtered:
                         if counts[pref] >= quotas[pref]:
@@ -714,7 +543,7 @@ class KansaiDataCollector:
                             continue
                         query = prefecture_query_map[pref].pop(0)
                         places = self.search_places(query)
-                        filtered = self.filter_places_by_category(places, cat)
+                        filtered = pools.harvest(places, cat, existing_place_ids)
                         for place in filtered:
                             if deficit <= 0:
                                 break
@@ -802,10 +631,14 @@ class KansaiDataCollector:
             # 詳細取得（追加分のみ）
             print(f"📦 {cat} 追加分 詳細取得開始: {min(sum(counts.values()), target)}件")
             category_data = []
+            # 名前と位置で既存カード・他の候補と重複するものは詳細取得しない（utils/dedupe_index）
+            _, near_duplicates = self._dedupe_index(cat).dedupe(collected_places.values())
+            if near_duplicates:
+                print(f"🧹 {cat}: 近似重複 {len(near_duplicates)}件を詳細取得前に除外")
             for i, (pid, place) in enumerate(list(collected_places.items()), 1):
                 if i > target:
                     break
-                if pid in existing_place_ids:
+                if pid in existing_place_ids or pid in near_duplicates:
                     continue
                 print(f"  ({i}/{target}) {place.get('name')} 詳細取得")
                 if not self.validate_place_id(pid):
@@ -833,23 +666,33 @@ class KansaiDataCollector:
         print("🎉 指定カテゴリ処理終了")
         return True
 
-    def _load_existing_place_ids(self) -> set:
-        """全cardsのplace_idを読み込み重複除外用集合を返す"""
+    def _dedupe_index(self, category: str) -> DedupeIndex:
+        """名前・位置の近似重複索引（utils/dedupe_index）に同カテゴリの既存カードを登録して返す"""
+        index = DedupeIndex.for_category(category, self.search_categories.get(category, {}).get('keywords') or ())
         connection = self.connect_database()
-        ids = set()
         if not connection:
-            return ids
+            return index
         try:
             cur = connection.cursor()
-            cur.execute("SELECT place_id FROM cards WHERE place_id IS NOT NULL")
-            for (pid,) in cur.fetchall():
-                if pid:
-                    ids.add(pid)
+            index.load_cards(cur, genre=category)
+            cur.close()
+        finally:
+            if connection.is_connected():
+                connection.close()
+        return index
+
+    def _load_existing_place_ids(self) -> PlaceIdIndex:
+        """cardsの既存place_id索引（utils/place_id_index、前回以降の追加行のみ取得）を返す"""
+        index = PlaceIdIndex('cards')
+        connection = self.connect_database()
+        if not connection:
+            return index
+        try:
+            index.refresh(connection)
         finally:
             if connection.is_connected():
-                cur.close()
                 connection.close()
-        return ids
+        return index
 
 def main():
     """メイン関数"""
@@ -8,7 +8,6 @@ Google Places APIを使用して関西地方の温泉・公園・サウナ・カ
 import os
 import sys
 import requests
-import mysql.connector
 from mysql.connector import Error
 from dotenv import load_dotenv
 import json
@@ -20,6 +19,10 @@ from utils.request_guard import (
     mark_fetched_place,
     get_photo_direct_url,
 )
+from utils.place_id_index import PlaceIdIndex, open_index
+from utils.bulk_writer import write_spots
+from utils.db_pool import get_connection, db_config
+from utils.category_matcher import CategoryMatcher
 
 # .envファイルを読み込み
 load_dotenv()
@@ -28,13 +31,7 @@ class KansaiRelaxDataCollector:
     def __init__(self):
         """初期化"""
         self.google_api_key = os.getenv('GOOGLE_API_KEY')
-        self.mysql_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': 'swipe_app_development',
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config('swipe_app_development')
 
         # API設定
         self.places_api_base = "https://maps.googleapis.com/maps/api/place"
@@ -121,6 +118,10 @@ class KansaiRelaxDataCollector:
             }
         }
 
+        # カテゴリ判定（名前・周辺住所のキーワード、地方内の都府県名、除外タイプを事前にまとめたもの）
+        self.category_matcher = CategoryMatcher(self.search_categories, relaxations={}, fields=('name', 'vicinity'),
+                                                required_terms=self.kansai_prefectures)
+
         self.total_target_count = 100  # 全体の取得目標件数（各カテゴリ20件ずつ）
 
     def _generate_regional_queries(self, base_terms: List[str]) -> List[str]:
@@ -147,7 +148,7 @@ class KansaiRelaxDataCollector:
     def _setup_mysql_connection(self):
         """MySQL接続をセットアップ"""
         try:
-            connection = mysql.connector.connect(**self.mysql_config)
+            connection = get_connection(self.mysql_config)
             if connection.is_connected():
                 print(f"MySQLに接続しました: {self.mysql_config['database']}")
                 return connection
@@ -193,19 +194,12 @@ class KansaiRelaxDataCollector:
         cursor.close()
         print("テーブル作成完了")
 
-    def _get_existing_place_ids(self, connection, category: str = None) -> set:
-        """既存のplace_idを取得"""
-        cursor = connection.cursor()
+    def _get_existing_place_ids(self, connection, category: str = None) -> PlaceIdIndex:
+        """既存のplace_idを取得（utils/place_id_index、前回以降の追加行のみ取得）"""
         if category:
-            query = "SELECT place_id FROM spots WHERE category = %s AND region = 'kansai'"
-            cursor.execute(query, (category,))
-        else:
-            query = "SELECT place_id FROM spots WHERE region = 'kansai'"
-            cursor.execute(query)
-
-        existing_ids = {row[0] for row in cursor.fetchall()}
-        cursor.close()
-        return existing_ids
+            return open_index(connection, f"spots_kansai_{category}", table='spots',
+                              where="category = %s AND region = 'kansai'", params=(category,))
+        return open_index(connection, "spots_kansai", table='spots', where="region = 'kansai'")
 
     def _search_places(self, query: str, category: str) -> List[Dict]:
         """Google Places APIで場所を検索"""
@@ -248,36 +242,10 @@ class KansaiRelaxDataCollector:
         return all_results
 
     def _filter_results(self, results: List[Dict], category: str) -> List[Dict]:
-        """検索結果をフィルタリング"""
+        """検索結果をフィルタリング（地方内の都府県名があり、キーワードに一致し、除外タイプでないもの）"""
         if category not in self.search_categories:
             return results
-
-        category_config = self.search_categories[category]
-        keywords = category_config.get('keywords', [])
-        exclude_types = category_config.get('exclude_types', [])
-
-        filtered = []
-        for place in results:
-            # 除外タイプチェック
-            place_types = place.get('types', [])
-            if any(excluded in place_types for excluded in exclude_types):
-                continue
-
-            # キーワードチェック（名前や住所に含まれているか）
-            name = place.get('name', '').lower()
-            vicinity = place.get('vicinity', '').lower()
-
-            # 関西地方の都府県が含まれているかチェック
-            address_text = f"{name} {vicinity}".lower()
-            kansai_prefectures_check = ['大阪', '兵庫', '京都', '奈良', '滋賀', '和歌山']
-
-            has_kansai_location = any(pref in address_text for pref in kansai_prefectures_check)
-            has_keyword = any(keyword.lower() in address_text for keyword in keywords)
-
-            if has_kansai_location and (has_keyword or not keywords):
-                filtered.append(place)
-
-        return filtered
+        return self.category_matcher.filter(results, category)
 
     def _get_place_details(self, place_id: str) -> Optional[Dict]:
         """場所の詳細情報を取得"""
@@ -307,27 +275,7 @@ class KansaiRelaxDataCollector:
 
     def _save_to_database(self, connection, places: List[Dict], category: str):
         """データベースに保存"""
-        cursor = connection.cursor()
-
-        insert_query = """
-        INSERT INTO spots (
-            place_id, name, category, address, latitude, longitude, rating,
-            user_ratings_total, price_level, phone_number, website, opening_hours,
-            photos, types, vicinity, plus_code, region
-        ) VALUES (
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-        ) ON DUPLICATE KEY UPDATE
-            name = VALUES(name),
-            address = VALUES(address),
-            rating = VALUES(rating),
-            user_ratings_total = VALUES(user_ratings_total),
-            phone_number = VALUES(phone_number),
-            website = VALUES(website),
-            opening_hours = VALUES(opening_hours),
-            updated_at = CURRENT_TIMESTAMP
-        """
-
-        saved_count = 0
+        rows = []
         for place in places:
             try:
                 # 写真情報の処理
@@ -372,15 +320,15 @@ class KansaiRelaxDataCollector:
                     'kansai'
                 )
 
-                cursor.execute(insert_query, data)
-                saved_count += 1
+                rows.append(data)
 
             except Exception as e:
-                print(f"保存エラー: {e} - {place.get('name', 'Unknown')}")
+                print(f"データ整形エラー: {e} - {place.get('name', 'Unknown')}")
                 continue
 
+        # 複数行 INSERT ... ON DUPLICATE KEY UPDATE でまとめて保存（utils/bulk_writer）
+        saved_count = write_spots(connection, rows)
         connection.commit()
-        cursor.close()
         print(f"カテゴリ {category}: {saved_count}件保存完了")
         return saved_count
 
@@ -7,7 +7,6 @@ Google Places APIを使用して東京の温泉・公園・サウナ・カフェ
 import os
 import sys
 import requests
-import mysql.connector
 from mysql.connector import Error
 from dotenv import load_dotenv
 import json
@@ -19,6 +18,13 @@ from utils.request_guard import (
     mark_fetched_place,
     get_photo_direct_url,
 )
+from utils.bulk_writer import write_cards, print_card_result
+from utils.query_pruning import apply_pruning, load_pruned_queries
+from utils.checkpoint import RunCheckpoint
+from utils.prefecture_geo import find_prefecture, prefecture_bias, region_bias, place_in_prefectures
+from utils.db_pool import get_connection, db_config
+from utils.category_matcher import CategoryMatcher
+from utils.japanese_text import is_japanese_text, extract_japanese_reviews
 
 # .envファイルを読み込み
 load_dotenv()
@@ -27,13 +33,7 @@ class MultiCategoryDataCollector:
     def __init__(self):
         """初期化"""
         self.google_api_key = os.getenv('GOOGLE_API_KEY')
-        self.mysql_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': 'swipe_app_development',
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config('swipe_app_development')
 
         # API設定
         self.places_api_base = "https://maps.googleapis.com/maps/api/place"
@@ -83,6 +83,9 @@ class MultiCategoryDataCollector:
             }
         }
 
+        # カテゴリ判定（キーワード・除外タイプを事前にまとめたもの。このスクリプトは active_sauna の緩和なし）
+        self.category_matcher = CategoryMatcher(self.search_categories, relaxations={})
+
         self.total_target_count = 400  # 全体の取得目標件数（各カテゴリ100件ずつ）
 
     def _generate_regional_queries(self, base_terms: List[str]) -> List[str]:
@@ -113,23 +116,23 @@ class MultiCategoryDataCollector:
 
         print("✅ 設定の検証が完了しました")
 
+    def text_search_params(self, query: str, location: str = "") -> Dict:
+        """テキスト検索のパラメータ（クエリ内の都県、無ければ関東全域に location バイアス）"""
+        params = {
+            'query': f"{query} {location}" if location else query,
+            'key': self.google_api_key,
+            'language': 'ja',
+            'region': 'jp'
+        }
+        pref = find_prefecture(params['query'], self.kanto_prefectures)
+        bias = prefecture_bias(pref) if pref else region_bias(self.kanto_prefectures)
+        if bias:
+            params.update(bias)
+        return params
+
     def search_places(self, query: str, location: str = "", radius: int = 100000) -> List[Dict]:
         """Google Places APIでテキスト検索（関東全域対応）"""
-        # 位置情報がない場合は関東地方の中心付近を使用
-        if not location:
-            params = {
-                'query': query,
-                'key': self.google_api_key,
-                'language': 'ja',
-                'region': 'jp'
-            }
-        else:
-            params = {
-                'query': f"{query} {location}",
-                'key': self.google_api_key,
-                'language': 'ja',
-                'region': 'jp'
-            }
+        params = self.text_search_params(query, location)
 
         try:
             print(f"🔍 検索中: {query}")
@@ -141,14 +144,10 @@ class MultiCategoryDataCollector:
                 return []
 
             results = data.get('results', [])
-            
-            # 関東地方の住所を持つ結果のみフィルタリング
-            kanto_results = []
-            for result in results:
-                address = result.get('formatted_address', '')
-                if any(prefecture in address for prefecture in self.kanto_prefectures):
-                    kanto_results.append(result)
-            
+
+            # 関東地方内の結果のみ（座標の矩形判定、境界付近は住所で確認）
+            kanto_results = [r for r in results if place_in_prefectures(r, self.kanto_prefectures)]
+
             print(f"📍 関東地方内: {len(kanto_results)}件の候補を発見")
             return kanto_results
 
@@ -214,79 +213,18 @@ class MultiCategoryDataCollector:
             return False
 
     def is_japanese_text(self, text: str) -> bool:
-        """テキストが日本語かどうかを判定"""
-        if not text:
-            return False
-
-        # ひらがな、カタカナ、漢字の文字数をカウント
-        japanese_chars = 0
-        total_chars = len(text.replace(' ', '').replace('\n', ''))
-
-        if total_chars == 0:
-            return False
-
-        for char in text:
-            # ひらがな: U+3040-U+309F
-            # カタカナ: U+30A0-U+30FF
-            # 漢字: U+4E00-U+9FAF
-            if ('\u3040' <= char <= '\u309F' or
-                '\u30A0' <= char <= '\u30FF' or
-                '\u4E00' <= char <= '\u9FAF'):
-                japanese_chars += 1
-
-        # 日本語文字が全体の30%以上なら日本語とみなす
-        return (japanese_chars / total_chars) >= 0.3
+        """テキストが日本語かどうかを判定（utils/japanese_text.py）"""
+        return is_japanese_text(text)
 
     def extract_japanese_reviews(self, reviews: List[Dict], max_count: int = 10) -> List[Dict]:
-        """日本語レビューを抽出・ソート"""
-        if not reviews:
-            return []
-
-        japanese_reviews = []
-
-        for review in reviews:
-            text = review.get('text', '')
-            if self.is_japanese_text(text):
-                japanese_reviews.append({
-                    'text': text,
-                    'rating': review.get('rating', 0),
-                    'time': review.get('time', 0),  # Unixタイムスタンプ
-                    'author_name': review.get('author_name', ''),
-                    'relative_time_description': review.get('relative_time_description', '')
-                })
-
-        # 新しい順にソート（timeの降順）
-        japanese_reviews.sort(key=lambda x: x['time'], reverse=True)
-
-        # 最大件数に制限
-        return japanese_reviews[:max_count]
+        """日本語レビューを抽出・ソート（新しい順に最大 max_count 件）"""
+        return extract_japanese_reviews(reviews, max_count)
 
     def filter_places_by_category(self, places: List[Dict], category: str) -> List[Dict]:
-        """カテゴリ別に施設をフィルタリング"""
+        """カテゴリ別に施設をフィルタリング（名前のキーワード・除外タイプ。utils/category_matcher.py）"""
         if category not in self.search_categories:
             return []
-
-        category_config = self.search_categories[category]
-        keywords = category_config['keywords']
-        exclude_types = category_config['exclude_types']
-
-        filtered = []
-
-        for place in places:
-            # 名前にカテゴリ関連キーワードが含まれているかチェック
-            name = place.get('name', '').lower()
-            types = place.get('types', [])
-
-            # キーワードチェック
-            has_keyword = any(keyword in name for keyword in keywords)
-
-            # 除外タイプチェック
-            has_exclude_type = any(exc_type in types for exc_type in exclude_types)
-
-            if has_keyword and not has_exclude_type:
-                filtered.append(place)
-
-        return filtered
+        return self.category_matcher.filter(places, category)
 
     def format_place_data(self, place: Dict, category: str, details: Optional[Dict] = None) -> Dict:
         """場所データを整形"""
@@ -375,7 +313,7 @@ class MultiCategoryDataCollector:
     def connect_database(self):
         """データベース接続"""
         try:
-            connection = mysql.connector.connect(**self.mysql_config)
+            connection = get_connection(self.mysql_config)
             if connection.is_connected():
                 print("✅ データベース接続成功")
                 return connection
@@ -384,88 +322,15 @@ class MultiCategoryDataCollector:
             return None
 
     def save_to_database(self, places_data: List[Dict]):
-        """データベースに保存"""
+        """データベースに保存（utils/bulk_writer でまとめて挿入、既存place_idはスキップ）"""
         connection = self.connect_database()
         if not connection:
             return False
 
         try:
-            cursor = connection.cursor()
-
-            # 重複チェック用クエリ（place_idベースに変更）
-            check_query = "SELECT id FROM cards WHERE place_id = %s"
-
-            # カード挿入クエリ
-            insert_card_query = """
-                INSERT INTO cards (genre, title, rating, review_count, image_url, external_link, region, address, latitude, longitude, place_id, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-            """
-
-            # レビュー挿入クエリ
-            insert_review_query = """
-                INSERT INTO review_comments (comment, card_id, created_at, updated_at)
-                VALUES (%s, %s, NOW(), NOW())
-            """
-
-            inserted_count = 0
-            duplicate_count = 0
-            total_reviews_inserted = 0
-
-            for place_data in places_data:
-                # place_idの有効性チェック
-                if not place_data.get('place_id'):
-                    print(f"⚠️  place_idが見つかりません: {place_data['title']}")
-                    duplicate_count += 1
-                    continue
-
-                # 重複チェック（place_idベース）
-                cursor.execute(check_query, (place_data['place_id'],))
-                existing = cursor.fetchone()
-
-                if existing:
-                    print(f"⚠️  スキップ（重複）: {place_data['title']} (place_id: {place_data['place_id']})")
-                    duplicate_count += 1
-                    continue
-
-                # カードデータ挿入
-                card_values = (
-                    place_data['genre'],
-                    place_data['title'],
-                    place_data['rating'],
-                    place_data['review_count'],
-                    place_data['image_url'],
-                    place_data['external_link'],
-                    place_data['region'],
-                    place_data['address'],
-                    place_data['latitude'],
-                    place_data['longitude'],
-                    place_data['place_id']
-                )
-
-                cursor.execute(insert_card_query, card_values)
-                card_id = cursor.lastrowid  # 挿入されたカードのIDを取得
-
-                # レビューデータ挿入
-                reviews = place_data.get('reviews', [])
-                reviews_inserted = 0
-
-                for review in reviews:
-                    review_text = review['text']
-                    # コメントの長さ制限（TEXTフィールドなので65535文字まで可能だが、実用的な長さに制限）
-                    if len(review_text) > 1000:
-                        review_text = review_text[:997] + "..."
-
-                    cursor.execute(insert_review_query, (review_text, card_id))
-                    reviews_inserted += 1
-
-                inserted_count += 1
-                total_reviews_inserted += reviews_inserted
-                print(f"✅ 保存完了: {place_data['title']} (レビュー{reviews_inserted}件)")
-
+            result = write_cards(connection, places_data)
             connection.commit()
-            print(f"\n📊 保存結果: {inserted_count}件挿入, {duplicate_count}件重複スキップ")
-            print(f"💬 レビュー保存結果: {total_reviews_inserted}件挿入")
-
+            print_card_result(result)
             return True
 
         except Error as e:
@@ -475,12 +340,12 @@ class MultiCategoryDataCollector:
 
         finally:
             if connection.is_connected():
-                cursor.close()
                 connection.close()
                 print("✅ データベース接続終了")
 
-    def collect_data(self):
-        """メインのデータ収集処理（関東全域・全カテゴリ対応）"""
+    def collect_data(self, fresh: bool = False):
+        """メインのデータ収集処理（関東全域・全カテゴリ対応）
+        途中経過は .cache/checkpoints に保存し、中断後の再実行では続きから再開する（fresh=Trueで破棄）"""
         print("🚀 関東全域多カテゴリデータ収集開始")
         print(f"🎯 目標取得件数: 合計{self.total_target_count}件")
         print("📋 対象カテゴリ:")
@@ -491,20 +356,38 @@ class MultiCategoryDataCollector:
         # 設定検証
         self.validate_config()
 
-        all_formatted_data = []
+        # 重複度分析で冗長と判定されたクエリは発行しない（query_overlap_analyzer.py）
+        pruned = load_pruned_queries()
+
+        # チェックポイント（消費済みクエリ・候補・整形済みカードを保持）
+        ckpt = RunCheckpoint("fetch_kanto_spots", fresh=fresh)
+        if ckpt.resumed:
+            print(f"♻️ チェックポイントから再開: {ckpt.path}")
+        run_state = ckpt.section('run', {'completed': [], 'all_formatted': []})
+        all_formatted_data = run_state['all_formatted']
 
         # 各カテゴリでデータ収集
         for category, category_config in self.search_categories.items():
+            if category in run_state['completed']:
+                print(f"⏭️ {category}: チェックポイントで完了済みのためスキップ")
+                continue
             print(f"\n🔍 【{category}】カテゴリ データ収集開始 (目標: {category_config['target_count']}件)")
 
-            unique_places = {}  # place_idで重複除去
-            processed_queries = 0
+            st = ckpt.state.get('current')
+            if not st or st.get('category') != category:
+                st = {'category': category, 'consumed': [], 'unique_places': {}, 'category_data': [], 'detailed': []}
+                ckpt.state['current'] = st
+            unique_places = st['unique_places']  # place_idで重複除去
+            consumed = set(st['consumed'])
+            processed_queries = len(consumed)
 
             # 各検索クエリで検索実行
-            for query in category_config['queries']:
+            for query in apply_pruning(category_config['queries'], category, pruned=pruned):
                 if len(unique_places) >= category_config['target_count']:
                     print(f"🎯 {category} 目標件数に達しました！")
                     break
+                if query in consumed:
+                    continue
 
                 places = self.search_places(query)
                 processed_queries += 1
@@ -520,6 +403,9 @@ class MultiCategoryDataCollector:
                         unique_places[place_id] = place
                         new_additions += 1
 
+                consumed.add(query)
+                st['consumed'].append(query)
+                ckpt.save()
                 print(f"💡 {category} クエリ{processed_queries}: +{new_additions}件 (累計: {len(unique_places)}件)")
 
                 # API呼び出し制限対策
@@ -533,9 +419,12 @@ class MultiCategoryDataCollector:
             selected_places = list(unique_places.values())[:category_config['target_count']]
             print(f"\n📋 {category} 最終選択された施設: {len(selected_places)}件")
 
-            # 詳細情報取得とデータ整形
-            category_data = []
+            # 詳細情報取得とデータ整形（チェックポイント済みのplace_idは再検証しない）
+            category_data = st['category_data']
+            detailed = set(st['detailed'])
             for i, place in enumerate(selected_places, 1):
+                if place.get('place_id') in detailed:
+                    continue
                 print(f"\n🔍 {category} 詳細取得中 ({i}/{len(selected_places)}): {place.get('name')}")
 
                 # place_idの有効性をチェック
@@ -546,6 +435,8 @@ class MultiCategoryDataCollector:
 
                 if not self.validate_place_id(place_id):
                     print(f"  ⚠️  無効なplace_idのためスキップ: {place.get('name')}")
+                    st['detailed'].append(place_id)
+                    ckpt.save()
                     continue
 
                 # 詳細情報取得
@@ -557,6 +448,8 @@ class MultiCategoryDataCollector:
                 # データ整形（カテゴリを渡す）
                 formatted_place = self.format_place_data(place, category, details)
                 category_data.append(formatted_place)
+                st['detailed'].append(place_id)
+                ckpt.save()
 
                 print(f"  📍 {formatted_place['title']} ({formatted_place['address'][:30]}...)")
                 print(f"  ⭐ 評価: {formatted_place['rating']} ({formatted_place['review_count']}件)")
@@ -567,6 +460,9 @@ class MultiCategoryDataCollector:
 
             # カテゴリデータを全体に追加
             all_formatted_data.extend(category_data)
+            run_state['completed'].append(category)
+            ckpt.state.pop('current', None)
+            ckpt.save()
             print(f"✅ {category} カテゴリ完了: {len(category_data)}件追加")
 
         # データベースに保存
@@ -574,6 +470,7 @@ class MultiCategoryDataCollector:
         success = self.save_to_database(all_formatted_data)
 
         if success:
+            ckpt.clear()
             print(f"\n🎉 関東全域データ収集完了！")
             print(f"📊 総取得件数: {len(all_formatted_data)}件")
 
@@ -599,7 +496,7 @@ class MultiCategoryDataCollector:
             for prefecture, count in sorted(prefecture_counts.items()):
                 print(f"  • {prefecture}: {count}件")
         else:
-            print(f"\n❌ データ保存に失敗しました")
+            print(f"\n❌ データ保存に失敗しました（チェックポイントを保持: {ckpt.path}）")
 
         return success
 
@@ -607,7 +504,8 @@ def main():
     """メイン関数"""
     try:
         collector = MultiCategoryDataCollector()
-        collector.collect_data()
+        # --fresh: チェックポイントを破棄して最初から実行
+        collector.collect_data(fresh='--fresh' in sys.argv)
 
     except KeyboardInterrupt:
         print("\n⚠️  処理が中断されました")
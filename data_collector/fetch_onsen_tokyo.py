@@ -7,7 +7,6 @@ Google Places APIを使用して東京の温泉・公園・サウナ・カフェ
 import os
 import sys
 import requests
-import mysql.connector
 from mysql.connector import Error
 from dotenv import load_dotenv
 import json
@@ -19,6 +18,20 @@ from utils.request_guard import (
     mark_fetched_place,
     get_photo_direct_url,
 )
+from utils.query_pruning import apply_pruning, load_pruned_queries
+from utils.checkpoint import RunCheckpoint
+from utils.prefecture_geo import find_prefecture, prefecture_bias, region_bias, place_in_prefectures
+from utils.quota_allocator import QuotaAllocator, YieldStats
+from utils.api_budget import BudgetExceeded, get_guard, set_budget
+from utils.grid_harvester import GridHarvester, place_prefecture
+from utils.place_id_index import PlaceIdIndex
+from utils.card_prefecture import prefecture_counts
+from utils.bulk_writer import write_cards, print_card_result
+from utils.db_pool import get_connection, db_config
+from utils.category_matcher import CategoryMatcher
+from utils.spillover import SpilloverPools
+from utils.dedupe_index import DedupeIndex
+from utils.japanese_text import is_japanese_text, extract_japanese_reviews
 
 # .envファイルを読み込み
 load_dotenv()
@@ -27,14 +40,7 @@ class MultiCategoryDataCollector:
     def __init__(self):
         """初期化"""
         self.google_api_key = os.getenv('GOOGLE_API_KEY')
-        self.mysql_config = {
-            'host': os.getenv('MYSQL_HOST', 'localhost'),
-            'user': os.getenv('MYSQL_USER', 'Haruto'),
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': os.getenv('MYSQL_DB', 'swipe_app_development'),
-            'port': int(os.getenv('MYSQL_PORT', '3306')),
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config()
 
         # API設定
         self.places_api_base = "https://maps.googleapis.com/maps/api/place"
@@ -57,6 +63,7 @@ class MultiCategoryDataCollector:
                 ]),
                 'keywords': ['温泉', '銭湯', 'スパ', 'spa', 'hot spring', 'bath house', '入浴', '岩盤浴'],
                 'exclude_types': ['lodging', 'hotel'],
+                'grid_searches': [{'keyword': '温泉'}, {'keyword': '銭湯'}],
                 'target_count': 100
             },
             'active_park': {
@@ -70,6 +77,7 @@ class MultiCategoryDataCollector:
                 ]),
                 'keywords': ['公園', 'park', '緑地', '運動場', 'スポーツ', '広場', '散歩', '遊歩道'],
                 'exclude_types': ['lodging', 'hotel'],
+                'grid_searches': [{'place_type': 'park'}],
                 'target_count': 100
             },
             'active_sauna': {
@@ -87,6 +95,7 @@ class MultiCategoryDataCollector:
                 ]),
                 'keywords': ['サウナ', 'sauna', 'ロウリュ', '岩盤浴', 'テント', '外気浴', '水風呂', '整', 'ととの', '発汗', 'サ活'],
                 'exclude_types': ['lodging', 'hotel'],
+                'grid_searches': [{'keyword': 'サウナ'}],
                 'target_count': 100
             },
             'relax_cafe': {
@@ -100,12 +109,19 @@ class MultiCategoryDataCollector:
                 ]),
                 'keywords': ['カフェ', 'cafe', 'coffee', 'コーヒー', '喫茶', '動物', '猫', '犬'],
                 'exclude_types': ['lodging', 'hotel'],
+                'grid_searches': [{'place_type': 'cafe'}],
                 'target_count': 100
             }
         }
 
+        # カテゴリ判定（キーワード・除外タイプ・active_sauna の緩和を事前にまとめたもの）
+        self.category_matcher = CategoryMatcher(self.search_categories)
+
         self.total_target_count = 400  # 全体の取得目標件数（各カテゴリ100件ずつ）
 
+        # 常駐プロセス（collector_daemon.py）向け: 既存place_id索引の保持
+        self._existing_ids: Optional[PlaceIdIndex] = None
+
     def _generate_regional_queries(self, base_terms: List[str]) -> List[str]:
         """関東全域の検索クエリを生成"""
         queries = []
@@ -134,23 +150,23 @@ class MultiCategoryDataCollector:
 
         print("✅ 設定の検証が完了しました")
 
-    def search_places(self, query: str, location: str = "", radius: int = 100000) -> List[Dict]:
+    def text_search_params(self, query: str, location: str = "") -> Dict:
+        """テキスト検索のパラメータ（クエリ内の都県、無ければ関東全域に location バイアス）"""
+        params = {
+            'query': f"{query} {location}" if location else query,
+            'key': self.google_api_key,
+            'language': 'ja',
+            'region': 'jp'
+        }
+        pref = find_prefecture(params['query'], self.kanto_prefectures)
+        bias = prefecture_bias(pref) if pref else region_bias(self.kanto_prefectures)
+        if bias:
+            params.update(bias)
+        return params
+
+    def search_places(self, query: str, location: str = "") -> List[Dict]:
         """Google Places APIでテキスト検索（関東全域対応）"""
-        # 位置情報がない場合は関東地方の中心付近を使用
-        if not location:
-            params = {
-                'query': query,
-                'key': self.google_api_key,
-                'language': 'ja',
-                'region': 'jp'
-            }
-        else:
-            params = {
-                'query': f"{query} {location}",
-                'key': self.google_api_key,
-                'language': 'ja',
-                'region': 'jp'
-            }
+        params = self.text_search_params(query, location)
 
         try:
             print(f"🔍 検索中: {query}")
@@ -163,12 +179,8 @@ class MultiCategoryDataCollector:
 
             results = data.get('results', [])
 
-            # 関東地方の住所を持つ結果のみフィルタリング
-            kanto_results = []
-            for result in results:
-                address = result.get('formatted_address', '')
-                if any(prefecture in address for prefecture in self.kanto_prefectures):
-                    kanto_results.append(result)
+            # 関東地方内の結果のみ（座標の矩形判定、境界付近は resolve_prefecture で確認）
+            kanto_results = [r for r in results if place_in_prefectures(r, self.kanto_prefectures)]
 
             print(f"📍 関東地方内: {len(kanto_results)}件の候補を発見")
             return kanto_results
@@ -232,92 +244,24 @@ class MultiCategoryDataCollector:
             return False
 
     def is_japanese_text(self, text: str) -> bool:
-        """テキストが日本語かどうかを判定"""
-        if not text:
-            return False
-
-        # ひらがな、カタカナ、漢字の文字数をカウント
-        japanese_chars = 0
-        total_chars = len(text.replace(' ', '').replace('\n', ''))
-
-        if total_chars == 0:
-            return False
-
-        for char in text:
-            # ひらがな: U+3040-U+309F
-            # カタカナ: U+30A0-U+30FF
-            # 漢字: U+4E00-U+9FAF
-            if ('\u3040' <= char <= '\u309F' or
-                '\u30A0' <= char <= '\u30FF' or
-                '\u4E00' <= char <= '\u9FAF'):
-                japanese_chars += 1
-
-        # 日本語文字が全体の30%以上なら日本語とみなす
-        return (japanese_chars / total_chars) >= 0.3
+        """テキストが日本語かどうかを判定（utils/japanese_text.py）"""
+        return is_japanese_text(text)
 
     def extract_japanese_reviews(self, reviews: List[Dict], max_count: int = 10) -> List[Dict]:
-        """日本語レビューを抽出・ソート"""
-        if not reviews:
-            return []
-
-        japanese_reviews = []
-
-        for review in reviews:
-            text = review.get('text', '')
-            if self.is_japanese_text(text):
-                japanese_reviews.append({
-                    'text': text,
-                    'rating': review.get('rating', 0),
-                    'time': review.get('time', 0),  # Unixタイムスタンプ
-                    'author_name': review.get('author_name', ''),
-                    'relative_time_description': review.get('relative_time_description', '')
-                })
-
-        # 新しい順にソート（timeの降順）
-        japanese_reviews.sort(key=lambda x: x['time'], reverse=True)
-
-        # 最大件数に制限
-        return japanese_reviews[:max_count]
+        """日本語レビューを抽出・ソート（新しい順に最大 max_count 件）"""
+        return extract_japanese_reviews(reviews, max_count)
 
     def filter_places_by_category(self, places: List[Dict], category: str) -> List[Dict]:
-        """カテゴリ別に施設をフィルタリング"""
+        """カテゴリ別に施設をフィルタリング（名前のキーワード・除外タイプ。utils/category_matcher.py）"""
         if category not in self.search_categories:
             return []
-
-        category_config = self.search_categories[category]
-        keywords = category_config['keywords']
-        exclude_types = category_config['exclude_types']
-
-        filtered = []
-
-        for place in places:
-            # 名前にカテゴリ関連キーワードが含まれているかチェック
-            name = place.get('name', '').lower()
-            types = place.get('types', []) or []
-
-            # キーワードチェック
-            has_keyword = any(k in name for k in keywords)
-
-            # active_sauna 緩和: types に spa / gym / health / establishment があり、名前にサウナ系断片("サウナ"/"整"/"ととの") があれば許容
-            if not has_keyword and category == 'active_sauna':
-                sauna_frag = any(frag in name for frag in ['サウナ', '整', 'ととの'])
-                type_hint = any(t in types for t in ['spa', 'gym', 'health', 'establishment'])
-                if sauna_frag and type_hint:
-                    has_keyword = True
-
-            # 除外タイプチェック
-            has_exclude_type = any(exc_type in types for exc_type in exclude_types)
-
-            if has_keyword and not has_exclude_type:
-                filtered.append(place)
-
-        return filtered
+        return self.category_matcher.filter(places, category)
 
     def format_place_data(self, place: Dict, category: str, details: Optional[Dict] = None) -> Dict:
         """場所データを整形"""
         # 基本情報
         name = place.get('name', '')
-        address = place.get('formatted_address', '')
+        address = place.get('formatted_address') or place.get('vicinity', '')
         rating = place.get('rating', 0.0)
         review_count = place.get('user_ratings_total', 0)
 
@@ -398,9 +342,9 @@ class MultiCategoryDataCollector:
         }
 
     def connect_database(self):
-        """データベース接続"""
+        """データベース接続（utils/db_pool の共有プールから払い出し、close()でプールへ返却）"""
         try:
-            connection = mysql.connector.connect(**self.mysql_config)
+            connection = get_connection(self.mysql_config)
             if connection.is_connected():
                 try:
                     cur = connection.cursor()
@@ -416,88 +360,18 @@ class MultiCategoryDataCollector:
             return None
 
     def save_to_database(self, places_data: List[Dict]):
-        """データベースに保存"""
+        """データベースに保存（utils/bulk_writer でまとめて挿入、既存place_idはスキップ）"""
         connection = self.connect_database()
         if not connection:
             return False
 
         try:
-            cursor = connection.cursor()
-
-            # 重複チェック用クエリ（place_idベースに変更）
-            check_query = "SELECT id FROM cards WHERE place_id = %s"
-
-            # カード挿入クエリ
-            insert_card_query = """
-                INSERT INTO cards (genre, title, rating, review_count, image_url, external_link, region, address, latitude, longitude, place_id, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-            """
-
-            # レビュー挿入クエリ
-            insert_review_query = """
-                INSERT INTO review_comments (comment, card_id, created_at, updated_at)
-                VALUES (%s, %s, NOW(), NOW())
-            """
-
-            inserted_count = 0
-            duplicate_count = 0
-            total_reviews_inserted = 0
-
-            for place_data in places_data:
-                # place_idの有効性チェック
-                if not place_data.get('place_id'):
-                    print(f"⚠️  place_idが見つかりません: {place_data['title']}")
-                    duplicate_count += 1
-                    continue
-
-                # 重複チェック（place_idベース）
-                cursor.execute(check_query, (place_data['place_id'],))
-                existing = cursor.fetchone()
-
-                if existing:
-                    print(f"⚠️  スキップ（重複）: {place_data['title']} (place_id: {place_data['place_id']})")
-                    duplicate_count += 1
-                    continue
-
-                # カードデータ挿入
-                card_values = (
-                    place_data['genre'],
-                    place_data['title'],
-                    place_data['rating'],
-                    place_data['review_count'],
-                    place_data['image_url'],
-                    place_data['external_link'],
-                    place_data['region'],
-                    place_data['address'],
-                    place_data['latitude'],
-                    place_data['longitude'],
-                    place_data['place_id']
-                )
-
-                cursor.execute(insert_card_query, card_values)
-                card_id = cursor.lastrowid  # 挿入されたカードのIDを取得
-
-                # レビューデータ挿入
-                reviews = place_data.get('reviews', [])
-                reviews_inserted = 0
-
-                for review in reviews:
-                    review_text = review['text']
-                    # コメントの長さ制限（TEXTフィールドなので65535文字まで可能だが、実用的な長さに制限）
-                    if len(review_text) > 1000:
-                        review_text = review_text[:997] + "..."
-
-                    cursor.execute(insert_review_query, (review_text, card_id))
-                    reviews_inserted += 1
-
-                inserted_count += 1
-                total_reviews_inserted += reviews_inserted
-                print(f"✅ 保存完了: {place_data['title']} (レビュー{reviews_inserted}件)")
-
+            result = write_cards(connection, places_data)
             connection.commit()
-            print(f"\n📊 保存結果: {inserted_count}件挿入, {duplicate_count}件重複スキップ")
-            print(f"💬 レビュー保存結果: {total_reviews_inserted}件挿入")
-
+            print_card_result(result)
+            if self._existing_ids is not None:
+                for pid in result['inserted_place_ids']:
+                    self._existing_ids.add(pid)
             return True
 
         except Error as e:
@@ -507,40 +381,36 @@ class MultiCategoryDataCollector:
 
         finally:
             if connection.is_connected():
-                cursor.close()
                 connection.close()
                 print("✅ データベース接続終了")
 
     def _get_existing_counts(self, category: str):
-        """指定カテゴリの既存総数と都県別カウントを取得"""
+        """指定カテゴリの既存総数と都県別カウントを取得（cards.prefecture の GROUP BY）"""
         connection = self.connect_database()
         total = 0
         prefect_counts = {p: 0 for p in self.kanto_prefectures}
         if not connection:
             return total, prefect_counts
         try:
-            cur = connection.cursor()
-            # 総数
-            cur.execute("SELECT COUNT(*) FROM cards WHERE genre=%s", (category,))
-            total = cur.fetchone()[0]
-            # 住所を取得して都県判定
-            cur.execute("SELECT address FROM cards WHERE genre=%s", (category,))
-            for (addr,) in cur.fetchall():
-                if not addr:
-                    continue
-                for pref in self.kanto_prefectures:
-                    if pref in addr:
-                        prefect_counts[pref] += 1
-                        break
+            counts = prefecture_counts(connection, category)
+            total = sum(counts.values())
+            for pref in self.kanto_prefectures:
+                prefect_counts[pref] = counts.get(pref, 0)
         finally:
             if connection.is_connected():
-                cur.close()
                 connection.close()
         return total, prefect_counts
 
-    def collect_data(self, category: Optional[str] = None):
+    def collect_data(self, category: Optional[str] = None, fresh: bool = False, max_calls: Optional[int] = None,
+                     grid: bool = False):
         """均等配分アルゴリズムでのデータ収集（都県ごとのクォータ厳守）
-        category を指定した場合、そのカテゴリのみ不足分を追加収集(トップアップ)する"""
+        category を指定した場合、そのカテゴリのみ不足分を追加収集(トップアップ)する
+        クォータはカテゴリごとに不足優先で配分し、作業順とコール数の見込みは全カテゴリ×都県を横断して決める
+        （utils/quota_allocator）。max_calls(検索コール数の上限)を指定した場合は上限内で到達見込みの件数に絞る
+        一次収集で見込みに届かなかった分は再配分フェーズ（各都県のクォータを REALLOC_ALLOW_DIFF 件まで超えてよい）で補う
+        grid=True の場合、キーワード検索の前に都県をセル分割した Nearby Search（utils/grid_harvester）で
+        候補を集め、網羅できた都県はキーワード検索を行わない
+        途中経過は .cache/checkpoints に保存し、中断後の再実行では続きから再開する（fresh=Trueで破棄）"""
         print("🚀 関東全域多カテゴリデータ収集開始 (均等/トップアップモード)")
         self.validate_config()
 
@@ -552,268 +422,398 @@ class MultiCategoryDataCollector:
         ]
         SAUNA_EXPAND_TERMS = ["テントサウナ", "外気浴", "水風呂", "ととのい", "整い", "高温サウナ", "低温サウナ", "サウナラウンジ", "サ活", "発汗"]
 
-        def build_prefecture_quotas(total: int) -> Dict[str, int]:
-            base = total // len(self.kanto_prefectures)
-            rem = total % len(self.kanto_prefectures)
-            quotas = {}
-            for i, pref in enumerate(self.kanto_prefectures):
-                quotas[pref] = base + (1 if i < rem else 0)
-            return quotas
-
         # 対象カテゴリリスト
         categories = [category] if category else list(self.search_categories.keys())
-
-        all_formatted = []
+        unknown = [c for c in categories if c not in self.search_categories]
+        for cat in unknown:
+            print(f"⚠️ 未知カテゴリ: {cat} スキップ")
+        categories = [c for c in categories if c not in unknown]
+
+        # カテゴリごとのクォータと、全カテゴリ×都県を横断した作業順を決める
+        existing = {cat: self._get_existing_counts(cat) for cat in categories}
+        yields = YieldStats()
+        plan = QuotaAllocator(
+            self.kanto_prefectures,
+            {cat: self.search_categories[cat]['target_count'] for cat in categories},
+            {cat: existing[cat][1] for cat in categories},
+            {cat: existing[cat][0] for cat in categories},
+            yields=yields,
+            budget=max_calls,
+        ).plan()
+        categories = plan['category_order']
+        print(f"🗺️ 作業計画: 見込みコール {plan['budget_used']}回" + (f" / 上限 {max_calls}回" if max_calls is not None else ""))
+        # 重複度分析で冗長と判定されたクエリは発行しない（query_overlap_analyzer.py）
+        pruned = load_pruned_queries()
+
+        # チェックポイント（消費済みクエリ・都県別カウンタ・候補・整形済みカードを保持）
+        ckpt = RunCheckpoint(f"fetch_onsen_tokyo_{category or 'all'}", fresh=fresh)
+        if ckpt.resumed:
+            print(f"♻️ チェックポイントから再開: {ckpt.path}")
+        run_state = ckpt.section('run', {'completed': [], 'all_formatted': []})
+        all_formatted = run_state['all_formatted']
+        # 検索結果のうち他カテゴリに一致した候補は、そのカテゴリのプールへ（上限はそのカテゴリの都県別クォータ）
+        pools = SpilloverPools(self.category_matcher, self.kanto_prefectures,
+                               {cat: plan['planned'][cat] for cat in categories if cat not in run_state['completed']},
+                               state=run_state.setdefault('spillover', {}))
 
         for cat in categories:
-            if cat not in self.search_categories:
-                print(f"⚠️ 未知カテゴリ: {cat} スキップ")
+            if cat in run_state['completed']:
+                print(f"⏭️ {cat}: チェックポイントで完了済みのためスキップ")
                 continue
             cfg = self.search_categories[cat]
             full_target = cfg['target_count']
 
             # 既存数取得（トップアップ用途）
-            existing_total, existing_pref_counts = self._get_existing_counts(cat)
+            existing_total, existing_pref_counts = existing[cat]
             existing_place_ids = self._load_existing_place_ids()  # 追加: 既存除外
             if existing_total >= full_target:
                 print(f"✅ {cat}: 既に目標{full_target}件に達しているためスキップ")
+                pools.close(cat)
                 continue
             remaining_target = full_target - existing_total
             print(f"\n🔍 {cat}: 既存 {existing_total}/{full_target} → 追加取得目標 {remaining_target}件")
 
-            # 既存分を考慮した都県別不足計算 (理想=full_targetを均等割当)
-            ideal_full = build_prefecture_quotas(full_target)
-            deficits = {p: max(0, ideal_full[p] - existing_pref_counts.get(p, 0)) for p in self.kanto_prefectures}
-            total_deficit = sum(deficits.values())
-
-            # 追加クォータ決定
-            if total_deficit == 0:
-                # 理論上均等 → 残り件数を均等割り
-                quotas = build_prefecture_quotas(remaining_target)
+            st = ckpt.state.get('current')
+            if st and st.get('category') == cat:
+                print(f"♻️ {cat}: フェーズ {st['phase']} から再開 (収集済み候補 {len(st['collected_places'])}件)")
             else:
-                # 不足が多い都県を優先しつつ remaining_target を配分
-                quotas = {p: 0 for p in self.kanto_prefectures}
-                need = remaining_target
-                ordered = sorted(deficits.items(), key=lambda x: x[1], reverse=True)
-                # ラウンドロビンで deficit 消化
-                while need > 0:
-                    progress = 0
-                    for pref, deficit in ordered:
-                        if need <= 0:
-                            break
-                        if quotas[pref] >= deficit:
-                            continue
-                        quotas[pref] += 1
-                        need -= 1
-                        progress += 1
-                    if progress == 0:
-                        break
-                # 念のため: 未割当があれば均等配分
-                if need > 0:
-                    tmp = build_prefecture_quotas(need)
-                    for p, v in tmp.items():
-                        quotas[p] += v
-            # 0割当都県は収集ループでスキップされる
+                # 既存分を考慮した都県別追加クォータ（不足優先・予算内見込み）
+                quotas = dict(plan['planned'][cat])
+                if max_calls is not None and sum(quotas.values()) < remaining_target:
+                    print(f"⚠️ {cat}: コール数上限内の見込みは {sum(quotas.values())}/{remaining_target}件 (不足見込み {sum(plan['shortfall'][cat].values())}件)")
+                remaining_target = sum(quotas.values())
+                # 0割当都県は収集ループでスキップされる
+
+                prefecture_query_map: Dict[str, List[str]] = {}
+                for pref in self.kanto_prefectures:
+                    if quotas.get(pref, 0) <= 0:
+                        prefecture_query_map[pref] = []
+                        continue
+                    qlist = apply_pruning([f"{term} {pref}" for term in cfg['base_terms']], cat, pref, pruned)
+                    prefecture_query_map[pref] = qlist
+
+                st = {
+                    'category': cat,
+                    'phase': 'grid' if grid else 'primary',
+                    'target': remaining_target,
+                    'quotas': quotas,
+                    'prefecture_query_map': prefecture_query_map,
+                    'collected_places': {},
+                    'counts': {p: 0 for p in self.kanto_prefectures},
+                    'exhausted': {p: quotas.get(p, 0) == 0 for p in self.kanto_prefectures},
+                    'zero_gain_streak': {p: 0 for p in self.kanto_prefectures},
+                    'rounds': 0,
+                    'steps': {},  # "フェーズ:ラウンド:都県" → 消費済みクエリと増分
+                    'category_data': [],
+                    'detailed': [],
+                }
+                pooled = pools.fill(cat, st['collected_places'], st['counts'], quotas, existing_place_ids)
+                if pooled:
+                    print(f"♻️ {cat}: 他カテゴリの検索結果から +{pooled}件")
+                ckpt.state['current'] = st
+                ckpt.save()
+            pools.close(cat)
+
+            quotas = st['quotas']
+            prefecture_query_map = st['prefecture_query_map']
+            collected_places: Dict[str, Dict] = st['collected_places']
+            counts = st['counts']
+            exhausted = st['exhausted']
+            zero_gain_streak = st['zero_gain_streak']
+            steps = st['steps']
             print(f"🧮 都県別追加クォータ: {quotas}")
 
-            prefecture_query_map: Dict[str, List[str]] = {}
-            for pref in self.kanto_prefectures:
-                if quotas.get(pref, 0) <= 0:
-                    prefecture_query_map[pref] = []
-                    continue
-                qlist = [f"{term} {pref}" for term in cfg['base_terms']]
-                prefecture_query_map[pref] = qlist
-
-            collected_places: Dict[str, Dict] = {}
-            counts = {p: 0 for p in self.kanto_prefectures}
-            exhausted = {p: quotas.get(p, 0) == 0 for p in self.kanto_prefectures}
-            zero_gain_streak = {p: 0 for p in self.kanto_prefectures}
-
-            rounds = 0
-            target = remaining_target  # 以降この変数で不足分ターゲットを扱う
-            while sum(counts.values()) < target and not all(exhausted.values()):
-                rounds += 1
+            # 1ラウンド内の都県の順は作業計画（コール単位の優先度順）に従う。計画に無い都県は最後
+            prefecture_order = [item['prefecture'] for item in plan['order'] if item['category'] == cat]
+            prefecture_order += [p for p in self.kanto_prefectures if p not in prefecture_order]
+            target = st['target']  # 以降この変数で不足分ターゲットを扱う
+            if st['phase'] == 'grid':
+                # グリッド収集（完了セルはキャッシュから復元されるため、中断した都県はそのままやり直す）
+                harvester = GridHarvester(self.google_api_key)
                 for pref in self.kanto_prefectures:
-                    if counts[pref] >= quotas.get(pref, 0):
-                        continue
-                    if exhausted[pref]:
-                        continue
-                    if not prefecture_query_map[pref]:
-                        exhausted[pref] = True
+                    step = f"grid:{pref}"
+                    if step in steps or counts[pref] >= quotas.get(pref, 0):
                         continue
-                    query = prefecture_query_map[pref].pop(0)
-                    places = self.search_places(query)
-                    filtered = self.filter_places_by_category(places, cat)
                     added = 0
-                    for place in filtered:
-                        if counts[pref] >= quotas[pref]:
-                            break
-                        place_id = place.get('place_id')
-                        address = place.get('formatted_address', '')
-                        if not place_id or place_id in collected_places or place_id in existing_place_ids:
+                    rerouted = 0
+                    covered = True
+                    try:
+                        for search in cfg.get('grid_searches', []):
+                            for place in harvester.harvest(pref, **search):
+                                if counts[pref] >= quotas[pref]:
+                                    break
+                                place_id = place.get('place_id')
+                                if place_id in collected_places or place_id in existing_place_ids:
+                                    continue
+                                if not self.filter_places_by_category([place], cat):
+                                    continue
+                                # 矩形は隣県と重なるので、実際の都県の分として数える（対象外・クォータ充足なら捨てる）
+                                owner = place_prefecture(place)
+                                if owner != pref:
+                                    if owner in counts and counts[owner] < quotas.get(owner, 0):
+                                        collected_places[place_id] = place
+                                        counts[owner] += 1
+                                        rerouted += 1
+                                    continue
+                                collected_places[place_id] = place
+                                counts[pref] += 1
+                                added += 1
+                            covered = covered and not harvester.truncated
+                            if counts[pref] >= quotas[pref]:
+                                break
+                        steps[step] = {'query': 'grid', 'added': added}
+                        # 網羅済みで不足 → キーワード検索をしても新規は見込めない
+                        if counts[pref] < quotas[pref] and covered:
+                            exhausted[pref] = True
+                    finally:
+                        ckpt.save()
+                    print(f"🧭 グリッド {pref}: +{added} (追加累計 {counts[pref]}/{quotas[pref]})"
+                          + (f" 隣県へ +{rerouted}" if rerouted else "")
+                          + (" 網羅済み" if exhausted[pref] else ""))
+                print(f"🧭 グリッド収集: 新規セル {harvester.live_cells} / キャッシュ {harvester.cached_cells}")
+                st['phase'] = 'primary'
+                ckpt.save()
+
+            if st['phase'] == 'primary':
+                # 中断したラウンドはやり直す（完了済みステップはスキップ）
+                rounds = max(st['rounds'] - 1, 0)
+                while sum(counts.values()) < target and not all(exhausted.values()):
+                    rounds += 1
+                    st['rounds'] = rounds
+                    for pref in prefecture_order:
+                        step = f"primary:{rounds}:{pref}"
+                        if step in steps:
                             continue
-                        if pref not in address:
+                        if counts[pref] >= quotas.get(pref, 0):
                             continue
-                        collected_places[place_id] = place
-                        counts[pref] += 1
-                        added += 1
-                    if added == 0:
-                        zero_gain_streak[pref] += 1
-                    else:
-                        zero_gain_streak[pref] = 0
-                    print(f"🔁 R{rounds} {pref} {query}: +{added} (追加累計 {counts[pref]}/{quotas[pref]}) streak={zero_gain_streak[pref]}")
-                    time.sleep(0.6)
-                    if zero_gain_streak[pref] >= ZERO_GAIN_LIMIT and counts[pref] < quotas[pref]:
-                        print(f"  ⛔ {pref} 連続0件{ZERO_GAIN_LIMIT}回で打ち切り (不足 {quotas[pref]-counts[pref]})")
-                        exhausted[pref] = True
-                        continue
-                    if counts[pref] >= quotas[pref]:
-                        continue
-                    if not prefecture_query_map[pref]:
-                        extra_terms = cfg['keywords'][:3]
-                        if cat == 'relax_onsen' and pref in ['茨城', '栃木', '群馬']:
-                            extra_terms = list(dict.fromkeys(extra_terms + EXTRA_ONSEN_EXPAND_TERMS))
-                        if cat == 'active_sauna':
-                            extra_terms = list(dict.fromkeys(extra_terms + SAUNA_EXPAND_TERMS))
-                        regenerated = [f"{t} {pref}" for t in extra_terms]
-                        prefecture_query_map[pref] = regenerated
-                        if not regenerated:
-                            exhausted[pref] = True
-                # 内側for終わり
-                if rounds > 100:
-                    print("⚠️ ラウンド上限到達。打ち切り。")
-                    break
-
-            total_collected = sum(counts.values())
-            deficit = target - total_collected
-            if deficit > 0:
-                print(f"⚠️ 追加目標未達 (一次収集): {total_collected}/{target} 不足 {deficit}件 → 再配分フェーズ")
-                realloc_rounds = 0
-                for pref in self.kanto_prefectures:
-                    if exhausted[pref]:
-                        continue
-                    allowed = quotas.get(pref, 0) + REALLOC_ALLOW_DIFF - counts[pref]
-                    if allowed <= 0:
-                        continue
-                    if not prefecture_query_map[pref]:
-                        base_extra = cfg['keywords'][:5]
-                        if cat == 'relax_onsen' and pref in ['茨城', '栃木', '群馬']:
-                            base_extra = list(dict.fromkeys(base_extra + EXTRA_ONSEN_EXPAND_TERMS))
-                        if cat == 'active_sauna':
-                            base_extra = list(dict.fromkeys(base_extra + SAUNA_EXPAND_TERMS))
-                        prefecture_query_map[pref] = [f"{t} {pref}" for t in base_extra]
-                while deficit > 0 and realloc_rounds < 50:
-                    realloc_rounds += 1
-                    progress = 0
-                    for pref in self.kanto_prefectures:
-                        if deficit <= 0:
-                            break
-                        if counts[pref] >= quotas.get(pref, 0) + REALLOC_ALLOW_DIFF:
+                        if exhausted[pref]:
                             continue
                         if not prefecture_query_map[pref]:
+                            exhausted[pref] = True
                             continue
-                        query = prefecture_query_map[pref].pop(0)
-                        places = self.search_places(query)
-                        filtered = self.filter_places_by_category(places, cat)
-                        for place in filtered:
+                        try:
+                            query = prefecture_query_map[pref][0]
+                            places = self.search_places(query)
+                            prefecture_query_map[pref].pop(0)
+                            filtered = pools.harvest(places, cat, existing_place_ids)
+                            added = 0
+                            for place in filtered:
+                                if counts[pref] >= quotas[pref]:
+                                    break
+                                place_id = place.get('place_id')
+                                if not place_id or place_id in collected_places or place_id in existing_place_ids:
+                                    continue
+                                if place_prefecture(place) != pref:
+                                    continue
+                                collected_places[place_id] = place
+                                counts[pref] += 1
+                                added += 1
+                            steps[step] = {'query': query, 'added': added}
+                            yields.record(cat, pref, added)
+                            if added == 0:
+                                zero_gain_streak[pref] += 1
+                            else:
+                                zero_gain_streak[pref] = 0
+                            print(f"🔁 R{rounds} {pref} {query}: +{added} (追加累計 {counts[pref]}/{quotas[pref]}) streak={zero_gain_streak[pref]}")
+                            time.sleep(0.6)
+                            if zero_gain_streak[pref] >= ZERO_GAIN_LIMIT and counts[pref] < quotas[pref]:
+                                print(f"  ⛔ {pref} 連続0件{ZERO_GAIN_LIMIT}回で打ち切り (不足 {quotas[pref]-counts[pref]})")
+                                exhausted[pref] = True
+                                continue
+                            if counts[pref] >= quotas[pref]:
+                                continue
+                            if not prefecture_query_map[pref]:
+                                extra_terms = cfg['keywords'][:3]
+                                if cat == 'relax_onsen' and pref in ['茨城', '栃木', '群馬']:
+                                    extra_terms = list(dict.fromkeys(extra_terms + EXTRA_ONSEN_EXPAND_TERMS))
+                                if cat == 'active_sauna':
+                                    extra_terms = list(dict.fromkeys(extra_terms + SAUNA_EXPAND_TERMS))
+                                regenerated = [f"{t} {pref}" for t in extra_terms]
+                                prefecture_query_map[pref] = regenerated
+                                if not regenerated:
+                                    exhausted[pref] = True
+                        finally:
+                            ckpt.save()
+                    # 内側for終わり
+                    if rounds > 100:
+                        print("⚠️ ラウンド上限到達。打ち切り。")
+                        break
+                st['primary_collected'] = sum(counts.values())
+                st['phase'] = 'realloc'
+                ckpt.save()
+
+            total_collected = st['primary_collected']
+            deficit = target - sum(counts.values())
+            if st['phase'] == 'realloc':
+                if deficit > 0:
+                    print(f"⚠️ 追加目標未達 (一次収集): {total_collected}/{target} 不足 {deficit}件 → 再配分フェーズ")
+                    if not st.get('realloc_prepared'):
+                        for pref in self.kanto_prefectures:
+                            if exhausted[pref]:
+                                continue
+                            allowed = quotas.get(pref, 0) + REALLOC_ALLOW_DIFF - counts[pref]
+                            if allowed <= 0:
+                                continue
+                            if not prefecture_query_map[pref]:
+                                base_extra = cfg['keywords'][:5]
+                                if cat == 'relax_onsen' and pref in ['茨城', '栃木', '群馬']:
+                                    base_extra = list(dict.fromkeys(base_extra + EXTRA_ONSEN_EXPAND_TERMS))
+                                if cat == 'active_sauna':
+                                    base_extra = list(dict.fromkeys(base_extra + SAUNA_EXPAND_TERMS))
+                                prefecture_query_map[pref] = [f"{t} {pref}" for t in base_extra]
+                        st['realloc_prepared'] = True
+                        ckpt.save()
+                    realloc_rounds = max(st.get('realloc_rounds', 0) - 1, 0)
+                    while deficit > 0 and realloc_rounds < 50:
+                        realloc_rounds += 1
+                        st['realloc_rounds'] = realloc_rounds
+                        progress = 0
+                        for pref in prefecture_order:
                             if deficit <= 0:
                                 break
+                            step = f"realloc:{realloc_rounds}:{pref}"
+                            if step in steps:
+                                progress += steps[step]['added']
+                                continue
                             if counts[pref] >= quotas.get(pref, 0) + REALLOC_ALLOW_DIFF:
-                                break
-                            pid = place.get('place_id')
-                            addr = place.get('formatted_address', '')
-                            if not pid or pid in collected_places or pid in existing_place_ids:
                                 continue
-                            if pref not in addr:
+                            if not prefecture_query_map[pref]:
                                 continue
-                            collected_places[pid] = place
-                            counts[pref] += 1
-                            deficit -= 1
-                            progress += 1
-                        print(f"  ♻ 再配分R{realloc_rounds} {pref} {query}: 現在 {counts[pref]} / 上限 {quotas.get(pref,0) + REALLOC_ALLOW_DIFF} 残り不足 {deficit}")
-                        time.sleep(0.4)
-                    if progress == 0:
-                        print("  ⛔ 再配分進捗なし → 打ち切り")
-                        break
-                if deficit > 0:
-                    print(f"⚠️ 再配分後も不足: {deficit}件 (今回追加 {total_collected - (target - (full_target - existing_total))}件)")
-                else:
-                    print("✅ 再配分で追加目標充足")
+                            try:
+                                query = prefecture_query_map[pref][0]
+                                places = self.search_places(query)
+                                prefecture_query_map[pref].pop(0)
+                                filtered = pools.harvest(places, cat, existing_place_ids)
+                                added = 0
+                                for place in filtered:
+                                    if deficit <= 0:
+                                        break
+                                    if counts[pref] >= quotas.get(pref, 0) + REALLOC_ALLOW_DIFF:
+                                        break
+                                    pid = place.get('place_id')
+                                    if not pid or pid in collected_places or pid in existing_place_ids:
+                                        continue
+                                    if place_prefecture(place) != pref:
+                                        continue
+                                    collected_places[pid] = place
+                                    counts[pref] += 1
+                                    deficit -= 1
+                                    added += 1
+                                progress += added
+                                steps[step] = {'query': query, 'added': added}
+                                yields.record(cat, pref, added)
+                            finally:
+                                ckpt.save()
+                            print(f"  ♻ 再配分R{realloc_rounds} {pref} {query}: 現在 {counts[pref]} / 上限 {quotas.get(pref,0) + REALLOC_ALLOW_DIFF} 残り不足 {deficit}")
+                            time.sleep(0.4)
+                        if progress == 0:
+                            print("  ⛔ 再配分進捗なし → 打ち切り")
+                            break
+                    if deficit > 0:
+                        print(f"⚠️ 再配分後も不足: {deficit}件 (今回追加 {total_collected - (target - (full_target - existing_total))}件)")
+                    else:
+                        print("✅ 再配分で追加目標充足")
+                st['phase'] = 'second'
+                ckpt.save()
 
             # ここから active_sauna 専用第二フェーズ（不足継続時）
-            if cat == 'active_sauna' and deficit > 0:
-                print(f"🔥 active_sauna 第二フェーズ突入: まだ {deficit}件不足 (緩和探索)")
-                SECOND_PHASE_TERMS = [
-                    "セルフロウリュ", "アウトドアサウナ", "薪サウナ", "貸切サウナ", "プライベートサウナ",
-                    "サウナテント", "本格サウナ", "サウナ 小規模", "サウナ スパ", "整いスペース",
-                    "健康ランド サウナ", "スパ サウナ", "リラクゼーション サウナ"
-                ]
-                # 不足都県のみ
-                deficit_prefs = [p for p in self.kanto_prefectures if quotas.get(p,0) > 0 and counts[p] < quotas[p] + REALLOC_ALLOW_DIFF]
-                if not deficit_prefs:
-                    deficit_prefs = self.kanto_prefectures  # 念のため
-                rounds2 = 0
-                existing_place_ids = self._load_existing_place_ids()
-                while deficit > 0 and rounds2 < 40:
-                    rounds2 += 1
-                    progress2 = 0
-                    for pref in deficit_prefs:
-                        if deficit <= 0:
-                            break
-                        # 緩和上限: quotas[pref] + REALLOC_ALLOW_DIFF まで
-                        if counts[pref] >= quotas.get(pref,0) + REALLOC_ALLOW_DIFF:
-                            continue
-                        # クエリ生成: SECOND_PHASE_TERMS から1件ずつ (ラウンドロビン)
-                        term = SECOND_PHASE_TERMS[rounds2 % len(SECOND_PHASE_TERMS)]
-                        query = f"{term} {pref}"
-                        places = self.search_places(query)
-                        if not places:
-                            continue
-                        # 緩和フィルタ: 元フィルタ + (名前にサウナ/整/ととの/スパ/健康ランド/岩盤浴) か types に spa/health/bath があれば
-                        for place in places:
+            if st['phase'] == 'second':
+                if cat == 'active_sauna' and deficit > 0:
+                    print(f"🔥 active_sauna 第二フェーズ突入: まだ {deficit}件不足 (緩和探索)")
+                    SECOND_PHASE_TERMS = [
+                        "セルフロウリュ", "アウトドアサウナ", "薪サウナ", "貸切サウナ", "プライベートサウナ",
+                        "サウナテント", "本格サウナ", "サウナ 小規模", "サウナ スパ", "整いスペース",
+                        "健康ランド サウナ", "スパ サウナ", "リラクゼーション サウナ"
+                    ]
+                    # 不足都県のみ
+                    if 'deficit_prefs' not in st:
+                        deficit_prefs = [p for p in self.kanto_prefectures if quotas.get(p,0) > 0 and counts[p] < quotas[p] + REALLOC_ALLOW_DIFF]
+                        if not deficit_prefs:
+                            deficit_prefs = self.kanto_prefectures  # 念のため
+                        st['deficit_prefs'] = deficit_prefs
+                    deficit_prefs = st['deficit_prefs']
+                    rounds2 = max(st.get('rounds2', 0) - 1, 0)
+                    existing_place_ids = self._load_existing_place_ids()
+                    while deficit > 0 and rounds2 < 40:
+                        rounds2 += 1
+                        st['rounds2'] = rounds2
+                        progress2 = 0
+                        for pref in deficit_prefs:
                             if deficit <= 0:
                                 break
-                            place_id = place.get('place_id')
-                            if not place_id or place_id in existing_place_ids or place_id in collected_places:
+                            step = f"second:{rounds2}:{pref}"
+                            if step in steps:
+                                progress2 += steps[step]['added']
                                 continue
-                            addr = place.get('formatted_address', '')
-                            if pref not in addr:
+                            # 緩和上限: quotas[pref] + REALLOC_ALLOW_DIFF まで
+                            if counts[pref] >= quotas.get(pref,0) + REALLOC_ALLOW_DIFF:
                                 continue
-                            name_low = (place.get('name','') or '').lower()
-                            types = place.get('types', []) or []
-                            name_hit = any(k in name_low for k in ['サウナ','整','ととの','スパ','健康','岩盤'])
-                            type_hit = any(t in types for t in ['spa','health','gym','bath','establishment'])
-                            if not (name_hit or type_hit):
+                            # クエリ生成: SECOND_PHASE_TERMS から1件ずつ (ラウンドロビン)
+                            term = SECOND_PHASE_TERMS[rounds2 % len(SECOND_PHASE_TERMS)]
+                            query = f"{term} {pref}"
+                            try:
+                                places = self.search_places(query)
+                                added = 0
+                                # 緩和フィルタ: 元フィルタ + (名前にサウナ/整/ととの/スパ/健康ランド/岩盤浴) か types に spa/health/bath があれば
+                                for place in places:
+                                    if deficit <= 0:
+                                        break
+                                    place_id = place.get('place_id')
+                                    if not place_id or place_id in existing_place_ids or place_id in collected_places:
+                                        continue
+                                    if place_prefecture(place) != pref:
+                                        continue
+                                    name_low = (place.get('name','') or '').lower()
+                                    types = place.get('types', []) or []
+                                    name_hit = any(k in name_low for k in ['サウナ','整','ととの','スパ','健康','岩盤'])
+                                    type_hit = any(t in types for t in ['spa','health','gym','bath','establishment'])
+                                    if not (name_hit or type_hit):
+                                        continue
+                                    collected_places[place_id] = place
+                                    counts[pref] += 1
+                                    deficit -= 1
+                                    added += 1
+                                progress2 += added
+                                steps[step] = {'query': query, 'added': added}
+                                yields.record(cat, pref, added)
+                            finally:
+                                ckpt.save()
+                            if not places:
                                 continue
-                            collected_places[place_id] = place
-                            counts[pref] += 1
-                            deficit -= 1
-                            progress2 += 1
-                        print(f"  🔍 第二R{rounds2} {pref} {query}: 進捗 {counts[pref]}/{quotas.get(pref,0)+REALLOC_ALLOW_DIFF} 残り不足 {deficit}")
-                        time.sleep(0.5)
-                    if progress2 == 0:
-                        print("  ⛔ 第二フェーズ進捗なし → 打ち切り")
-                        break
-                if deficit > 0:
-                    print(f"⚠️ 第二フェーズ後も不足: {deficit}件 (これ以上は新規place_id枯渇の可能性)" )
-                else:
-                    print("✅ 第二フェーズで不足解消")
+                            print(f"  🔍 第二R{rounds2} {pref} {query}: 進捗 {counts[pref]}/{quotas.get(pref,0)+REALLOC_ALLOW_DIFF} 残り不足 {deficit}")
+                            time.sleep(0.5)
+                        if progress2 == 0:
+                            print("  ⛔ 第二フェーズ進捗なし → 打ち切り")
+                            break
+                    if deficit > 0:
+                        print(f"⚠️ 第二フェーズ後も不足: {deficit}件 (これ以上は新規place_id枯渇の可能性)" )
+                    else:
+                        print("✅ 第二フェーズで不足解消")
+                st['phase'] = 'details'
+                ckpt.save()
 
-            # 詳細取得（追加分のみ）
+            # 詳細取得（追加分のみ、チェックポイント済みのplace_idは再検証しない）
             print(f"📦 {cat} 追加分 詳細取得開始: {min(sum(counts.values()), target)}件")
-            category_data = []
+            category_data = st['category_data']
+            detailed = set(st['detailed'])
+            # 名前と位置で既存カード・他の候補と重複するものは詳細取得しない（utils/dedupe_index）
+            _, near_duplicates = self._dedupe_index(cat).dedupe(collected_places.values())
+            if near_duplicates:
+                print(f"🧹 {cat}: 近似重複 {len(near_duplicates)}件を詳細取得前に除外")
             for i, (pid, place) in enumerate(list(collected_places.items()), 1):
                 if i > target:
                     break
-                if pid in existing_place_ids:
+                if pid in existing_place_ids or pid in detailed or pid in near_duplicates:
                     continue
                 print(f"  ({i}/{target}) {place.get('name')} 詳細取得")
-                if not self.validate_place_id(pid):
-                    continue
-                details = self.get_place_details(pid)
-                time.sleep(0.7)
-                formatted = self.format_place_data(place, cat, details)
-                category_data.append(formatted)
+                if self.validate_place_id(pid):
+                    details = self.get_place_details(pid)
+                    time.sleep(0.7)
+                    formatted = self.format_place_data(place, cat, details)
+                    category_data.append(formatted)
+                detailed.add(pid)
+                st['detailed'].append(pid)
+                ckpt.save()
                 if i % 20 == 0:
                     print(f"    進捗: {i}/{target}")
 
@@ -823,33 +823,99 @@ class MultiCategoryDataCollector:
                 if inc > 0:
                     print(f"  • {pref}: +{inc}")
             all_formatted.extend(category_data)
+            yields.save()
+            run_state['completed'].append(cat)
+            ckpt.state.pop('current', None)
+            ckpt.save()
             print(f"✅ {cat} 追加完了: {len(category_data)}件 (DB挿入時に重複除外の可能性あり)")
 
         print(f"\n💾 保存処理: 今回追加 {len(all_formatted)}件")
         if all_formatted:
-            self.save_to_database(all_formatted)
+            if self.save_to_database(all_formatted):
+                ckpt.clear()
+            else:
+                print(f"⚠️ 保存失敗のためチェックポイントを保持: {ckpt.path}")
         else:
             print("ℹ️ 追加対象なし (保存スキップ)")
+            ckpt.clear()
         print("🎉 指定カテゴリ処理終了")
         return True
 
-    def _load_existing_place_ids(self) -> set:
-        """全cardsのplace_idを読み込み重複除外用集合を返す"""
+    def collect_prefecture(self, category: str, prefecture: str, count: int) -> Dict:
+        """1カテゴリ×1都県を count 件トップアップ（ジョブキューのcollectジョブ用）
+        剪定済みの都県クエリを順に検索し、集まった分だけ詳細取得・保存する"""
+        if category not in self.search_categories:
+            raise ValueError(f"未知カテゴリ: {category}")
+        if prefecture not in self.kanto_prefectures:
+            raise ValueError(f"対象外の都県: {prefecture}")
+        cfg = self.search_categories[category]
+        existing_place_ids = self._load_existing_place_ids()
+        yields = YieldStats()
+        queries = apply_pruning([f"{term} {prefecture}" for term in cfg['base_terms']],
+                                category, prefecture, load_pruned_queries())
+
+        collected: Dict[str, Dict] = {}
+        searched = 0
+        for query in queries:
+            if len(collected) >= count:
+                break
+            places = self.filter_places_by_category(self.search_places(query), category)
+            searched += 1
+            added = 0
+            for place in places:
+                if len(collected) >= count:
+                    break
+                place_id = place.get('place_id')
+                if not place_id or place_id in collected or place_id in existing_place_ids:
+                    continue
+                if not place_in_prefectures(place, [prefecture]):
+                    continue
+                collected[place_id] = place
+                added += 1
+            yields.record(category, prefecture, added)
+            time.sleep(0.6)
+        yields.save()
+
+        formatted = []
+        for pid, place in collected.items():
+            if self.validate_place_id(pid):
+                formatted.append(self.format_place_data(place, category, self.get_place_details(pid)))
+                time.sleep(0.7)
+        saved = bool(formatted) and self.save_to_database(formatted)
+        if formatted and not saved:
+            raise RuntimeError("データベース保存に失敗しました")
+        print(f"✅ {category} × {prefecture}: 候補 {len(collected)}件 / 保存対象 {len(formatted)}件 (検索 {searched}回)")
+        return {'searched': searched, 'collected': len(collected), 'formatted': len(formatted), 'saved': bool(saved)}
+
+    def _dedupe_index(self, category: str) -> DedupeIndex:
+        """名前・位置の近似重複索引（utils/dedupe_index）に同カテゴリの既存カードを登録して返す"""
+        index = DedupeIndex.for_category(category, self.search_categories.get(category, {}).get('keywords') or ())
         connection = self.connect_database()
-        ids = set()
         if not connection:
-            return ids
+            return index
         try:
             cur = connection.cursor()
-            cur.execute("SELECT place_id FROM cards WHERE place_id IS NOT NULL")
-            for (pid,) in cur.fetchall():
-                if pid:
-                    ids.add(pid)
+            index.load_cards(cur, genre=category)
+            cur.close()
         finally:
             if connection.is_connected():
-                cur.close()
                 connection.close()
-        return ids
+        return index
+
+    def _load_existing_place_ids(self, refresh: bool = False) -> PlaceIdIndex:
+        """cardsの既存place_id索引（utils/place_id_index）を返す
+        呼び出しごとに前回以降に追加された行だけを取り込む（refresh=Trueで全件から再構築）"""
+        if self._existing_ids is None:
+            self._existing_ids = PlaceIdIndex('cards')
+        connection = self.connect_database()
+        if not connection:
+            return self._existing_ids
+        try:
+            self._existing_ids.refresh(connection, rebuild=refresh)
+        finally:
+            if connection.is_connected():
+                connection.close()
+        return self._existing_ids
 
 def main():
     """メイン関数"""
@@ -861,7 +927,26 @@ def main():
             idx = sys.argv.index('--category')
             if idx + 1 < len(sys.argv):
                 cat = sys.argv[idx + 1]
-        collector.collect_data(category=cat)
+        # --fresh: チェックポイントを破棄して最初から実行
+        # --max-calls <N>: 検索コール数の上限（上限内で到達見込みの件数に絞る）
+        max_calls = None
+        if '--max-calls' in sys.argv:
+            idx = sys.argv.index('--max-calls')
+            if idx + 1 < len(sys.argv):
+                max_calls = int(sys.argv[idx + 1])
+        # --max-usd <USD>: API予算上限（金額）。到達時はチェックポイントを残して停止
+        if '--max-usd' in sys.argv:
+            idx = sys.argv.index('--max-usd')
+            if idx + 1 < len(sys.argv):
+                set_budget(float(sys.argv[idx + 1]))
+        # --grid: 都県をセル分割した Nearby Search で先に候補を集める
+        collector.collect_data(category=cat, fresh='--fresh' in sys.argv, max_calls=max_calls,
+                               grid='--grid' in sys.argv)
+        print(get_guard().summary())
+    except BudgetExceeded as e:
+        print(f"\n🛑 {e}")
+        print(get_guard().summary())
+        print("💾 チェックポイント保存済み（再実行で続きから再開）")
     except KeyboardInterrupt:
         print("\n⚠️  処理が中断されました")
     except Exception as e:
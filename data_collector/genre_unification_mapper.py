@@ -5,7 +5,7 @@ Genre統一マッピングシステム
 """
 
 import os
-import mysql.connector
+from utils.db_pool import get_connection, db_config
 from typing import Dict, List, Tuple
 from dotenv import load_dotenv
 
@@ -13,13 +13,7 @@ load_dotenv()
 
 class GenreUnificationMapper:
     def __init__(self):
-        self.db_config = {
-            'host': os.getenv('MYSQL_HOST', 'localhost'),
-            'user': os.getenv('MYSQL_USER', 'Haruto'),
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': os.getenv('MYSQL_DATABASE', 'swipe_app_production'),
-            'charset': 'utf8mb4'
-        }
+        self.db_config = db_config(os.getenv('MYSQL_DATABASE', 'swipe_app_production'))
 
         # 詳細カテゴリ→大カテゴリマッピング
         self.category_mapping = {
@@ -62,7 +56,7 @@ class GenreUnificationMapper:
     def check_table_schema(self) -> bool:
         """データベーステーブルスキーマを確認し、必要に応じてカラムを追加"""
         try:
-            connection = mysql.connector.connect(**self.db_config)
+            connection = get_connection(self.db_config)
             cursor = connection.cursor()
 
             print("📊 テーブルスキーマ確認")
@@ -99,7 +93,7 @@ class GenreUnificationMapper:
     def analyze_current_state(self) -> Dict:
         """現在のgenre状況を分析"""
         try:
-            connection = mysql.connector.connect(**self.db_config)
+            connection = get_connection(self.db_config)
             cursor = connection.cursor()
 
             print("\\n🔍 現在の状況分析")
@@ -139,7 +133,7 @@ class GenreUnificationMapper:
     def execute_genre_unification(self, dry_run: bool = True) -> bool:
         """genre統一を実行"""
         try:
-            connection = mysql.connector.connect(**self.db_config)
+            connection = get_connection(self.db_config)
             cursor = connection.cursor()
 
             print(f"\\n{'🔄 DRY RUN: ' if dry_run else '⚡ 実行: '}Genre統一処理")
@@ -186,7 +180,7 @@ class GenreUnificationMapper:
     def verify_unification(self) -> bool:
         """統一結果を検証"""
         try:
-            connection = mysql.connector.connect(**self.db_config)
+            connection = get_connection(self.db_config)
             cursor = connection.cursor()
 
             print("\\n✅ 統一結果検証")
@@ -12,7 +12,7 @@ import json
 import time
 from datetime import datetime
 from dotenv import load_dotenv
-import mysql.connector
+from utils.db_pool import get_connection
 
 load_dotenv()
 
@@ -95,13 +95,7 @@ def demo_hybrid_system():
     manager = HybridImageManager()
 
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='Haruto',
-            password=os.getenv('MYSQL_PASSWORD'),
-            database='swipe_app_development',
-            charset='utf8mb4'
-        )
+        connection = get_connection(database='swipe_app_development')
 
         cursor = connection.cursor()
         cursor.execute("SELECT id, name, category, photos FROM spots LIMIT 5")
@@ -5,8 +5,7 @@ API制限に依存しない高パフォーマンス画像配信システム
 """
 
 import json
-import mysql.connector
-import os
+from utils.db_pool import get_connection
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,13 +13,7 @@ load_dotenv()
 def get_spot_images(spot_id):
     """スポットの画像URLを取得（API制限に依存しない）"""
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='Haruto',
-            password=os.getenv('MYSQL_PASSWORD'),
-            database='swipe_app_development',
-            charset='utf8mb4'
-        )
+        connection = get_connection(database='swipe_app_development')
 
         cursor = connection.cursor()
         cursor.execute(
@@ -82,13 +75,7 @@ def test_image_api():
     print("🧪 画像取得APIテスト\n")
 
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='Haruto',
-            password=os.getenv('MYSQL_PASSWORD'),
-            database='swipe_app_development',
-            charset='utf8mb4'
-        )
+        connection = get_connection(database='swipe_app_development')
 
         cursor = connection.cursor()
         cursor.execute("SELECT id, name, category FROM spots LIMIT 5")
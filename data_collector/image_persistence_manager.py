@@ -11,9 +11,9 @@ import requests
 import hashlib
 from datetime import datetime
 from dotenv import load_dotenv
-import mysql.connector
 from pathlib import Path
 from utils.request_guard import get_photo_direct_url
+from utils.db_pool import get_connection
 
 load_dotenv()
 
@@ -83,13 +83,7 @@ class ImagePersistenceManager:
     def process_existing_data(self, limit=None):
         """既存データの画像を一括処理"""
         try:
-            connection = mysql.connector.connect(
-                host='localhost',
-                user='Haruto',
-                password=os.getenv('MYSQL_PASSWORD'),
-                database='swipe_app_development',
-                charset='utf8mb4'
-            )
+            connection = get_connection(database='swipe_app_development')
 
             cursor = connection.cursor()
 
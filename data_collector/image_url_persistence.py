@@ -11,8 +11,8 @@ import requests
 import time
 from datetime import datetime
 from dotenv import load_dotenv
-import mysql.connector
 from utils.request_guard import get_photo_direct_url
+from utils.db_pool import get_connection, db_config
 
 load_dotenv()
 
@@ -21,13 +21,7 @@ class ImageUrlPersistence:
 
     def __init__(self):
         self.api_key = os.getenv('GOOGLE_API_KEY')
-        self.mysql_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': 'swipe_app_development',
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config('swipe_app_development')
 
         # フォールバック画像マッピング
         self.fallback_images = {
@@ -59,7 +53,7 @@ class ImageUrlPersistence:
     def process_existing_spots(self, limit=None):
         """既存スポットの画像を永続化"""
         try:
-            connection = mysql.connector.connect(**self.mysql_config)
+            connection = get_connection(self.mysql_config)
             cursor = connection.cursor()
 
             print("🚀 既存データ画像永続化開始\n")
@@ -5,7 +5,7 @@ Genre統一システム修正版
 """
 
 import os
-import mysql.connector
+from utils.db_pool import get_connection, db_config
 from typing import Dict, List, Tuple
 from dotenv import load_dotenv
 
@@ -13,13 +13,7 @@ load_dotenv()
 
 class ImprovedGenreMapper:
     def __init__(self):
-        self.db_config = {
-            'host': os.getenv('MYSQL_HOST', 'localhost'),
-            'user': os.getenv('MYSQL_USER', 'Haruto'),
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': os.getenv('MYSQL_DATABASE', 'swipe_app_production'),
-            'charset': 'utf8mb4'
-        }
+        self.db_config = db_config(os.getenv('MYSQL_DATABASE', 'swipe_app_production'))
 
         # 詳細→大カテゴリマッピング
         self.genre_mapping = {
@@ -38,7 +32,7 @@ class ImprovedGenreMapper:
     def add_detailed_category_column(self):
         """detailed_categoryカラムを追加"""
         try:
-            connection = mysql.connector.connect(**self.db_config)
+            connection = get_connection(self.db_config)
             cursor = connection.cursor()
 
             print("🔧 detailed_categoryカラム追加")
@@ -68,7 +62,7 @@ class ImprovedGenreMapper:
     def analyze_and_map_genres(self):
         """現在のgenreを分析し、マッピング実行"""
         try:
-            connection = mysql.connector.connect(**self.db_config)
+            connection = get_connection(self.db_config)
             cursor = connection.cursor()
 
             print("\\n📊 Genre分析とマッピング実行")
@@ -120,7 +114,7 @@ class ImprovedGenreMapper:
     def verify_mapping_results(self):
         """マッピング結果を検証"""
         try:
-            connection = mysql.connector.connect(**self.db_config)
+            connection = get_connection(self.db_config)
             cursor = connection.cursor()
 
             print("\\n✅ マッピング結果検証")
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+収集ジョブのキュー投入・ワーカー実行ツール（utils/job_queue.py）
+ジョブ種別:
+- collect: カテゴリ×都県のトップアップ  payload {category, prefecture, count}
+- enrich : cards の詳細情報（座標・評価・住所）更新  payload {place_ids: [...]}
+- image  : cards の画像URL補完  payload {place_id}
+使い方:
+  python job_worker.py enqueue collect --category active_sauna --prefecture 群馬 --count 5
+  python job_worker.py enqueue enrich --missing-coords [--batch 20]
+  python job_worker.py enqueue image --missing [--requeue]
+  python job_worker.py work [--workers 4] [--kind image] [--drain]
+  python job_worker.py stats
+同じホストで複数のワーカープロセスを同時に起動してよい（同じキューを安全に共有する）
+"""
+
+import os
+import time
+import hashlib
+import argparse
+import threading
+import traceback
+from typing import Dict, List
+
+from fetch_onsen_tokyo import MultiCategoryDataCollector
+from utils.job_queue import JobQueue, default_worker_id, DEFAULT_LEASE_SEC
+from utils.request_guard import get_json, get_photo_direct_url
+from utils.api_budget import BudgetExceeded, get_guard
+from utils.db_pool import format_pool_stats, set_pool_size
+
+POLL_INTERVAL = 5
+
+ENRICH_FIELDS = 'place_id,geometry,rating,user_ratings_total,formatted_address'
+
+
+def handle_collect(collector: MultiCategoryDataCollector, payload: Dict) -> Dict:
+    return collector.collect_prefecture(payload['category'], payload['prefecture'], int(payload['count']))
+
+
+def handle_enrich(collector: MultiCategoryDataCollector, payload: Dict) -> Dict:
+    """place_idごとにDetailsを取得し、cardsの座標・評価・住所を更新"""
+    updates = []
+    for pid in payload['place_ids']:
+        data = get_json(collector.place_details_url,
+                        {'place_id': pid, 'key': collector.google_api_key, 'language': 'ja',
+                         'fields': ENRICH_FIELDS},
+                        ttl_sec=60*60*24*30)
+        if data.get('status') != 'OK':
+            continue
+        result = data.get('result', {})
+        loc = result.get('geometry', {}).get('location', {})
+        updates.append((loc.get('lat'), loc.get('lng'), result.get('rating'), result.get('user_ratings_total'),
+                        (result.get('formatted_address') or '')[:128] or None, pid))
+
+    if not updates:
+        return {'updated': 0}
+    connection = collector.connect_database()
+    if not connection:
+        raise RuntimeError("データベース接続に失敗しました")
+    try:
+        cur = connection.cursor()
+        cur.executemany(
+            "UPDATE cards SET latitude=COALESCE(%s, latitude), longitude=COALESCE(%s, longitude), "
+            "rating=COALESCE(%s, rating), review_count=COALESCE(%s, review_count), "
+            "address=COALESCE(%s, address), updated_at=NOW() WHERE place_id=%s",
+            updates,
+        )
+        connection.commit()
+        cur.close()
+    finally:
+        connection.close()
+    return {'updated': len(updates)}
+
+
+def handle_image(collector: MultiCategoryDataCollector, payload: Dict) -> Dict:
+    """先頭写真の直リンクを取得し、画像未設定のcardに保存"""
+    pid = payload['place_id']
+    data = get_json(collector.place_details_url,
+                    {'place_id': pid, 'key': collector.google_api_key, 'fields': 'photos'},
+                    ttl_sec=60*60*24*30)
+    photos = (data.get('result') or {}).get('photos') or []
+    if not photos:
+        return {'image_url': None}
+    url = get_photo_direct_url(photos[0].get('photo_reference'), maxwidth=200)
+    if not url or len(url) > 1000:
+        return {'image_url': None}
+    connection = collector.connect_database()
+    if not connection:
+        raise RuntimeError("データベース接続に失敗しました")
+    try:
+        cur = connection.cursor()
+        cur.execute(
+            "UPDATE cards SET image_url=%s, updated_at=NOW() WHERE place_id=%s AND (image_url IS NULL OR image_url='')",
+            (url, pid),
+        )
+        connection.commit()
+        cur.close()
+    finally:
+        connection.close()
+    return {'image_url': url}
+
+
+HANDLERS = {
+    'collect': handle_collect,
+    'enrich': handle_enrich,
+    'image': handle_image,
+}
+
+
+def _select_place_ids(collector: MultiCategoryDataCollector, where: str) -> List[str]:
+    connection = collector.connect_database()
+    if not connection:
+        return []
+    try:
+        cur = connection.cursor()
+        cur.execute(f"SELECT place_id FROM cards WHERE place_id IS NOT NULL AND ({where})")
+        ids = [pid for (pid,) in cur.fetchall() if pid]
+        cur.close()
+        return ids
+    finally:
+        connection.close()
+
+
+def enqueue(queue: JobQueue, args):
+    collector = MultiCategoryDataCollector()
+    count = 0
+    if args.kind == 'collect':
+        queue.enqueue('collect', {'category': args.category, 'prefecture': args.prefecture, 'count': args.count},
+                      key=f"collect:{args.category}:{args.prefecture}", priority=args.priority, requeue=True)
+        count = 1
+    elif args.kind == 'enrich':
+        ids = args.place_id or []
+        if args.missing_coords:
+            ids += _select_place_ids(collector, "latitude IS NULL OR longitude IS NULL")
+        for i in range(0, len(ids), args.batch):
+            batch = sorted(ids[i:i + args.batch])
+            digest = hashlib.sha1(",".join(batch).encode()).hexdigest()[:16]
+            queue.enqueue('enrich', {'place_ids': batch}, key=f"enrich:{digest}", priority=args.priority,
+                          requeue=args.requeue)
+            count += 1
+    elif args.kind == 'image':
+        ids = args.place_id or []
+        if args.missing:
+            ids += _select_place_ids(collector, "image_url IS NULL OR image_url=''")
+        for pid in ids:
+            queue.enqueue('image', {'place_id': pid}, key=f"image:{pid}", priority=args.priority, requeue=args.requeue)
+            count += 1
+    print(f"📥 {args.kind} ジョブ投入: {count}件（同じキーの未完了ジョブは再投入しない）")
+
+
+def work_loop(queue: JobQueue, collector: MultiCategoryDataCollector, worker_id: str,
+              kinds, drain: bool, stop: threading.Event):
+    """1ワーカー分のループ。drain=True ならキューが空になった時点で終了"""
+    while not stop.is_set():
+        job = queue.claim(worker_id, kinds)
+        if job is None:
+            if drain:
+                return
+            stop.wait(POLL_INTERVAL)
+            continue
+
+        print(f"▶️ [{worker_id}] #{job['id']} {job['kind']} (試行 {job['attempts']}/{job['max_attempts']}) {job['payload']}")
+        done = threading.Event()
+
+        def keep_lease():
+            while not done.wait(DEFAULT_LEASE_SEC / 3):
+                queue.heartbeat(job['id'], worker_id)
+
+        threading.Thread(target=keep_lease, daemon=True).start()
+        try:
+            result = HANDLERS[job['kind']](collector, job['payload'])
+            queue.complete(job['id'], worker_id, result)
+            print(f"✅ [{worker_id}] #{job['id']} 完了 {result}")
+        except BudgetExceeded as e:
+            queue.release(job['id'], worker_id)
+            print(f"🛑 [{worker_id}] {e} → ジョブを返却して全ワーカー停止")
+            stop.set()
+        except Exception as e:
+            status = queue.fail(job['id'], worker_id, f"{type(e).__name__}: {e}\n{traceback.format_exc()}")
+            label = '再試行予定' if status == 'queued' else '試行上限（dead）'
+            print(f"❌ [{worker_id}] #{job['id']} 失敗: {e} → {label}")
+        finally:
+            done.set()
+
+
+def work(queue: JobQueue, args):
+    set_pool_size(max(int(os.getenv('MYSQL_POOL_SIZE', '10')), args.workers + 2))
+    collector = MultiCategoryDataCollector()
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=work_loop,
+                         args=(queue, collector, default_worker_id(str(i)), args.kind, args.drain, stop))
+        for i in range(args.workers)
+    ]
+    print(f"👷 ワーカー {args.workers}本起動 (対象: {', '.join(args.kind) if args.kind else '全種別'})")
+    for t in threads:
+        t.start()
+    try:
+        while any(t.is_alive() for t in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n⚠️ 停止要求: 実行中のジョブ完了後に終了します")
+        stop.set()
+        for t in threads:
+            t.join()
+    print(get_guard().summary())
+    print(format_pool_stats())
+
+
+def show_stats(queue: JobQueue):
+    stats = queue.stats()
+    if not stats:
+        print("ℹ️ ジョブなし")
+        return
+    print("📊 ジョブ状況")
+    for kind, by_status in sorted(stats.items()):
+        detail = ", ".join(f"{s}: {n}" for s, n in sorted(by_status.items()))
+        print(f"  • {kind}: {detail}")
+    for job in queue.list('dead', limit=10):
+        print(f"  💀 #{job['id']} {job['kind']} {job['payload']} — {(job['last_error'] or '').splitlines()[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='収集ジョブキュー')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_enq = sub.add_parser('enqueue', help='ジョブ投入')
+    p_enq.add_argument('kind', choices=sorted(HANDLERS))
+    p_enq.add_argument('--category')
+    p_enq.add_argument('--prefecture')
+    p_enq.add_argument('--count', type=int, default=5)
+    p_enq.add_argument('--place-id', action='append', help='対象place_id（複数指定可）')
+    p_enq.add_argument('--missing-coords', action='store_true', help='座標未設定のcardsを対象にする（enrich）')
+    p_enq.add_argument('--missing', action='store_true', help='画像未設定のcardsを対象にする（image）')
+    p_enq.add_argument('--batch', type=int, default=20, help='enrichの1ジョブあたりplace_id数')
+    p_enq.add_argument('--priority', type=int, default=0, help='優先度（大きいほど先）')
+    p_enq.add_argument('--requeue', action='store_true', help='同じキーの完了済み・dead のジョブも再投入する（collect は常に再投入）')
+
+    p_work = sub.add_parser('work', help='ワーカー実行')
+    p_work.add_argument('--workers', type=int, default=2)
+    p_work.add_argument('--kind', action='append', choices=sorted(HANDLERS), help='処理するジョブ種別（複数指定可）')
+    p_work.add_argument('--drain', action='store_true', help='キューが空になったら終了')
+
+    sub.add_parser('stats', help='ジョブ状況')
+
+    args = parser.parse_args()
+    queue = JobQueue()
+    if args.command == 'enqueue':
+        if args.kind == 'collect' and not (args.category and args.prefecture):
+            parser.error('collect には --category と --prefecture が必要です')
+        enqueue(queue, args)
+    elif args.command == 'work':
+        work(queue, args)
+    else:
+        show_stats(queue)
+
+
+if __name__ == '__main__':
+    main()
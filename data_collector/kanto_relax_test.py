@@ -6,8 +6,8 @@
 import os
 import sys
 import requests
-import mysql.connector
 from mysql.connector import Error
+from utils.db_pool import get_connection, db_config
 from dotenv import load_dotenv
 import json
 from typing import List, Dict, Optional
@@ -20,13 +20,7 @@ class KantoRelaxDataCollector:
     def __init__(self):
         """初期化"""
         self.google_api_key = os.getenv('GOOGLE_API_KEY')
-        self.mysql_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': 'swipe_app_development',
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config('swipe_app_development')
 
         # API設定
         self.places_api_base = "https://maps.googleapis.com/maps/api/place"
@@ -39,7 +33,7 @@ class KantoRelaxDataCollector:
     def _setup_mysql_connection(self):
         """MySQL接続をセットアップ"""
         try:
-            connection = mysql.connector.connect(**self.mysql_config)
+            connection = get_connection(self.mysql_config)
             if connection.is_connected():
                 print(f"✅ MySQLに接続しました: {self.mysql_config['database']}")
                 return connection
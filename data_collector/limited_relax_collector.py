@@ -4,10 +4,9 @@
 Places API制限（250req/min, 200req/day）に完全対応
 """
 
-import os
 import sys
-import mysql.connector
 from mysql.connector import Error
+from utils.db_pool import get_connection, db_config
 from dotenv import load_dotenv
 import json
 from typing import List, Dict, Optional
@@ -24,18 +23,12 @@ class LimitedRelaxDataCollector:
         self.prefectures = prefectures
         self.api_client = LimitedPlacesAPIClient()
 
-        self.mysql_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': 'swipe_app_development',
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config('swipe_app_development')
 
     def _setup_mysql_connection(self):
         """MySQL接続をセットアップ"""
         try:
-            connection = mysql.connector.connect(**self.mysql_config)
+            connection = get_connection(self.mysql_config)
             if connection.is_connected():
                 print(f"✅ MySQLに接続しました: {self.mysql_config['database']}")
                 return connection
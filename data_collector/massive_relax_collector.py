@@ -3,34 +3,35 @@
 大規模リラックスカテゴリー収集システム
 4カテゴリー × 100データ × 7地域 = 2800件収集
 永続画像URL対応 + API制限管理
+--stage: 1件ずつINSERTせず .cache/staging/ のTSVに追記し、最後に LOAD DATA で一括取り込み（utils/staged_loader.py）
 """
 
 import os
 import json
-import requests
 import time
-import mysql.connector
+import argparse
 from dotenv import load_dotenv
-from datetime import datetime
 from utils.request_guard import (
     get_json,
     get_photo_direct_url,
 )
+from utils.db_pool import get_connection, db_config
+from utils.place_id_index import open_index
+from utils.staged_loader import StagingWriter, load_staged, print_load_result
+
+STAGE_NAME = "massive_relax"
 
 load_dotenv()
 
 class MassiveRelaxCollector:
     """大規模リラックスカテゴリー収集クラス"""
 
-    def __init__(self):
+    def __init__(self, stage: bool = False, fresh: bool = False):
         self.api_key = os.getenv('GOOGLE_API_KEY')
-        self.mysql_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': 'swipe_app_development',
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config('swipe_app_development')
+        # ステージングモード: 保存はTSVへの追記のみ、重複判定は既存place_id索引で行う
+        self.stage = StagingWriter(STAGE_NAME, fresh=fresh) if stage else None
+        self._existing_ids = None
 
         # 収集対象設定
         self.categories = {
@@ -102,16 +103,16 @@ class MassiveRelaxCollector:
             }
 
             data = get_json(url, params, ttl_sec=60*60*24*7)
-                status = data.get('status')
-                if status == 'OK':
-                    places = data.get('results', [])
-                    print(f"      ✅ 検索結果: {len(places)}件")
-                    return places
-                elif status == 'OVER_QUERY_LIMIT':
-                    print(f"      ❌ API制限達成")
-                    return 'LIMIT_REACHED'
-                else:
-                    print(f"      ⚠️  Status: {status}")
+            status = data.get('status')
+            if status == 'OK':
+                places = data.get('results', [])
+                print(f"      ✅ 検索結果: {len(places)}件")
+                return places
+            elif status == 'OVER_QUERY_LIMIT':
+                print("      ❌ API制限達成")
+                return 'LIMIT_REACHED'
+            else:
+                print(f"      ⚠️  Status: {status}")
 
         except Exception as e:
             print(f"      ❌ 検索エラー: {e}")
@@ -144,10 +145,80 @@ class MassiveRelaxCollector:
         keyword = category_keywords.get(category_key, 'nature')
         return f"https://source.unsplash.com/800x600/?{keyword}"
 
+    def build_spot_data(self, place, region, category_key):
+        """spots の1行分（永続画像URLの取得を含む）"""
+        place_id = place.get('place_id')
+
+        # 永続画像URL取得
+        permanent_urls = []
+        fallback_url = self.get_fallback_image(category_key, place.get('name', ''))
+
+        photos = place.get('photos', [])
+        if photos:
+            for photo in photos[:3]:  # 最大3枚
+                photo_ref = photo.get('photo_reference')
+                if photo_ref:
+                    permanent_url = self.extract_permanent_image_url(photo_ref)
+                    if permanent_url:
+                        permanent_urls.append({
+                            'url': permanent_url,
+                            'width': photo.get('width'),
+                            'height': photo.get('height'),
+                            'api_independent': True
+                        })
+                    time.sleep(0.2)  # API制限対策
+
+        # データ準備
+        geometry = place.get('geometry', {})
+        location = geometry.get('location', {})
+
+        spot_data = {
+            'place_id': place_id,
+            'name': place.get('name'),
+            'category': f"relax_{category_key}",
+            'address': place.get('formatted_address'),
+            'latitude': location.get('lat'),
+            'longitude': location.get('lng'),
+            'rating': place.get('rating'),
+            'user_ratings_total': place.get('user_ratings_total'),
+            'price_level': place.get('price_level'),
+            'photos': json.dumps(photos) if photos else None,
+            'types': json.dumps(place.get('types', [])),
+            'vicinity': place.get('vicinity'),
+            'plus_code': place.get('plus_code', {}).get('global_code'),
+            'region': region,
+            'image_urls': json.dumps(permanent_urls) if permanent_urls else None,
+            'fallback_image_url': fallback_url
+        }
+        return spot_data
+
+    def _existing_place_ids(self):
+        if self._existing_ids is None:
+            connection = get_connection(self.mysql_config)
+            try:
+                self._existing_ids = open_index(connection, "spots_all", table='spots')
+            finally:
+                connection.close()
+        return self._existing_ids
+
+    def stage_spot(self, place, region, category_key):
+        """スポットをステージングTSVに追記（取り込みは collect_all_massive の最後）"""
+        place_id = place.get('place_id')
+        if not place_id or place_id in self._existing_place_ids() or self.stage.is_staged(place_id, 'spots'):
+            print(f"        ⚠️  重複スキップ: {place.get('name', 'Unknown')}")
+            return False
+        spot_data = self.build_spot_data(place, region, category_key)
+        self.stage.add_spot(spot_data, columns=list(spot_data))
+        self.collected_spots += 1
+        print(f"        📝 ステージ: {place.get('name')}")
+        return True
+
     def save_spot(self, place, region, category_key):
         """スポット情報をデータベースに保存"""
+        if self.stage is not None:
+            return self.stage_spot(place, region, category_key)
         try:
-            connection = mysql.connector.connect(**self.mysql_config)
+            connection = get_connection(self.mysql_config)
             cursor = connection.cursor()
 
             # 重複チェック
@@ -160,47 +231,8 @@ class MassiveRelaxCollector:
                     connection.close()
                     return False
 
-            # 永続画像URL取得
-            permanent_urls = []
-            fallback_url = self.get_fallback_image(category_key, place.get('name', ''))
-
-            photos = place.get('photos', [])
-            if photos:
-                for photo in photos[:3]:  # 最大3枚
-                    photo_ref = photo.get('photo_reference')
-                    if photo_ref:
-                        permanent_url = self.extract_permanent_image_url(photo_ref)
-                        if permanent_url:
-                            permanent_urls.append({
-                                'url': permanent_url,
-                                'width': photo.get('width'),
-                                'height': photo.get('height'),
-                                'api_independent': True
-                            })
-                        time.sleep(0.2)  # API制限対策
-
-            # データ準備
-            geometry = place.get('geometry', {})
-            location = geometry.get('location', {})
-
-            spot_data = {
-                'place_id': place_id,
-                'name': place.get('name'),
-                'category': f"relax_{category_key}",
-                'address': place.get('formatted_address'),
-                'latitude': location.get('lat'),
-                'longitude': location.get('lng'),
-                'rating': place.get('rating'),
-                'user_ratings_total': place.get('user_ratings_total'),
-                'price_level': place.get('price_level'),
-                'photos': json.dumps(photos) if photos else None,
-                'types': json.dumps(place.get('types', [])),
-                'vicinity': place.get('vicinity'),
-                'plus_code': place.get('plus_code', {}).get('global_code'),
-                'region': region,
-                'image_urls': json.dumps(permanent_urls) if permanent_urls else None,
-                'fallback_image_url': fallback_url
-            }
+            spot_data = self.build_spot_data(place, region, category_key)
+            permanent_urls = json.loads(spot_data['image_urls']) if spot_data['image_urls'] else []
 
             # データベース挿入
             insert_query = """
@@ -257,7 +289,7 @@ class MassiveRelaxCollector:
                 places = self.search_places(search_term, region_key, city, category_key)
 
                 if places == 'LIMIT_REACHED':
-                    print(f"     ⚠️  API制限達成 - 処理停止")
+                    print("     ⚠️  API制限達成 - 処理停止")
                     return collected_in_this_session
 
                 if places:
@@ -298,22 +330,32 @@ class MassiveRelaxCollector:
 
                 # 大量処理の休憩
                 if self.api_usage % 50 == 0:
-                    print(f"   😴 API制限対策休憩（10秒）...")
+                    print("   😴 API制限対策休憩（10秒）...")
                     time.sleep(10)
 
             print(f"🎯 {category['japanese']} 完了: {category_total}件")
 
-        print(f"\n🎉 大規模収集完了!")
+        if self.stage is not None:
+            self.stage.close()
+            print(f"\n📥 ステージングTSVを一括取り込み中... ({self.stage.path})")
+            print_load_result(load_staged(self.mysql_config, STAGE_NAME))
+
+        print("\n🎉 大規模収集完了!")
         print(f"   📊 総収集数: {total_collected}件")
         print(f"   🔧 API使用: {self.api_usage}回")
-        print(f"   🖼️  全て永続画像URL対応済み")
+        print("   🖼️  全て永続画像URL対応済み")
 
 def main():
+    parser = argparse.ArgumentParser(description='大規模リラックスカテゴリー収集')
+    parser.add_argument('--stage', action='store_true', help='TSVにステージングし、最後に LOAD DATA で一括取り込み')
+    parser.add_argument('--fresh', action='store_true', help='前回のステージングTSVを破棄')
+    args = parser.parse_args()
+
     print("🏗️  大規模リラックスカテゴリー収集システム")
     print("💫 APIキー依存なし永続画像システム")
     print("⚡ 2800件データ収集\n")
 
-    collector = MassiveRelaxCollector()
+    collector = MassiveRelaxCollector(stage=args.stage, fresh=args.fresh)
     collector.collect_all_massive()
 
 if __name__ == "__main__":
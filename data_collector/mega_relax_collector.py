@@ -5,10 +5,8 @@
 """
 
 import os
-import sys
 import json
 import time
-import mysql.connector
 from dotenv import load_dotenv
 from datetime import datetime
 from utils.request_guard import (
@@ -17,6 +15,10 @@ from utils.request_guard import (
     mark_fetched_place,
     get_photo_direct_url,
 )
+from utils.checkpoint import RunCheckpoint
+from utils.api_budget import BudgetExceeded, get_guard, set_budget
+from utils.prefecture_geo import REGION_PREFECTURES, area_bias, place_in_prefectures
+from utils.db_pool import get_connection, db_config
 
 # 環境変数読み込み
 load_dotenv()
@@ -27,43 +29,44 @@ class MegaRelaxCollector:
         if not self.api_key:
             raise ValueError("GOOGLE_PLACES_API_KEY not found in environment variables")
 
-        self.db_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': 'swipe_app_development',
-            'charset': 'utf8mb4'
-        }
+        self.db_config = db_config('swipe_app_development')
 
-        # 地域設定
+        # 地域設定（areas: 都市/県ごとに location バイアスを付けて検索する単位）
         self.regions = {
             'hokkaido': {
                 'name': '北海道',
-                'query_area': '北海道 札幌 函館 旭川'
+                'query_area': '北海道 札幌 函館 旭川',
+                'areas': ['札幌', '函館', '旭川']
             },
             'tohoku': {
                 'name': '東北',
-                'query_area': '仙台 青森 盛岡 秋田 山形 福島'
+                'query_area': '仙台 青森 盛岡 秋田 山形 福島',
+                'areas': ['仙台', '青森', '盛岡', '秋田', '山形', '福島']
             },
             'kanto': {
                 'name': '関東',
-                'query_area': '東京 横浜 千葉 埼玉 茨城 栃木 群馬'
+                'query_area': '東京 横浜 千葉 埼玉 茨城 栃木 群馬',
+                'areas': ['東京', '横浜', '千葉', '埼玉', '茨城', '栃木', '群馬']
             },
             'chubu': {
                 'name': '中部',
-                'query_area': '名古屋 金沢 富山 福井 山梨 長野 岐阜 静岡 新潟'
+                'query_area': '名古屋 金沢 富山 福井 山梨 長野 岐阜 静岡 新潟',
+                'areas': ['名古屋', '金沢', '富山', '福井', '山梨', '長野', '岐阜', '静岡', '新潟']
             },
             'kansai': {
                 'name': '関西',
-                'query_area': '大阪 京都 神戸 奈良 和歌山 滋賀'
+                'query_area': '大阪 京都 神戸 奈良 和歌山 滋賀',
+                'areas': ['大阪', '京都', '神戸', '奈良', '和歌山', '滋賀']
             },
             'chugoku_shikoku': {
                 'name': '中国四国',
-                'query_area': '広島 岡山 山口 島根 鳥取 高松 松山 高知 徳島'
+                'query_area': '広島 岡山 山口 島根 鳥取 高松 松山 高知 徳島',
+                'areas': ['広島', '岡山', '山口', '島根', '鳥取', '高松', '松山', '高知', '徳島']
             },
             'kyushu_okinawa': {
                 'name': '九州沖縄',
-                'query_area': '福岡 北九州 熊本 鹿児島 宮崎 大分 佐賀 長崎 那覇'
+                'query_area': '福岡 北九州 熊本 鹿児島 宮崎 大分 佐賀 長崎 那覇',
+                'areas': ['福岡', '北九州', '熊本', '鹿児島', '宮崎', '大分', '佐賀', '長崎', '那覇']
             }
         }
 
@@ -179,32 +182,70 @@ class MegaRelaxCollector:
             print(f"⚠️ レビュー取得エラー: {e}")
             return []
 
-    def search_places(self, region_key, category_key, target_count=100):
-        """指定地域・カテゴリーでスポットを検索"""
+    def text_search_request(self, region_key, category_key, query_term, area):
+        """テキスト検索のURL・パラメータ（見積もりツールと共用）
+        都市名を並べたクエリではなく、1都市/県ずつその中心に location バイアスを付けて検索する"""
+        url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+        params = {
+            'query': f"{query_term} {area}",
+            'key': self.api_key,
+            'language': 'ja',
+            'region': 'jp'
+        }
+        params.update(area_bias(area) or {})
+        return url, params
+
+    def search_units(self, region_key, category_key):
+        """(クエリ語, 都市/県) の検索単位。語ごとに全都市を回して地域内に分散させる"""
+        return [(term, area) for term in self.categories[category_key]['queries']
+                for area in self.regions[region_key]['areas']]
+
+    def details_request(self, place_id):
+        """詳細取得のURL・パラメータ（見積もりツールと共用）"""
+        url = "https://maps.googleapis.com/maps/api/place/details/json"
+        params = {
+            'place_id': place_id,
+            'fields': 'name,formatted_address,geometry,photos,rating,types,website,formatted_phone_number,opening_hours,reviews',
+            'key': self.api_key,
+            'language': 'ja'
+        }
+        return url, params
+
+    def search_places(self, region_key, category_key, target_count=100, checkpoint=None):
+        """指定地域・カテゴリーでスポットを検索
+        checkpoint を渡すと消費済みクエリ・取得済み候補を逐次保存し、再実行時は続きから再開する"""
         region = self.regions[region_key]
         category = self.categories[category_key]
 
         print(f"\n🔍 {region['name']} - {category['name']} 収集開始 (目標: {target_count}件)")
 
-        collected_places = []
-        used_place_ids = set()
+        pair = f"{region_key}:{category_key}"
+        st = {'pair': pair, 'consumed': [], 'used_place_ids': [], 'collected_places': []}
+        if checkpoint is not None:
+            current = checkpoint.state.get('current')
+            if current and current.get('pair') == pair:
+                st = current
+                print(f"  ♻️ チェックポイントから再開 (取得済み {len(st['collected_places'])}件)")
+            else:
+                checkpoint.state['current'] = st
 
-        for query_term in category['queries']:
+        collected_places = st['collected_places']
+        used_place_ids = set(st['used_place_ids'])
+        consumed = set(st['consumed'])
+
+        region_prefectures = REGION_PREFECTURES[region_key]
+
+        for query_term, area in self.search_units(region_key, category_key):
             if len(collected_places) >= target_count:
                 break
+            unit = f"{query_term}@{area}"
+            if unit in consumed:
+                continue
 
-            print(f"  📍 検索: {query_term} in {region['query_area']}")
+            print(f"  📍 検索: {query_term} in {area}")
 
             # テキスト検索実行
-            search_query = f"{query_term} {region['query_area']}"
-            url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-
-            params = {
-                'query': search_query,
-                'key': self.api_key,
-                'language': 'ja',
-                'region': 'jp'
-            }
+            url, params = self.text_search_request(region_key, category_key, query_term, area)
 
             try:
                 data = get_json(url, params, ttl_sec=60*60*24*7)
@@ -223,6 +264,9 @@ class MegaRelaxCollector:
                     place_id = result.get('place_id')
                     if place_id in used_place_ids:
                         continue
+                    # 地域外の結果は詳細取得しない（座標の矩形判定）
+                    if not place_in_prefectures(result, region_prefectures):
+                        continue
 
                     used_place_ids.add(place_id)
 
@@ -237,6 +281,16 @@ class MegaRelaxCollector:
                         collected_places.append(place_details)
                         print(f"    ✅ {place_details['name']} (レビュー: {len(place_details.get('reviews', []))}件)")
 
+                    # Details取得済みマークが付くため、結果は1件ごとに保存する
+                    st['used_place_ids'].append(place_id)
+                    if checkpoint is not None:
+                        checkpoint.save()
+
+                consumed.add(unit)
+                st['consumed'].append(unit)
+                if checkpoint is not None:
+                    checkpoint.save()
+
                 # API制限対策
                 time.sleep(0.1)
 
@@ -253,14 +307,7 @@ class MegaRelaxCollector:
             if already_fetched_place(place_id):
                 return None
 
-            url = f"https://maps.googleapis.com/maps/api/place/details/json"
-            params = {
-                'place_id': place_id,
-                'fields': 'name,formatted_address,geometry,photos,rating,types,website,formatted_phone_number,opening_hours,reviews',
-                'key': self.api_key,
-                'language': 'ja'
-            }
-
+            url, params = self.details_request(place_id)
             data = get_json(url, params, ttl_sec=60*60*24*30)
 
             if data.get('status') == 'OK' and 'result' in data:
@@ -309,7 +356,7 @@ class MegaRelaxCollector:
             return
 
         try:
-            connection = mysql.connector.connect(**self.db_config)
+            connection = get_connection(self.db_config)
             cursor = connection.cursor()
 
             insert_query = """
@@ -370,42 +417,75 @@ class MegaRelaxCollector:
         except Exception as e:
             print(f"❌ データベースエラー: {e}")
 
-    def collect_region_category(self, region_key, category_key, target_count=100):
+    def collect_region_category(self, region_key, category_key, target_count=100, checkpoint=None):
         """特定地域・カテゴリーの収集実行"""
-        places = self.search_places(region_key, category_key, target_count)
+        places = self.search_places(region_key, category_key, target_count, checkpoint)
         self.save_to_database(places)
         return len(places)
 
-    def collect_all(self):
-        """全地域・全カテゴリーの完全収集"""
+    def collect_all(self, fresh=False):
+        """全地域・全カテゴリーの完全収集
+        地域×カテゴリー単位の完了状況と収集途中の候補をチェックポイントに保存し、中断・予算到達後は続きから再開する"""
         print("🚀 メガリラックス収集開始！")
         print("目標: 2800件 (4カテゴリー × 100件 × 7地域)")
         print("=" * 60)
 
-        total_collected = 0
+        ckpt = RunCheckpoint("mega_relax_collect_all", fresh=fresh)
+        if ckpt.resumed:
+            print(f"♻️ チェックポイントから再開: {ckpt.path}")
+        run_state = ckpt.section('run', {'completed': {}, 'total_collected': 0})
+        total_collected = run_state['total_collected']
+        failed = []
 
-        for region_key in self.regions.keys():
-            for category_key in self.categories.keys():
-                print(f"\n📍 {self.regions[region_key]['name']} - {self.categories[category_key]['name']}")
+        try:
+            for region_key in self.regions.keys():
+                for category_key in self.categories.keys():
+                    pair = f"{region_key}:{category_key}"
+                    if pair in run_state['completed']:
+                        print(f"⏭️ {pair}: チェックポイントで完了済み ({run_state['completed'][pair]}件)")
+                        continue
+                    print(f"\n📍 {self.regions[region_key]['name']} - {self.categories[category_key]['name']}")
 
-                try:
-                    count = self.collect_region_category(region_key, category_key, 100)
-                    total_collected += count
+                    try:
+                        count = self.collect_region_category(region_key, category_key, 100, checkpoint=ckpt)
+                        total_collected += count
+                        run_state['completed'][pair] = count
+                        run_state['total_collected'] = total_collected
+                        ckpt.state.pop('current', None)
+                        ckpt.save()
 
-                    print(f"✅ 完了: {count}件")
-                    print(f"📊 累計: {total_collected}件 / 2800件")
+                        print(f"✅ 完了: {count}件")
+                        print(f"📊 累計: {total_collected}件 / 2800件")
 
-                    # 進捗表示
-                    progress = (total_collected / 2800) * 100
-                    print(f"📈 進捗: {progress:.1f}%")
+                        # 進捗表示
+                        progress = (total_collected / 2800) * 100
+                        print(f"📈 進捗: {progress:.1f}%")
 
-                    # API制限対策
-                    time.sleep(1)
+                        # API制限対策
+                        time.sleep(1)
 
-                except Exception as e:
-                    print(f"❌ エラー: {e}")
-                    continue
+                    except Exception as e:
+                        print(f"❌ エラー: {e}")
+                        failed.append(pair)
+                        continue
+        except BudgetExceeded as e:
+            ckpt.save()
+            print(f"\n🛑 {e}")
+            print(get_guard().summary())
+            print(f"💾 チェックポイント保存済み: {ckpt.path}（再実行で続きから再開）")
+            return
 
+        pairs = [f"{r}:{c}" for r in self.regions for c in self.categories]
+        if failed or any(pair not in run_state['completed'] for pair in pairs):
+            # 失敗した組み合わせがあれば再開用の状態を残す（完了済みは再実行時にスキップ）
+            ckpt.save()
+            print(get_guard().summary())
+            print(f"\n⚠️ 失敗した地域×カテゴリー {len(failed)}件: {', '.join(failed)}")
+            print(f"💾 チェックポイント保存済み: {ckpt.path}（再実行で失敗分から再開）")
+            return
+
+        ckpt.clear()
+        print(get_guard().summary())
         print("\n" + "=" * 60)
         print(f"🎉 メガリラックス収集完了！")
         print(f"📊 総収集数: {total_collected}件")
@@ -414,7 +494,7 @@ class MegaRelaxCollector:
     def get_current_stats(self):
         """現在の収集状況を確認"""
         try:
-            connection = mysql.connector.connect(**self.db_config)
+            connection = get_connection(self.db_config)
             cursor = connection.cursor()
 
             print("📊 現在の収集状況")
@@ -445,28 +525,36 @@ class MegaRelaxCollector:
             print(f"❌ 統計取得エラー: {e}")
 
 def main():
-    if len(sys.argv) < 2:
-        print("使用方法:")
-        print("  python3 mega_relax_collector.py all                    # 全収集")
-        print("  python3 mega_relax_collector.py <region> <category>    # 個別収集")
-        print("  python3 mega_relax_collector.py stats                  # 統計表示")
-        print("")
-        print("地域: hokkaido, tohoku, kanto, chubu, kansai, chugoku_shikoku, kyushu_okinawa")
-        print("カテゴリー: parks, sauna, cafe, walking_courses")
-        return
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='メガリラックス収集',
+        epilog='地域: hokkaido, tohoku, kanto, chubu, kansai, chugoku_shikoku, kyushu_okinawa / '
+               'カテゴリー: parks, sauna, cafe, walking_courses')
+    parser.add_argument('target', help='all（全収集。中断・予算到達時は続きから再開） / stats（統計表示） / 地域')
+    parser.add_argument('category', nargs='?', help='カテゴリー（地域を指定した個別収集のとき）')
+    parser.add_argument('--fresh', action='store_true', help='チェックポイントを破棄して最初から実行（all）')
+    parser.add_argument('--max-usd', type=float, default=None, help='API予算上限（USD）。到達時はチェックポイントを残して停止')
+    args = parser.parse_args()
+
+    if args.target not in ('all', 'stats') and not args.category:
+        parser.error('地域を指定した場合はカテゴリーも指定してください')
+    if args.max_usd is not None:
+        set_budget(args.max_usd)
 
     collector = MegaRelaxCollector()
 
-    if sys.argv[1] == 'all':
-        collector.collect_all()
-    elif sys.argv[1] == 'stats':
+    if args.target == 'all':
+        collector.collect_all(fresh=args.fresh)
+    elif args.target == 'stats':
         collector.get_current_stats()
-    elif len(sys.argv) == 3:
-        region = sys.argv[1]
-        category = sys.argv[2]
-        collector.collect_region_category(region, category)
+    elif args.target not in collector.regions or args.category not in collector.categories:
+        parser.error(f"未知の地域・カテゴリーです: {args.target} {args.category}")
     else:
-        print("❌ 引数が不正です")
+        try:
+            collector.collect_region_category(args.target, args.category)
+        except BudgetExceeded as e:
+            print(f"\n🛑 {e}")
+        print(get_guard().summary())
 
 if __name__ == "__main__":
     main()
@@ -2,142 +2,165 @@
 """
 データ移行スクリプト: development.spots → production.cards
 永続化済みの画像URLも含めて完全移行
+- 移行データはまず本番側の影テーブル（一時テーブル cards_migration）へ一括挿入し、件数を検証
+- 切り替えは place_id をキーにした集合演算（既存カードは UPDATE で id を維持、新規のみ INSERT）を1トランザクションで実行
+  （cards は review_comments / user_cards から外部キーで参照されるため、DELETE や RENAME による入れ替えはしない）
+- --incremental: 前回同期以降に変更された spots だけを upsert（utils/spot_sync.py、水位線は本番DBの sync_watermarks）
+使い方:
+  python migrate_to_production.py [--prune] [--force] [--batch 1000]
+  python migrate_to_production.py --incremental [--interval 60] [--reset]
 """
 
 import os
-import json
-import mysql.connector
+import time
+import argparse
+from utils.db_pool import get_connection, db_config
+from utils.spot_sync import (
+    CARD_SYNC_COLUMNS as MIGRATION_COLUMNS,
+    SPOT_SELECT,
+    SpotCardSync,
+    normalize_category,
+    print_sync_result,
+    spot_to_card,
+    update_expression,
+)
 from dotenv import load_dotenv
 
 load_dotenv()
 
+MIGRATION_BATCH = int(os.getenv("MIGRATION_BATCH", "1000"))
+# 移行後の件数が本番の既存件数のこの割合を下回る場合は、開発側のデータ欠損とみなして中止
+MIN_KEEP_RATIO = float(os.getenv("MIGRATION_MIN_KEEP_RATIO", "0.5"))
+
+
 class DataMigrator:
     """開発環境から本番環境へのデータ移行"""
 
     def __init__(self):
-        self.mysql_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'charset': 'utf8mb4'
-        }
-
-    def migrate_spots_to_cards(self):
-        """spotsテーブルからcardsテーブルへの移行"""
+        self.mysql_config = db_config()
+
+    def _fill_shadow_table(self, dev_cursor, prod_cursor, batch):
+        """影テーブルに移行データを一括挿入。(読込件数, place_id のユニーク件数) を返す"""
+        prod_cursor.execute("DROP TEMPORARY TABLE IF EXISTS cards_migration")
+        prod_cursor.execute("CREATE TEMPORARY TABLE cards_migration LIKE cards")
+
+        cols = ', '.join(MIGRATION_COLUMNS)
+        insert_query = (
+            f"INSERT INTO cards_migration ({cols}, created_at, updated_at) "
+            f"VALUES ({', '.join(['%s'] * len(MIGRATION_COLUMNS))}, NOW(), NOW()) "
+            "ON DUPLICATE KEY UPDATE id = id"
+        )
+
+        dev_cursor.execute(SPOT_SELECT + " ORDER BY id ASC")
+        read_count = 0
+        place_ids = set()
+        while True:
+            rows = dev_cursor.fetchmany(batch)
+            if not rows:
+                break
+            values = [spot_to_card(row) for row in rows]
+            prod_cursor.executemany(insert_query, values)
+            read_count += len(rows)
+            place_ids.update(v[MIGRATION_COLUMNS.index('place_id')] for v in values)
+            print(f"   📈 影テーブルへ挿入: {read_count}件")
+        return read_count, len(place_ids)
+
+    def _validate(self, prod_cursor, read_count, unique_count, force):
+        """影テーブルの件数検証。問題があればメッセージを返す"""
+        prod_cursor.execute("SELECT COUNT(*), SUM(title IS NULL OR title = '') FROM cards_migration")
+        shadow_count, empty_titles = prod_cursor.fetchone()
+        prod_cursor.execute("SELECT COUNT(*) FROM cards")
+        current_count = prod_cursor.fetchone()[0]
+
+        print(f"\n🔎 検証: 読込 {read_count}件 / place_id ユニーク {unique_count}件 / 影テーブル {shadow_count}件"
+              f" / 本番cards {current_count}件")
+        if shadow_count != unique_count:
+            return f"影テーブルの件数がユニーク件数と一致しません ({shadow_count} != {unique_count})"
+        if empty_titles:
+            return f"タイトルが空の行が {empty_titles}件あります"
+        if shadow_count == 0:
+            return "移行対象がありません"
+        if not force and current_count and shadow_count < current_count * MIN_KEEP_RATIO:
+            return (f"移行件数 {shadow_count}件が本番の既存件数 {current_count}件の"
+                    f"{MIN_KEEP_RATIO:.0%} 未満です（--force で続行）")
+        return None
+
+    def _cutover(self, prod_cursor, prune):
+        """影テーブルの内容を cards に反映（呼び出し側で1トランザクションとしてcommit）"""
+        updates = ', '.join(update_expression(col, f"m.{col}", alias='c')
+                            for col in MIGRATION_COLUMNS if col != 'place_id')
+        prod_cursor.execute(
+            f"UPDATE cards c JOIN cards_migration m ON m.place_id = c.place_id "
+            f"SET {updates}, c.updated_at = NOW()"
+        )
+        updated = prod_cursor.rowcount
+
+        cols = ', '.join(MIGRATION_COLUMNS)
+        prod_cursor.execute(
+            f"INSERT INTO cards ({cols}, created_at, updated_at) "
+            f"SELECT {', '.join('m.' + c for c in MIGRATION_COLUMNS)}, NOW(), NOW() FROM cards_migration m "
+            f"LEFT JOIN cards c ON c.place_id = m.place_id WHERE c.id IS NULL"
+        )
+        inserted = prod_cursor.rowcount
+
+        pruned = 0
+        if prune:
+            # 移行元に無く、ユーザーに参照されていないカードのみ削除（レビューも合わせて削除）
+            stale = ("SELECT c.id FROM cards c LEFT JOIN cards_migration m ON m.place_id = c.place_id "
+                     "WHERE m.id IS NULL AND NOT EXISTS (SELECT 1 FROM user_cards u WHERE u.card_id = c.id)")
+            prod_cursor.execute(stale)
+            stale_ids = [row[0] for row in prod_cursor.fetchall()]
+            for i in range(0, len(stale_ids), MIGRATION_BATCH):
+                chunk = stale_ids[i:i + MIGRATION_BATCH]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                prod_cursor.execute(f"DELETE FROM review_comments WHERE card_id IN ({placeholders})", chunk)
+                prod_cursor.execute(f"DELETE FROM cards WHERE id IN ({placeholders})", chunk)
+                pruned += prod_cursor.rowcount
+        return updated, inserted, pruned
+
+    def migrate_spots_to_cards(self, prune=False, force=False, batch=MIGRATION_BATCH):
+        """spotsテーブルからcardsテーブルへの移行
+        prune=True なら移行元に無いカード（ユーザー未参照のもの）を削除"""
 
         dev_connection = None
         prod_connection = None
 
         try:
             # 開発環境接続
-            dev_connection = mysql.connector.connect(
-                **self.mysql_config,
+            dev_connection = get_connection(
+                self.mysql_config,
                 database='swipe_app_development'
             )
             dev_cursor = dev_connection.cursor()
 
             # 本番環境接続
-            prod_connection = mysql.connector.connect(
-                **self.mysql_config,
+            prod_connection = get_connection(
+                self.mysql_config,
                 database='swipe_app_production'
             )
             prod_cursor = prod_connection.cursor()
 
             print("🚀 データ移行開始")
             print("📂 開発環境 → 本番環境")
-            print("🗂️  spots → cards\n")
-
-            # 開発環境からデータ取得
-            dev_cursor.execute("""
-                SELECT
-                    place_id,
-                    name,
-                    category,
-                    address,
-                    rating,
-                    user_ratings_total,
-                    website,
-                    region,
-                    image_urls,
-                    fallback_image_url
-                FROM spots
-                WHERE name IS NOT NULL
-                ORDER BY created_at ASC
-            """)
-
-            spots_data = dev_cursor.fetchall()
-            print(f"📊 移行対象: {len(spots_data)}件")
-
-            # 既存のcardsデータをクリア（念のため）
-            prod_cursor.execute("DELETE FROM cards")
+            print("🗂️  spots → cards（影テーブル経由）\n")
+
+            read_count, unique_count = self._fill_shadow_table(dev_cursor, prod_cursor, batch)
             prod_connection.commit()
-            print("🗑️  既存cardsデータクリア完了")
-
-            migrated_count = 0
-
-            for spot in spots_data:
-                (place_id, name, category, address, rating,
-                 user_ratings_total, website, region,
-                 image_urls_json, fallback_image_url) = spot
-
-                # 画像URL決定（永続URL優先）
-                image_url = fallback_image_url  # デフォルトはフォールバック
-
-                if image_urls_json:
-                    try:
-                        image_urls = json.loads(image_urls_json)
-                        if image_urls and len(image_urls) > 0:
-                            # 永続URLが最優先
-                            first_image = image_urls[0]
-                            if 'url' in first_image:
-                                image_url = first_image['url']
-                    except json.JSONDecodeError:
-                        pass  # フォールバックURLを使用
-
-                # カテゴリ名正規化
-                genre = self.normalize_category(category)
-
-                # 外部リンク（websiteがあればそれを、なければGoogle検索）
-                external_link = website if website else f"https://www.google.com/search?q={name}"
-
-                # cardsテーブルに挿入
-                insert_query = """
-                    INSERT INTO cards (
-                        genre, title, rating, review_count,
-                        image_url, external_link, region,
-                        address, place_id, created_at, updated_at
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW()
-                    )
-                """
-
-                values = (
-                    genre,
-                    name,
-                    rating if rating else 0.0,
-                    user_ratings_total if user_ratings_total else 0,
-                    image_url,
-                    external_link,
-                    region,
-                    address,
-                    place_id
-                )
-
-                try:
-                    prod_cursor.execute(insert_query, values)
-                    migrated_count += 1
-
-                    if migrated_count % 10 == 0:
-                        print(f"   📈 進捗: {migrated_count}/{len(spots_data)}件")
-
-                except Exception as e:
-                    print(f"   ❌ エラー ({name}): {e}")
-
-            # コミット
+
+            problem = self._validate(prod_cursor, read_count, unique_count, force)
+            if problem:
+                print(f"🛑 移行中止: {problem}")
+                print("   本番cardsは変更していません")
+                return False
+
+            started = time.time()
+            updated, inserted, pruned = self._cutover(prod_cursor, prune)
             prod_connection.commit()
+            cutover_ms = (time.time() - started) * 1000
 
             print(f"\n🎉 移行完了!")
-            print(f"   ✅ 成功: {migrated_count}/{len(spots_data)}件")
+            print(f"   ✅ 更新: {updated}件 / 新規: {inserted}件" + (f" / 削除: {pruned}件" if prune else ""))
+            print(f"   ⏱️  切り替え所要: {cutover_ms:.0f}ms")
 
             # 移行結果確認
             prod_cursor.execute("SELECT COUNT(*) FROM cards")
@@ -152,11 +175,13 @@ class DataMigrator:
                 print(f"   {region}: {count}件")
 
             print(f"\n🚀 本番環境へのデータ移行が完了しました！")
+            return True
 
         except Exception as e:
             print(f"❌ 移行エラー: {e}")
             if prod_connection:
                 prod_connection.rollback()
+            return False
 
         finally:
             if dev_connection:
@@ -168,25 +193,34 @@ class DataMigrator:
 
     def normalize_category(self, category):
         """カテゴリ名の正規化"""
-        if not category:
-            return "relax"
-
-        # カテゴリマッピング
-        category_map = {
-            "温泉": "relax",
-            "relax_onsen": "relax",
-            "relax_onsen_test": "relax",
-            "onsen": "relax"
-        }
-
-        return category_map.get(category, "relax")
+        return normalize_category(category)
 
 def main():
+    parser = argparse.ArgumentParser(description='development.spots → production.cards 移行')
+    parser.add_argument('--prune', action='store_true', help='移行元に無いカード（ユーザー未参照）を削除')
+    parser.add_argument('--force', action='store_true', help='件数検証（既存件数との比較）を無視して切り替える')
+    parser.add_argument('--batch', type=int, default=MIGRATION_BATCH, help='影テーブルへの1回の挿入件数')
+    parser.add_argument('--incremental', action='store_true', help='前回同期以降に変更された spots だけを反映')
+    parser.add_argument('--interval', type=float, default=None, help='--incremental を指定秒ごとに繰り返す')
+    parser.add_argument('--reset', action='store_true', help='--incremental の水位線を破棄して全件から同期')
+    args = parser.parse_args()
+
+    if args.incremental:
+        sync = SpotCardSync(db_config())
+        if args.reset:
+            sync.reset()
+        if args.interval:
+            sync.run_forever(args.interval)
+        else:
+            started = time.time()
+            print_sync_result(sync.name, sync.run_once(), time.time() - started)
+        return
+
     print("🔄 本番環境データ移行")
     print("💫 永続URL込みで完全移行\n")
 
     migrator = DataMigrator()
-    migrator.migrate_spots_to_cards()
+    migrator.migrate_spots_to_cards(prune=args.prune, force=args.force, batch=args.batch)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+検索クエリ重複度分析ツール
+キャッシュ済みのText Search結果（API呼び出しなし）から、クエリ間のplace_id集合の
+Jaccard重複度を計算し、ほぼ同じ結果を返すクエリをクラスタ化して剪定リストを出力する。
+出力（.cache/pruned_queries.json）は fetch_onsen_tokyo.py / fetch_kanto_spots.py が参照する。
+"""
+
+import argparse
+from typing import Dict, List, Set
+
+from fetch_onsen_tokyo import MultiCategoryDataCollector
+from utils.request_guard import peek_json
+from utils.query_pruning import (
+    DEFAULT_THRESHOLD,
+    jaccard,
+    prune_queries,
+    save_pruned_queries,
+    PRUNED_QUERIES_PATH,
+)
+
+REGION_LABEL = '関東'
+
+
+def _area_of(query: str, prefectures: List[str]) -> str:
+    """クエリが対象とする都県（地域全体クエリは地域名）"""
+    for token in query.split():
+        if token in prefectures:
+            return token
+    return REGION_LABEL
+
+
+def cached_place_ids(collector: MultiCategoryDataCollector, query: str):
+    """search_placesと同じパラメータでキャッシュを参照し、place_id集合を返す（未キャッシュはNone）"""
+    data = peek_json(collector.text_search_url, collector.text_search_params(query))
+    if data is None:
+        return None
+    if data.get('status') not in ('OK', 'ZERO_RESULTS'):
+        return None
+    return {r.get('place_id') for r in data.get('results', []) if r.get('place_id')}
+
+
+def analyze(threshold: float = DEFAULT_THRESHOLD, categories: List[str] = None) -> Dict:
+    collector = MultiCategoryDataCollector()
+    prefectures = collector.kanto_prefectures
+    targets = categories or list(collector.search_categories.keys())
+
+    plan: Dict[str, Dict[str, Dict]] = {}
+    for cat in targets:
+        cfg = collector.search_categories.get(cat)
+        if not cfg:
+            print(f"⚠️ 未知カテゴリ: {cat} スキップ")
+            continue
+
+        groups: Dict[str, List[str]] = {}
+        for q in cfg['queries']:
+            groups.setdefault(_area_of(q, prefectures), []).append(q)
+
+        print(f"\n🔍 {cat}")
+        plan[cat] = {}
+        for area, queries in groups.items():
+            query_sets: Dict[str, Set[str]] = {}
+            for q in queries:
+                ids = cached_place_ids(collector, q)
+                if ids is not None:
+                    query_sets[q] = ids
+
+            result = prune_queries(queries, query_sets, threshold)
+            plan[cat][area] = {
+                'keep': result['keep'],
+                'drop': result['drop'],
+                'measured': len(query_sets),
+                'total': len(queries),
+            }
+
+            print(f"  📍 {area}: 計測 {len(query_sets)}/{len(queries)} → 残す {len(result['keep'])} / 剪定 {len(result['drop'])}")
+            for members in result['clusters']:
+                rep = next(q for q in members if q not in result['drop'])
+                for q in members:
+                    if q == rep:
+                        continue
+                    sim = jaccard(query_sets[q], query_sets[rep])
+                    print(f"     ✂️  {q} ≒ {rep} (J={sim:.2f})")
+
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description='キャッシュ済み検索結果の重複度からクエリを剪定')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Jaccard閾値（デフォルト0.8）')
+    parser.add_argument('--category', action='append', help='対象カテゴリ（複数指定可、省略時は全カテゴリ）')
+    parser.add_argument('--output', default=PRUNED_QUERIES_PATH, help='剪定リストの出力先')
+    args = parser.parse_args()
+
+    plan = analyze(args.threshold, args.category)
+    save_pruned_queries(plan, args.threshold, args.output)
+
+    dropped = sum(len(area['drop']) for areas in plan.values() for area in areas.values())
+    print(f"\n💾 剪定リスト保存: {args.output} (剪定クエリ {dropped}件)")
+
+
+if __name__ == '__main__':
+    main()
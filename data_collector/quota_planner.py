@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全カテゴリ × 都県 クォータ配分・作業計画ツール
+MySQLの既存件数・目標件数・クエリ実績（.cache/query_yields.json）から、
+総API予算内で都県バランス目標に最少コールで近づく作業計画を出力する（API呼び出しなし）。
+"""
+
+import argparse
+import json
+
+from fetch_onsen_tokyo import MultiCategoryDataCollector
+from utils.quota_allocator import QuotaAllocator, YieldStats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='全カテゴリ×都県のクォータ配分と作業計画')
+    parser.add_argument('--max-calls', type=int, default=None, help='総検索コール数の上限')
+    parser.add_argument('--category', action='append', help='対象カテゴリ（複数指定可、省略時は全カテゴリ）')
+    parser.add_argument('--json', action='store_true', help='計画をJSONで出力')
+    args = parser.parse_args()
+
+    collector = MultiCategoryDataCollector()
+    categories = args.category or list(collector.search_categories.keys())
+    existing = {cat: collector._get_existing_counts(cat) for cat in categories}
+
+    plan = QuotaAllocator(
+        collector.kanto_prefectures,
+        {cat: collector.search_categories[cat]['target_count'] for cat in categories},
+        {cat: existing[cat][1] for cat in categories},
+        {cat: existing[cat][0] for cat in categories},
+        yields=YieldStats(),
+        budget=args.max_calls,
+    ).plan()
+
+    if args.json:
+        print(json.dumps(plan, ensure_ascii=False, indent=2))
+        return
+
+    print("🗺️ 作業計画（全カテゴリ×都県）")
+    print("=" * 60)
+    for cat in plan['category_order']:
+        total, pref_counts = existing[cat]
+        print(f"\n📂 {cat}: 既存 {total}件")
+        for pref in collector.kanto_prefectures:
+            quota = plan['quotas'][cat][pref]
+            if quota <= 0 and pref_counts.get(pref, 0) == 0:
+                continue
+            print(f"  • {pref}: 既存 {pref_counts.get(pref, 0):3d} / 追加 {quota:3d} "
+                  f"→ 見込み {plan['planned'][cat][pref]:3d} (コール {plan['calls'][cat][pref]}回, "
+                  f"不足見込み {plan['shortfall'][cat][pref]})")
+
+    print("\n📋 実行順（先頭から着手）")
+    for i, item in enumerate(plan['order'], 1):
+        print(f"  {i:3d}. {item['category']} × {item['prefecture']}: {item['calls']}コール → +{item['expected']}件見込み")
+
+    total_short = sum(sum(v.values()) for v in plan['shortfall'].values())
+    budget = f" / 上限 {args.max_calls}回" if args.max_calls is not None else ""
+    print(f"\n📊 見込みコール {plan['budget_used']}回{budget}, 不足見込み {total_short}件")
+
+
+if __name__ == '__main__':
+    main()
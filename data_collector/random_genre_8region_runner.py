@@ -11,10 +11,10 @@
 import os
 import time
 import random
-import mysql.connector
 from dotenv import load_dotenv
 from typing import Dict, List, Optional
 from utils.request_guard import get_json, already_fetched_place, mark_fetched_place
+from utils.db_pool import get_connection, db_config
 
 # .env 読み込み
 load_dotenv()
@@ -28,13 +28,7 @@ class RandomGenre8RegionRunner:
         if not self.api_key:
             raise ValueError("Google API Key not set (GOOGLE_API_KEY/GOOGLE_PLACES_API_KEY/GOOGLE_MAPS_API_KEY)")
 
-        self.db_conf = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': 'swipe_app_production',
-            'charset': 'utf8mb4'
-        }
+        self.db_conf = db_config('swipe_app_production')
         if not self.db_conf['password']:
             raise ValueError('MYSQL_PASSWORD not set')
 
@@ -155,7 +149,7 @@ class RandomGenre8RegionRunner:
             return {}
 
     def _connect_db(self):
-        return mysql.connector.connect(**self.db_conf)
+        return get_connection(self.db_conf)
 
     def _save_card(self, card: Dict, reviews: List[str]) -> bool:
         """cardsテーブルへ保存（place_id重複スキップ + レビューコメント保存）
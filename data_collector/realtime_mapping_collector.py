@@ -8,19 +8,21 @@ Google Places APIからデータを取得し、即座に正確な地域マッピ
 import os
 import sys
 import requests
-import mysql.connector
 from mysql.connector import Error
 from dotenv import load_dotenv
 import json
 from typing import List, Dict, Optional
 import time
-import re
 from utils.request_guard import (
     get_json,
     already_fetched_place,
     mark_fetched_place,
     get_photo_direct_url,
 )
+from utils.place_id_index import PlaceIdIndex, open_index
+from utils.db_pool import get_connection, db_config
+from utils.category_matcher import CategoryMatcher
+from utils.region_resolver import address_prefecture, full_name, resolver
 
 # .envファイルを読み込み
 load_dotenv()
@@ -29,39 +31,15 @@ class RealtimeMappingCollector:
     def __init__(self):
         """初期化"""
         self.google_api_key = os.getenv('GOOGLE_API_KEY')
-        self.mysql_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': 'swipe_app_production',
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config('swipe_app_production')
 
         # API設定
         self.places_api_base = "https://maps.googleapis.com/maps/api/place"
         self.text_search_url = f"{self.places_api_base}/textsearch/json"
         self.place_details_url = f"{self.places_api_base}/details/json"
 
-        # 都道府県→地域マッピング（日本語版）
-        self.prefecture_to_region = {
-            '北海道': '北海道',
-            '青森県': '東北', '岩手県': '東北', '宮城県': '東北',
-            '秋田県': '東北', '山形県': '東北', '福島県': '東北',
-            '東京都': '関東', '茨城県': '関東', '栃木県': '関東',
-            '群馬県': '関東', '埼玉県': '関東', '千葉県': '関東', '神奈川県': '関東',
-            '新潟県': '中部', '富山県': '中部', '石川県': '中部', '福井県': '中部',
-            '山梨県': '中部', '長野県': '中部', '岐阜県': '中部',
-            '静岡県': '中部', '愛知県': '中部',
-            '京都府': '関西', '大阪府': '関西', '三重県': '関西',
-            '滋賀県': '関西', '兵庫県': '関西', '奈良県': '関西', '和歌山県': '関西',
-            '鳥取県': '中国', '島根県': '中国', '岡山県': '中国',
-            '広島県': '中国', '山口県': '中国',
-            '徳島県': '中国', '香川県': '中国',
-            '愛媛県': '中国', '高知県': '中国',
-            '福岡県': '九州', '佐賀県': '九州', '長崎県': '九州',
-            '大分県': '九州', '熊本県': '九州', '宮崎県': '九州',
-            '鹿児島県': '九州', '沖縄県': '九州'
-        }
+        # 都道府県→地域（utils/region_resolver.py の ja7 区分）
+        self.region_resolver = resolver('ja7')
 
         # 新規カテゴリ設定（エンターテイメント系から開始）
         self.search_categories = {
@@ -89,33 +67,18 @@ class RealtimeMappingCollector:
             }
         }
 
-    def extract_prefecture_from_address(self, address: str) -> Optional[str]:
-        """住所から都道府県を抽出"""
-        if not address:
-            return None
-
-        # パターン1: 日本、〒XXX-XXXX 都道府県
-        pattern1 = r'日本、〒[0-9]{3}-[0-9]{4}\s+([^市区町村]+?[県都府])'
-        match1 = re.search(pattern1, address)
-        if match1:
-            return match1.group(1)
+        # カテゴリ判定（名前・周辺住所のキーワード、除外タイプを事前にまとめたもの）
+        self.category_matcher = CategoryMatcher(self.search_categories, relaxations={}, fields=('name', 'vicinity'))
 
-        # パターン2: 都道府県を直接検索（最長マッチ）
-        found_prefectures = []
-        for prefecture in self.prefecture_to_region.keys():
-            if prefecture in address:
-                found_prefectures.append(prefecture)
-
-        if found_prefectures:
-            return max(found_prefectures, key=len)
-
-        return None
+    def extract_prefecture_from_address(self, address: str) -> Optional[str]:
+        """住所から都道府県を抽出（utils/region_resolver.py）"""
+        return full_name(address_prefecture(address))
 
     def get_region_from_address(self, address: str) -> str:
         """住所から地域を判定（取得時マッピング）"""
         prefecture = self.extract_prefecture_from_address(address)
         if prefecture:
-            region = self.prefecture_to_region.get(prefecture)
+            region = self.region_resolver.region_of(prefecture)
             if region:
                 print(f"    🎯 取得時マッピング: {prefecture} → {region}")
                 return region
@@ -126,7 +89,7 @@ class RealtimeMappingCollector:
     def _setup_mysql_connection(self):
         """MySQL接続をセットアップ"""
         try:
-            connection = mysql.connector.connect(**self.mysql_config)
+            connection = get_connection(self.mysql_config)
             if connection.is_connected():
                 print(f"MySQLに接続しました: {self.mysql_config['database']}")
                 return connection
@@ -134,19 +97,12 @@ class RealtimeMappingCollector:
             print(f"MySQL接続エラー: {e}")
             return None
 
-    def _get_existing_place_ids(self, connection, genre: str = None) -> set:
-        """既存のgoogle_place_idを取得"""
-        cursor = connection.cursor()
+    def _get_existing_place_ids(self, connection, genre: str = None) -> PlaceIdIndex:
+        """既存のgoogle_place_idを取得（utils/place_id_index、前回以降の追加行のみ取得）"""
         if genre:
-            query = "SELECT google_place_id FROM cards WHERE genre = %s AND google_place_id IS NOT NULL"
-            cursor.execute(query, (genre,))
-        else:
-            query = "SELECT google_place_id FROM cards WHERE google_place_id IS NOT NULL"
-            cursor.execute(query)
-
-        existing_ids = {row[0] for row in cursor.fetchall()}
-        cursor.close()
-        return existing_ids
+            return open_index(connection, f"cards_google_{genre}", column='google_place_id',
+                              where="genre = %s", params=(genre,))
+        return open_index(connection, "cards_google", column='google_place_id')
 
     def _search_places(self, query: str, category: str) -> List[Dict]:
         """Google Places APIで場所を検索"""
@@ -189,32 +145,10 @@ class RealtimeMappingCollector:
         return all_results
 
     def _filter_results(self, results: List[Dict], category: str) -> List[Dict]:
-        """検索結果をフィルタリング"""
+        """検索結果をフィルタリング（キーワードに一致し、除外タイプでないもの）"""
         if category not in self.search_categories:
             return results
-
-        category_config = self.search_categories[category]
-        keywords = category_config.get('keywords', [])
-        exclude_types = category_config.get('exclude_types', [])
-
-        filtered = []
-        for place in results:
-            # 除外タイプチェック
-            place_types = place.get('types', [])
-            if any(excluded in place_types for excluded in exclude_types):
-                continue
-
-            # キーワードチェック
-            name = place.get('name', '').lower()
-            vicinity = place.get('vicinity', '').lower()
-            address_text = f"{name} {vicinity}".lower()
-
-            has_keyword = any(keyword.lower() in address_text for keyword in keywords)
-
-            if has_keyword or not keywords:
-                filtered.append(place)
-
-        return filtered
+        return self.category_matcher.filter(results, category)
 
     def _get_place_details(self, place_id: str) -> Optional[Dict]:
         """場所の詳細情報を取得"""
@@ -8,8 +8,8 @@ import os
 import time
 import random
 import requests
-import mysql.connector
-import re
+from utils.db_pool import get_connection, db_config
+from utils.region_resolver import address_prefecture, full_name, resolver
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
@@ -23,62 +23,18 @@ class RealtimeMappingDemo:
             raise ValueError("GOOGLE_API_KEY が環境変数に設定されていません")
 
         # データベース接続設定
-        self.db_config = {
-            'host': os.getenv('MYSQL_HOST', 'localhost'),
-            'user': os.getenv('MYSQL_USER', 'Haruto'),
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': os.getenv('MYSQL_DATABASE', 'swipe_app_production'),
-            'charset': 'utf8mb4'
-        }
-
-        # 都道府県→地域マッピング（日本語）
-        self.prefecture_to_region = {
-            # 北海道
-            '北海道': '北海道',
-
-            # 東北
-            '青森県': '東北', '岩手県': '東北', '宮城県': '東北',
-            '秋田県': '東北', '山形県': '東北', '福島県': '東北',
-
-            # 関東
-            '茨城県': '関東', '栃木県': '関東', '群馬県': '関東',
-            '埼玉県': '関東', '千葉県': '関東', '東京都': '関東', '神奈川県': '関東',
-
-            # 中部
-            '新潟県': '中部', '富山県': '中部', '石川県': '中部', '福井県': '中部',
-            '山梨県': '中部', '長野県': '中部', '岐阜県': '中部', '静岡県': '中部', '愛知県': '中部',
-
-            # 関西
-            '三重県': '関西', '滋賀県': '関西', '京都府': '関西',
-            '大阪府': '関西', '兵庫県': '関西', '奈良県': '関西', '和歌山県': '関西',
+        self.db_config = db_config(os.getenv('MYSQL_DATABASE', 'swipe_app_production'))
 
-            # 中国・四国
-            '鳥取県': '中国', '島根県': '中国', '岡山県': '中国', '広島県': '中国', '山口県': '中国',
-            '徳島県': '四国', '香川県': '四国', '愛媛県': '四国', '高知県': '四国',
-
-            # 九州・沖縄
-            '福岡県': '九州', '佐賀県': '九州', '長崎県': '九州', '熊本県': '九州',
-            '大分県': '九州', '宮崎県': '九州', '鹿児島県': '九州', '沖縄県': '九州'
-        }
+        # 都道府県→地域（utils/region_resolver.py の ja8 区分）
+        self.region_resolver = resolver('ja8')
 
     def extract_prefecture_from_address(self, address: str) -> Optional[str]:
-        """アドレスから都道府県を抽出"""
-        if not address:
-            return None
-
-        # Google Places APIの標準フォーマット: "日本、〒XXX-XXXX 都道府県..."
-        prefecture_pattern = r'(北海道|[^\s]+県|[^\s]+府|[^\s]+都)'
-
-        matches = re.findall(prefecture_pattern, address)
-        for match in matches:
-            if match in self.prefecture_to_region:
-                return match
-
-        return None
+        """アドレスから都道府県を抽出（utils/region_resolver.py）"""
+        return full_name(address_prefecture(address))
 
     def get_region_from_prefecture(self, prefecture: str) -> str:
         """都道府県から地域を取得"""
-        return self.prefecture_to_region.get(prefecture, '関東')  # デフォルトは関東
+        return self.region_resolver.region_of(prefecture) or '関東'  # デフォルトは関東
 
     def search_entertainment_venues(self, query: str, location: str, limit: int = 5) -> List[Dict]:
         """エンターテイメント施設を検索（リアルタイム地域マッピング付き）"""
@@ -138,7 +94,7 @@ class RealtimeMappingDemo:
     def save_to_database(self, place_data: Dict, category: str) -> bool:
         """データベースに保存（リアルタイム地域マッピング済み）"""
         try:
-            connection = mysql.connector.connect(**self.db_config)
+            connection = get_connection(self.db_config)
             cursor = connection.cursor()
 
             # 重複チェック
@@ -2,91 +2,159 @@
 """
 全国リラックスカテゴリデータ収集統括スクリプト
 全地域のリラックスカテゴリ（温泉・公園・サウナ・カフェ・散歩コース）を一括収集
+- 各地域の collector.run_collection() を1プロセス内のスレッドで並行実行
+- レート制限（MAX_QPS / MAX_CONCURRENCY）とAPIキャッシュは utils.request_guard をプロセス全体で共有
+- 地域ごとにログへ接頭辞を付け、定期的に進捗を表示。1地域の失敗は他地域に影響しない
 """
 
 import os
 import sys
-import subprocess
 import time
+import argparse
+import importlib
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
-def run_region_collector(script_name, region_name):
-    """指定した地域のデータ収集スクリプトを実行"""
-    print(f"\n{'='*50}")
-    print(f"{region_name}のリラックスカテゴリデータ収集を開始")
-    print(f"実行時刻: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"{'='*50}")
-
+from utils.api_budget import BudgetExceeded, get_guard
+from utils.db_pool import format_pool_stats, set_pool_size
+
+# 収集する地域（モジュール, クラス, 表示名）
+REGIONS = [
+    ('fetch_hokkaido_relax', 'HokkaidoRelaxDataCollector', '北海道'),
+    ('fetch_tohoku_relax', 'TohokuRelaxDataCollector', '東北'),
+    ('fetch_kanto_relax', 'KantoRelaxDataCollector', '関東'),
+    ('fetch_chubu_relax', 'ChubuRelaxDataCollector', '中部'),
+    ('fetch_kansai_relax', 'KansaiRelaxDataCollector', '関西'),
+    ('fetch_chugoku_shikoku_relax', 'ChugokuShikokuRelaxDataCollector', '中国・四国'),
+    ('fetch_kyushu_okinawa_relax', 'KyushuOkinawaRelaxDataCollector', '九州・沖縄'),
+]
+
+PROGRESS_INTERVAL = float(os.getenv('ORCHESTRATOR_PROGRESS_SEC', '60'))
+
+
+class RegionLog:
+    """スレッドごとに地域名の接頭辞を付けて出力する stdout ラッパー"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.last_line = {}
+        self.line_count = {}
+
+    def bind(self, label):
+        self.local.label = label
+        self.local.buf = ''
+
+    def write(self, text):
+        label = getattr(self.local, 'label', None)
+        if not label:
+            with self.lock:
+                return self.stream.write(text)
+        *lines, self.local.buf = (self.local.buf + text).split('\n')
+        with self.lock:
+            for line in lines:
+                self.stream.write(f"[{label}] {line}\n")
+                if line.strip():
+                    self.last_line[label] = line.strip()
+                    self.line_count[label] = self.line_count.get(label, 0) + 1
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+STATUS_LABELS = {'ok': '完了', 'budget': '予算到達', 'failed': '失敗'}
+
+
+def run_region(log, states, module_name, class_name, region_name, category=None):
+    """1地域分の収集（スレッド内で実行）。例外は呼び出し側へ返さず結果として返す"""
+    log.bind(region_name)
+    states[region_name] = '実行中'
+    started = time.time()
     try:
-        result = subprocess.run([
-            'python3', script_name
-        ], capture_output=True, text=True, timeout=3600)  # 1時間でタイムアウト
-
-        if result.returncode == 0:
-            print(f"✅ {region_name}の収集が正常に完了しました")
-            print("標準出力:")
-            print(result.stdout)
-        else:
-            print(f"❌ {region_name}の収集でエラーが発生しました")
-            print("標準エラー:")
-            print(result.stderr)
-
-    except subprocess.TimeoutExpired:
-        print(f"⏰ {region_name}の収集がタイムアウトしました")
+        module = importlib.import_module(module_name)
+        collector = getattr(module, class_name)()
+        collector.run_collection(category)
+        status, error = 'ok', None
+    except BudgetExceeded as e:
+        status, error = 'budget', str(e)
+        print(f"🛑 {e}")
     except Exception as e:
-        print(f"🚫 {region_name}の収集で例外が発生しました: {e}")
+        status, error = 'failed', f"{type(e).__name__}: {e}"
+        print(f"🚫 収集で例外が発生しました: {error}")
+        traceback.print_exc(file=sys.stdout)
+    states[region_name] = STATUS_LABELS[status]
+    return {'region': region_name, 'status': status, 'error': error, 'elapsed': time.time() - started}
+
+
+def report_progress(log, states, stop):
+    """実行中の地域の直近ログを定期表示"""
+    while not stop.wait(PROGRESS_INTERVAL):
+        with log.lock:
+            log.stream.write(f"\n📊 進捗 {datetime.now().strftime('%H:%M:%S')} | {get_guard().summary()}\n")
+            log.stream.write(f"  {format_pool_stats()}\n")
+            for name, state in states.items():
+                last = log.last_line.get(name, '')[:60]
+                log.stream.write(f"  • {name}: {state} ({log.line_count.get(name, 0)}行) {last}\n")
+            log.stream.flush()
+
 
 def main():
     """メイン関数"""
+    parser = argparse.ArgumentParser(description='全国リラックスカテゴリデータ収集（地域並行）')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('ORCHESTRATOR_WORKERS', str(len(REGIONS)))),
+                        help='同時実行する地域数（1で直列）')
+    parser.add_argument('--region', action='append', help='対象地域の表示名（複数指定可、省略時は全地域）')
+    parser.add_argument('--category', default=None, help='対象カテゴリ（省略時は全カテゴリ）')
+    args = parser.parse_args()
+
     print("🎯 全国リラックスカテゴリデータ収集を開始します")
     print(f"開始時刻: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
-    # 収集する地域とスクリプトのマッピング
-    regions = [
-        ('fetch_hokkaido_relax.py', '北海道'),
-        ('fetch_tohoku_relax.py', '東北'),
-        ('fetch_kanto_relax.py', '関東'),
-        ('fetch_chubu_relax.py', '中部'),
-        ('fetch_kansai_relax.py', '関西'),
-        ('fetch_chugoku_shikoku_relax.py', '中国・四国'),
-        ('fetch_kyushu_okinawa_relax.py', '九州・沖縄')
-    ]
-
-    total_regions = len(regions)
-    completed_regions = 0
-    failed_regions = []
-
-    for script_name, region_name in regions:
-        # スクリプトファイルの存在確認
-        if not os.path.exists(script_name):
-            print(f"⚠️  スクリプトファイルが見つかりません: {script_name}")
-            failed_regions.append(region_name)
-            continue
-
-        # 地域別データ収集実行
-        run_region_collector(script_name, region_name)
-        completed_regions += 1
-
-        # 進捗表示
-        progress = (completed_regions / total_regions) * 100
-        print(f"\n📊 進捗: {completed_regions}/{total_regions} 地域完了 ({progress:.1f}%)")
-
-        # 次の地域まで待機（APIレート制限対策）
-        if completed_regions < total_regions:
-            wait_time = 120  # 2分間待機
-            print(f"⏳ 次の地域まで{wait_time}秒待機します...")
-            time.sleep(wait_time)
+    regions = [r for r in REGIONS if not args.region or r[2] in args.region]
+    # 各地域が収集中ずっと1接続を保持するため、同時実行数より少し大きいプールにする
+    set_pool_size(max(int(os.getenv('MYSQL_POOL_SIZE', '10')), args.workers + 3))
+    states = {name: '待機中' for _, _, name in regions}
+    results = []
+
+    log = RegionLog(sys.stdout)
+    sys.stdout = log
+    stop = threading.Event()
+    monitor = threading.Thread(target=report_progress, args=(log, states, stop), daemon=True)
+    monitor.start()
+    started = time.time()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            futures = {}
+            for module_name, class_name, region_name in regions:
+                futures[pool.submit(run_region, log, states, module_name, class_name, region_name,
+                                    args.category)] = region_name
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                mark = '✅' if result['status'] == 'ok' else '❌'
+                print(f"{mark} {result['region']}: {states[result['region']]} ({result['elapsed'] / 60:.1f}分) "
+                      f"— {len(results)}/{len(regions)} 地域終了")
+    finally:
+        stop.set()
+        sys.stdout = log.stream
 
     # 最終結果
+    failed = [r for r in results if r['status'] != 'ok']
     print(f"\n{'='*60}")
     print("🎉 全国リラックスカテゴリデータ収集が完了しました")
-    print(f"完了時刻: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"📈 成功: {completed_regions}地域")
-
-    if failed_regions:
-        print(f"❌ 失敗: {len(failed_regions)}地域")
-        print(f"失敗地域: {', '.join(failed_regions)}")
-
+    print(f"完了時刻: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} (所要 {(time.time() - started) / 60:.1f}分)")
+    print(f"📈 成功: {len(results) - len(failed)}地域")
+    if failed:
+        print(f"❌ 失敗: {len(failed)}地域")
+        for r in failed:
+            print(f"  • {r['region']}: {r['error']}")
+    print(get_guard().summary())
+    print(format_pool_stats())
     print(f"{'='*60}")
 
     # 収集目標の確認
@@ -98,7 +166,8 @@ def main():
     print("- カフェ: 20件")
     print("- 散歩コース: 20件")
     print("地域別合計: 100件")
-    print(f"全国合計目標: {100 * 7}件")
+    print(f"全国合計目標: {100 * len(REGIONS)}件")
+
 
 if __name__ == "__main__":
     main()
@@ -12,7 +12,7 @@ import hashlib
 import time
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-import mysql.connector
+from utils.db_pool import get_connection
 
 load_dotenv()
 
@@ -52,13 +52,7 @@ class SmartImageManager:
     def get_spot_image_url(self, spot_id, size=400):
         """スポットIDから画像URL取得"""
         try:
-            connection = mysql.connector.connect(
-                host='localhost',
-                user='Haruto',
-                password=os.getenv('MYSQL_PASSWORD'),
-                database='swipe_app_development',
-                charset='utf8mb4'
-            )
+            connection = get_connection(database='swipe_app_development')
 
             cursor = connection.cursor()
             cursor.execute("SELECT photos FROM spots WHERE id = %s", (spot_id,))
@@ -91,13 +85,7 @@ def test_smart_system():
     print("🧠 スマート画像管理システムテスト\n")
 
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='Haruto',
-            password=os.getenv('MYSQL_PASSWORD'),
-            database='swipe_app_development',
-            charset='utf8mb4'
-        )
+        connection = get_connection(database='swipe_app_development')
 
         cursor = connection.cursor()
         cursor.execute("SELECT id, name, region FROM spots WHERE photos IS NOT NULL LIMIT 3")
@@ -4,10 +4,9 @@
 永続化されたURLがAPIキーなしで正常に動作するかテスト
 """
 
-import os
 import json
 import requests
-import mysql.connector
+from utils.db_pool import get_connection, db_config
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,18 +15,12 @@ class CommercialReadinessTest:
     """商業化準備完了テスト"""
 
     def __init__(self):
-        self.mysql_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': 'swipe_app_development',
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config('swipe_app_development')
 
     def test_api_independence(self):
         """APIキー依存なしでの画像アクセステスト"""
         try:
-            connection = mysql.connector.connect(**self.mysql_config)
+            connection = get_connection(self.mysql_config)
             cursor = connection.cursor()
 
             print("🚀 商業化準備完了テスト開始")
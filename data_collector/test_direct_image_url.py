@@ -9,7 +9,7 @@ import os
 import json
 import requests
 from dotenv import load_dotenv
-import mysql.connector
+from utils.db_pool import get_connection
 
 load_dotenv()
 
@@ -62,13 +62,7 @@ def get_actual_image_url(photo_reference, api_key):
 def test_direct_url_extraction():
     """実際のURL抽出テスト"""
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='Haruto',
-            password=os.getenv('MYSQL_PASSWORD'),
-            database='swipe_app_development',
-            charset='utf8mb4'
-        )
+        connection = get_connection(database='swipe_app_development')
 
         cursor = connection.cursor()
         api_key = os.getenv('GOOGLE_API_KEY')
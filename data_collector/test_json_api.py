@@ -4,9 +4,8 @@
 データベースからカード情報を取得してJSON形式で出力
 """
 
-import os
-import mysql.connector
 from mysql.connector import Error
+from utils.db_pool import get_connection, db_config
 from dotenv import load_dotenv
 import json
 from typing import List, Dict, Optional
@@ -18,18 +17,12 @@ load_dotenv()
 class CardJsonGenerator:
     def __init__(self):
         """初期化"""
-        self.mysql_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': 'swipe_app_development',
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config('swipe_app_development')
 
     def connect_database(self):
         """データベース接続"""
         try:
-            connection = mysql.connector.connect(**self.mysql_config)
+            connection = get_connection(self.mysql_config)
             if connection.is_connected():
                 return connection
         except Error as e:
@@ -8,7 +8,7 @@ import os
 import json
 import requests
 from dotenv import load_dotenv
-import mysql.connector
+from utils.db_pool import get_connection
 
 load_dotenv()
 
@@ -22,13 +22,7 @@ def test_photo_urls():
 
     try:
         # データベース接続
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='Haruto',
-            password=os.getenv('MYSQL_PASSWORD'),
-            database='swipe_app_development',
-            charset='utf8mb4'
-        )
+        connection = get_connection(database='swipe_app_development')
 
         cursor = connection.cursor()
 
@@ -8,13 +8,13 @@
 import os
 import sys
 import requests
-import mysql.connector
 from mysql.connector import Error
+from utils.db_pool import get_connection, db_config
+from utils.region_resolver import address_prefecture, full_name, resolver
 from dotenv import load_dotenv
 import json
 from typing import List, Dict, Optional
 import time
-import re
 
 # .envファイルを読み込み
 load_dotenv()
@@ -23,13 +23,7 @@ class GameEntertainmentCollector:
     def __init__(self):
         """初期化"""
         self.google_api_key = os.getenv('GOOGLE_API_KEY')
-        self.mysql_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': 'swipe_app_production',
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config('swipe_app_production')
 
         # API設定
         self.places_api_base = "https://maps.googleapis.com/maps/api/place"
@@ -37,41 +31,8 @@ class GameEntertainmentCollector:
         self.place_details_url = f"{self.places_api_base}/details/json"
 
         # 地域マッピング（取得時使用）
-        self.prefecture_to_region = {
-            # 北海道地方
-            '北海道': '北海道',
-
-            # 東北地方
-            '青森県': '東北', '岩手県': '東北', '宮城県': '東北',
-            '秋田県': '東北', '山形県': '東北', '福島県': '東北',
-
-            # 関東地方
-            '東京都': '関東', '茨城県': '関東', '栃木県': '関東',
-            '群馬県': '関東', '埼玉県': '関東', '千葉県': '関東', '神奈川県': '関東',
-
-            # 中部地方
-            '新潟県': '中部', '富山県': '中部', '石川県': '中部', '福井県': '中部',
-            '山梨県': '中部', '長野県': '中部', '岐阜県': '中部',
-            '静岡県': '中部', '愛知県': '中部',
-
-            # 関西地方
-            '京都府': '関西', '大阪府': '関西', '三重県': '関西',
-            '滋賀県': '関西', '兵庫県': '関西', '奈良県': '関西', '和歌山県': '関西',
-            '京都': '関西',  # 京都の省略形対応
-
-            # 中国地方
-            '鳥取県': '中国', '島根県': '中国', '岡山県': '中国',
-            '広島県': '中国', '山口県': '中国',
-
-            # 四国地方 → 中国地方に統合
-            '徳島県': '中国', '香川県': '中国',
-            '愛媛県': '中国', '高知県': '中国',
-
-            # 九州地方
-            '福岡県': '九州', '佐賀県': '九州', '長崎県': '九州',
-            '大分県': '九州', '熊本県': '九州', '宮崎県': '九州',
-            '鹿児島県': '九州', '沖縄県': '九州'
-        }
+        # 都道府県→地域（utils/region_resolver.py の ja7 区分）
+        self.region_resolver = resolver('ja7')
 
         # 検索対象都市（各地域から代表都市）
         self.target_cities = {
@@ -97,39 +58,14 @@ class GameEntertainmentCollector:
         }
 
     def extract_prefecture_from_address(self, address):
-        """住所から都道府県を抽出（取得時マッピング用）"""
-        if not address:
-            return None
-
-        # パターン1: 日本、〒XXX-XXXX 都道府県
-        pattern1 = r'日本、〒[0-9]{3}-[0-9]{4}\s+([^市区町村]+?[県都府])'
-        match1 = re.search(pattern1, address)
-        if match1:
-            return match1.group(1)
-
-        # パターン2: 日本、都道府県（郵便番号なし）
-        pattern2 = r'日本、([^市区町村]+?[県都府])'
-        match2 = re.search(pattern2, address)
-        if match2:
-            return match2.group(1)
-
-        # パターン3: 都道府県を直接検索（最長マッチ）
-        found_prefectures = []
-        for prefecture in self.prefecture_to_region.keys():
-            if prefecture in address:
-                found_prefectures.append(prefecture)
-
-        # 最長の県名を返す
-        if found_prefectures:
-            return max(found_prefectures, key=len)
-
-        return None
+        """住所から都道府県を抽出（取得時マッピング用）（utils/region_resolver.py）"""
+        return full_name(address_prefecture(address))
 
     def get_region_from_address(self, address):
         """住所から地域を判定（取得時マッピング）"""
         prefecture = self.extract_prefecture_from_address(address)
         if prefecture:
-            return self.prefecture_to_region.get(prefecture, '不明')
+            return self.region_resolver.region_of(prefecture) or '不明'
         return '不明'
 
     def search_places(self, query: str, location: str = None) -> List[Dict]:
@@ -194,7 +130,7 @@ class GameEntertainmentCollector:
     def save_to_database(self, place_data: Dict, genre: str, region: str) -> Optional[int]:
         """データベースに保存（取得時マッピング済み）"""
         try:
-            connection = mysql.connector.connect(**self.mysql_config)
+            connection = get_connection(self.mysql_config)
             cursor = connection.cursor()
 
             # 重複チェック
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+utils/dedupe_index.py のテスト
+使い方（data_collector で実行）:
+  python -m pytest tests  または  python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.dedupe_index import DedupeIndex, split_branch  # noqa: E402
+
+# 新宿の同じ建物（約5m間隔）
+LAT, LNG = 35.69060, 139.70220
+NEAR = (35.69064, 139.70222)
+
+
+def place(place_id, name, lat=LAT, lng=LNG, address=''):
+    return {'place_id': place_id, 'name': name, 'formatted_address': address,
+            'geometry': {'location': {'lat': lat, 'lng': lng}}}
+
+
+class SplitBranchTest(unittest.TestCase):
+    def test_branch_is_split(self):
+        self.assertEqual(split_branch('ビッグエコー 新宿東口駅前店'), ('ビッグエコー', '新宿東口駅前店'))
+        self.assertEqual(split_branch('鳥貴族（新宿東口店）'), ('鳥貴族', '新宿東口店'))
+
+    def test_short_or_attached_branch_is_not_split(self):
+        self.assertEqual(split_branch('居酒屋 X店'), ('居酒屋x店', ''))
+        self.assertEqual(split_branch('魚民新宿東口駅前店'), ('魚民新宿東口駅前店', ''))
+        self.assertEqual(split_branch('本店'), ('本店', ''))
+
+
+class DedupeIndexTest(unittest.TestCase):
+    def test_same_brand_in_same_building_is_duplicate(self):
+        index = DedupeIndex.for_category('karaoke')
+        kept, dropped = index.dedupe([
+            place('a', 'ビッグエコー 新宿東口駅前店'),
+            place('b', 'ビッグエコー', *NEAR),
+        ])
+        self.assertEqual([p['place_id'] for p in kept], ['a'])
+        self.assertEqual(dropped, {'b': 'a'})
+
+    def test_generic_word_is_not_a_brand(self):
+        index = DedupeIndex.for_category('gourmet_alcohol')
+        kept, dropped = index.dedupe([
+            place('a', '焼肉 牛角店'),
+            place('b', '焼肉 一番店', *NEAR),
+        ])
+        self.assertEqual(len(kept), 2)
+        self.assertEqual(dropped, {})
+
+    def test_category_keyword_is_not_a_brand(self):
+        index = DedupeIndex.for_category('gourmet_alcohol', ['おでん屋'])
+        kept, dropped = index.dedupe([
+            place('a', 'おでん屋 たけ店'),
+            place('b', 'おでん屋 まつ店', *NEAR),
+            place('c', '居酒屋 はな店', *NEAR),
+            place('d', '居酒屋 ゆき店', *NEAR),
+        ])
+        self.assertEqual(len(kept), 4)
+        self.assertEqual(dropped, {})
+
+    def test_different_names_are_kept(self):
+        index = DedupeIndex.for_category('gourmet_alcohol')
+        kept, _ = index.dedupe([place('a', 'バー ルパン'), place('b', 'バー ガス灯', *NEAR)])
+        self.assertEqual(len(kept), 2)
+
+    def test_same_name_far_apart_is_kept(self):
+        index = DedupeIndex()
+        kept, _ = index.dedupe([
+            place('a', 'ビッグエコー 新宿東口駅前店'),
+            place('b', 'ビッグエコー 新宿東口駅前店', 35.70500, 139.70220),
+        ])
+        self.assertEqual(len(kept), 2)
+
+    def test_address_match_without_coordinates(self):
+        index = DedupeIndex()
+        index.add('card:1', 'とりあえず吾平', '日本、〒100-0001 東京都千代田区1')
+        self.assertEqual(index.find('とりあえず 吾平', '東京都千代田区1'), 'card:1')
+        self.assertIsNone(index.find('とりあえず 吾平', '東京都千代田区2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
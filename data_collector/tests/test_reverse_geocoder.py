@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+utils/reverse_geocoder.py のテスト（同梱の data/prefecture_grid.bin を使う）
+使い方（data_collector で実行）:
+  python -m pytest tests  または  python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.reverse_geocoder import GRID_PATH, PrefectureGrid, locate_prefecture, locate_prefectures  # noqa: E402
+
+# (期待する都道府県, 緯度, 経度, 地点)
+ISLANDS = [
+    ('東京', 33.109, 139.791, '八丈島'),
+    ('東京', 27.094, 142.192, '父島'),
+    ('長崎', 34.203, 129.288, '対馬 厳原'),
+    ('長崎', 34.654, 129.478, '対馬 比田勝'),
+    ('沖縄', 24.340, 124.160, '石垣島'),
+    ('新潟', 38.020, 138.370, '佐渡島'),
+    ('香川', 34.480, 134.230, '小豆島'),
+]
+BORDERS = [
+    ('京都', 34.993, 135.816, '山科駅'),
+    ('滋賀', 34.995, 135.853, '大津 逢坂'),
+    ('京都', 35.058, 135.800, '左京区 修学院'),
+    ('滋賀', 35.070, 135.841, '比叡山延暦寺'),
+    ('東京', 35.597, 139.667, '田園調布'),
+    ('神奈川', 35.576, 139.659, '武蔵小杉'),
+    ('大阪', 34.712, 135.452, '西淀川'),
+    ('兵庫', 34.718, 135.416, '尼崎'),
+]
+
+
+class PrefectureGridTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.grid = PrefectureGrid.load(GRID_PATH)
+
+    def test_grid_covers_all_prefectures(self):
+        self.assertEqual(len(self.grid.names) - 1, 47)
+
+    def test_islands(self):
+        for expected, lat, lng, label in ISLANDS:
+            with self.subTest(label):
+                self.assertEqual(self.grid.prefecture(lat, lng), expected)
+
+    def test_borders(self):
+        for expected, lat, lng, label in BORDERS:
+            with self.subTest(label):
+                self.assertEqual(self.grid.prefecture(lat, lng), expected)
+
+    def test_open_sea_is_none(self):
+        self.assertIsNone(self.grid.prefecture(30.0, 140.0))
+
+
+class LocatePrefectureTest(unittest.TestCase):
+    def test_locate_uses_grid(self):
+        points = ISLANDS + BORDERS
+        self.assertEqual([locate_prefecture(lat, lng) for _, lat, lng, _ in points],
+                         [expected for expected, _, _, _ in points])
+
+    def test_locate_many(self):
+        points = ISLANDS + BORDERS
+        lats = [lat for _, lat, _, _ in points] + [None]
+        lngs = [lng for _, _, lng, _ in points] + [None]
+        self.assertEqual(locate_prefectures(lats, lngs), [expected for expected, _, _, _ in points] + [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
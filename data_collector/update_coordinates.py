@@ -2,89 +2,52 @@
 """
 座標データ移行修正スクリプト
 既存のcardsテーブルに緯度・経度データを追加更新
+- 前回実行以降に変更された spots だけを読み、バッチ単位で cards を更新（utils/spot_sync.py の差分同期）
+使い方:
+  python update_coordinates.py [--reset] [--interval 300]
 """
 
-import os
-import mysql.connector
+import time
+import argparse
+from utils.db_pool import get_connection, db_config
+from utils.spot_sync import SpotCardSync, print_sync_result
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# 座標と、座標から決まる都道府県・地方コードのみ更新する
+COORDINATE_COLUMNS = ('latitude', 'longitude', 'prefecture', 'region_code')
+
 class CoordinateUpdater:
     """座標データ更新クラス"""
 
     def __init__(self):
-        self.mysql_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'charset': 'utf8mb4'
-        }
+        self.mysql_config = db_config()
 
-    def update_coordinates(self):
-        """spotsからcardsに座標データを更新"""
+    def update_coordinates(self, reset=False):
+        """spotsからcardsに座標データを更新（前回以降に変更された spots のみ。reset=True で全件）"""
 
-        dev_connection = None
         prod_connection = None
 
         try:
-            # 開発環境接続
-            dev_connection = mysql.connector.connect(
-                **self.mysql_config,
-                database='swipe_app_development'
-            )
-            dev_cursor = dev_connection.cursor()
-
-            # 本番環境接続
-            prod_connection = mysql.connector.connect(
-                **self.mysql_config,
-                database='swipe_app_production'
-            )
-            prod_cursor = prod_connection.cursor()
-
             print("🗺️  座標データ更新開始")
             print("📍 spots → cards 座標移行\n")
 
-            # 開発環境から座標データ取得
-            dev_cursor.execute("""
-                SELECT place_id, latitude, longitude, name
-                FROM spots
-                WHERE place_id IS NOT NULL
-                AND latitude IS NOT NULL
-                AND longitude IS NOT NULL
-                ORDER BY created_at ASC
-            """)
-
-            coordinates_data = dev_cursor.fetchall()
-            print(f"📊 座標データ取得: {len(coordinates_data)}件")
-
-            updated_count = 0
-
-            for place_id, latitude, longitude, name in coordinates_data:
-                # cardsテーブルで対応するレコードを更新
-                update_query = """
-                    UPDATE cards
-                    SET latitude = %s, longitude = %s
-                    WHERE place_id = %s
-                """
-
-                try:
-                    prod_cursor.execute(update_query, (latitude, longitude, place_id))
-                    if prod_cursor.rowcount > 0:
-                        updated_count += 1
-                        if updated_count % 10 == 0:
-                            print(f"   📈 進捗: {updated_count}/{len(coordinates_data)}件")
-                    else:
-                        print(f"   ⚠️  対応するcard未発見: {name}")
-
-                except Exception as e:
-                    print(f"   ❌ 更新エラー ({name}): {e}")
-
-            # コミット
-            prod_connection.commit()
+            sync = SpotCardSync(self.mysql_config, name="spots_coordinates", columns=COORDINATE_COLUMNS)
+            if reset:
+                sync.reset()
+            started = time.time()
+            stats = sync.run_once()
 
             print(f"\n🎉 座標データ更新完了!")
-            print(f"   ✅ 更新成功: {updated_count}/{len(coordinates_data)}件")
+            print_sync_result(sync.name, stats, time.time() - started)
+
+            # 本番環境接続
+            prod_connection = get_connection(
+                self.mysql_config,
+                database='swipe_app_production'
+            )
+            prod_cursor = prod_connection.cursor()
 
             # 更新結果確認
             prod_cursor.execute("SELECT COUNT(*) FROM cards WHERE latitude IS NOT NULL AND longitude IS NOT NULL")
@@ -119,19 +82,28 @@ class CoordinateUpdater:
                 prod_connection.rollback()
 
         finally:
-            if dev_connection:
-                dev_cursor.close()
-                dev_connection.close()
             if prod_connection:
                 prod_cursor.close()
                 prod_connection.close()
 
 def main():
+    parser = argparse.ArgumentParser(description='spots → cards 座標データ更新')
+    parser.add_argument('--reset', action='store_true', help='水位線を破棄して全件を更新')
+    parser.add_argument('--interval', type=float, default=None, help='指定秒ごとに差分更新を繰り返す')
+    args = parser.parse_args()
+
     print("🔧 座標データ移行修正")
     print("🎯 開発環境 → 本番環境\n")
 
+    if args.interval:
+        sync = SpotCardSync(db_config(), name="spots_coordinates", columns=COORDINATE_COLUMNS)
+        if args.reset:
+            sync.reset()
+        sync.run_forever(args.interval)
+        return
+
     updater = CoordinateUpdater()
-    updater.update_coordinates()
+    updater.update_coordinates(reset=args.reset)
 
 if __name__ == "__main__":
     main()
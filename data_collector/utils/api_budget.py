@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Google Places API の課金SKU別コスト管理
+- URLからSKU（Text Search / Nearby Search / Place Details / Place Photo）を判定
+- 実行中の実コール数・推定金額をSKU別に集計
+- API_BUDGET_USD（または set_budget）で上限を設定すると、超過前に BudgetExceeded を送出
+- 事前見積もり（dry-run）用に、キャッシュ参照のみで実コール数を数える CostEstimator を提供
+"""
+
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 1000リクエストあたりのUSD（環境変数で上書き可）
+PRICES_PER_1000 = {
+    'text_search': float(os.getenv('PRICE_TEXT_SEARCH', '32')),
+    'nearby_search': float(os.getenv('PRICE_NEARBY_SEARCH', '32')),
+    'details': float(os.getenv('PRICE_DETAILS', '17')),
+    'photo': float(os.getenv('PRICE_PHOTO', '7')),
+    'other': float(os.getenv('PRICE_OTHER', '5')),
+}
+
+SKU_LABELS = {
+    'text_search': 'Text Search',
+    'nearby_search': 'Nearby Search',
+    'details': 'Place Details',
+    'photo': 'Place Photo',
+    'other': 'その他',
+}
+
+
+def sku_for(url: str) -> str:
+    """リクエストURLから課金SKUを判定"""
+    if '/textsearch/' in url:
+        return 'text_search'
+    if '/nearbysearch/' in url:
+        return 'nearby_search'
+    if '/details/' in url:
+        return 'details'
+    if '/place/photo' in url:
+        return 'photo'
+    return 'other'
+
+
+def cost_of(counts: Dict[str, int]) -> float:
+    return sum(PRICES_PER_1000.get(sku, PRICES_PER_1000['other']) * n / 1000.0
+               for sku, n in counts.items())
+
+
+def format_counts(counts: Dict[str, int]) -> List[str]:
+    lines = []
+    for sku, n in counts.items():
+        if not n:
+            continue
+        usd = PRICES_PER_1000.get(sku, PRICES_PER_1000['other']) * n / 1000.0
+        lines.append(f"{SKU_LABELS.get(sku, sku)}: {n}回 (${usd:.2f})")
+    return lines
+
+
+class BudgetExceeded(BaseException):
+    """予算上限に到達した。
+    各コレクタは `except Exception` で個別エラーを握りつぶすため、KeyboardInterrupt と同様に
+    BaseException 派生としてトップレベルまで伝播させ、チェックポイントを残して停止させる。
+    """
+
+
+class BudgetGuard:
+    """実コールのSKU別集計と予算上限チェック（スレッドセーフ）"""
+
+    def __init__(self, limit_usd: Optional[float] = None):
+        self.limit_usd = limit_usd
+        self.counts: Dict[str, int] = {sku: 0 for sku in PRICES_PER_1000}
+        self._lock = threading.Lock()
+
+    @property
+    def spent_usd(self) -> float:
+        return cost_of(self.counts)
+
+    def charge(self, url: str):
+        """実コール直前に呼ぶ。上限を超える場合は BudgetExceeded"""
+        sku = sku_for(url)
+        price = PRICES_PER_1000.get(sku, PRICES_PER_1000['other']) / 1000.0
+        with self._lock:
+            if self.limit_usd is not None and self.spent_usd + price > self.limit_usd:
+                raise BudgetExceeded(
+                    f"API予算上限 ${self.limit_usd:.2f} に到達 (使用 ${self.spent_usd:.2f})"
+                )
+            self.counts[sku] = self.counts.get(sku, 0) + 1
+
+    def summary(self) -> str:
+        limit = f" / 上限 ${self.limit_usd:.2f}" if self.limit_usd is not None else ""
+        detail = ", ".join(format_counts(self.counts)) or "実コールなし"
+        return f"💰 API使用: ${self.spent_usd:.2f}{limit} ({detail})"
+
+
+_limit_env = os.getenv('API_BUDGET_USD')
+_guard = BudgetGuard(float(_limit_env) if _limit_env else None)
+
+
+def get_guard() -> BudgetGuard:
+    return _guard
+
+
+def set_budget(limit_usd: Optional[float]):
+    """実行中の予算上限（USD）を設定。Noneで無制限"""
+    _guard.limit_usd = limit_usd
+
+
+def charge(url: str):
+    _guard.charge(url)
+
+
+class CostEstimator:
+    """キャッシュのみを参照して、計画中のクエリが発生させる実コール数をSKU別に見積もる
+    - キャッシュ済みText Searchは実際の結果を使って下流のDetails/Photoを辿る
+    - 未キャッシュのText Searchは results_per_query 件の新規候補が得られるとみなす
+    - 未キャッシュのDetailsは photos_per_place 枚のPhotoが必要とみなす
+    """
+
+    def __init__(self, peek: Callable[[str, dict], Optional[dict]],
+                 results_per_query: Optional[int] = None):
+        self.peek = peek
+        self.results_per_query = results_per_query or int(os.getenv('ESTIMATE_RESULTS_PER_QUERY', '15'))
+        self.live: Dict[str, int] = {sku: 0 for sku in PRICES_PER_1000}
+        self.cached: Dict[str, int] = {sku: 0 for sku in PRICES_PER_1000}
+
+    def _count(self, url: str, hit: bool):
+        bucket = self.cached if hit else self.live
+        sku = sku_for(url)
+        bucket[sku] = bucket.get(sku, 0) + 1
+
+    def walk_group(self, target: int,
+                   searches: Iterable[Tuple[str, dict]],
+                   details: Callable[[str], Tuple[str, dict]],
+                   photo: Optional[Callable[[str], Tuple[str, dict]]] = None,
+                   photos_per_place: int = 0,
+                   skip_place: Optional[Callable[[str], bool]] = None,
+                   skipped_counts: bool = False,
+                   accept: Optional[Callable[[dict], bool]] = None) -> int:
+        """1グループ（地域×カテゴリ等）の見積もり。見込み収集件数を返す
+        skip_place: Details取得済みマーク等でAPIを呼ばずにスキップされるplace_idの判定
+        skipped_counts: スキップしたplace_idも収集件数に数えるか（コレクタの挙動に合わせる）
+        accept: 検索結果の事前フィルタ（地域外判定など、Detailsを呼ばずに捨てる結果）
+        """
+        seen = set()
+        collected = 0
+        for url, params in searches:
+            if collected >= target:
+                break
+            data = self.peek(url, params)
+            self._count(url, data is not None)
+            if data is None:
+                gain = min(self.results_per_query, target - collected)
+                collected += gain
+                self.live['details'] += gain
+                self.live['photo'] += gain * photos_per_place
+                continue
+            for result in data.get('results', []):
+                if collected >= target:
+                    break
+                pid = result.get('place_id')
+                if not pid or pid in seen:
+                    continue
+                seen.add(pid)
+                if accept and not accept(result):
+                    continue
+                if skip_place and skip_place(pid):
+                    if skipped_counts:
+                        collected += 1
+                    continue
+                d_url, d_params = details(pid)
+                detail = self.peek(d_url, d_params)
+                self._count(d_url, detail is not None)
+                collected += 1
+                if not photos_per_place or photo is None:
+                    continue
+                if detail is None:
+                    self.live['photo'] += photos_per_place
+                    continue
+                for ph in ((detail.get('result') or {}).get('photos') or [])[:photos_per_place]:
+                    ref = ph.get('photo_reference')
+                    if not ref:
+                        continue
+                    p_url, p_params = photo(ref)
+                    self._count(p_url, self.peek(p_url, p_params) is not None)
+        return collected
+
+    def report(self, title: str = "API見積もり") -> str:
+        lines = [f"🧮 {title}"]
+        for sku in PRICES_PER_1000:
+            live, hit = self.live.get(sku, 0), self.cached.get(sku, 0)
+            if not live and not hit:
+                continue
+            usd = PRICES_PER_1000[sku] * live / 1000.0
+            lines.append(f"  • {SKU_LABELS[sku]}: 実コール見込み {live}回 (${usd:.2f}) / キャッシュ {hit}回")
+        lines.append(f"  💰 合計見込み: ${cost_of(self.live):.2f}")
+        return "\n".join(lines)
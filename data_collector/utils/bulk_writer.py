@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+cards / review_comments / spots の一括書き込み
+- cards: 既存place_idを1クエリで確認 → 複数行 INSERT ... ON DUPLICATE KEY UPDATE（place_id の一意インデックス）
+  → 新規カードの id を place_id で1クエリ取得 → レビューを executemany でまとめて挿入
+- spots: 複数行 INSERT ... ON DUPLICATE KEY UPDATE
+- バッチがエラーになった場合のみ1行ずつ再実行し、不正な行だけをスキップする
+1バッチ（BULK_BATCH_SIZE env、デフォルト200件）あたりの往復は4回程度（従来はカードごとに 2+レビュー数 回）
+"""
+
+import os
+from typing import Dict, List, Sequence
+
+from utils.card_prefecture import prefecture_fields
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "200"))
+
+CARD_COLUMNS = (
+    'genre', 'title', 'rating', 'review_count', 'image_url', 'external_link', 'region',
+    'address', 'latitude', 'longitude', 'place_id', 'prefecture', 'region_code',
+)
+# 既存カードを更新する場合の対象列（update_existing=True）
+CARD_UPDATE_COLUMNS = ('rating', 'review_count', 'latitude', 'longitude')
+
+SPOT_COLUMNS = (
+    'place_id', 'name', 'category', 'address', 'latitude', 'longitude', 'rating',
+    'user_ratings_total', 'price_level', 'phone_number', 'website', 'opening_hours',
+    'photos', 'types', 'vicinity', 'plus_code', 'region',
+)
+SPOT_UPDATE_COLUMNS = ('name', 'address', 'rating', 'user_ratings_total', 'phone_number', 'website', 'opening_hours')
+
+REVIEW_MAX_LENGTH = 1000
+
+
+def _chunks(items: Sequence, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _placeholders(n: int) -> str:
+    return ','.join(['%s'] * n)
+
+
+def card_values(card: Dict) -> tuple:
+    """CARD_COLUMNS 順の値（prefecture 未設定なら住所・座標から判定）"""
+    pref, region_code = card.get('prefecture'), card.get('region_code')
+    if not pref:
+        pref, region_code = prefecture_fields(card.get('address'), card.get('latitude'), card.get('longitude'))
+    values = dict(card, prefecture=pref, region_code=region_code)
+    return tuple(values.get(col) for col in CARD_COLUMNS)
+
+
+def review_text(text: str) -> str:
+    # TEXT型だが実用的な長さに制限
+    if len(text) > REVIEW_MAX_LENGTH:
+        return text[:REVIEW_MAX_LENGTH - 3] + "..."
+    return text
+
+
+def _upsert_sql(table: str, columns: Sequence[str], update_columns: Sequence[str], rows: int,
+                timestamps: bool) -> str:
+    cols = list(columns) + (['created_at', 'updated_at'] if timestamps else [])
+    row_sql = f"({_placeholders(len(columns))}{', NOW(), NOW()' if timestamps else ''})"
+    if update_columns:
+        updates = ', '.join(f"{c} = VALUES({c})" for c in update_columns)
+        updates += ', updated_at = ' + ('NOW()' if timestamps else 'CURRENT_TIMESTAMP')
+    else:
+        updates = 'id = id'   # 既存行は変更しない
+    return (f"INSERT INTO {table} ({', '.join(cols)}) VALUES {', '.join([row_sql] * rows)} "
+            f"ON DUPLICATE KEY UPDATE {updates}")
+
+
+def _execute_rows(cursor, table: str, columns, update_columns, rows: List[tuple], timestamps: bool,
+                  label) -> List[tuple]:
+    """複数行で実行し、失敗したら1行ずつ再実行。書き込めた行を返す"""
+    try:
+        cursor.execute(_upsert_sql(table, columns, update_columns, len(rows), timestamps),
+                       [v for row in rows for v in row])
+        return rows
+    except Exception as e:
+        print(f"⚠️ 一括書き込みエラー（1件ずつ再試行）: {e}")
+    ok = []
+    sql = _upsert_sql(table, columns, update_columns, 1, timestamps)
+    for row in rows:
+        try:
+            cursor.execute(sql, row)
+            ok.append(row)
+        except Exception as e:
+            print(f"❌ 保存エラー: {e} - {label(row)}")
+    return ok
+
+
+def write_cards(connection, cards: List[Dict], batch_size: int = BULK_BATCH_SIZE,
+                update_existing: bool = False) -> Dict[str, object]:
+    """整形済みカード（format_place_data の戻り値）をまとめて保存
+    既存place_idのカードはスキップ（update_existing=True なら評価・件数・座標を更新）。
+    レビューは新規カードのみ挿入。commit は呼び出し側で行う
+    戻り値: {'inserted', 'duplicates', 'invalid', 'reviews', 'inserted_place_ids'}"""
+    result = {'inserted': 0, 'duplicates': 0, 'invalid': 0, 'reviews': 0, 'inserted_place_ids': []}
+    seen = set()
+    valid = []
+    for card in cards:
+        pid = card.get('place_id')
+        if not pid or pid in seen:
+            result['invalid' if not pid else 'duplicates'] += 1
+            continue
+        seen.add(pid)
+        valid.append(card)
+
+    cursor = connection.cursor()
+    try:
+        for batch in _chunks(valid, batch_size):
+            pids = [c['place_id'] for c in batch]
+            cursor.execute(f"SELECT place_id FROM cards WHERE place_id IN ({_placeholders(len(pids))})", pids)
+            existing = {pid for (pid,) in cursor.fetchall()}
+            result['duplicates'] += len(existing)
+
+            targets = batch if update_existing else [c for c in batch if c['place_id'] not in existing]
+            if not targets:
+                continue
+            written = _execute_rows(
+                cursor, 'cards', CARD_COLUMNS, CARD_UPDATE_COLUMNS if update_existing else (),
+                [card_values(c) for c in targets], True,
+                label=lambda row: f"{row[1]} ({row[10]})",
+            )
+            written_pids = {row[10] for row in written}
+            new_cards = [c for c in targets if c['place_id'] in written_pids and c['place_id'] not in existing]
+            if not new_cards:
+                continue
+
+            new_pids = [c['place_id'] for c in new_cards]
+            cursor.execute(f"SELECT id, place_id FROM cards WHERE place_id IN ({_placeholders(len(new_pids))})",
+                           new_pids)
+            card_ids = {pid: card_id for card_id, pid in cursor.fetchall()}
+            reviews = [
+                (review_text(review['text']), card_ids[c['place_id']])
+                for c in new_cards if c['place_id'] in card_ids
+                for review in c.get('reviews') or []
+                if review.get('text')
+            ]
+            if reviews:
+                cursor.executemany(
+                    "INSERT INTO review_comments (comment, card_id, created_at, updated_at) VALUES (%s, %s, NOW(), NOW())",
+                    reviews,
+                )
+            result['inserted'] += len(new_cards)
+            result['reviews'] += len(reviews)
+            result['inserted_place_ids'].extend(new_pids)
+    finally:
+        cursor.close()
+    return result
+
+
+def write_spots(connection, rows: List[tuple], batch_size: int = BULK_BATCH_SIZE) -> int:
+    """SPOT_COLUMNS 順のタプルを spots に upsert（同じplace_idは情報を更新）。書き込めた行数を返す
+    commit は呼び出し側で行う"""
+    cursor = connection.cursor()
+    saved = 0
+    try:
+        for batch in _chunks(rows, batch_size):
+            saved += len(_execute_rows(cursor, 'spots', SPOT_COLUMNS, SPOT_UPDATE_COLUMNS, list(batch), False,
+                                       label=lambda row: row[1]))
+    finally:
+        cursor.close()
+    return saved
+
+
+def print_card_result(result: Dict[str, object]):
+    print(f"\n📊 保存結果: {result['inserted']}件挿入, {result['duplicates'] + result['invalid']}件重複スキップ")
+    print(f"💬 レビュー保存結果: {result['reviews']}件挿入")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+cards.prefecture / cards.region_code の補完と都道府県別件数
+- 取り込み時に resolve_prefecture で判定して保存する（各collectorの save_to_database）
+- 未設定（NULL）の行は住所・座標から一括判定し、CASE式のUPDATEでまとめて更新
+- 判定できなかった行は空文字にして再判定しない
+- 件数は (genre, prefecture) インデックスを使う GROUP BY 1回で取得
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.prefecture_geo import region_code_of
+from utils.region_resolver import resolve_prefecture
+
+BACKFILL_BATCH = 1000
+
+
+def prefecture_fields(address: Optional[str], lat=None, lng=None) -> Tuple[Optional[str], Optional[str]]:
+    """INSERT 用の (prefecture, region_code)"""
+    pref = resolve_prefecture(address, lat, lng)
+    return pref, region_code_of(pref)
+
+
+def _update_batch(cursor, resolved: Iterable[Tuple[int, str, Optional[str]]]):
+    rows = list(resolved)
+    if not rows:
+        return
+    pref_case = " ".join("WHEN %s THEN %s" for _ in rows)
+    region_case = " ".join("WHEN %s THEN %s" for _ in rows)
+    args = []
+    for card_id, pref, _ in rows:
+        args.extend((card_id, pref))
+    for card_id, _, region in rows:
+        args.extend((card_id, region))
+    args.extend(card_id for card_id, _, _ in rows)
+    cursor.execute(
+        f"UPDATE cards SET prefecture = CASE id {pref_case} END, region_code = CASE id {region_case} END "
+        f"WHERE id IN ({','.join(['%s'] * len(rows))})",
+        args,
+    )
+
+
+def backfill_prefectures(connection, genre: Optional[str] = None, batch: int = BACKFILL_BATCH,
+                         recompute: bool = False) -> Dict[str, int]:
+    """prefecture 未設定の行を判定して更新（recompute=True なら全行を再判定）
+    戻り値: {'resolved': 判定できた件数, 'unresolved': 判定できず空文字にした件数}"""
+    stats = {'resolved': 0, 'unresolved': 0}
+    cursor = connection.cursor()
+    last_id = 0
+    where = "" if recompute else " AND prefecture IS NULL"
+    if genre:
+        where += " AND genre = %s"
+    try:
+        while True:
+            cursor.execute(
+                f"SELECT id, address, latitude, longitude FROM cards WHERE id > %s{where} ORDER BY id LIMIT %s",
+                (last_id,) + ((genre,) if genre else ()) + (batch,),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            resolved = []
+            for card_id, address, lat, lng in rows:
+                pref, region = prefecture_fields(address, lat, lng)
+                if pref:
+                    stats['resolved'] += 1
+                else:
+                    stats['unresolved'] += 1
+                resolved.append((card_id, pref or '', region))
+            _update_batch(cursor, resolved)
+            connection.commit()
+            last_id = rows[-1][0]
+    finally:
+        cursor.close()
+    return stats
+
+
+def prefecture_counts(connection, genre: str, prefectures: Optional[List[str]] = None) -> Dict[str, int]:
+    """genre の都道府県別件数（prefectures 指定時はその都道府県のみ）。未設定の行があれば先に補完する
+    prefectures 未指定時、判定できなかった行は '' キーに入る（合計 = 全キーの和）"""
+    backfill_prefectures(connection, genre)
+    cursor = connection.cursor()
+    try:
+        if prefectures:
+            cursor.execute(
+                "SELECT prefecture, COUNT(*) FROM cards WHERE genre = %s "
+                f"AND prefecture IN ({','.join(['%s'] * len(prefectures))}) GROUP BY prefecture",
+                (genre, *prefectures),
+            )
+        else:
+            cursor.execute("SELECT prefecture, COUNT(*) FROM cards WHERE genre = %s GROUP BY prefecture", (genre,))
+        counts: Dict[str, int] = {}
+        for pref, count in cursor.fetchall():
+            counts[pref or ''] = counts.get(pref or '', 0) + count
+        return counts
+    finally:
+        cursor.close()
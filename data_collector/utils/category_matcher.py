@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+検索結果のカテゴリ判定（filter_places_by_category / _filter_results で共用）
+- 全カテゴリのキーワードを1つの正規表現（utils/region_resolver.trie_pattern のトライ木）にまとめ、
+  名前を1回走査して「一致したキーワード → カテゴリのビット集合」の OR を取る
+  （先読みで全位置から照合するので、キーワード同士が重なっても部分一致の判定は従来の `k in name` と同じ）
+- exclude_types は types → 除外するカテゴリのビット集合 の辞書で、place の types ごとに1回引く
+- 1件の place について全カテゴリを同時に判定し、一致したカテゴリをすべて返す（match / classify）
+- 緩和条件（active_sauna の「名前にサウナ系の断片 かつ types に spa/gym 等」）は RELAXATIONS のデータで表す
+照合する文字列は小文字化した name（fields=('name', 'vicinity') なら空白区切りで連結）。キーワードも小文字化する
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from utils.region_resolver import trie_pattern
+
+# カテゴリ → 緩和条件の一覧。キーワードに一致しなくても name_any の断片が名前にあり、
+# types に types_any のいずれかがあれば一致とみなす
+RELAXATIONS: Dict[str, List[Dict[str, List[str]]]] = {
+    'active_sauna': [
+        {'name_any': ['サウナ', '整', 'ととの'], 'types_any': ['spa', 'gym', 'health', 'establishment']},
+    ],
+}
+
+
+def _compile(words: Iterable[str]) -> Optional[re.Pattern]:
+    words = sorted(set(words))
+    return re.compile('(?=(' + trie_pattern(words) + '))') if words else None
+
+
+def _or_all(masks: Iterable[int]) -> int:
+    result = 0
+    for mask in masks:
+        result |= mask
+    return result
+
+
+def _bits(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class CategoryMatcher:
+    """search_categories（カテゴリ → {'keywords', 'exclude_types', ...}）から生成する判定器"""
+
+    def __init__(self, categories: Dict[str, Dict], relaxations: Optional[Dict[str, List[Dict]]] = None,
+                 fields: Sequence[str] = ('name',), required_terms: Optional[Sequence[str]] = None):
+        self.categories = list(categories)
+        self.fields = tuple(fields)
+        self.bit = {category: 1 << i for i, category in enumerate(self.categories)}
+        self.all_mask = (1 << len(self.categories)) - 1
+        relaxations = RELAXATIONS if relaxations is None else relaxations
+
+        # キーワード → カテゴリのビット集合（キーワードが無いカテゴリは常に一致）
+        keyword_mask: Dict[str, int] = {}
+        self.no_keyword_mask = 0
+        self.exclude_mask: Dict[str, int] = {}
+        for category, config in categories.items():
+            bit = self.bit[category]
+            keywords = config.get('keywords') or []
+            if not keywords:
+                self.no_keyword_mask |= bit
+            for keyword in keywords:
+                keyword = keyword.lower()
+                keyword_mask[keyword] = keyword_mask.get(keyword, 0) | bit
+            for place_type in config.get('exclude_types') or []:
+                self.exclude_mask[place_type] = self.exclude_mask.get(place_type, 0) | bit
+
+        # 緩和条件は1条件1ビット（名前の断片・types の両方が立った条件のカテゴリが一致）
+        fragment_mask: Dict[str, int] = {}
+        self.relax_type_mask: Dict[str, int] = {}
+        self.rule_category: List[int] = []
+        for category, rules in relaxations.items():
+            if category not in self.bit:
+                continue
+            for rule in rules:
+                rule_bit = 1 << len(self.rule_category)
+                self.rule_category.append(self.bit[category])
+                for fragment in rule['name_any']:
+                    fragment = fragment.lower()
+                    fragment_mask[fragment] = fragment_mask.get(fragment, 0) | rule_bit
+                for place_type in rule['types_any']:
+                    self.relax_type_mask[place_type] = self.relax_type_mask.get(place_type, 0) | rule_bit
+
+        # 照合した語 → (カテゴリ, 緩和条件) のビット集合。先読みは各位置で最長の語に一致するため、
+        # その語の先頭部分になっている短い語のビットもまとめて持たせる
+        words = set(keyword_mask) | set(fragment_mask)
+        self.word_masks = {
+            word: (_or_all(keyword_mask.get(w, 0) for w in words if word.startswith(w)),
+                   _or_all(fragment_mask.get(w, 0) for w in words if word.startswith(w)))
+            for word in words
+        }
+        self.pattern = _compile(words)
+        self.required = _compile(term.lower() for term in required_terms or [])
+        # types → (除外するカテゴリ, 緩和条件) のビット集合（1回の辞書引きで両方）
+        self.type_masks = {place_type: (self.exclude_mask.get(place_type, 0), self.relax_type_mask.get(place_type, 0))
+                           for place_type in set(self.exclude_mask) | set(self.relax_type_mask)}
+
+    def text(self, place: Dict) -> str:
+        if len(self.fields) == 1:
+            return (place.get(self.fields[0]) or '').lower()
+        return ' '.join(place.get(field, '') or '' for field in self.fields).lower()
+
+    def mask(self, place: Dict) -> int:
+        """place が一致するカテゴリのビット集合"""
+        text = self.text(place)
+        if self.required is not None and not self.required.search(text):
+            return 0
+        keywords = self.no_keyword_mask
+        fragments = 0
+        if self.pattern is not None:
+            word_masks = self.word_masks
+            for word in self.pattern.findall(text):
+                kw, fr = word_masks[word]
+                keywords |= kw
+                fragments |= fr
+        excluded = relax_types = 0
+        type_masks = self.type_masks
+        for place_type in place.get('types') or ():
+            found = type_masks.get(place_type)
+            if found:
+                excluded |= found[0]
+                relax_types |= found[1]
+        rules = fragments & relax_types
+        if rules:
+            for rule in _bits(rules):
+                keywords |= self.rule_category[rule]
+        return keywords & ~excluded & self.all_mask
+
+    def match(self, place: Dict) -> List[str]:
+        """place が一致するカテゴリ（search_categories の順）"""
+        mask = self.mask(place)
+        return [self.categories[i] for i in _bits(mask)]
+
+    def matches(self, place: Dict, category: str) -> bool:
+        return bool(self.mask(place) & self.bit.get(category, 0))
+
+    def filter(self, places: Iterable[Dict], category: str) -> List[Dict]:
+        """category に一致する place（順序は元のまま）"""
+        bit = self.bit.get(category, 0)
+        return [place for place in places if self.mask(place) & bit]
+
+    def classify(self, places: Iterable[Dict]) -> Dict[str, List[Dict]]:
+        """全カテゴリについて一致する place を1回の走査で振り分け"""
+        out: Dict[str, List[Dict]] = {category: [] for category in self.categories}
+        for place in places:
+            for i in _bits(self.mask(place)):
+                out[self.categories[i]].append(place)
+        return out
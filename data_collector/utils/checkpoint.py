@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+長時間収集ジョブのチェックポイント
+- 実行単位ごとに .cache/checkpoints/<name>.json へ状態を保存
+- 一時ファイル + os.replace による原子的書き込み（途中で落ちても壊れない）
+- 正常終了時に clear() で削除。残っていれば次回起動時に再開する
+"""
+
+import os
+import json
+import time
+from typing import Any, Dict
+
+_BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+CHECKPOINT_DIR = os.path.join(_BASE_DIR, ".cache", "checkpoints")
+
+
+class RunCheckpoint:
+    """JSONで永続化される実行状態"""
+
+    def __init__(self, name: str, directory: str = CHECKPOINT_DIR, fresh: bool = False):
+        self.name = name
+        self.path = os.path.join(directory, f"{name}.json")
+        os.makedirs(directory, exist_ok=True)
+        if fresh:
+            self.clear()
+        self.state: Dict[str, Any] = self._load()
+        self.resumed = bool(self.state)
+
+    def _load(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                payload = json.load(f)
+            return payload.get('state', {})
+        except (OSError, ValueError):
+            print(f"⚠️ チェックポイント読込失敗（破棄して最初から実行）: {self.path}")
+            return {}
+
+    def save(self):
+        """現在の状態を原子的に書き出す"""
+        payload = {'name': self.name, 'saved_at': int(time.time()), 'state': self.state}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        """正常終了時に削除"""
+        self.state = {}
+        self.resumed = False
+        for p in (self.path, f"{self.path}.tmp"):
+            if os.path.exists(p):
+                os.remove(p)
+
+    def section(self, key: str, default: Dict[str, Any] = None) -> Dict[str, Any]:
+        """state内の辞書セクションを取得（無ければdefaultで作成）"""
+        if key not in self.state:
+            self.state[key] = default if default is not None else {}
+        return self.state[key]
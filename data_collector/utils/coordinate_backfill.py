@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+cards の緯度・経度の一括補完（座標が NULL の行）
+1. spots（place_id が一致する行）の座標と、request_guard のキャッシュに残っている Details 応答の座標を
+   一時テーブル coord_backfill に集める（spots 分は INSERT ... SELECT、キャッシュ分は executemany）
+2. UPDATE ... JOIN 1回で cards に反映
+3. それでも残った行だけ Details（fields=geometry）を並列に取得し、同様に反映
+   （QPS・並列数・予算は request_guard.get_json の制御に従う）
+Rails の backfill:coords_from_place_id（1件ずつ Details + sleep）の置き換え
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.request_guard import get_json, peek_many
+from utils.api_budget import BudgetExceeded
+
+DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+GEOMETRY_PARAMS = {'fields': 'geometry'}
+DETAILS_TTL = 60 * 60 * 24 * 30
+BACKFILL_WORKERS = int(os.getenv("MAX_CONCURRENCY", "3"))
+
+# 各collectorが get_json で Details を呼ぶ際のパラメータ（place_id / key 以外）。キャッシュキーの再現に使う
+CACHED_DETAILS_PARAMS = (
+    GEOMETRY_PARAMS,
+    # fetch_*_relax.py / fetch_onsen_tokyo.py 等
+    {'language': 'ja', 'fields': 'name,formatted_address,geometry,rating,user_ratings_total,price_level,'
+                                 'formatted_phone_number,website,opening_hours,photos,types,vicinity,plus_code'},
+    # realtime_mapping_collector.py
+    {'language': 'ja', 'fields': 'name,formatted_address,geometry,rating,user_ratings_total,price_level,'
+                                 'formatted_phone_number,website,opening_hours,photos,types,vicinity,plus_code,reviews'},
+    # collect_all_relax_categories.py
+    {'language': 'ja', 'reviews_sort': 'newest',
+     'fields': 'name,formatted_address,geometry,photos,rating,user_ratings_total,reviews,website,'
+               'formatted_phone_number,opening_hours'},
+    # mega_relax_collector.py
+    {'language': 'ja', 'fields': 'name,formatted_address,geometry,photos,rating,types,website,'
+                                 'formatted_phone_number,opening_hours,reviews'},
+    # random_genre_8region_runner.py
+    {'language': 'ja', 'fields': 'name,formatted_address,rating,user_ratings_total,photos,reviews,'
+                                 'formatted_phone_number,website,opening_hours,geometry'},
+)
+
+_MISSING = "(c.latitude IS NULL OR c.longitude IS NULL) AND c.place_id IS NOT NULL AND c.place_id <> ''"
+
+
+def _api_keys() -> List[str]:
+    keys = []
+    for name in ('GOOGLE_API_KEY', 'GOOGLE_PLACES_API_KEY', 'GOOGLE_MAPS_API_KEY'):
+        value = os.getenv(name)
+        if value and value not in keys:
+            keys.append(value)
+    return keys
+
+
+def _location(data) -> Optional[Tuple[float, float]]:
+    if not data or data.get('status') != 'OK':
+        return None
+    loc = ((data.get('result') or {}).get('geometry') or {}).get('location') or {}
+    if loc.get('lat') is None or loc.get('lng') is None:
+        return None
+    return loc['lat'], loc['lng']
+
+
+def cached_locations(place_ids: Sequence[str]) -> Dict[str, Tuple[float, float]]:
+    """キャッシュ済みの Details 応答から座標を取得（API呼び出しなし・期限切れも使う）"""
+    found: Dict[str, Tuple[float, float]] = {}
+    for key in _api_keys():
+        for extra in CACHED_DETAILS_PARAMS:
+            pending = [pid for pid in place_ids if pid not in found]
+            if not pending:
+                return found
+            responses = peek_many(DETAILS_URL, [dict(extra, place_id=pid, key=key) for pid in pending])
+            for pid, data in zip(pending, responses):
+                location = _location(data)
+                if location:
+                    found[pid] = location
+    return found
+
+
+def fetch_location(place_id: str) -> Optional[Tuple[float, float]]:
+    """Details（geometry のみ）で座標を取得"""
+    keys = _api_keys()
+    if not keys:
+        return None
+    data = get_json(DETAILS_URL, dict(GEOMETRY_PARAMS, place_id=place_id, key=keys[0]), ttl_sec=DETAILS_TTL)
+    location = _location(data)
+    if not location:
+        print(f"⚠️ 座標取得失敗: {place_id} status={data.get('status')}")
+    return location
+
+
+def _create_stage(cursor):
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS coord_backfill")
+    cursor.execute(
+        "CREATE TEMPORARY TABLE coord_backfill ("
+        "place_id VARCHAR(128) NOT NULL PRIMARY KEY, latitude DECIMAL(10,8) NOT NULL, "
+        "longitude DECIMAL(11,8) NOT NULL, source VARCHAR(8) NOT NULL"
+        ") CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci"
+    )
+
+
+def _stage_rows(cursor, rows: List[tuple], source: str):
+    if rows:
+        cursor.executemany(
+            "INSERT IGNORE INTO coord_backfill (place_id, latitude, longitude, source) VALUES (%s, %s, %s, %s)",
+            [(pid, lat, lng, source) for pid, (lat, lng) in rows],
+        )
+
+
+def _apply(cursor) -> int:
+    cursor.execute(
+        f"UPDATE cards c JOIN coord_backfill b ON b.place_id = c.place_id "
+        f"SET c.latitude = b.latitude, c.longitude = b.longitude, c.updated_at = NOW() WHERE {_MISSING}"
+    )
+    return cursor.rowcount
+
+
+def _remaining(cursor, limit: Optional[int] = None) -> List[str]:
+    query = (f"SELECT c.place_id FROM cards c LEFT JOIN coord_backfill b ON b.place_id = c.place_id "
+             f"WHERE {_MISSING} AND b.place_id IS NULL ORDER BY c.id")
+    if limit is not None:
+        cursor.execute(query + " LIMIT %s", (limit,))
+    else:
+        cursor.execute(query)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def backfill_coordinates(connection, spots_db: Optional[str] = None, max_details: int = 1000,
+                         workers: int = BACKFILL_WORKERS, dry_run: bool = False) -> Dict[str, int]:
+    """座標が NULL の cards を補完（spots_db 指定時はそのDBの spots を参照）。
+    max_details は Details を呼ぶ上限件数（0 で呼ばない）。dry_run=True なら Details は呼ばず
+    （取得予定件数を would_fetch に入れる）、最後に rollback
+    戻り値: {'missing', 'from_spots', 'from_cache', 'from_details', 'failed', 'updated', 'would_fetch'}"""
+    stats = dict.fromkeys(('missing', 'from_spots', 'from_cache', 'from_details', 'failed', 'updated',
+                           'would_fetch'), 0)
+    spots = f"`{spots_db}`.spots" if spots_db else "spots"
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT COUNT(*) FROM cards c WHERE {_MISSING}")
+        stats['missing'] = cursor.fetchone()[0]
+        if not stats['missing']:
+            return stats
+        _create_stage(cursor)
+
+        # 1. spots の座標（照合順序が異なるため cards 側を変換し spots の一意インデックスで引く）
+        cursor.execute(
+            f"INSERT IGNORE INTO coord_backfill (place_id, latitude, longitude, source) "
+            f"SELECT c.place_id, s.latitude, s.longitude, 'spots' FROM cards c "
+            f"JOIN {spots} s ON s.place_id = c.place_id COLLATE utf8mb4_unicode_ci "
+            f"WHERE {_MISSING} AND s.latitude IS NOT NULL AND s.longitude IS NOT NULL"
+        )
+        stats['from_spots'] = cursor.rowcount
+
+        # 1'. キャッシュ済み Details の座標
+        cached = cached_locations(_remaining(cursor))
+        _stage_rows(cursor, list(cached.items()), 'cache')
+        stats['from_cache'] = len(cached)
+
+        # 2. 一括反映（Details 取得中に cards の行ロックを保持しないよう先にcommit）
+        stats['updated'] = _apply(cursor)
+        if not dry_run:
+            connection.commit()
+
+        # 3. 残りのみ Details を並列取得（dry_run では件数のみ）
+        pending = _remaining(cursor, max_details) if max_details > 0 else []
+        if dry_run:
+            stats['would_fetch'] = len(pending)
+        elif pending:
+            print(f"🌐 Details（geometry）取得: {len(pending)}件（並列{workers}）")
+            fetched = []
+            stopped = False
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                futures = {pid: pool.submit(fetch_location, pid) for pid in pending}
+                # 予算上限に達したら未着手分だけ取り消し、取得済み（課金済み）の結果は反映する
+                for pid, future in futures.items():
+                    if future.cancelled():
+                        continue
+                    try:
+                        location = future.result()
+                    except BudgetExceeded as e:
+                        if not stopped:
+                            print(f"🛑 API予算上限のため Details 取得を中止: {e}")
+                            stopped = True
+                            for rest in futures.values():
+                                rest.cancel()
+                        continue
+                    except Exception as e:
+                        print(f"❌ Details エラー ({pid}): {e}")
+                        location = None
+                    if location:
+                        fetched.append((pid, location))
+                    else:
+                        stats['failed'] += 1
+            _stage_rows(cursor, fetched, 'details')
+            stats['from_details'] = len(fetched)
+            stats['updated'] += _apply(cursor)
+
+        if dry_run:
+            connection.rollback()
+        else:
+            connection.commit()
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS coord_backfill")
+        return stats
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def print_backfill_result(stats: Dict[str, int], elapsed: float, dry_run: bool = False):
+    label = "更新予定" if dry_run else "更新"
+    print(f"📍 座標補完: 対象 {stats['missing']}件 → {label} {stats['updated']}件 ({elapsed:.1f}秒)")
+    if dry_run:
+        print(f"   spots {stats['from_spots']}件 / キャッシュ {stats['from_cache']}件 / "
+              f"Details 取得予定 {stats.get('would_fetch', 0)}件（dry-run のため未取得）")
+        return
+    print(f"   spots {stats['from_spots']}件 / キャッシュ {stats['from_cache']}件 / "
+          f"Details {stats['from_details']}件 / 取得失敗 {stats['failed']}件")
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+MySQL 接続プール（mysql.connector.pooling）
+- 接続設定は環境変数: MYSQL_HOST / MYSQL_USER / MYSQL_PASSWORD / MYSQL_PORT / MYSQL_DB（または MYSQL_DATABASE）
+  MYSQL_USER は必須（未設定なら ValueError）
+- 接続設定（database 等）ごとにプールを作成しプロセス内で共有。サイズは MYSQL_POOL_SIZE（デフォルト10、上限32）
+- プールが埋まっている場合は MYSQL_POOL_TIMEOUT 秒（デフォルト5）待ち、それでも空かなければ
+  プール外の接続を開く（overflow として計上）
+- close()（または参照が外れた時点）でプールへ返却
+- pool_stats() / format_pool_stats() で払い出し数・使用中・最大同時使用・待ち時間・overflow を確認できる
+"""
+
+import os
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+import mysql.connector
+from mysql.connector import pooling
+
+_WAIT_STEP = 0.05
+
+_lock = threading.Lock()
+_pools: Dict[tuple, "_Pool"] = {}
+_pool_size: List[Optional[int]] = [None]
+
+
+def db_config(database: Optional[str] = None, **overrides) -> Dict[str, Any]:
+    """環境変数ベースの接続設定。database を省略した場合は MYSQL_DB（MYSQL_DATABASE）"""
+    user = overrides.get('user') or os.getenv('MYSQL_USER')
+    if not user:
+        raise ValueError("MYSQL_USER が環境変数（.env）に設定されていません")
+    config = {
+        'host': os.getenv('MYSQL_HOST', 'localhost'),
+        'user': user,
+        'password': os.getenv('MYSQL_PASSWORD'),
+        'database': database or os.getenv('MYSQL_DB') or os.getenv('MYSQL_DATABASE', 'swipe_app_development'),
+        'port': int(os.getenv('MYSQL_PORT', '3306')),
+        'charset': 'utf8mb4',
+    }
+    config.update(overrides)
+    return config
+
+
+def set_pool_size(size: int):
+    """以降に作成されるプールのサイズ（常駐プロセス・並行実行の起動時に設定）"""
+    _pool_size[0] = max(1, min(int(size), pooling.CNX_POOL_MAXSIZE))
+
+
+def _configured_pool_size() -> int:
+    # .env は各スクリプトの load_dotenv() 後に読むため、プール作成時に参照する
+    if _pool_size[0]:
+        return _pool_size[0]
+    return max(1, min(int(os.getenv("MYSQL_POOL_SIZE", "10")), pooling.CNX_POOL_MAXSIZE))
+
+
+class _Pool:
+    def __init__(self, name: str, config: Dict[str, Any], size: int):
+        self.name = name
+        self.config = config
+        self.size = size
+        self.pool = pooling.MySQLConnectionPool(pool_name=name, pool_size=size, pool_reset_session=True, **config)
+        self.stats = {'checkouts': 0, 'in_use': 0, 'peak_in_use': 0, 'waits': 0, 'wait_sec': 0.0, 'overflow': 0}
+
+    def acquire(self):
+        started = time.time()
+        timeout = float(os.getenv("MYSQL_POOL_TIMEOUT", "5"))
+        waited = False
+        while True:
+            try:
+                conn = self.pool.get_connection()
+                pooled = True
+                break
+            except pooling.PoolError:
+                if time.time() - started >= timeout:
+                    conn = mysql.connector.connect(**self.config)
+                    pooled = False
+                    break
+                waited = True
+                time.sleep(_WAIT_STEP)
+        with _lock:
+            s = self.stats
+            s['checkouts'] += 1
+            s['in_use'] += 1
+            s['peak_in_use'] = max(s['peak_in_use'], s['in_use'])
+            if waited:
+                s['waits'] += 1
+                s['wait_sec'] += time.time() - started
+            if not pooled:
+                s['overflow'] += 1
+        return PooledConnection(conn, self)
+
+    def released(self):
+        with _lock:
+            self.stats['in_use'] -= 1
+
+
+class PooledConnection:
+    """払い出した接続のラッパー（通常の接続と同じように使える。close()でプールへ返却）"""
+
+    def __init__(self, conn, pool: _Pool):
+        self._conn = conn
+        self._pool = pool
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._conn.close()
+        finally:
+            self._pool.released()
+
+    def is_connected(self) -> bool:
+        return not self._closed and self._conn.is_connected()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # close() し忘れた接続もプールへ戻す
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def _pool_for(config: Dict[str, Any]) -> _Pool:
+    key = tuple(sorted((k, str(v)) for k, v in config.items()))
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _Pool(f"data_collector_{len(_pools)}", config, _configured_pool_size())
+            _pools[key] = pool
+        return pool
+
+
+def get_connection(config: Optional[Dict[str, Any]] = None, **overrides):
+    """プールから接続を取得。config 省略時は db_config()、overrides で database 等を上書き"""
+    merged = dict(config) if config else db_config()
+    merged.update(overrides)
+    return _pool_for(merged).acquire()
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """プール（database）ごとの利用状況"""
+    with _lock:
+        return {
+            f"{p.config.get('database')}@{p.config.get('host')}": dict(p.stats, size=p.size)
+            for p in _pools.values()
+        }
+
+
+def format_pool_stats() -> str:
+    stats = pool_stats()
+    if not stats:
+        return "🗄️ DB接続プール: 未使用"
+    parts = []
+    for name, s in stats.items():
+        part = (f"{name} 払い出し{s['checkouts']}回 使用中{s['in_use']}/{s['size']} 最大{s['peak_in_use']}"
+                f" 待ち{s['waits']}回({s['wait_sec']:.1f}秒)")
+        if s['overflow']:
+            part += f" プール外{s['overflow']}回"
+        parts.append(part)
+    return "🗄️ DB接続プール: " + " | ".join(parts)
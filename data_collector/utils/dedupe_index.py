@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+名前と位置による近似重複の判定（place_id が違う同一施設を Details 取得前に落とす）
+- 名前は NFKC 正規化・小文字化し、法人格（株式会社 等）と空白・記号を除いたものを比べる
+  末尾の支店名（「ビッグエコー 新宿東口駅前店」の「新宿東口駅前店」）は切り離してブランド名としても比べる
+  支店名は空白・括弧で区切られた「2文字以上 + 店」の語のみ。ブランド名が業態を表す一般語（「焼肉 牛角店」の「焼肉」、
+  カテゴリのキーワード）の場合はブランド名では比べない
+- 座標は geohash と同じ区切りのセル（緯度・経度の格子）に振り分け、同じセルと周囲8セルの候補だけを名前の辞書引きで探す
+  （1件あたり定数時間）。セルの大きさは判定半径以上になる精度を選ぶ
+- 判定: 名前が一致して radius_m 以内、またはブランド名が一致して brand_radius_m 以内（同じ建物）なら重複
+  座標の無いものは「名前 + 正規化した住所」の完全一致で判定
+- 半径はカテゴリごとに DEDUPE_RULES で設定（公園は広く、チェーン店の多いカテゴリはブランド判定を狭く）
+"""
+
+import math
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# カテゴリ → 判定半径（m）。brand_radius_m=0 ならブランド名での判定はしない
+DEDUPE_RULES: Dict[str, Dict[str, float]] = {
+    'default': {'radius_m': 50, 'brand_radius_m': 20},
+    'relax_onsen': {'radius_m': 150, 'brand_radius_m': 50},
+    'active_park': {'radius_m': 300, 'brand_radius_m': 0},
+    'gourmet_alcohol': {'radius_m': 50, 'brand_radius_m': 10},
+}
+
+# ブランド名として扱わない業態の一般語（カテゴリのキーワードと合わせて使う）
+GENERIC_BRANDS = (
+    '焼肉', '焼き肉', '焼鳥', '焼き鳥', '居酒屋', 'バー', 'bar', '酒場', '大衆酒場', '立ち飲み', '寿司', '鮨',
+    'ラーメン', 'らーめん', 'そば', 'うどん', '定食', '食堂', 'カフェ', 'cafe', '喫茶', '珈琲', 'パン', 'ベーカリー',
+    '温泉', '銭湯', 'サウナ', 'スパ', 'カラオケ', 'ジム', '公園', 'ホテル', '旅館', '美容室', '本店',
+)
+
+_EARTH_RADIUS_M = 6371000.0
+_METERS_PER_DEGREE = 111320.0
+_NORTH_LAT = 46.0  # セルの東西幅は日本の北端で見積もる（南ほど広い）
+
+_CORPORATE_RE = re.compile(r'株式会社|有限会社|合同会社|\(株\)|\(有\)|\(同\)')
+_BRANCH_RE = re.compile(r'^(.+?)[\s(\[]+([^\s()\[\]]{2,}?(?:支店|号店|店))[)\]]?$')
+_SYMBOLS_RE = re.compile(r'[\W_]+')
+_ADDRESS_PREFIX_RE = re.compile(r'^(?:日本[、,]?\s*)?(?:〒?\d{3}-?\d{4}\s*)?')
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """NFKC・小文字化し、法人格と空白・記号を除いた名前"""
+    text = _CORPORATE_RE.sub(' ', unicodedata.normalize('NFKC', name or '').lower())
+    return _SYMBOLS_RE.sub('', text)
+
+
+def split_branch(name: Optional[str]) -> Tuple[str, str]:
+    """(ブランド名, 支店名) をそれぞれ正規化して返す。支店名が無ければ ('名前', '')"""
+    text = _CORPORATE_RE.sub(' ', unicodedata.normalize('NFKC', name or '').lower()).strip()
+    found = _BRANCH_RE.match(text)
+    if not found:
+        return _SYMBOLS_RE.sub('', text), ''
+    return _SYMBOLS_RE.sub('', found.group(1)), _SYMBOLS_RE.sub('', found.group(2))
+
+
+def normalize_address(address: Optional[str]) -> str:
+    """先頭の「日本、」と郵便番号、空白を除いた住所"""
+    text = unicodedata.normalize('NFKC', address or '').strip()
+    return re.sub(r'\s+', '', _ADDRESS_PREFIX_RE.sub('', text)).lower()
+
+
+def _cell_size(precision: int) -> Tuple[float, float]:
+    """geohash の精度 → セルの (緯度幅, 経度幅)（度）"""
+    bits = precision * 5
+    return 180.0 / (1 << (bits // 2)), 360.0 / (1 << (bits - bits // 2))
+
+
+def geohash_precision(radius_m: float) -> int:
+    """セルの短辺が radius_m 以上になる最大の精度（1〜9）"""
+    cos_north = math.cos(math.radians(_NORTH_LAT))
+    for precision in range(9, 0, -1):
+        dlat, dlng = _cell_size(precision)
+        if min(dlat * _METERS_PER_DEGREE, dlng * _METERS_PER_DEGREE * cos_north) >= radius_m:
+            return precision
+    return 1
+
+
+def _cell(lat: float, lng: float, precision: int) -> Tuple[int, int]:
+    dlat, dlng = _cell_size(precision)
+    return int((lat + 90.0) // dlat), int((lng + 180.0) // dlng)
+
+
+def distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """2点間の距離（正距円筒近似、数百m以内なら十分）"""
+    x = math.radians(lng2 - lng1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return _EARTH_RADIUS_M * math.hypot(x, y)
+
+
+def place_fields(place: Dict) -> Tuple[str, str, Optional[float], Optional[float]]:
+    """Text Search 結果・Details 結果・整形済みカードから (名前, 住所, 緯度, 経度)"""
+    name = place.get('name') or place.get('title') or ''
+    address = place.get('formatted_address') or place.get('address') or place.get('vicinity') or ''
+    location = (place.get('geometry') or {}).get('location') or {}
+    lat = location.get('lat', place.get('latitude'))
+    lng = location.get('lng', place.get('longitude'))
+    if lat is None or lng is None:
+        return name, address, None, None
+    return name, address, float(lat), float(lng)
+
+
+class DedupeIndex:
+    """セル → 名前・ブランド名 → 登録済みの (キー, 緯度, 経度) の索引"""
+
+    def __init__(self, radius_m: float = 50, brand_radius_m: float = 20, generic: Iterable[str] = ()):
+        """generic: ブランド名として扱わない語（GENERIC_BRANDS に追加。カテゴリのキーワード等）"""
+        self.radius_m = radius_m
+        self.brand_radius_m = brand_radius_m
+        self.generic = {normalize_name(word) for word in (*GENERIC_BRANDS, *generic)}
+        self.precision = geohash_precision(max(radius_m, brand_radius_m))
+        self.cells: Dict[Tuple[int, int], Dict[Tuple[str, str], List[Tuple[str, float, float]]]] = {}
+        self.by_address: Dict[Tuple[str, str], str] = {}
+        self.size = 0
+
+    @classmethod
+    def for_category(cls, category: Optional[str], keywords: Iterable[str] = ()) -> 'DedupeIndex':
+        """DEDUPE_RULES の半径で作成。keywords（カテゴリの検索キーワード）はブランド名として扱わない"""
+        rule = DEDUPE_RULES.get(category or '', DEDUPE_RULES['default'])
+        return cls(rule['radius_m'], rule['brand_radius_m'], keywords)
+
+    def brand(self, name: Optional[str]) -> str:
+        """ブランド名での判定に使う名前（判定しない場合は ''）。2文字未満や業態の一般語は使わない"""
+        if self.brand_radius_m <= 0:
+            return ''
+        brand = split_branch(name)[0]
+        return brand if len(brand) >= 2 and brand not in self.generic else ''
+
+    def add(self, key: str, name: str, address: Optional[str] = None,
+            lat: Optional[float] = None, lng: Optional[float] = None):
+        name_key = normalize_name(name)
+        if not name_key:
+            return
+        if address:
+            self.by_address.setdefault((name_key, normalize_address(address)), key)
+        if lat is not None and lng is not None:
+            bucket = self.cells.setdefault(_cell(lat, lng, self.precision), {})
+            bucket.setdefault(('n', name_key), []).append((key, lat, lng))
+            brand = self.brand(name)
+            if brand:
+                bucket.setdefault(('b', brand), []).append((key, lat, lng))
+        self.size += 1
+
+    def find(self, name: str, address: Optional[str] = None,
+             lat: Optional[float] = None, lng: Optional[float] = None) -> Optional[str]:
+        """重複とみなす登録済みのキー（無ければ None）"""
+        name_key = normalize_name(name)
+        if not name_key:
+            return None
+        if lat is not None and lng is not None:
+            brand = self.brand(name)
+            row, col = _cell(lat, lng, self.precision)
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    bucket = self.cells.get((row + dr, col + dc))
+                    if not bucket:
+                        continue
+                    for key, lat2, lng2 in bucket.get(('n', name_key), ()):
+                        if distance_m(lat, lng, lat2, lng2) <= self.radius_m:
+                            return key
+                    for key, lat2, lng2 in bucket.get(('b', brand), ()) if brand else ():
+                        if distance_m(lat, lng, lat2, lng2) <= self.brand_radius_m:
+                            return key
+        if address:
+            return self.by_address.get((name_key, normalize_address(address)))
+        return None
+
+    def add_place(self, place: Dict, key: Optional[str] = None):
+        self.add(key or place.get('place_id') or '', *place_fields(place))
+
+    def find_place(self, place: Dict) -> Optional[str]:
+        return self.find(*place_fields(place))
+
+    def dedupe(self, places: Iterable[Dict]) -> Tuple[List[Dict], Dict[str, str]]:
+        """places を順に判定して登録。(残した place, 落とした place_id → 重複先のキー)"""
+        kept: List[Dict] = []
+        dropped: Dict[str, str] = {}
+        for place in places:
+            duplicate_of = self.find_place(place)
+            if duplicate_of is not None and duplicate_of != place.get('place_id'):
+                dropped[place.get('place_id') or ''] = duplicate_of
+                continue
+            self.add_place(place)
+            kept.append(place)
+        return kept, dropped
+
+    def load_cards(self, cursor, genre: Optional[str] = None) -> int:
+        """cards の既存行（タイトル・住所・座標）を登録。キーは 'card:<id>'。戻り値は件数"""
+        query = "SELECT id, title, address, latitude, longitude FROM cards"
+        params: Tuple = ()
+        if genre:
+            query += " WHERE genre = %s"
+            params = (genre,)
+        cursor.execute(query, params)
+        count = 0
+        for card_id, title, address, lat, lng in cursor:
+            self.add(f"card:{card_id}", title, address,
+                     float(lat) if lat is not None else None, float(lng) if lng is not None else None)
+            count += 1
+        return count
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+グリッド型 Nearby Search 収集
+- 都道府県のバウンディングボックスを一辺 GRID_CELL_KM のセルに分割し、セルごとに location+radius で検索
+- 1セルで上限（3ページ×20件=60件）に達したら4分割して再検索（GRID_MAX_DEPTH まで）
+- 完了したセルは request_guard の marker に記録し、再実行時はAPIを呼ばずキャッシュから復元
+- 結果は重複除去・矩形内判定のうえで逐次 yield（必要件数に達した時点で打ち切れる）
+  矩形は隣県と重なるため、どの都道府県の分として数えるかは place_prefecture() で判定すること
+"""
+
+import os
+import time
+from collections import deque
+from typing import Dict, Iterator, Optional
+
+from utils.request_guard import get_json, peek_json, has_marker, set_marker
+from utils.prefecture_geo import bounds_of, tile_bounds, split_bounds, cell_circle, in_bounds, resolve_prefecture
+
+NEARBY_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+
+GRID_CELL_KM = float(os.getenv("GRID_CELL_KM", "10"))
+GRID_MAX_DEPTH = int(os.getenv("GRID_MAX_DEPTH", "4"))     # 10km → 625m まで分割
+GRID_CELL_TTL = int(os.getenv("GRID_CELL_TTL_DAYS", "30")) * 60 * 60 * 24
+RESULT_CAP = 60            # Nearby Search の1検索あたり上限（20件 × 3ページ）
+PAGE_TOKEN_WAIT = 2.0      # next_page_token が有効になるまでの待機
+
+
+def place_prefecture(place: Dict) -> Optional[str]:
+    """検索結果の都道府県（formatted_address があれば住所、無ければ座標。Nearby Search の vicinity は都道府県を含まない）"""
+    loc = (place.get('geometry') or {}).get('location') or {}
+    return resolve_prefecture(place.get('formatted_address'), loc.get('lat'), loc.get('lng'))
+
+
+class GridHarvester:
+    """都道府県をセル分割して Nearby Search で網羅的に候補を集める"""
+
+    def __init__(self, api_key: str, cell_km: float = GRID_CELL_KM, max_depth: int = GRID_MAX_DEPTH,
+                 language: str = 'ja'):
+        self.api_key = api_key
+        self.cell_km = cell_km
+        self.max_depth = max_depth
+        self.language = language
+        self.truncated = False   # 最大深さでも上限に達したセルがあったか（網羅できていない）
+        self.live_cells = 0
+        self.cached_cells = 0
+
+    def _cell_key(self, bounds, keyword: Optional[str], place_type: Optional[str]) -> str:
+        lat, lng, radius = cell_circle(bounds)
+        return f"grid:{keyword or ''}|{place_type or ''}|{lat:.5f},{lng:.5f}|{radius}"
+
+    def _search_cell(self, bounds, keyword: Optional[str], place_type: Optional[str],
+                     cached_only: bool = False) -> list:
+        """セル中心・外接円で検索し、最大3ページ分の結果を返す"""
+        lat, lng, radius = cell_circle(bounds)
+        params = {
+            'location': f"{lat:.6f},{lng:.6f}",
+            'radius': radius,
+            'key': self.api_key,
+            'language': self.language,
+        }
+        if keyword:
+            params['keyword'] = keyword
+        if place_type:
+            params['type'] = place_type
+
+        results = []
+        for page in range(3):
+            if cached_only:
+                data = peek_json(NEARBY_SEARCH_URL, params)
+                if data is None:
+                    break
+            else:
+                data = get_json(NEARBY_SEARCH_URL, params, ttl_sec=GRID_CELL_TTL)
+                # トークン有効化前のリクエストは INVALID_REQUEST になるため、待って再取得（キャッシュを上書き）
+                if page > 0 and data.get('status') == 'INVALID_REQUEST':
+                    time.sleep(PAGE_TOKEN_WAIT)
+                    data = get_json(NEARBY_SEARCH_URL, params, ttl_sec=0)
+            if data.get('status') != 'OK':
+                break
+            results.extend(data.get('results', []))
+            token = data.get('next_page_token')
+            if not token:
+                break
+            params = {'pagetoken': token, 'key': self.api_key}
+            if not cached_only:
+                time.sleep(PAGE_TOKEN_WAIT)
+        return results
+
+    def harvest(self, prefecture: str, keyword: Optional[str] = None,
+                place_type: Optional[str] = None) -> Iterator[Dict]:
+        """prefecture の矩形内の候補を逐次返す（place_id重複なし。隣県の候補も含む）"""
+        bounds = bounds_of(prefecture)
+        if not bounds:
+            print(f"⚠️ 範囲未定義の都道府県: {prefecture}")
+            return
+        self.truncated = False
+        seen = set()
+        queue = deque((cell, 0) for cell in tile_bounds(bounds, self.cell_km))
+
+        while queue:
+            cell, depth = queue.popleft()
+            key = self._cell_key(cell, keyword, place_type)
+            done = has_marker(key, GRID_CELL_TTL)
+            results = self._search_cell(cell, keyword, place_type, cached_only=done)
+            if done:
+                self.cached_cells += 1
+                split = has_marker(f"{key}:split", GRID_CELL_TTL)
+            else:
+                self.live_cells += 1
+                split = len(results) >= RESULT_CAP
+                set_marker(key)
+                if split:
+                    set_marker(f"{key}:split")
+
+            if split:
+                if depth < self.max_depth:
+                    queue.extend((child, depth + 1) for child in split_bounds(cell))
+                else:
+                    self.truncated = True
+
+            for place in results:
+                pid = place.get('place_id')
+                if not pid or pid in seen:
+                    continue
+                loc = (place.get('geometry') or {}).get('location') or {}
+                if 'lat' not in loc or not in_bounds(loc['lat'], loc['lng'], bounds):
+                    continue
+                seen.add(pid)
+                yield place
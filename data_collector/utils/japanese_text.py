@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日本語レビューの判定（fetch_* の is_japanese_text / extract_japanese_reviews で共用）
+- 判定基準は従来どおり: ひらがな（U+3040-309F）・カタカナ（U+30A0-30FF）・漢字（U+4E00-9FAF）の文字数が、
+  半角スペースと改行を除いた文字数の30%以上
+- 文字の数え上げは1文字ずつのループではなく、正規表現で日本語の文字を取り除いた長さの差で求める
+- japanese_flags() はレビュー本文の一覧を1つに連結して正規表現1回で数える（1件ずつの呼び出しのオーバーヘッドを省く）
+- script_language() は文字種の比率による簡易な言語判定（ja / zh / ko / en / other、本文ごとにキャッシュ）
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+JAPANESE_RATIO = 0.3
+
+_JAPANESE_RE = re.compile(r'[\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FAF]+')
+_KANA_RE = re.compile(r'[\u3040-\u309F\u30A0-\u30FF]+')
+_HANGUL_RE = re.compile(r'[\uAC00-\uD7AF\u1100-\u11FF\u3130-\u318F]+')
+_LATIN_RE = re.compile('[A-Za-z]+')
+_SEPARATOR = '\0'
+
+
+def _total(text: str) -> int:
+    """半角スペースと改行を除いた文字数"""
+    return len(text) - text.count(' ') - text.count('\n')
+
+
+def japanese_ratio(text: Optional[str]) -> float:
+    """日本語の文字（ひらがな・カタカナ・漢字）の比率。空なら 0"""
+    if not text:
+        return 0.0
+    total = _total(text)
+    if total == 0:
+        return 0.0
+    return (len(text) - len(_JAPANESE_RE.sub('', text))) / total
+
+
+def is_japanese_text(text: Optional[str], threshold: float = JAPANESE_RATIO) -> bool:
+    """テキストが日本語かどうかを判定"""
+    if not text:
+        return False
+    total = _total(text)
+    if total == 0:
+        return False
+    return (len(text) - len(_JAPANESE_RE.sub('', text))) / total >= threshold
+
+
+def japanese_flags(texts: Sequence[Optional[str]], threshold: float = JAPANESE_RATIO) -> List[bool]:
+    """本文の一覧をまとめて判定（結果は is_japanese_text を1件ずつ呼んだものと同じ）"""
+    texts = [text or '' for text in texts]
+    joined = _SEPARATOR.join(texts)
+    if joined.count(_SEPARATOR) != len(texts) - 1:  # 本文に区切り文字が含まれる場合は1件ずつ
+        return [is_japanese_text(text, threshold) for text in texts]
+    remaining = _JAPANESE_RE.sub('', joined).split(_SEPARATOR)
+    flags = []
+    for text, rest in zip(texts, remaining):
+        total = _total(text)
+        flags.append(total > 0 and (len(text) - len(rest)) / total >= threshold)
+    return flags
+
+
+def extract_japanese_reviews(reviews: Optional[List[Dict]], max_count: int = 10) -> List[Dict]:
+    """日本語レビューを抽出し、新しい順（time の降順）に最大 max_count 件"""
+    if not reviews:
+        return []
+    flags = japanese_flags([review.get('text', '') for review in reviews])
+    japanese_reviews = [{
+        'text': review.get('text', ''),
+        'rating': review.get('rating', 0),
+        'time': review.get('time', 0),  # Unixタイムスタンプ
+        'author_name': review.get('author_name', ''),
+        'relative_time_description': review.get('relative_time_description', ''),
+    } for review, ok in zip(reviews, flags) if ok]
+    japanese_reviews.sort(key=lambda x: x['time'], reverse=True)
+    return japanese_reviews[:max_count]
+
+
+def _count(pattern: re.Pattern, text: str) -> int:
+    return len(text) - len(pattern.sub('', text))
+
+
+@lru_cache(maxsize=4096)
+def script_language(text: Optional[str]) -> str:
+    """文字種の比率による簡易な言語判定: 'ja' / 'zh' / 'ko' / 'en' / 'other'
+    かながあれば日本語、漢字のみなら中国語、ハングルが多ければ韓国語、ラテン文字が多ければ英語"""
+    if not text:
+        return 'other'
+    total = _total(text)
+    if total == 0:
+        return 'other'
+    kana = _count(_KANA_RE, text)
+    cjk = _count(_JAPANESE_RE, text) - kana
+    hangul = _count(_HANGUL_RE, text)
+    latin = _count(_LATIN_RE, text)
+    if (kana + cjk) / total >= JAPANESE_RATIO:
+        return 'ja' if kana else 'zh'
+    if hangul / total >= JAPANESE_RATIO:
+        return 'ko'
+    if latin / total >= 0.5:
+        return 'en'
+    return 'other'
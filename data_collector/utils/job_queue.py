@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SQLite 永続ジョブキュー
+- 優先度（大きいほど先）・実行予定時刻つきのジョブを .cache/jobs.sqlite に保存
+- claim はトランザクション（BEGIN IMMEDIATE）で1件をリースし、複数ワーカー/プロセスから安全に取り出せる
+- リース期限切れのジョブ（ワーカー停止等）は再取得される。heartbeat でリース延長
+- 失敗時は指数バックオフ（ジッタ付き）で再実行、max_attempts 到達で dead
+- job_key によるべき等な投入（同じキーの未完了ジョブは二重投入しない）
+WAL モード（共有メモリを使う）のため、同じホストのプロセス間でのみ共有できる。JOB_QUEUE_PATH はローカルディスクに置くこと
+（NFS 等のネットワークファイルシステム上では動作を保証しない）
+"""
+
+import os
+import json
+import time
+import random
+import socket
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+_BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join(_BASE_DIR, ".cache", "jobs.sqlite"))
+
+DEFAULT_LEASE_SEC = int(os.getenv("JOB_LEASE_SEC", "300"))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+BACKOFF_BASE_SEC = float(os.getenv("JOB_BACKOFF_BASE_SEC", "30"))
+BACKOFF_MAX_SEC = float(os.getenv("JOB_BACKOFF_MAX_SEC", "3600"))
+
+# queued → running → done / (失敗) queued(再試行) → dead
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+def default_worker_id(suffix: str = "") -> str:
+    base = f"{socket.gethostname()}:{os.getpid()}"
+    return f"{base}:{suffix}" if suffix else base
+
+
+def backoff_delay(attempts: int) -> float:
+    """attempts回目の失敗後の待機秒（指数 + ジッタ、上限あり）"""
+    delay = min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * (2 ** max(attempts - 1, 0)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class JobQueue:
+    """SQLiteベースのジョブキュー（接続は呼び出しごとに開く）"""
+
+    def __init__(self, path: str = JOB_QUEUE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    job_key TEXT,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    run_after REAL NOT NULL,
+                    lease_owner TEXT,
+                    lease_until REAL,
+                    last_error TEXT,
+                    result TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_key ON jobs(job_key)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, priority, run_after)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    @staticmethod
+    def _row(row) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        if job.get('result'):
+            job['result'] = json.loads(job['result'])
+        return job
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], key: Optional[str] = None, priority: int = 0,
+                max_attempts: int = DEFAULT_MAX_ATTEMPTS, delay_sec: float = 0, requeue: bool = False) -> int:
+        """ジョブ投入。keyが同じ未完了ジョブがあればそのIDを返す
+        requeue=True なら完了/dead済みの同キージョブを再投入する"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if key:
+                row = conn.execute("SELECT id, status FROM jobs WHERE job_key=?", (key,)).fetchone()
+                if row:
+                    if row['status'] in ACTIVE_STATUSES or not requeue:
+                        conn.execute("COMMIT")
+                        return row['id']
+                    conn.execute(
+                        "UPDATE jobs SET kind=?, payload=?, priority=?, status='queued', attempts=0, max_attempts=?, "
+                        "run_after=?, lease_owner=NULL, lease_until=NULL, last_error=NULL, result=NULL, updated_at=? "
+                        "WHERE id=?",
+                        (kind, json.dumps(payload, ensure_ascii=False), priority, max_attempts,
+                         now + delay_sec, now, row['id']),
+                    )
+                    conn.execute("COMMIT")
+                    return row['id']
+            cur = conn.execute(
+                "INSERT INTO jobs(kind, payload, job_key, priority, max_attempts, run_after, created_at, updated_at) "
+                "VALUES(?,?,?,?,?,?,?,?)",
+                (kind, json.dumps(payload, ensure_ascii=False), key, priority, max_attempts,
+                 now + delay_sec, now, now),
+            )
+            conn.execute("COMMIT")
+            return cur.lastrowid
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def claim(self, worker_id: str, kinds: Optional[List[str]] = None,
+              lease_sec: int = DEFAULT_LEASE_SEC) -> Optional[Dict[str, Any]]:
+        """実行可能なジョブを1件リースして返す（無ければNone）
+        期限切れリースのrunningジョブも対象。試行回数は取得時に加算する"""
+        now = time.time()
+        kind_sql = ""
+        args: List[Any] = [now, now]
+        if kinds:
+            kind_sql = f" AND kind IN ({','.join('?' * len(kinds))})"
+            args.extend(kinds)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # 試行上限に達したまま放置されたリースは dead にする
+            conn.execute(
+                "UPDATE jobs SET status='dead', last_error=COALESCE(last_error, 'lease expired'), updated_at=? "
+                "WHERE status='running' AND lease_until < ? AND attempts >= max_attempts",
+                (now, now),
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE ((status='queued' AND run_after <= ?) OR (status='running' AND lease_until < ?))"
+                f"{kind_sql} ORDER BY priority DESC, run_after, id LIMIT 1",
+                args,
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status='running', attempts=attempts+1, lease_owner=?, lease_until=?, updated_at=? "
+                "WHERE id=?",
+                (worker_id, now + lease_sec, now, row['id']),
+            )
+            job = self._row(conn.execute("SELECT * FROM jobs WHERE id=?", (row['id'],)).fetchone())
+            conn.execute("COMMIT")
+            return job
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _update_owned(self, job_id: int, worker_id: str, sql: str, args: tuple) -> bool:
+        """リース保持者のみ更新できる（期限切れで他ワーカーに渡ったジョブは上書きしない）"""
+        conn = self._connect()
+        try:
+            cur = conn.execute(f"{sql} WHERE id=? AND lease_owner=? AND status='running'",
+                               args + (job_id, worker_id))
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_sec: int = DEFAULT_LEASE_SEC) -> bool:
+        now = time.time()
+        return self._update_owned(job_id, worker_id, "UPDATE jobs SET lease_until=?, updated_at=?",
+                                  (now + lease_sec, now))
+
+    def complete(self, job_id: int, worker_id: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        return self._update_owned(
+            job_id, worker_id,
+            "UPDATE jobs SET status='done', lease_owner=NULL, lease_until=NULL, result=?, last_error=NULL, updated_at=?",
+            (json.dumps(result or {}, ensure_ascii=False, default=str), time.time()),
+        )
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> Optional[str]:
+        """失敗を記録。再試行予定なら 'queued'、上限到達なら 'dead' を返す"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id=? AND lease_owner=? AND status='running'",
+                (job_id, worker_id),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            status = 'dead' if row['attempts'] >= row['max_attempts'] else 'queued'
+            run_after = now + backoff_delay(row['attempts']) if status == 'queued' else now
+            conn.execute(
+                "UPDATE jobs SET status=?, run_after=?, lease_owner=NULL, lease_until=NULL, last_error=?, updated_at=? "
+                "WHERE id=?",
+                (status, run_after, error[:2000], now, job_id),
+            )
+            conn.execute("COMMIT")
+            return status
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def release(self, job_id: int, worker_id: str, delay_sec: float = 0) -> bool:
+        """失敗扱いにせず返却（予算到達・停止時など）。取得時に加算した試行回数を戻す"""
+        now = time.time()
+        return self._update_owned(
+            job_id, worker_id,
+            "UPDATE jobs SET status='queued', attempts=MAX(attempts-1, 0), run_after=?, lease_owner=NULL, "
+            "lease_until=NULL, updated_at=?",
+            (now + delay_sec, now),
+        )
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            return self._row(conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone())
+        finally:
+            conn.close()
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            if status:
+                rows = conn.execute("SELECT * FROM jobs WHERE status=? ORDER BY priority DESC, id LIMIT ?",
+                                    (status, limit)).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+            return [self._row(r) for r in rows]
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """kind別・status別の件数"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status").fetchall()
+        finally:
+            conn.close()
+        result: Dict[str, Dict[str, int]] = {}
+        for kind, status, count in rows:
+            result.setdefault(kind, {})[status] = count
+        return result
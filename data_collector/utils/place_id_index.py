@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+既存place_idの所属判定用インデックス（重複除外用）
+- ブルームフィルタ（偽陽性率 PLACE_ID_INDEX_FPR、デフォルト0.1%）で「存在しない」を即答
+- 陽性時のみ、ソート済みID配列ファイル（mmap）を二分探索して確定
+- 構築済みの索引は .cache/place_id_index/ に保存し、以降は id の水位線（id > last_seen）より後の行だけを取得
+- 差分は .delta に追記し、PLACE_ID_INDEX_COMPACT 件を超えたらソート済み配列へ統合
+- add() は実行中の重複除外用（永続化しない）。DB上の行は refresh() でのみ取り込む
+- スレッド間で共有してよい。refresh() はDB読み込み・統合を参照用ロックの外で行い、差し替えだけをロック内で行う
+  （参照中の mmap が閉じられることはない）
+行の削除は追跡しない（削除済みIDが残っても重複扱いで取得をスキップするだけ。refresh(rebuild=True)で解消）
+"""
+
+import os
+import json
+import math
+import mmap
+import hashlib
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: プロセス間ロックなし
+    fcntl = None
+
+_BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+INDEX_DIR = os.path.join(_BASE_DIR, ".cache", "place_id_index")
+
+FALSE_POSITIVE_RATE = float(os.getenv("PLACE_ID_INDEX_FPR", "0.001"))
+COMPACT_THRESHOLD = int(os.getenv("PLACE_ID_INDEX_COMPACT", "5000"))
+MIN_CAPACITY = 10000
+
+
+class BloomFilter:
+    """固定長ビット配列のブルームフィルタ（ダブルハッシュ）"""
+
+    def __init__(self, capacity: int, error_rate: float = FALSE_POSITIVE_RATE,
+                 bits: Optional[int] = None, k: Optional[int] = None, data: Optional[bytes] = None):
+        self.capacity = capacity
+        self.bits = bits or max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.k = k or max(1, round(self.bits / capacity * math.log(2)))
+        self.data = bytearray(data) if data is not None else bytearray((self.bits + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.k):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.data[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.data[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class SortedIdFile:
+    """ソート済みIDを連結した .ids と、オフセット配列 .off（uint64）を mmap して二分探索する"""
+
+    def __init__(self, base: Optional[str] = None):
+        self.base = base
+        self._ids_mm = None
+        self._off_mm = None
+        self.offsets = None
+        self.count = 0
+        self._open()
+
+    def _open(self):
+        if self.base is None:
+            return
+        ids_path, off_path = f"{self.base}.ids", f"{self.base}.off"
+        if not (os.path.exists(ids_path) and os.path.exists(off_path)) or os.path.getsize(off_path) <= 8:
+            return
+        with open(ids_path, "rb") as f:
+            self._ids_mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(ids_path) else b""
+        with open(off_path, "rb") as f:
+            self._off_mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offsets = memoryview(self._off_mm).cast("Q")
+        self.count = len(self.offsets) - 1
+
+    def close(self):
+        if self.offsets is not None:
+            self.offsets.release()
+            self.offsets = None
+        for mm in (self._ids_mm, self._off_mm):
+            if isinstance(mm, mmap.mmap):
+                mm.close()
+        self._ids_mm = self._off_mm = None
+        self.count = 0
+
+    def _item(self, i: int) -> bytes:
+        return self._ids_mm[self.offsets[i]:self.offsets[i + 1]]
+
+    def __contains__(self, item: str) -> bool:
+        target = item.encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = self._item(mid)
+            if value < target:
+                lo = mid + 1
+            elif value > target:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self._item(i).decode("utf-8")
+
+    @staticmethod
+    def write(base: str, ids: Iterable[str]):
+        """ソート済みのIDを書き出す（一時ファイル経由で置き換え）"""
+        offsets = array("Q", [0])
+        with open(f"{base}.ids.tmp", "wb") as f:
+            for pid in ids:
+                data = pid.encode("utf-8")
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+        with open(f"{base}.off.tmp", "wb") as f:
+            offsets.tofile(f)
+        os.replace(f"{base}.ids.tmp", f"{base}.ids")
+        os.replace(f"{base}.off.tmp", f"{base}.off")
+
+
+def _merge_sorted(a: Iterable[str], b: List[str]):
+    """ソート済み2系列のマージ（重複除去）。UTF-8のバイト順と str の比較順は一致する"""
+    b_iter = iter(b)
+    nb = next(b_iter, None)
+    last = None
+    for x in a:
+        while nb is not None and nb < x:
+            if nb != last:
+                yield nb
+                last = nb
+            nb = next(b_iter, None)
+        if x != last:
+            yield x
+            last = x
+    while nb is not None:
+        if nb != last:
+            yield nb
+            last = nb
+        nb = next(b_iter, None)
+
+
+class PlaceIdIndex:
+    """テーブル（＋絞り込み条件）ごとの既存place_id集合。set と同じく in / add / len が使える"""
+
+    def __init__(self, name: str, table: str = "cards", column: str = "place_id",
+                 where: str = "", params: tuple = ()):
+        self.name = name
+        self.table = table
+        self.column = column
+        self.where = where
+        self.params = tuple(params)
+        self.scope = f"{table}|{column}|{where}|{json.dumps(self.params, ensure_ascii=False)}"
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        self.base = os.path.join(INDEX_DIR, name)
+        self._lock = threading.Lock()           # 参照と差し替え
+        self._refresh_lock = threading.Lock()   # refresh() 同士の排他
+        self._session = set()
+        self._load()
+
+    # ---- 永続化 ----
+    @contextmanager
+    def _file_lock(self):
+        """同じ索引を複数プロセスが更新しないよう排他"""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.base}.lock", "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _stored_watermark(self) -> int:
+        try:
+            with open(f"{self.base}.json", encoding="utf-8") as f:
+                return json.load(f).get("watermark", 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _load(self):
+        meta = None
+        if os.path.exists(f"{self.base}.json"):
+            with open(f"{self.base}.json", encoding="utf-8") as f:
+                meta = json.load(f)
+        if not meta or meta.get("scope") != self.scope or not os.path.exists(f"{self.base}.bloom"):
+            self._reset()
+            return
+        self.watermark = meta["watermark"]
+        self.sorted = SortedIdFile(self.base)
+        with open(f"{self.base}.bloom", "rb") as f:
+            self.bloom = BloomFilter(meta["capacity"], bits=meta["bits"], k=meta["k"], data=f.read())
+        self.delta = []
+        if os.path.exists(f"{self.base}.delta"):
+            with open(f"{self.base}.delta", encoding="utf-8") as f:
+                self.delta = [line.rstrip("\n") for line in f if line.strip()]
+        self._delta_set = set(self.delta)
+
+    def _reset(self):
+        self.watermark = 0
+        self.sorted = SortedIdFile()
+        self.bloom = BloomFilter(MIN_CAPACITY)
+        self.delta = []
+        self._delta_set = set()
+
+    def _write_meta(self):
+        tmp = f"{self.base}.bloom.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.bloom.data)
+        os.replace(tmp, f"{self.base}.bloom")
+        meta = {"scope": self.scope, "watermark": self.watermark, "count": len(self),
+                "capacity": self.bloom.capacity, "bits": self.bloom.bits, "k": self.bloom.k}
+        tmp = f"{self.base}.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, f"{self.base}.json")
+
+    def _replace_sorted(self, ids: List[str], bloom: BloomFilter, watermark: int):
+        """ソート済みの ids で配列ファイルを書き直し、ロック内で差し替える（差分は空に）
+        古い mmap は差し替え後に閉じる（os.replace で置き換えても、開いている mmap は元のファイルを参照し続ける）"""
+        SortedIdFile.write(self.base, ids)
+        new_sorted = SortedIdFile(self.base)
+        with self._lock:
+            old, self.sorted = self.sorted, new_sorted
+            self.bloom = bloom
+            self.delta = []
+            self._delta_set = set()
+            self.watermark = watermark
+            old.close()
+        if os.path.exists(f"{self.base}.delta"):
+            os.remove(f"{self.base}.delta")
+
+    def _compact(self):
+        """差分をソート済み配列へ統合（DBアクセスなし）。必要ならブルームフィルタも作り直す"""
+        merged = list(_merge_sorted(iter(self.sorted), sorted(self.delta)))
+        bloom = self.bloom
+        if len(merged) > bloom.capacity:
+            bloom = BloomFilter(max(MIN_CAPACITY, len(merged) * 2))
+            for pid in merged:
+                bloom.add(pid)
+        self._replace_sorted(merged, bloom, self.watermark)
+
+    # ---- 更新 ----
+    def refresh(self, connection, rebuild: bool = False) -> int:
+        """水位線より後の行を取り込んで保存。初回（またはrebuild=True）のみ全件走査。追加件数を返す
+        DB読み込みと新しい構造の構築は参照用ロックの外で行うため、refresh 中も他スレッドの in は止まらない
+        （rebuild 中は完了まで古い索引で判定する）"""
+        with self._refresh_lock, self._file_lock():
+            if not rebuild and self._stored_watermark() != self.watermark:
+                # 他プロセスが更新済み → 最新の保存状態から続ける
+                with self._lock:
+                    self.sorted.close()
+                    self._load()
+            where = f" AND {self.where}" if self.where else ""
+            cursor = connection.cursor()
+            cursor.execute(
+                f"SELECT id, {self.column} FROM {self.table} "
+                f"WHERE id > %s AND {self.column} IS NOT NULL{where} ORDER BY id",
+                (0 if rebuild else self.watermark,) + self.params,
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+
+            if rebuild:
+                ids = sorted({pid for _, pid in rows if pid})
+                bloom = BloomFilter(max(MIN_CAPACITY, len(ids) * 2))
+                for pid in ids:
+                    bloom.add(pid)
+                self._replace_sorted(ids, bloom, max((row_id for row_id, _ in rows), default=0))
+                self._write_meta()
+                return len(ids)
+
+            # 構造を書き換えるのはこのスレッドだけなので、判定はロックの外で行う
+            added = []
+            seen = set()
+            watermark = self.watermark
+            for row_id, pid in rows:
+                watermark = max(watermark, row_id)
+                if pid and pid not in seen and pid not in self._delta_set and pid not in self.sorted:
+                    added.append(pid)
+                    seen.add(pid)
+            with self._lock:
+                self.watermark = watermark
+                for pid in added:
+                    self.bloom.add(pid)
+                self._delta_set.update(added)
+                self.delta.extend(added)
+
+            if self.watermark and (not self.sorted.count or len(self.delta) > COMPACT_THRESHOLD):
+                self._compact()
+            elif added:
+                with open(f"{self.base}.delta", "a", encoding="utf-8") as f:
+                    f.writelines(f"{pid}\n" for pid in added)
+            if rows:
+                self._write_meta()
+            return len(added)
+
+    def add(self, place_id: str):
+        """実行中に扱ったIDを登録（メモリのみ）"""
+        if place_id and place_id not in self:
+            self._session.add(place_id)
+
+    # ---- 参照 ----
+    def __contains__(self, place_id) -> bool:
+        if not place_id:
+            return False
+        if place_id in self._session:
+            return True
+        with self._lock:
+            if place_id not in self.bloom:
+                return False
+            return place_id in self._delta_set or place_id in self.sorted
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.sorted.count + len(self.delta) + len(self._session)
+
+    def close(self):
+        with self._lock:
+            self.sorted.close()
+
+
+def open_index(connection, name: str, table: str = "cards", column: str = "place_id",
+               where: str = "", params: tuple = ()) -> PlaceIdIndex:
+    """索引を開いて水位線以降の行を取り込む（既存の set 取得関数の置き換え用）"""
+    index = PlaceIdIndex(name, table=table, column=column, where=where, params=params)
+    index.refresh(connection)
+    return index
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+7桁郵便番号 → 都道府県・市区町村 のオフライン索引
+- 日本郵便の KEN_ALL.CSV（住所の郵便番号）/ JIGYOSYO.CSV（大口事業所）から build_postal_index.py で生成
+- ファイルはソート済みの郵便番号（uint32）と、都道府県・市区町村の文字列ID（uint16）の配列＋文字列表のみ（約1MB）
+- 検索は郵便番号の二分探索（O(log n)）。住所の文字列照合を使わないので「東京都」内の「京都」などで誤らない
+索引ファイルが無い環境では postal_index() が None を返し、region_resolver は郵便番号上3桁の表で判定する
+"""
+
+import os
+import re
+import sys
+import struct
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+INDEX_PATH = os.getenv("POSTAL_INDEX_PATH", os.path.join(_BASE_DIR, "data", "postal_index.bin"))
+
+_MAGIC = b"POSTIDX1"
+_HEADER = struct.Struct("<8sIII")  # magic, 件数, 文字列数, 文字列表のバイト数
+
+_CODE_RE = re.compile(r"〒\s*([0-9０-９]{3})\s*[-－ー‐]?\s*([0-9０-９]{4})")
+_ZENKAKU_DIGITS = str.maketrans("０１２３４５６７８９", "0123456789")
+
+
+def postal_code(address: Optional[str]) -> Optional[int]:
+    """住所中の〒郵便番号を7桁の整数で（〒100-0005 → 1000005）。無ければ None"""
+    if not address:
+        return None
+    i = address.find("〒")
+    if i < 0:
+        return None
+    head = address[i + 1:i + 9]
+    if len(head) == 8 and head[3] == "-" and head.isascii() and head[:3].isdigit() and head[4:].isdigit():
+        return int(head[:3]) * 10000 + int(head[4:])
+    # 全角数字・空白・ハイフンなしの表記
+    m = _CODE_RE.match(address, i)
+    if not m:
+        return None
+    return int((m.group(1) + m.group(2)).translate(_ZENKAKU_DIGITS))
+
+
+def _little_endian(arr: array) -> array:
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+class PostalIndex:
+    """ソート済み郵便番号の配列を二分探索する索引"""
+
+    def __init__(self, codes: array, prefs: array, munis: array, strings: List[str]):
+        self.codes = codes
+        self.prefs = prefs
+        self.munis = munis
+        self.strings = strings
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def lookup(self, code: Optional[int]) -> Optional[Tuple[str, str]]:
+        """7桁郵便番号 → (都道府県の短縮名, 市区町村)。索引に無ければ None"""
+        if code is None:
+            return None
+        i = bisect_left(self.codes, code)
+        if i == len(self.codes) or self.codes[i] != code:
+            return None
+        return self.strings[self.prefs[i]], self.strings[self.munis[i]]
+
+    def prefecture(self, code: Optional[int]) -> Optional[str]:
+        found = self.lookup(code)
+        return found[0] if found else None
+
+    def municipality(self, code: Optional[int]) -> Optional[str]:
+        found = self.lookup(code)
+        return found[1] if found else None
+
+    def lookup_address(self, address: Optional[str]) -> Optional[Tuple[str, str]]:
+        return self.lookup(postal_code(address))
+
+    @classmethod
+    def load(cls, path: str = INDEX_PATH) -> "PostalIndex":
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, count, string_count, string_bytes = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError(f"郵便番号索引の形式が不正です: {path}")
+        pos = _HEADER.size
+        codes = array("I")
+        codes.frombytes(data[pos:pos + 4 * count])
+        pos += 4 * count
+        prefs = array("H")
+        prefs.frombytes(data[pos:pos + 2 * count])
+        pos += 2 * count
+        munis = array("H")
+        munis.frombytes(data[pos:pos + 2 * count])
+        pos += 2 * count
+        offsets = array("I")
+        offsets.frombytes(data[pos:pos + 4 * (string_count + 1)])
+        pos += 4 * (string_count + 1)
+        _little_endian(codes), _little_endian(prefs), _little_endian(munis), _little_endian(offsets)
+        blob = data[pos:pos + string_bytes]
+        strings = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(string_count)]
+        return cls(codes, prefs, munis, strings)
+
+    @staticmethod
+    def write(path: str, entries: Dict[int, Tuple[str, str]]):
+        """{郵便番号: (都道府県, 市区町村)} を索引ファイルに書き出す"""
+        string_ids: Dict[str, int] = {}
+
+        def sid(s: str) -> int:
+            if s not in string_ids:
+                string_ids[s] = len(string_ids)
+            return string_ids[s]
+
+        codes, prefs, munis = array("I"), array("H"), array("H")
+        for code in sorted(entries):
+            pref, muni = entries[code]
+            codes.append(code)
+            prefs.append(sid(pref))
+            munis.append(sid(muni))
+        encoded = [s.encode("utf-8") for s in string_ids]
+        offsets = array("I", [0])
+        for b in encoded:
+            offsets.append(offsets[-1] + len(b))
+        blob = b"".join(encoded)
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, len(codes), len(encoded), len(blob)))
+            for arr in (codes, prefs, munis, offsets):
+                f.write(_little_endian(array(arr.typecode, arr)).tobytes())
+            f.write(blob)
+        os.replace(tmp, path)
+
+
+def merge_entries(rows: Iterable[Tuple[int, str, str]]) -> Tuple[Dict[int, Tuple[str, str]], int]:
+    """(郵便番号, 都道府県, 市区町村) の並び → {郵便番号: (都道府県, 市区町村)}
+    同じ郵便番号が複数行ある場合は最初の行を採る。戻り値の2つ目は市区町村が食い違った郵便番号の数"""
+    entries: Dict[int, Tuple[str, str]] = {}
+    conflicts = 0
+    for code, pref, muni in rows:
+        found = entries.get(code)
+        if found is None:
+            entries[code] = (pref, muni)
+        elif found != (pref, muni):
+            conflicts += 1
+    return entries, conflicts
+
+
+_index: Optional[PostalIndex] = None
+_loaded = False
+
+
+def postal_index() -> Optional[PostalIndex]:
+    """INDEX_PATH の索引（プロセス内で1回だけ読み込む）。ファイルが無ければ None"""
+    global _index, _loaded
+    if not _loaded:
+        _loaded = True
+        if os.path.exists(INDEX_PATH):
+            try:
+                _index = PostalIndex.load(INDEX_PATH)
+            except (OSError, ValueError, struct.error) as e:
+                print(f"⚠️ 郵便番号索引を読み込めません（上3桁の表で判定します）: {e}")
+    return _index
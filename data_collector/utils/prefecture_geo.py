@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+都道府県の地理テーブル
+- 都道府県ごとの概略バウンディングボックス（本土・主要部、遠隔離島は除く）
+- 都道府県の代表点（県庁所在地）・主要都市の中心と半径（Text Search の location バイアス用）
+- 地方（collector の region_key）ごとの都道府県
+- 緯度経度の矩形判定・矩形のグリッド分割（グリッド収集用）
+- 座標からの都道府県判定（住所からの判定は utils/region_resolver.py）
+キーはリポジトリ内の表記に合わせて「都/府/県」なしの短縮名（北海道のみそのまま）
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+# (south, west, north, east)
+PREFECTURE_BOUNDS: Dict[str, Tuple[float, float, float, float]] = {
+    '北海道': (41.35, 139.33, 45.56, 145.82),
+    '青森': (40.22, 139.49, 41.56, 141.69),
+    '岩手': (38.74, 140.65, 40.45, 142.08),
+    '宮城': (37.77, 140.27, 39.00, 141.68),
+    '秋田': (38.87, 139.69, 40.51, 140.99),
+    '山形': (37.73, 139.52, 39.21, 140.65),
+    '福島': (36.79, 139.16, 37.98, 141.05),
+    '茨城': (35.74, 139.69, 36.95, 140.86),
+    '栃木': (36.20, 139.33, 37.16, 140.29),
+    '群馬': (35.98, 138.40, 37.06, 139.67),
+    '埼玉': (35.75, 138.71, 36.28, 139.90),
+    '千葉': (34.90, 139.74, 36.11, 140.88),
+    '東京': (35.50, 138.94, 35.90, 139.92),
+    '神奈川': (35.13, 138.92, 35.67, 139.78),
+    '新潟': (36.74, 137.63, 38.55, 139.90),
+    '富山': (36.27, 136.77, 36.98, 137.76),
+    '石川': (36.07, 136.24, 37.86, 137.36),
+    '福井': (35.34, 135.45, 36.30, 136.83),
+    '山梨': (35.17, 138.18, 35.97, 139.13),
+    '長野': (35.20, 137.32, 37.03, 138.74),
+    '岐阜': (35.13, 136.28, 36.47, 137.65),
+    '静岡': (34.57, 137.47, 35.65, 139.18),
+    '愛知': (34.57, 136.67, 35.42, 137.84),
+    '三重': (33.72, 135.85, 35.26, 136.99),
+    '滋賀': (34.79, 135.76, 35.70, 136.46),
+    '京都': (34.71, 134.85, 35.78, 136.06),
+    '大阪': (34.27, 135.09, 35.05, 135.75),
+    '兵庫': (34.15, 134.25, 35.68, 135.47),
+    '奈良': (33.86, 135.54, 34.78, 136.23),
+    '和歌山': (33.43, 135.06, 34.39, 136.01),
+    '鳥取': (35.05, 133.14, 35.62, 134.52),
+    '島根': (34.30, 131.67, 35.59, 133.39),
+    '岡山': (34.30, 133.27, 35.35, 134.41),
+    '広島': (34.03, 132.04, 35.11, 133.47),
+    '山口': (33.71, 130.77, 34.80, 132.49),
+    '徳島': (33.54, 133.66, 34.25, 134.82),
+    '香川': (34.01, 133.45, 34.57, 134.45),
+    '愛媛': (32.89, 132.01, 34.30, 133.70),
+    '高知': (32.70, 132.48, 33.88, 134.31),
+    '福岡': (33.00, 129.97, 34.25, 131.19),
+    '佐賀': (32.95, 129.73, 33.62, 130.54),
+    '長崎': (32.56, 128.60, 34.73, 130.38),
+    '熊本': (32.09, 129.94, 33.20, 131.33),
+    '大分': (32.71, 130.82, 33.74, 132.08),
+    '宮崎': (31.36, 130.71, 32.84, 131.89),
+    '鹿児島': (30.98, 129.99, 32.32, 131.20),
+    '沖縄': (26.06, 127.63, 26.88, 128.33),
+}
+
+# 県庁所在地（東京は新宿）
+PREFECTURE_CENTERS: Dict[str, Tuple[float, float]] = {
+    '北海道': (43.0642, 141.3469), '青森': (40.8244, 140.7400), '岩手': (39.7036, 141.1527),
+    '宮城': (38.2688, 140.8721), '秋田': (39.7186, 140.1024), '山形': (38.2404, 140.3633),
+    '福島': (37.7503, 140.4676), '茨城': (36.3418, 140.4468), '栃木': (36.5657, 139.8836),
+    '群馬': (36.3911, 139.0608), '埼玉': (35.8569, 139.6489), '千葉': (35.6047, 140.1233),
+    '東京': (35.6895, 139.6917), '神奈川': (35.4478, 139.6425), '新潟': (37.9026, 139.0232),
+    '富山': (36.6953, 137.2113), '石川': (36.5947, 136.6256), '福井': (36.0652, 136.2216),
+    '山梨': (35.6642, 138.5684), '長野': (36.6513, 138.1810), '岐阜': (35.3912, 136.7223),
+    '静岡': (34.9769, 138.3831), '愛知': (35.1802, 136.9066), '三重': (34.7303, 136.5086),
+    '滋賀': (35.0045, 135.8686), '京都': (35.0214, 135.7556), '大阪': (34.6863, 135.5200),
+    '兵庫': (34.6913, 135.1830), '奈良': (34.6851, 135.8329), '和歌山': (34.2260, 135.1675),
+    '鳥取': (35.5036, 134.2383), '島根': (35.4723, 133.0505), '岡山': (34.6618, 133.9344),
+    '広島': (34.3966, 132.4596), '山口': (34.1860, 131.4705), '徳島': (34.0658, 134.5593),
+    '香川': (34.3401, 134.0434), '愛媛': (33.8416, 132.7657), '高知': (33.5597, 133.5311),
+    '福岡': (33.6064, 130.4182), '佐賀': (33.2494, 130.2988), '長崎': (32.7448, 129.8737),
+    '熊本': (32.7898, 130.7417), '大分': (33.2382, 131.6126), '宮崎': (31.9111, 131.4239),
+    '鹿児島': (31.5602, 130.5581), '沖縄': (26.2124, 127.6809),
+}
+
+# 主要都市の中心と市街地をおおよそ覆う半径(km)
+CITY_CENTERS: Dict[str, Tuple[float, float, int]] = {
+    '札幌': (43.0621, 141.3544, 20), '函館': (41.7687, 140.7288, 15), '旭川': (43.7707, 142.3650, 15),
+    '釧路': (42.9849, 144.3820, 15), '帯広': (42.9239, 143.1961, 15), '北見': (43.8030, 143.8948, 15),
+    '小樽': (43.1907, 140.9947, 10), '室蘭': (42.3152, 140.9738, 10),
+    '仙台': (38.2682, 140.8694, 20), '青森': (40.8222, 140.7474, 15), '盛岡': (39.7020, 141.1545, 15),
+    '秋田': (39.7200, 140.1025, 15), '山形': (38.2554, 140.3396, 15), '福島': (37.7608, 140.4747, 15),
+    '八戸': (40.5123, 141.4883, 15), '郡山': (37.4005, 140.3597, 15),
+    '東京': (35.6812, 139.7671, 20), '横浜': (35.4437, 139.6380, 20), '千葉': (35.6073, 140.1063, 15),
+    'さいたま': (35.8617, 139.6455, 15), '川崎': (35.5308, 139.7029, 10), '宇都宮': (36.5551, 139.8828, 15),
+    '前橋': (36.3895, 139.0634, 15), '水戸': (36.3659, 140.4710, 15),
+    '名古屋': (35.1709, 136.8815, 20), '金沢': (36.5780, 136.6480, 15), '富山': (36.7013, 137.2132, 15),
+    '福井': (36.0620, 136.2230, 15), '甲府': (35.6622, 138.5683, 15), '長野': (36.6432, 138.1887, 15),
+    '岐阜': (35.4097, 136.7567, 15), '静岡': (34.9718, 138.3890, 15), '新潟': (37.9120, 139.0617, 15),
+    '大阪': (34.7025, 135.4959, 20), '京都': (35.0116, 135.7681, 15), '神戸': (34.6901, 135.1955, 15),
+    '奈良': (34.6851, 135.8049, 15), '和歌山': (34.2305, 135.1708, 15), '大津': (35.0176, 135.8547, 10),
+    '津': (34.7186, 136.5056, 10), '堺': (34.5733, 135.4830, 10),
+    '広島': (34.3853, 132.4553, 20), '岡山': (34.6655, 133.9184, 15), '山口': (34.1785, 131.4737, 15),
+    '松江': (35.4681, 133.0484, 15), '鳥取': (35.5011, 134.2351, 15), '高松': (34.3428, 134.0466, 15),
+    '松山': (33.8392, 132.7657, 15), '高知': (33.5588, 133.5312, 15), '徳島': (34.0703, 134.5548, 15),
+    '福岡': (33.5902, 130.4017, 20), '北九州': (33.8834, 130.8752, 15), '熊本': (32.8031, 130.7079, 15),
+    '鹿児島': (31.5966, 130.5571, 15), '宮崎': (31.9077, 131.4202, 15), '大分': (33.2396, 131.6093, 15),
+    '佐賀': (33.2635, 130.3009, 15), '長崎': (32.7503, 129.8779, 15), '那覇': (26.2124, 127.6792, 15),
+}
+
+# collector の region_key → 都道府県
+REGION_PREFECTURES: Dict[str, List[str]] = {
+    'hokkaido': ['北海道'],
+    'tohoku': ['青森', '岩手', '宮城', '秋田', '山形', '福島'],
+    'kanto': ['東京', '神奈川', '千葉', '埼玉', '茨城', '栃木', '群馬'],
+    'chubu': ['新潟', '富山', '石川', '福井', '山梨', '長野', '岐阜', '静岡', '愛知'],
+    'kansai': ['三重', '滋賀', '京都', '大阪', '兵庫', '奈良', '和歌山'],
+    'chugoku_shikoku': ['鳥取', '島根', '岡山', '広島', '山口', '徳島', '香川', '愛媛', '高知'],
+    'kyushu_okinawa': ['福岡', '佐賀', '長崎', '熊本', '大分', '宮崎', '鹿児島', '沖縄'],
+}
+
+PREFECTURE_REGION: Dict[str, str] = {
+    pref: region for region, prefs in REGION_PREFECTURES.items() for pref in prefs
+}
+
+# cards.region の地方区分（utils/region_resolver.py で使用）
+# - collector: REGION_PREFECTURES のキー（関西・中国四国・九州沖縄）
+# - standard7: japan_region_mapper.py の標準7地域（近畿、四国は中国に統合、沖縄は九州に統合）
+# - eight: 8地方区分（四国を分け、沖縄は九州に含める）
+# - ja7 / ja8: collector / eight の日本語ラベル（realtime_* の表記。近畿は「関西」）
+_STANDARD7 = {'kansai': 'kinki', 'chugoku_shikoku': 'chugoku', 'kyushu_okinawa': 'kyushu'}
+_SHIKOKU = ('徳島', '香川', '愛媛', '高知')
+_JA7 = {'hokkaido': '北海道', 'tohoku': '東北', 'kanto': '関東', 'chubu': '中部',
+        'kansai': '関西', 'chugoku_shikoku': '中国', 'kyushu_okinawa': '九州'}
+REGION_SCHEMES: Dict[str, Dict[str, str]] = {
+    'collector': PREFECTURE_REGION,
+    'standard7': {pref: _STANDARD7.get(region, region) for pref, region in PREFECTURE_REGION.items()},
+    'eight': {pref: 'shikoku' if pref in _SHIKOKU else _STANDARD7.get(region, region)
+              for pref, region in PREFECTURE_REGION.items()},
+    'ja7': {pref: _JA7[region] for pref, region in PREFECTURE_REGION.items()},
+    'ja8': {pref: '四国' if pref in _SHIKOKU else _JA7[region] for pref, region in PREFECTURE_REGION.items()},
+}
+
+# 地方コード → (日本語, 英語)
+REGION_LABELS: Dict[str, Tuple[str, str]] = {
+    'hokkaido': ('北海道', 'Hokkaido'), 'tohoku': ('東北', 'Tohoku'), 'kanto': ('関東', 'Kanto'),
+    'chubu': ('中部', 'Chubu'), 'kansai': ('関西', 'Kansai'), 'kinki': ('近畿', 'Kinki'),
+    'chugoku_shikoku': ('中国四国', 'Chugoku-Shikoku'), 'chugoku': ('中国', 'Chugoku'),
+    'shikoku': ('四国', 'Shikoku'), 'kyushu_okinawa': ('九州沖縄', 'Kyushu-Okinawa'), 'kyushu': ('九州', 'Kyushu'),
+}
+
+# 短縮名 → 正式表記（東京都・京都府・大阪府・北海道・〇〇県）
+PREFECTURE_FULL_NAMES: Dict[str, str] = {
+    pref: pref if pref == '北海道' else pref + ('都' if pref == '東京' else '府' if pref in ('京都', '大阪') else '県')
+    for pref in PREFECTURE_REGION
+}
+
+KM_PER_DEG_LAT = 111.0
+MAX_BIAS_RADIUS = 50000   # Text Search の radius 上限(m)
+
+
+def normalize_prefecture(name: str) -> str:
+    """「東京都」「大阪府」「茨城県」→ 短縮名（京都・北海道はそのまま）"""
+    if not name:
+        return name
+    if name.endswith(('県', '府')):
+        return name[:-1]
+    if name.endswith('都') and name != '京都':
+        return name[:-1]
+    return name
+
+
+def bounds_of(prefecture: str) -> Optional[Tuple[float, float, float, float]]:
+    return PREFECTURE_BOUNDS.get(normalize_prefecture(prefecture))
+
+
+def in_bounds(lat: float, lng: float, bounds: Tuple[float, float, float, float]) -> bool:
+    south, west, north, east = bounds
+    return south <= lat <= north and west <= lng <= east
+
+
+def in_any_bounds(lat: float, lng: float, prefectures: List[str]) -> bool:
+    """いずれかの都道府県の矩形内か（境界付近は隣県を含む概略判定）"""
+    for pref in prefectures:
+        bounds = bounds_of(pref)
+        if bounds and in_bounds(lat, lng, bounds):
+            return True
+    return False
+
+
+def place_in_prefectures(place: Dict, prefectures: List[str]) -> bool:
+    """検索結果が対象都道府県内か
+    座標の矩形判定で確定できればそれを使い、隣県の矩形とも重なる境界付近・どの矩形にも入らない離島（石垣・八丈島など）・
+    座標なしの場合は resolve_prefecture（住所の都道府県、決まらなければ逆ジオコーダ）で判定する"""
+    targets = {normalize_prefecture(p) for p in prefectures}
+    address = place.get('formatted_address') or place.get('vicinity') or ''
+    loc = (place.get('geometry') or {}).get('location') or {}
+    if 'lat' not in loc:
+        return resolve_prefecture(address) in targets
+    hits = [p for p, bounds in PREFECTURE_BOUNDS.items() if in_bounds(loc['lat'], loc['lng'], bounds)]
+    inside = [p for p in hits if p in targets]
+    if hits and not inside:
+        return False
+    if hits and len(inside) == len(hits):
+        return True
+    return resolve_prefecture(address, loc['lat'], loc['lng']) in targets
+
+
+def find_prefecture(text: str, prefectures: List[str]) -> Optional[str]:
+    """テキスト（クエリ等）に含まれる最初の都道府県名"""
+    for pref in prefectures:
+        if pref in text:
+            return pref
+    return None
+
+
+def resolve_prefecture(address: Optional[str], lat: Optional[float] = None,
+                       lng: Optional[float] = None) -> Optional[str]:
+    """住所から都道府県（短縮名）を判定し、決まらなければ座標で判定（utils/region_resolver.py に委譲）"""
+    from utils.region_resolver import resolve_prefecture as _resolve   # region_resolver がこのモジュールを参照するため
+    return _resolve(address, lat, lng)
+
+
+def prefecture_at(lat, lng) -> Optional[str]:
+    """座標の矩形で都道府県を判定（複数の矩形に入る境界付近は県庁所在地が最も近いもの）"""
+    if lat is None or lng is None:
+        return None
+    lat, lng = float(lat), float(lng)
+    hits = [p for p, bounds in PREFECTURE_BOUNDS.items() if in_bounds(lat, lng, bounds)]
+    if len(hits) <= 1:
+        return hits[0] if hits else None
+    return min(hits, key=lambda p: _distance_km(lat, lng, *PREFECTURE_CENTERS[p]))
+
+
+def region_code_of(prefecture: Optional[str]) -> Optional[str]:
+    """都道府県 → 地方コード（REGION_PREFECTURES のキー）"""
+    return PREFECTURE_REGION.get(normalize_prefecture(prefecture)) if prefecture else None
+
+
+def _distance_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    mid = (lat1 + lat2) / 2
+    return math.hypot((lat1 - lat2) * KM_PER_DEG_LAT, (lng1 - lng2) * km_per_deg_lng(mid))
+
+
+def _bias(lat: float, lng: float, radius_m: float) -> Dict[str, object]:
+    return {'location': f"{lat:.4f},{lng:.4f}", 'radius': int(min(radius_m, MAX_BIAS_RADIUS))}
+
+
+def prefecture_bias(prefecture: str) -> Optional[Dict[str, object]]:
+    """県庁所在地を中心に、県の矩形の角までを覆う半径（上限50km）の location/radius"""
+    pref = normalize_prefecture(prefecture)
+    center = PREFECTURE_CENTERS.get(pref)
+    bounds = PREFECTURE_BOUNDS.get(pref)
+    if not center or not bounds:
+        return None
+    south, west, north, east = bounds
+    radius_km = max(_distance_km(center[0], center[1], lat, lng)
+                    for lat in (south, north) for lng in (west, east))
+    return _bias(center[0], center[1], radius_km * 1000)
+
+
+def area_bias(name: str) -> Optional[Dict[str, object]]:
+    """都市名なら都市中心、都道府県名なら prefecture_bias"""
+    if name in CITY_CENTERS:
+        lat, lng, radius_km = CITY_CENTERS[name]
+        return _bias(lat, lng, radius_km * 1000)
+    return prefecture_bias(name)
+
+
+def region_bias(prefectures: List[str]) -> Optional[Dict[str, object]]:
+    """複数都道府県（地方）全体の矩形中心と半径（上限50km）"""
+    boxes = [PREFECTURE_BOUNDS[p] for p in prefectures if p in PREFECTURE_BOUNDS]
+    if not boxes:
+        return None
+    south = min(b[0] for b in boxes)
+    west = min(b[1] for b in boxes)
+    north = max(b[2] for b in boxes)
+    east = max(b[3] for b in boxes)
+    lat, lng = (south + north) / 2, (west + east) / 2
+    return _bias(lat, lng, _distance_km(lat, lng, north, east) * 1000)
+
+
+def km_per_deg_lng(lat: float) -> float:
+    return 111.32 * math.cos(math.radians(lat))
+
+
+def tile_bounds(bounds: Tuple[float, float, float, float], cell_km: float) -> List[Tuple[float, float, float, float]]:
+    """矩形を一辺約cell_kmのセルに分割（南西から順）"""
+    south, west, north, east = bounds
+    mid_lat = (south + north) / 2
+    dlat = cell_km / KM_PER_DEG_LAT
+    dlng = cell_km / km_per_deg_lng(mid_lat)
+    rows = max(1, math.ceil((north - south) / dlat))
+    cols = max(1, math.ceil((east - west) / dlng))
+    h = (north - south) / rows
+    w = (east - west) / cols
+    return [
+        (south + r * h, west + c * w, south + (r + 1) * h, west + (c + 1) * w)
+        for r in range(rows) for c in range(cols)
+    ]
+
+
+def split_bounds(bounds: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
+    """セルを4分割"""
+    south, west, north, east = bounds
+    mlat = (south + north) / 2
+    mlng = (west + east) / 2
+    return [
+        (south, west, mlat, mlng), (south, mlng, mlat, east),
+        (mlat, west, north, mlng), (mlat, mlng, north, east),
+    ]
+
+
+def cell_circle(bounds: Tuple[float, float, float, float]) -> Tuple[float, float, int]:
+    """セルの外接円（中心lat, lng, 半径m）"""
+    south, west, north, east = bounds
+    lat = (south + north) / 2
+    lng = (west + east) / 2
+    h_km = (north - south) * KM_PER_DEG_LAT
+    w_km = (east - west) * km_per_deg_lng(lat)
+    radius = int(math.ceil(math.hypot(h_km, w_km) / 2 * 1000))
+    return lat, lng, min(radius, 50000)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+冗長クエリの剪定（結果重複度ベース）
+- キャッシュ済みText Search結果の place_id 集合からペアワイズJaccard係数を計算
+- 閾値以上のクエリ同士を単連結でクラスタ化し、各クラスタの代表クエリのみ残す
+- 剪定結果は .cache/pruned_queries.json に保存し、各コレクタから参照する
+"""
+
+import os
+import json
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+_BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+PRUNED_QUERIES_PATH = os.path.join(_BASE_DIR, ".cache", "pruned_queries.json")
+
+DEFAULT_THRESHOLD = float(os.getenv("QUERY_PRUNE_THRESHOLD", "0.8"))
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """2集合のJaccard係数（両方空なら0）"""
+    if not a and not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def cluster_queries(query_sets: Dict[str, Set[str]], threshold: float = DEFAULT_THRESHOLD) -> List[List[str]]:
+    """Jaccard >= threshold のペアを辺とみなし、連結成分ごとにクエリをまとめる。
+    結果集合が空のクエリは比較対象外（単独クラスタ）。順序は入力順を維持。
+    """
+    queries = list(query_sets.keys())
+    parent = {q: q for q in queries}
+
+    def find(q: str) -> str:
+        while parent[q] != q:
+            parent[q] = parent[parent[q]]
+            q = parent[q]
+        return q
+
+    for i, qa in enumerate(queries):
+        sa = query_sets[qa]
+        if not sa:
+            continue
+        for qb in queries[i + 1:]:
+            sb = query_sets[qb]
+            if sb and jaccard(sa, sb) >= threshold:
+                ra, rb = find(qa), find(qb)
+                if ra != rb:
+                    parent[rb] = ra
+
+    clusters: Dict[str, List[str]] = {}
+    for q in queries:
+        clusters.setdefault(find(q), []).append(q)
+    return list(clusters.values())
+
+
+def prune_queries(queries: List[str], query_sets: Dict[str, Set[str]],
+                  threshold: float = DEFAULT_THRESHOLD) -> Dict:
+    """クエリ列を剪定する。
+    - 計測済み(query_setsにある)クエリはクラスタ代表（結果件数最大、同数なら先勝ち）のみ残す
+    - 未計測クエリは判断材料が無いので常に残す
+    戻り値: {'keep': [...], 'drop': {dropped_query: representative}, 'clusters': [[...], ...]}
+    """
+    measured = {q: query_sets[q] for q in queries if q in query_sets}
+    clusters = cluster_queries(measured, threshold)
+
+    drop: Dict[str, str] = {}
+    multi = []
+    for members in clusters:
+        if len(members) < 2:
+            continue
+        rep = max(members, key=lambda q: len(measured[q]))
+        for q in members:
+            if q != rep:
+                drop[q] = rep
+        multi.append(members)
+
+    keep = [q for q in queries if q not in drop]
+    return {'keep': keep, 'drop': drop, 'clusters': multi}
+
+
+def save_pruned_queries(plan: Dict[str, Dict[str, Dict]], threshold: float,
+                        path: str = PRUNED_QUERIES_PATH):
+    """カテゴリ→都道府県(または地域)→剪定結果 を保存"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = {
+        'generated_at': int(time.time()),
+        'threshold': threshold,
+        'categories': plan,
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def load_pruned_queries(path: str = PRUNED_QUERIES_PATH) -> Dict:
+    """保存済みの剪定結果を読む（無ければ空）"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def redundant_queries(category: str, area: Optional[str] = None,
+                      pruned: Optional[Dict] = None) -> Set[str]:
+    """指定カテゴリ（と都道府県/地域）で冗長と判定されたクエリ集合"""
+    pruned = load_pruned_queries() if pruned is None else pruned
+    areas = (pruned.get('categories') or {}).get(category) or {}
+    if area is not None:
+        return set((areas.get(area) or {}).get('drop', {}).keys())
+    dropped: Set[str] = set()
+    for result in areas.values():
+        dropped.update((result or {}).get('drop', {}).keys())
+    return dropped
+
+
+def apply_pruning(queries: Iterable[str], category: str, area: Optional[str] = None,
+                  pruned: Optional[Dict] = None) -> List[str]:
+    """コレクタ向け: クエリ列から冗長クエリを除いたものを返す（順序維持）"""
+    dropped = redundant_queries(category, area, pruned)
+    return [q for q in queries if q not in dropped]
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+全カテゴリ × 都道府県のクォータ配分と作業計画
+- 追加クォータはカテゴリごとに決める（既存件数と目標件数から、都道府県の不足を優先: deficit_first_quotas）
+  カテゴリ間で件数を融通する最適化はしない
+- 全カテゴリ横断で扱うのはコールの割り当てのみ。1クエリあたりの期待新規件数（実績ベース、逓減あり）を使い、
+  「1コールあたりの期待増分 × 不足率」が最大のセルから順にコールを割り当てる
+- API予算（総コール数）を与えると、予算内で到達可能な件数と不足を事前に算出する
+- 実行時の取りこぼし（検索結果が見込みに届かない都道府県）は呼び出し側の再配分で補う（fetch_onsen_tokyo の realloc フェーズ）
+"""
+
+import os
+import json
+import heapq
+from typing import Dict, List, Optional
+
+_BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+YIELDS_PATH = os.path.join(_BASE_DIR, ".cache", "query_yields.json")
+
+DEFAULT_YIELD = float(os.getenv("QUOTA_DEFAULT_YIELD", "3.0"))  # 1クエリあたり新規件数の事前値
+YIELD_DECAY = 0.85          # 同一セルでクエリを重ねるごとの期待値の逓減率
+PRIOR_WEIGHT = 3.0          # 事前値の重み（擬似クエリ数）
+DEFAULT_MAX_CALLS = 20      # 1セルあたりの上限コール数
+
+
+def even_split(total: int, keys: List[str]) -> Dict[str, int]:
+    """totalをkeysへ均等配分（余りは先頭から1件ずつ）"""
+    if not keys:
+        return {}
+    base = total // len(keys)
+    rem = total % len(keys)
+    return {k: base + (1 if i < rem else 0) for i, k in enumerate(keys)}
+
+
+def deficit_first_quotas(full_target: int, remaining: int, prefectures: List[str],
+                         existing_counts: Dict[str, int]) -> Dict[str, int]:
+    """理想配分(full_targetの均等割)に対する不足が大きい都道府県から remaining を配分"""
+    ideal = even_split(full_target, prefectures)
+    deficits = {p: max(0, ideal[p] - existing_counts.get(p, 0)) for p in prefectures}
+    if sum(deficits.values()) == 0:
+        return even_split(remaining, prefectures)
+
+    quotas = {p: 0 for p in prefectures}
+    need = remaining
+    ordered = sorted(deficits.items(), key=lambda x: x[1], reverse=True)
+    # ラウンドロビンで不足を消化
+    while need > 0:
+        progress = 0
+        for pref, deficit in ordered:
+            if need <= 0:
+                break
+            if quotas[pref] >= deficit:
+                continue
+            quotas[pref] += 1
+            need -= 1
+            progress += 1
+        if progress == 0:
+            break
+    # 未割当があれば均等配分
+    if need > 0:
+        for p, v in even_split(need, prefectures).items():
+            quotas[p] += v
+    return quotas
+
+
+class YieldStats:
+    """カテゴリ×都道府県ごとのクエリ実績（コール数・新規件数）"""
+
+    def __init__(self, path: str = YIELDS_PATH):
+        self.path = path
+        self.data: Dict[str, Dict[str, int]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                self.data = {}
+
+    def record(self, category: str, prefecture: str, added: int):
+        cell = self.data.setdefault(f"{category}:{prefecture}", {'calls': 0, 'added': 0})
+        cell['calls'] += 1
+        cell['added'] += int(added)
+
+    def expected(self, category: str, prefecture: str) -> float:
+        """事前値と実績を混合した1クエリあたり期待新規件数"""
+        cell = self.data.get(f"{category}:{prefecture}") or {'calls': 0, 'added': 0}
+        return (cell['added'] + DEFAULT_YIELD * PRIOR_WEIGHT) / (cell['calls'] + PRIOR_WEIGHT)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+
+class QuotaAllocator:
+    """カテゴリごとのクォータ配分と、全カテゴリ×都道府県を横断するコールの作業計画"""
+
+    def __init__(self, prefectures: List[str], targets: Dict[str, int],
+                 existing: Dict[str, Dict[str, int]], existing_totals: Dict[str, int],
+                 yields: Optional[YieldStats] = None, budget: Optional[int] = None,
+                 max_calls: int = DEFAULT_MAX_CALLS):
+        self.prefectures = prefectures
+        self.targets = targets
+        self.existing = existing
+        self.existing_totals = existing_totals
+        self.yields = yields or YieldStats()
+        self.budget = budget
+        self.max_calls = max_calls
+
+    def quotas(self) -> Dict[str, Dict[str, int]]:
+        """カテゴリごとの都道府県別追加クォータ（カテゴリ単位で決める。予算は考慮しない）"""
+        result = {}
+        for cat, full_target in self.targets.items():
+            remaining = full_target - self.existing_totals.get(cat, 0)
+            if remaining <= 0:
+                result[cat] = {p: 0 for p in self.prefectures}
+                continue
+            result[cat] = deficit_first_quotas(full_target, remaining, self.prefectures,
+                                               self.existing.get(cat, {}))
+        return result
+
+    def plan(self) -> Dict:
+        """コール単位の貪欲スケジューリング（quotas() の配分を固定し、予算内のコールを全セル横断で割り当てる）
+        優先度 = 次の1コールの期待増分 × (1 + 残り不足/クォータ)  … 不足率の高いセルを優先
+        戻り値:
+          quotas   : 追加クォータ（予算なしの場合の配分）
+          planned  : 予算内で到達見込みの追加件数（予算なしなら quotas と同じ）
+          calls    : セルごとの割当コール数
+          order    : 作業計画（セル単位、初回着手順）
+          category_order : カテゴリの着手順
+          shortfall: セルごとの見込み不足
+          budget_used : 割当コール総数
+        """
+        quotas = self.quotas()
+        gained = {c: {p: 0.0 for p in self.prefectures} for c in quotas}
+        calls = {c: {p: 0 for p in self.prefectures} for c in quotas}
+
+        def priority(cat: str, pref: str):
+            quota = quotas[cat][pref]
+            remaining = quota - gained[cat][pref]
+            if remaining <= 0 or calls[cat][pref] >= self.max_calls:
+                return None
+            step_yield = self.yields.expected(cat, pref) * (YIELD_DECAY ** calls[cat][pref])
+            gain = min(step_yield, remaining)
+            if gain <= 0.05:
+                return None
+            return gain, gain * (1.0 + remaining / quota)
+
+        heap = []
+        for cat in quotas:
+            for pref in self.prefectures:
+                pr = priority(cat, pref)
+                if pr:
+                    heapq.heappush(heap, (-pr[1], cat, pref))
+
+        order: List[Dict] = []
+        seen_cells = {}
+        used = 0
+        while heap and (self.budget is None or used < self.budget):
+            _, cat, pref = heapq.heappop(heap)
+            pr = priority(cat, pref)
+            if not pr:
+                continue
+            gain = pr[0]
+            calls[cat][pref] += 1
+            gained[cat][pref] += gain
+            used += 1
+            key = (cat, pref)
+            if key not in seen_cells:
+                seen_cells[key] = len(order)
+                order.append({'category': cat, 'prefecture': pref, 'calls': 0, 'expected': 0.0})
+            item = order[seen_cells[key]]
+            item['calls'] += 1
+            item['expected'] += gain
+            nxt = priority(cat, pref)
+            if nxt:
+                heapq.heappush(heap, (-nxt[1], cat, pref))
+
+        for item in order:
+            item['expected'] = round(item['expected'], 1)
+
+        if self.budget is None:
+            planned = quotas
+        else:
+            planned = {c: {p: min(quotas[c][p], int(round(gained[c][p]))) for p in self.prefectures}
+                       for c in quotas}
+        shortfall = {c: {p: max(0, quotas[c][p] - int(round(gained[c][p]))) for p in self.prefectures}
+                     for c in quotas}
+
+        category_order = []
+        for item in order:
+            if item['category'] not in category_order:
+                category_order.append(item['category'])
+        category_order += [c for c in quotas if c not in category_order]
+
+        return {
+            'quotas': quotas,
+            'planned': planned,
+            'calls': calls,
+            'order': order,
+            'category_order': category_order,
+            'shortfall': shortfall,
+            'budget_used': used,
+        }
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+cards.region の一括再判定
+- 読み込みはサーバーサイドカーソル（unbuffered）で id 順に chunk 件ずつ流す（全件をメモリに載せない）
+- 判定は utils/region_resolver.py の一括API（郵便番号 → 都道府県名の1回走査 → 座標の矩形。同じ住所は1回だけ判定）
+- 変更がある行だけ一時テーブル region_remap に executemany で入れ、chunk ごとに UPDATE ... JOIN 1回で反映
+- 結果は (変更前 → 変更後) ごとの件数に集約して表示。dry_run=True なら cards を更新しない
+読み込み用と書き込み用で接続を分ける（一時テーブルは書き込み側の接続にのみ存在する）
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from utils.db_pool import get_connection
+from utils.region_resolver import RegionResolver, resolver
+
+REMAP_CHUNK = 5000
+SAMPLE_LIMIT = 5
+
+
+def _create_stage(cursor):
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS region_remap")
+    cursor.execute("CREATE TEMPORARY TABLE region_remap (id BIGINT NOT NULL PRIMARY KEY, "
+                   "region VARCHAR(16) NOT NULL) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci")
+
+
+def _apply_chunk(cursor, changes: List[Tuple[int, str]]) -> int:
+    cursor.execute("DELETE FROM region_remap")
+    cursor.executemany("INSERT INTO region_remap (id, region) VALUES (%s, %s)", changes)
+    cursor.execute("UPDATE cards c JOIN region_remap r ON r.id = c.id SET c.region = r.region")
+    return cursor.rowcount
+
+
+def remap_regions(config: Dict, scheme: str = 'collector', chunk: int = REMAP_CHUNK,
+                  dry_run: bool = False, region_resolver: Optional[RegionResolver] = None) -> Dict[str, object]:
+    """cards.region を住所・座標から再判定して更新
+    戻り値: {'scanned', 'changed', 'unchanged', 'unresolved', 'updated', 'transitions': Counter, 'samples'}"""
+    region_resolver = region_resolver or resolver(scheme)
+    stats: Dict[str, object] = {'scanned': 0, 'changed': 0, 'unchanged': 0, 'unresolved': 0, 'updated': 0,
+                                'transitions': Counter(), 'samples': []}
+    reader = get_connection(config)
+    writer = get_connection(config)
+    read_cursor = reader.cursor(buffered=False)
+    write_cursor = writer.cursor()
+    try:
+        if not dry_run:
+            _create_stage(write_cursor)
+        read_cursor.execute("SELECT id, title, address, latitude, longitude, region FROM cards "
+                            "WHERE address IS NOT NULL OR latitude IS NOT NULL ORDER BY id")
+        while True:
+            rows = read_cursor.fetchmany(chunk)
+            if not rows:
+                break
+            changes = []
+            regions = region_resolver.regions([row[2] for row in rows], [(row[3], row[4]) for row in rows])
+            for (card_id, title, address, lat, lng, current), region in zip(rows, regions):
+                if not region:
+                    stats['unresolved'] += 1
+                    if len(stats['samples']) < SAMPLE_LIMIT:
+                        stats['samples'].append((card_id, title, address))
+                elif region != current:
+                    changes.append((card_id, region))
+                    stats['transitions'][(current, region)] += 1
+                else:
+                    stats['unchanged'] += 1
+            stats['scanned'] += len(rows)
+            stats['changed'] += len(changes)
+            if changes and not dry_run:
+                stats['updated'] += _apply_chunk(write_cursor, changes)
+                writer.commit()
+        return stats
+    except Exception:
+        writer.rollback()
+        raise
+    finally:
+        read_cursor.close()
+        write_cursor.close()
+        reader.close()
+        writer.close()
+
+
+def print_remap_result(stats: Dict[str, object], elapsed: float, region_names: Optional[Dict[str, str]] = None,
+                       dry_run: bool = False):
+    names = region_names or {}
+    label = '変更予定' if dry_run else '更新'
+    print(f"\n📊 地域再判定: {stats['scanned']}件を走査 ({elapsed:.1f}秒)")
+    print(f"   ✅ {label}: {stats['changed']}件" + ('' if dry_run else f"（反映 {stats['updated']}件）"))
+    print(f"   ⏸️ 変更なし: {stats['unchanged']}件")
+    print(f"   ❌ 判定不可: {stats['unresolved']}件")
+    if stats['transitions']:
+        print("\n🔀 変更内容:")
+        for (before, after), count in stats['transitions'].most_common():
+            print(f"   {names.get(before, before) or '未設定'} → {names.get(after, after)}: {count}件")
+    for card_id, title, address in stats['samples']:
+        print(f"   ❓ 判定不可の例: ID {card_id} {(title or '')[:30]} (住所: {(address or '')[:50]})")
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+住所 → 都道府県 → 地方 の共通判定（各collector・地域修正ツールで共用）
+1. 〒郵便番号から都道府県を引く。郵便番号索引（utils/postal_index.py、7桁の二分探索）があればそれを使い、
+   無い・索引に無い番号は上3桁の表（都道府県をまたぐ上3桁は除外）で判定
+2. 都道府県の正式表記（東京都・京都府・〇〇県…）をトライ木から生成した正規表現1回の走査で探し、最初の出現を採る
+   （「東京都」内の「京都」には一致しない）
+3. 正式表記が無ければ短縮名（東京・京都…）で同様に探す
+住所で決まらず座標があれば utils/reverse_geocoder.py（都道府県ポリゴンのグリッド索引。無ければ矩形）で判定
+地方は REGION_SCHEMES の区分（collector / standard7 / eight / ja7 / ja8）で返し、lang='ja'/'en' でラベル化できる
+一覧をまとめて判定する prefectures() / regions() は同じ住所を1回だけ判定する
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.postal_index import postal_code, postal_index
+from utils.prefecture_geo import (
+    PREFECTURE_FULL_NAMES, REGION_LABELS, REGION_SCHEMES, normalize_prefecture,
+)
+from utils.reverse_geocoder import locate_prefecture, locate_prefectures
+
+# 郵便番号の上3桁 (開始, 終了, 都道府県)
+POSTAL_PREFIX_RANGES: Tuple[Tuple[int, int, str], ...] = (
+    (1, 9, '北海道'), (10, 19, '秋田'), (20, 29, '岩手'), (30, 39, '青森'), (40, 99, '北海道'),
+    (100, 208, '東京'), (210, 259, '神奈川'), (260, 299, '千葉'), (300, 319, '茨城'), (320, 329, '栃木'),
+    (330, 369, '埼玉'), (370, 379, '群馬'), (380, 399, '長野'), (400, 409, '山梨'), (410, 439, '静岡'),
+    (440, 499, '愛知'), (500, 509, '岐阜'), (510, 519, '三重'), (520, 529, '滋賀'), (530, 599, '大阪'),
+    (600, 629, '京都'), (630, 639, '奈良'), (640, 649, '和歌山'), (650, 679, '兵庫'), (680, 689, '鳥取'),
+    (690, 699, '島根'), (700, 719, '岡山'), (720, 739, '広島'), (740, 759, '山口'), (760, 769, '香川'),
+    (770, 779, '徳島'), (780, 789, '高知'), (790, 799, '愛媛'), (800, 839, '福岡'), (840, 849, '佐賀'),
+    (850, 859, '長崎'), (860, 869, '熊本'), (870, 879, '大分'), (880, 889, '宮崎'), (890, 899, '鹿児島'),
+    (900, 909, '沖縄'), (910, 919, '福井'), (920, 929, '石川'), (930, 939, '富山'), (940, 959, '新潟'),
+    (960, 979, '福島'), (980, 989, '宮城'), (990, 999, '山形'),
+)
+# 上3桁が都道府県をまたぐもの（498: 愛知/三重、684: 鳥取/島根、811: 福岡/長崎、871: 大分/福岡）
+AMBIGUOUS_POSTAL_PREFIXES = frozenset({498, 684, 811, 871})
+# 対馬（817）は上の範囲では福岡になるため個別に指定
+_POSTAL_OVERRIDES = {817: '長崎'}
+
+_POSTAL_RE = re.compile(r'〒\s*([0-9０-９]{3})\s*[-－ー‐]?\s*[0-9０-９]{4}')
+_ZENKAKU_DIGITS = str.maketrans('０１２３４５６７８９', '0123456789')
+
+
+def _postal_table() -> List[Optional[str]]:
+    table: List[Optional[str]] = [None] * 1000
+    for start, end, pref in POSTAL_PREFIX_RANGES:
+        for prefix in range(start, end + 1):
+            table[prefix] = pref
+    for prefix, pref in _POSTAL_OVERRIDES.items():
+        table[prefix] = pref
+    for prefix in AMBIGUOUS_POSTAL_PREFIXES:
+        table[prefix] = None
+    return table
+
+
+_POSTAL_TABLE = _postal_table()
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """語の集合をトライ木に畳んだ正規表現（共通の先頭文字を1回だけ比較し、同じ位置では最長の語に一致）"""
+    root: Dict[str, dict] = {}
+    for word in words:
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        terminal = '' in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            return '(?:' + body + ')?'
+        return body
+
+    return build(root)
+
+
+_FULL_RE = re.compile(trie_pattern(PREFECTURE_FULL_NAMES.values()))
+_SHORT_RE = re.compile(trie_pattern(PREFECTURE_FULL_NAMES))
+_FULL_TO_SHORT = {full: short for short, full in PREFECTURE_FULL_NAMES.items()}
+
+
+def postal_prefecture(address: Optional[str]) -> Optional[str]:
+    """住所中の〒郵便番号から都道府県（短縮名）。判定できなければ None"""
+    if not address:
+        return None
+    i = address.find('〒')
+    if i < 0:
+        return None
+    index = postal_index()
+    if index is not None:
+        pref = index.prefecture(postal_code(address))
+        if pref:
+            return pref
+    head = address[i + 1:i + 4]
+    if head.isdigit() and head.isascii():
+        return _POSTAL_TABLE[int(head)]
+    # 全角数字・空白入りの表記
+    m = _POSTAL_RE.match(address, i)
+    if not m:
+        return None
+    return _POSTAL_TABLE[int(m.group(1).translate(_ZENKAKU_DIGITS))]
+
+
+def municipality(address: Optional[str]) -> Optional[str]:
+    """住所中の〒郵便番号から市区町村（郵便番号索引がある場合のみ。無ければ None）"""
+    index = postal_index()
+    if index is None or not address:
+        return None
+    return index.municipality(postal_code(address))
+
+
+def text_prefecture(address: Optional[str]) -> Optional[str]:
+    """住所の文字列のみから都道府県（短縮名）。正式表記 → 短縮名 の順"""
+    if not address:
+        return None
+    m = _FULL_RE.search(address)
+    if m:
+        return _FULL_TO_SHORT[m.group(0)]
+    m = _SHORT_RE.search(address)
+    return m.group(0) if m else None
+
+
+def address_prefecture(address: Optional[str]) -> Optional[str]:
+    """住所から都道府県（短縮名）。郵便番号 → 正式表記 → 短縮名 の順"""
+    if not address:
+        return None
+    return postal_prefecture(address) or text_prefecture(address)
+
+
+def resolve_prefecture(address: Optional[str], lat=None, lng=None) -> Optional[str]:
+    """住所で判定し、決まらなければ座標で判定"""
+    return address_prefecture(address) or locate_prefecture(lat, lng)
+
+
+def full_name(prefecture: Optional[str]) -> Optional[str]:
+    """短縮名 → 正式表記（東京 → 東京都）"""
+    if not prefecture:
+        return None
+    return PREFECTURE_FULL_NAMES.get(normalize_prefecture(prefecture))
+
+
+def region_label(region: Optional[str], lang: str = 'ja') -> Optional[str]:
+    """地方コード → ラベル（lang は 'ja' / 'en'）"""
+    labels = REGION_LABELS.get(region) if region else None
+    if not labels:
+        return region
+    return labels[0] if lang == 'ja' else labels[1]
+
+
+class RegionResolver:
+    """住所（と座標）から都道府県・地方を判定。scheme は REGION_SCHEMES のキー"""
+
+    def __init__(self, scheme: str = 'collector', lang: Optional[str] = None):
+        self.scheme = scheme
+        self.mapping = REGION_SCHEMES[scheme]
+        self.lang = lang
+
+    def _label(self, region: Optional[str]) -> Optional[str]:
+        return region_label(region, self.lang) if self.lang and region else region
+
+    def region_of(self, prefecture: Optional[str]) -> Optional[str]:
+        """都道府県（短縮名・正式表記どちらでも）→ 地方"""
+        if not prefecture:
+            return None
+        return self._label(self.mapping.get(normalize_prefecture(prefecture)))
+
+    def prefecture(self, address: Optional[str], lat=None, lng=None) -> Optional[str]:
+        return resolve_prefecture(address, lat, lng)
+
+    def region(self, address: Optional[str], lat=None, lng=None) -> Optional[str]:
+        return self.region_of(resolve_prefecture(address, lat, lng))
+
+    def prefectures(self, addresses: Sequence[Optional[str]],
+                    coords: Optional[Sequence[Tuple[object, object]]] = None) -> List[Optional[str]]:
+        """住所の一覧をまとめて判定（同じ住所は1回だけ判定。coords は住所と同じ順の (lat, lng)）"""
+        resolve = address_prefecture
+        found = {address: resolve(address) for address in dict.fromkeys(addresses)}
+        out = [found[address] for address in addresses]
+        if coords is not None:
+            missing = [i for i, pref in enumerate(out) if pref is None]
+            if missing:
+                located = locate_prefectures([coords[i][0] for i in missing], [coords[i][1] for i in missing])
+                for i, pref in zip(missing, located):
+                    out[i] = pref
+        return out
+
+    def regions(self, addresses: Sequence[Optional[str]],
+                coords: Optional[Sequence[Tuple[object, object]]] = None) -> List[Optional[str]]:
+        return [self.region_of(pref) for pref in self.prefectures(addresses, coords)]
+
+
+_resolvers: Dict[Tuple[str, Optional[str]], RegionResolver] = {}
+
+
+def resolver(scheme: str = 'collector', lang: Optional[str] = None) -> RegionResolver:
+    """scheme ごとに共有する RegionResolver"""
+    key = (scheme, lang)
+    if key not in _resolvers:
+        _resolvers[key] = RegionResolver(scheme, lang)
+    return _resolvers[key]
@@ -7,6 +7,8 @@ Google API 呼び出し用のガード/キャッシュ層
 - QPS制御（MAX_QPS env、デフォルト5）
 - 並列制限（MAX_CONCURRENCY env、デフォルト3）
 - Place Details 二重取得防止（place_idを一定期間メモ）
+- 実コール直前にAPI予算チェック（API_BUDGET_USD env、utils.api_budget）
+- 常駐プロセス向け: HTTPセッション（コネクションプール）共有とメモリLRUキャッシュ（MEM_CACHE_SIZE env、デフォルト1024）
 """
 
 import os
@@ -15,9 +17,13 @@ import json
 import sqlite3
 import threading
 import hashlib
+from collections import OrderedDict
 from contextlib import contextmanager
 from urllib.parse import urlencode
 import requests
+from requests.adapters import HTTPAdapter
+
+from utils import api_budget
 
 _BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 _CACHE_DIR = os.path.join(_BASE_DIR, ".cache")
@@ -29,6 +35,13 @@ _sem = threading.Semaphore(int(os.getenv("MAX_CONCURRENCY", "3")))
 _MAX_QPS = float(os.getenv("MAX_QPS", "5"))
 _last_req_ts = [0.0]
 
+_MEM_CACHE_SIZE = int(os.getenv("MEM_CACHE_SIZE", "1024"))
+_mem_cache = OrderedDict()   # k -> (updated_at, JSON文字列)
+_mem_lock = threading.Lock()
+_stats = {"mem_hits": 0, "db_hits": 0, "live_calls": 0}
+_db_ready = [False]
+_session_holder = []
+
 
 def _now() -> int:
     return int(time.time())
@@ -40,8 +53,50 @@ def _key(url: str, params: dict) -> str:
     return hashlib.sha256(s.encode()).hexdigest()
 
 
+def _session() -> requests.Session:
+    """プロセス共有のHTTPセッション（Keep-Aliveで接続を再利用）"""
+    with _lock:
+        if not _session_holder:
+            session = requests.Session()
+            pool = max(int(os.getenv("MAX_CONCURRENCY", "3")) * 2, 10)
+            session.mount("https://", HTTPAdapter(pool_connections=pool, pool_maxsize=pool))
+            _session_holder.append(session)
+        return _session_holder[0]
+
+
+def _mem_get(k: str, ttl_sec: int | None):
+    """メモリキャッシュから取得（呼び出し側で書き換えても共有されないよう毎回デコード）"""
+    with _mem_lock:
+        entry = _mem_cache.get(k)
+        if entry is None:
+            return None
+        if ttl_sec is not None and _now() - entry[0] > ttl_sec:
+            return None
+        _mem_cache.move_to_end(k)
+        _stats["mem_hits"] += 1
+    return json.loads(entry[1])
+
+
+def _mem_put(k: str, raw: str, updated_at: int):
+    if _MEM_CACHE_SIZE <= 0:
+        return
+    with _mem_lock:
+        _mem_cache[k] = (updated_at, raw)
+        _mem_cache.move_to_end(k)
+        while len(_mem_cache) > _MEM_CACHE_SIZE:
+            _mem_cache.popitem(last=False)
+
+
+def cache_stats() -> dict:
+    """メモリ/SQLiteキャッシュのヒット数と実コール数"""
+    with _mem_lock:
+        return dict(_stats, mem_entries=len(_mem_cache))
+
+
 def _open_db():
     conn = sqlite3.connect(_CACHE_DB)
+    if _db_ready[0]:
+        return conn
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS kv_cache (
@@ -59,6 +114,7 @@ def _open_db():
         )
         """
     )
+    _db_ready[0] = True
     return conn
 
 
@@ -75,30 +131,87 @@ def _rate_limit():
 
 
 def get_json(url: str, params: dict, ttl_sec: int = 60 * 60 * 24):
-    """GETしてJSON返す。TTL内はキャッシュを返す。"""
-    conn = _open_db()
+    """GETしてJSON返す。TTL内はキャッシュ（メモリ→SQLite）を返す。"""
     k = _key(url, params)
+    cached = _mem_get(k, ttl_sec)
+    if cached is not None:
+        return cached
+    conn = _open_db()
     row = conn.execute("SELECT v, updated_at FROM kv_cache WHERE k=?", (k,)).fetchone()
     if row and (_now() - row[1] <= ttl_sec):
         try:
+            _mem_put(k, row[0], row[1])
+            with _mem_lock:
+                _stats["db_hits"] += 1
             return json.loads(row[0])
         finally:
             conn.close()
 
+    try:
+        api_budget.charge(url)
+    except api_budget.BudgetExceeded:
+        conn.close()
+        raise
     with _rate_limit():
-        resp = requests.get(url, params=params, timeout=20)
+        resp = _session().get(url, params=params, timeout=20)
         resp.raise_for_status()
         data = resp.json()
+    with _mem_lock:
+        _stats["live_calls"] += 1
 
+    raw = json.dumps(data, ensure_ascii=False)
+    now = _now()
     conn.execute(
         "REPLACE INTO kv_cache(k, v, updated_at) VALUES(?,?,?)",
-        (k, json.dumps(data, ensure_ascii=False), _now()),
+        (k, raw, now),
     )
     conn.commit()
     conn.close()
+    _mem_put(k, raw, now)
     return data
 
 
+def peek_json(url: str, params: dict, ttl_sec: int | None = None):
+    """キャッシュのみ参照してJSONを返す（API呼び出しなし）。無ければNone。
+    ttl_secを省略した場合は期限切れのエントリも返す（分析用途）。
+    """
+    k = _key(url, params)
+    cached = _mem_get(k, ttl_sec)
+    if cached is not None:
+        return cached
+    conn = _open_db()
+    try:
+        row = conn.execute(
+            "SELECT v, updated_at FROM kv_cache WHERE k=?", (k,)
+        ).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return None
+    if ttl_sec is not None and _now() - row[1] > ttl_sec:
+        return None
+    return json.loads(row[0])
+
+
+def peek_many(url: str, params_list: list, ttl_sec: int | None = None, chunk: int = 500) -> list:
+    """peek_json の一括版（SQLiteへは chunk 件ずつ IN 検索）。params_list と同じ順で JSON または None を返す"""
+    keys = [_key(url, params) for params in params_list]
+    found = {}
+    conn = _open_db()
+    try:
+        for i in range(0, len(keys), chunk):
+            part = keys[i:i + chunk]
+            rows = conn.execute(
+                f"SELECT k, v, updated_at FROM kv_cache WHERE k IN ({','.join('?' * len(part))})", part
+            ).fetchall()
+            for k, v, updated_at in rows:
+                if ttl_sec is None or _now() - updated_at <= ttl_sec:
+                    found[k] = v
+    finally:
+        conn.close()
+    return [json.loads(found[k]) if k in found else None for k in keys]
+
+
 def already_fetched_place(place_id: str, ttl_sec: int = 60 * 60 * 24 * 14) -> bool:
     """直近ttl_sec以内に同じplace_idのDetailsを取得済みか。"""
     if not place_id:
@@ -122,13 +235,23 @@ def mark_fetched_place(place_id: str):
     conn.close()
 
 
-def get_photo_direct_url(photo_reference: str, maxwidth: int = 800, ttl_sec: int = 60*60*24*30) -> str | None:
-    """Places Photoの302先URLを長期キャッシュ。
-    直接URLを返すことでクライアントの都度API消費を防ぐ。
-    """
-    if not photo_reference:
-        return None
+def has_marker(k: str, ttl_sec: int | None = None) -> bool:
+    """汎用マーカー（グリッドセル完了等）が ttl_sec 以内に記録済みか。"""
+    conn = _open_db()
+    row = conn.execute("SELECT updated_at FROM marker WHERE k=?", (k,)).fetchone()
+    conn.close()
+    return bool(row and (ttl_sec is None or _now() - row[0] <= ttl_sec))
+
 
+def set_marker(k: str):
+    conn = _open_db()
+    conn.execute("REPLACE INTO marker(k, updated_at) VALUES(?, ?)", (k, _now()))
+    conn.commit()
+    conn.close()
+
+
+def photo_request(photo_reference: str, maxwidth: int = 800):
+    """Places PhotoのURL・パラメータ（キャッシュキー算出用）"""
     url = "https://maps.googleapis.com/maps/api/place/photo"
     api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GOOGLE_PLACES_API_KEY") or os.getenv("GOOGLE_MAPS_API_KEY")
     params = {
@@ -136,6 +259,17 @@ def get_photo_direct_url(photo_reference: str, maxwidth: int = 800, ttl_sec: int
         "photo_reference": photo_reference,
         "key": api_key,
     }
+    return url, params
+
+
+def get_photo_direct_url(photo_reference: str, maxwidth: int = 800, ttl_sec: int = 60*60*24*30) -> str | None:
+    """Places Photoの302先URLを長期キャッシュ。
+    直接URLを返すことでクライアントの都度API消費を防ぐ。
+    """
+    if not photo_reference:
+        return None
+
+    url, params = photo_request(photo_reference, maxwidth)
 
     conn = _open_db()
     k = _key(url, params)
@@ -155,8 +289,15 @@ def get_photo_direct_url(photo_reference: str, maxwidth: int = 800, ttl_sec: int
         conn.close()
         return payload.get("location")
 
+    try:
+        api_budget.charge(url)
+    except api_budget.BudgetExceeded:
+        conn.close()
+        raise
     with _rate_limit():
-        resp = requests.get(url, params=params, allow_redirects=False, timeout=15)
+        resp = _session().get(url, params=params, allow_redirects=False, timeout=15)
+    with _mem_lock:
+        _stats["live_calls"] += 1
     if resp.status_code == 302:
         loc = resp.headers.get("Location")
         payload = {"location": loc}
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+座標 → 都道府県 のオフライン逆ジオコーダ（住所の文字列解析・APIを使わない）
+- 都道府県ポリゴン（簡略化済み、離島を含む）から build_prefecture_grid.py で生成した一様グリッド索引を使う
+  data/prefecture_grid.bin を同梱（0.1度セル。echarts-countries-pypkg の Japan.js から生成）
+  - 各セルは「1つの都道府県の内部」「海など該当なし」「境界を含む」のいずれか（1バイト）
+  - 内部・該当なしのセルはセル番号の計算だけで即答
+  - 境界を含むセルは、その行（緯度帯）にかかる都道府県の辺だけで内外判定（東向きの半直線の交差数）
+    行内の辺の経度範囲に入らない都道府県は判定しない。どの都道府県にも入らない海岸付近は最も近い辺の都道府県
+- locate_prefectures() は緯度・経度の配列をまとめて判定（NumPy があればセル参照をベクトル化）
+索引ファイルが無い・範囲外・海上のセルは prefecture_geo.prefecture_at（矩形＋県庁所在地の距離）にフォールバック
+"""
+
+import os
+import sys
+import math
+import struct
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.prefecture_geo import prefecture_at
+
+try:
+    import numpy as np
+except ImportError:  # NumPy なし: 一括判定も1件ずつ
+    np = None
+
+_BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+GRID_PATH = os.getenv("PREFECTURE_GRID_PATH", os.path.join(_BASE_DIR, "data", "prefecture_grid.bin"))
+
+_MAGIC = b"PREFGRD1"
+# magic, south, west, step, 行数, 列数, 都道府県数, 帯の数, 辺の数
+_HEADER = struct.Struct("<8sdddIIIII")
+CELL_NONE = 0
+CELL_MIXED = 255
+
+Edge = Tuple[float, float, float, float]  # (lat1, lng1, lat2, lng2)
+Band = Tuple[str, float, float, List[Edge]]  # (都道府県, 経度の最小, 最大, 辺)
+
+
+def _little_endian(arr: array) -> array:
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+def _inside(lat: float, lng: float, edges: List[Edge]) -> bool:
+    inside = False
+    for y1, x1, y2, x2 in edges:
+        if (y1 > lat) != (y2 > lat) and lng < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+    return inside
+
+
+def _distance2(lat: float, lng: float, edges: List[Edge], kx: float) -> float:
+    """点から辺までの距離の2乗の最小（経度は kx 倍して緯度と同じ尺度に）"""
+    best = math.inf
+    px = lng * kx
+    for y1, x1, y2, x2 in edges:
+        ax, bx = x1 * kx, x2 * kx
+        dx, dy = bx - ax, y2 - y1
+        length2 = dx * dx + dy * dy
+        t = 0.0 if length2 == 0 else max(0.0, min(1.0, ((px - ax) * dx + (lat - y1) * dy) / length2))
+        ex, ey = ax + t * dx - px, y1 + t * dy - lat
+        best = min(best, ex * ex + ey * ey)
+    return best
+
+
+class PrefectureGrid:
+    """一様グリッド＋行ごとの辺の索引"""
+
+    def __init__(self, south: float, west: float, step: float, rows: int, cols: int, names: List[str],
+                 cells: bytes, band_rows: array, band_prefs: bytes, band_edges: array, edges: array):
+        self.south = south
+        self.west = west
+        self.step = step
+        self.rows = rows
+        self.cols = cols
+        self.names = names  # 1始まりのID → 都道府県（names[0] は None）
+        self.cells = cells
+        self.band_rows = band_rows  # 行 → 帯の範囲
+        self.band_prefs = band_prefs  # 帯 → 都道府県ID
+        self.band_edges = band_edges  # 帯 → 辺の範囲
+        self.edges = edges  # (lat1, lng1, lat2, lng2) の連続
+        self._bands: Dict[int, List[Band]] = {}
+
+    def cell(self, lat: float, lng: float) -> Tuple[int, int, int]:
+        """(行, 列, セルの値)。範囲外は値 CELL_NONE"""
+        r = int((lat - self.south) // self.step)
+        c = int((lng - self.west) // self.step)
+        if 0 <= r < self.rows and 0 <= c < self.cols:
+            return r, c, self.cells[r * self.cols + c]
+        return r, c, CELL_NONE
+
+    def bands(self, row: int) -> List[Band]:
+        """行（緯度帯）にかかる都道府県ごとの辺（初回に展開してキャッシュ）"""
+        found = self._bands.get(row)
+        if found is None:
+            found = []
+            edges = self.edges
+            for b in range(self.band_rows[row], self.band_rows[row + 1]):
+                start, end = self.band_edges[b], self.band_edges[b + 1]
+                band = [tuple(edges[i * 4:i * 4 + 4]) for i in range(start, end)]
+                lo = min(min(e[1], e[3]) for e in band)
+                hi = max(max(e[1], e[3]) for e in band)
+                found.append((self.names[self.band_prefs[b]], lo, hi, band))
+            self._bands[row] = found
+        return found
+
+    def resolve_mixed(self, lat: float, lng: float, row: int) -> Optional[str]:
+        """境界を含むセル内の点を判定"""
+        bands = self.bands(row)
+        for pref, lo, hi, edges in bands:
+            if lo <= lng <= hi and _inside(lat, lng, edges):
+                return pref
+        # どのポリゴンにも入らない（簡略化で削れた海岸・埋立地など）: 1セル以内で最も近い辺の都道府県
+        kx = math.cos(math.radians(lat))
+        best, best_d2 = None, self.step * self.step
+        for pref, lo, hi, edges in bands:
+            if lo - self.step <= lng <= hi + self.step:
+                d2 = _distance2(lat, lng, edges, kx)
+                if d2 < best_d2:
+                    best, best_d2 = pref, d2
+        return best
+
+    def prefecture(self, lat, lng) -> Optional[str]:
+        if lat is None or lng is None:
+            return None
+        lat, lng = float(lat), float(lng)
+        row, _, value = self.cell(lat, lng)
+        if value == CELL_MIXED:
+            return self.resolve_mixed(lat, lng, row)
+        return self.names[value] if value != CELL_NONE else None
+
+    @classmethod
+    def load(cls, path: str = GRID_PATH) -> "PrefectureGrid":
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, south, west, step, rows, cols, pref_count, band_count, edge_count = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError(f"都道府県グリッドの形式が不正です: {path}")
+        pos = _HEADER.size
+        names: List[Optional[str]] = [None]
+        for _ in range(pref_count):
+            size = data[pos]
+            names.append(data[pos + 1:pos + 1 + size].decode("utf-8"))
+            pos += 1 + size
+        cells = data[pos:pos + rows * cols]
+        pos += rows * cols
+        band_rows = array("I")
+        band_rows.frombytes(data[pos:pos + 4 * (rows + 1)])
+        pos += 4 * (rows + 1)
+        band_prefs = data[pos:pos + band_count]
+        pos += band_count
+        band_edges = array("I")
+        band_edges.frombytes(data[pos:pos + 4 * (band_count + 1)])
+        pos += 4 * (band_count + 1)
+        edges = array("d")
+        edges.frombytes(data[pos:pos + 32 * edge_count])
+        _little_endian(band_rows), _little_endian(band_edges), _little_endian(edges)
+        return cls(south, west, step, rows, cols, names, cells, band_rows, band_prefs, band_edges, edges)
+
+    @staticmethod
+    def write(path: str, south: float, west: float, step: float, rows: int, cols: int, names: List[str],
+              cells: bytearray, row_bands: List[List[Tuple[int, List[Edge]]]]):
+        """row_bands: 行ごとの [(都道府県ID, 辺の一覧)]"""
+        band_rows, band_prefs, band_edges, edges = array("I", [0]), bytearray(), array("I", [0]), array("d")
+        for bands in row_bands:
+            for pref_id, band in bands:
+                band_prefs.append(pref_id)
+                for edge in band:
+                    edges.extend(edge)
+                band_edges.append(len(edges) // 4)
+            band_rows.append(len(band_prefs))
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, south, west, step, rows, cols, len(names), len(band_prefs), len(edges) // 4))
+            for name in names:
+                encoded = name.encode("utf-8")
+                f.write(bytes([len(encoded)]) + encoded)
+            f.write(bytes(cells))
+            f.write(_little_endian(band_rows).tobytes())
+            f.write(bytes(band_prefs))
+            f.write(_little_endian(band_edges).tobytes())
+            f.write(_little_endian(edges).tobytes())
+        os.replace(tmp, path)
+
+
+_grid: Optional[PrefectureGrid] = None
+_loaded = False
+
+
+def prefecture_grid() -> Optional[PrefectureGrid]:
+    """GRID_PATH の索引（プロセス内で1回だけ読み込む）。ファイルが無ければ None"""
+    global _grid, _loaded
+    if not _loaded:
+        _loaded = True
+        if os.path.exists(GRID_PATH):
+            try:
+                _grid = PrefectureGrid.load(GRID_PATH)
+            except (OSError, ValueError, struct.error) as e:
+                print(f"⚠️ 都道府県グリッドを読み込めません（矩形で判定します）: {e}")
+    return _grid
+
+
+def locate_prefecture(lat, lng) -> Optional[str]:
+    """座標 → 都道府県（短縮名）。グリッドで決まらなければ矩形で判定"""
+    if lat is None or lng is None:
+        return None
+    grid = prefecture_grid()
+    if grid is not None:
+        pref = grid.prefecture(lat, lng)
+        if pref:
+            return pref
+    return prefecture_at(lat, lng)
+
+
+def locate_prefectures(lats: Sequence, lngs: Sequence) -> List[Optional[str]]:
+    """座標の配列をまとめて判定（lats / lngs は同じ長さ。None・NaN は None）"""
+    grid = prefecture_grid()
+    if grid is None or np is None:
+        return [locate_prefecture(lat, lng) for lat, lng in zip(lats, lngs)]
+
+    lat_arr = np.asarray(lats, dtype=float)
+    lng_arr = np.asarray(lngs, dtype=float)
+    rows = np.floor((lat_arr - grid.south) / grid.step)
+    cols = np.floor((lng_arr - grid.west) / grid.step)
+    valid = (rows >= 0) & (rows < grid.rows) & (cols >= 0) & (cols < grid.cols)  # NaN は False
+    flat = np.where(valid, rows * grid.cols + cols, 0).astype(np.int64)
+    values = np.where(valid, np.frombuffer(grid.cells, dtype=np.uint8)[flat], CELL_NONE)
+
+    names = np.array(grid.names + [None] * (256 - len(grid.names)), dtype=object)
+    out = names[values].tolist()
+    for i in np.flatnonzero(values == CELL_MIXED).tolist():
+        out[i] = grid.resolve_mixed(float(lat_arr[i]), float(lng_arr[i]), int(rows[i]))
+    missing = np.array([pref is None for pref in out], dtype=bool) & ~np.isnan(lat_arr) & ~np.isnan(lng_arr)
+    for i in np.flatnonzero(missing).tolist():
+        out[i] = prefecture_at(float(lat_arr[i]), float(lng_arr[i]))
+    return out
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+他カテゴリの検索結果からの候補の取り込み（1回の Text Search で複数カテゴリを収集）
+- harvest() は検索結果を utils/category_matcher.py で全カテゴリについて1回で判定し、
+  収集中のカテゴリに一致したものを返す。他カテゴリに一致したものはそのカテゴリの候補プールへ入れる
+  （例: 「岩盤浴 東京」の relax_onsen 検索で見つかったサウナ → active_sauna のプール）
+- プールはカテゴリ × 都道府県ごとに上限（そのカテゴリの都道府県別クォータ）までしか貯めない
+- fill() はカテゴリの収集開始時にプールの候補をクォータの範囲で取り込み、そのカテゴリのプールを閉じる
+  （以降そのカテゴリには貯めない）
+状態はJSONにできる dict（カテゴリ → 都道府県 → {place_id: place}）で、チェックポイントに保存すれば中断後も引き継ぐ
+"""
+
+from typing import Collection, Dict, List, Optional, Sequence
+
+from utils.category_matcher import CategoryMatcher
+from utils.region_resolver import address_prefecture
+
+
+class SpilloverPools:
+    """カテゴリ × 都道府県ごとの候補プール"""
+
+    def __init__(self, matcher: CategoryMatcher, prefectures: Sequence[str], caps: Dict[str, Dict[str, int]],
+                 state: Optional[Dict[str, Dict[str, Dict[str, Dict]]]] = None):
+        """caps: カテゴリ → 都道府県 → 貯める上限。caps に無いカテゴリには貯めない"""
+        self.matcher = matcher
+        self.prefectures = list(prefectures)
+        self.prefecture_set = set(self.prefectures)
+        self.caps = {category: dict(quotas) for category, quotas in caps.items()}
+        self.state = state if state is not None else {}
+        self.offered = 0
+
+    def prefecture_of(self, place: Dict) -> Optional[str]:
+        """formatted_address の都道府県（utils/region_resolver）。対象外なら None
+        （`pref in address` だと「東京都」の住所が「京都」に一致するため、住所を判定してから照合する）"""
+        pref = address_prefecture(place.get('formatted_address'))
+        return pref if pref in self.prefecture_set else None
+
+    def offer(self, category: str, place: Dict, exclude_ids: Collection[str] = ()) -> bool:
+        """category のプールに place を入れる（上限超過・既存・対象外の都道府県なら入れない）"""
+        quotas = self.caps.get(category)
+        place_id = place.get('place_id')
+        if not quotas or not place_id or place_id in exclude_ids:
+            return False
+        pref = self.prefecture_of(place)
+        if pref is None:
+            return False
+        pool = self.state.setdefault(category, {}).setdefault(pref, {})
+        if place_id in pool or len(pool) >= quotas.get(pref, 0):
+            return False
+        pool[place_id] = place
+        self.offered += 1
+        return True
+
+    def harvest(self, places: List[Dict], category: str, exclude_ids: Collection[str] = ()) -> List[Dict]:
+        """places のうち category に一致するもの（filter_places_by_category と同じ結果）。他カテゴリの一致はプールへ"""
+        matched = self.matcher.classify(places)
+        for other, found in matched.items():
+            if other == category or other not in self.caps:
+                continue
+            for place in found:
+                self.offer(other, place, exclude_ids)
+        return matched.get(category, [])
+
+    def fill(self, category: str, collected: Dict[str, Dict], counts: Dict[str, int], quotas: Dict[str, int],
+             exclude_ids: Collection[str] = ()) -> int:
+        """category のプールから collected へクォータの範囲で取り込み、プールを閉じる。戻り値は取り込んだ件数"""
+        added = 0
+        for pref, pool in self.state.pop(category, {}).items():
+            for place_id, place in pool.items():
+                if counts.get(pref, 0) >= quotas.get(pref, 0):
+                    break
+                if place_id in collected or place_id in exclude_ids:
+                    continue
+                collected[place_id] = place
+                counts[pref] = counts.get(pref, 0) + 1
+                added += 1
+        self.close(category)
+        return added
+
+    def close(self, category: str):
+        """category には以降貯めない"""
+        self.caps.pop(category, None)
+        self.state.pop(category, None)
+
+    def sizes(self) -> Dict[str, int]:
+        return {category: sum(len(pool) for pool in pools.values()) for category, pools in self.state.items()}
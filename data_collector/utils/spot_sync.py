@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+development.spots → production.cards の変換と差分同期
+- spot_to_card: spots の1行を cards の列に変換（migrate_to_production.py の全件移行と共用）
+- SpotCardSync: spots の (updated_at, id) 水位線より後の行だけを順に読み、place_id をキーに cards へ upsert
+  - バッチ単位で upsert と水位線の更新（本番DBの sync_watermarks）を同じトランザクションでcommit
+  - updated_at は秒精度のため、毎回水位線の SYNC_OVERLAP_SEC 秒前から読み直す（upsert なので再適用しても同じ結果）
+  - columns を座標などに絞ると既存カードの更新のみ（新規カードは作らない）
+"""
+
+import os
+import json
+import time
+from datetime import timedelta
+from typing import Dict, Optional, Sequence
+
+from utils.card_prefecture import prefecture_fields
+from utils.db_pool import get_connection
+
+SYNC_BATCH = int(os.getenv("SYNC_BATCH", "500"))
+SYNC_OVERLAP_SEC = int(os.getenv("SYNC_OVERLAP_SEC", "1"))
+
+CARD_SYNC_COLUMNS = (
+    'genre', 'title', 'rating', 'review_count', 'image_url', 'external_link', 'region',
+    'address', 'latitude', 'longitude', 'place_id', 'prefecture', 'region_code',
+)
+
+SPOT_SELECT_COLUMNS = (
+    'place_id', 'name', 'category', 'address', 'latitude', 'longitude', 'rating',
+    'user_ratings_total', 'website', 'region', 'image_urls', 'fallback_image_url',
+)
+SPOT_SELECT = f"SELECT {', '.join(SPOT_SELECT_COLUMNS)} FROM spots WHERE name IS NOT NULL"
+
+# cards の列長（超える値は切り詰める）
+COLUMN_LIMITS = {'title': 128, 'image_url': 1000, 'external_link': 256, 'region': 16, 'address': 128}
+# 移行元が NULL の場合は本番の値を残す列
+KEEP_IF_NULL = ('latitude', 'longitude', 'prefecture', 'region_code')
+
+CATEGORY_MAP = {
+    "温泉": "relax",
+    "relax_onsen": "relax",
+    "relax_onsen_test": "relax",
+    "onsen": "relax"
+}
+
+
+def normalize_category(category: Optional[str]) -> str:
+    """カテゴリ名の正規化"""
+    if not category:
+        return "relax"
+    return CATEGORY_MAP.get(category, "relax")
+
+
+def spot_to_card(spot: Sequence) -> tuple:
+    """spots の1行（SPOT_SELECT の列順）を CARD_SYNC_COLUMNS 順のタプルに変換"""
+    (place_id, name, category, address, latitude, longitude, rating,
+     user_ratings_total, website, region, image_urls_json, fallback_image_url) = spot
+
+    # 画像URL決定（永続URL優先、なければフォールバック）
+    image_url = fallback_image_url
+    if image_urls_json:
+        try:
+            image_urls = json.loads(image_urls_json)
+            if image_urls and 'url' in image_urls[0]:
+                image_url = image_urls[0]['url']
+        except (json.JSONDecodeError, TypeError, KeyError):
+            pass
+
+    card = {
+        'genre': normalize_category(category),
+        'title': name,
+        'rating': rating if rating else 0.0,
+        'review_count': user_ratings_total if user_ratings_total else 0,
+        'image_url': image_url,
+        # websiteがあればそれを、なければGoogle検索
+        'external_link': website if website else f"https://www.google.com/search?q={name}",
+        'region': region,
+        'address': address,
+        'latitude': latitude,
+        'longitude': longitude,
+        'place_id': place_id,
+    }
+    card['prefecture'], card['region_code'] = prefecture_fields(address, latitude, longitude)
+    for column, limit in COLUMN_LIMITS.items():
+        if isinstance(card[column], str) and len(card[column]) > limit:
+            card[column] = card[column][:limit]
+    return tuple(card[col] for col in CARD_SYNC_COLUMNS)
+
+
+def update_expression(column: str, source: str, alias: str = '') -> str:
+    """cards の列を source（VALUES(col) や m.col）で更新する式。KEEP_IF_NULL の列は NULL で上書きしない"""
+    target = f"{alias}.{column}" if alias else column
+    if column in KEEP_IF_NULL:
+        return f"{target} = COALESCE({source}, {target})"
+    return f"{target} = {source}"
+
+
+class SpotCardSync:
+    """spots の変更分を cards へ反映する差分同期"""
+
+    def __init__(self, config: Dict, name: str = "spots_to_cards", columns: Optional[Sequence[str]] = None,
+                 batch: int = SYNC_BATCH, source_db: str = 'swipe_app_development',
+                 target_db: str = 'swipe_app_production'):
+        self.config = config
+        self.name = name
+        # columns 指定時は既存カードの該当列のみ更新する
+        self.columns = tuple(columns) if columns else None
+        self.batch = batch
+        self.source_db = source_db
+        self.target_db = target_db
+
+    def _ensure_state_table(self, cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_watermarks (
+                name VARCHAR(64) NOT NULL PRIMARY KEY,
+                source_updated_at DATETIME NULL,
+                source_id BIGINT NOT NULL DEFAULT 0,
+                rows_applied BIGINT NOT NULL DEFAULT 0,
+                updated_at DATETIME NOT NULL
+            )
+        """)
+
+    def watermark(self, cursor):
+        cursor.execute("SELECT source_updated_at, source_id FROM sync_watermarks WHERE name = %s", (self.name,))
+        row = cursor.fetchone()
+        return (row[0], row[1]) if row else (None, 0)
+
+    def reset(self):
+        """水位線を削除（次回は全件を同期）"""
+        connection = get_connection(self.config, database=self.target_db)
+        try:
+            cursor = connection.cursor()
+            self._ensure_state_table(cursor)
+            cursor.execute("DELETE FROM sync_watermarks WHERE name = %s", (self.name,))
+            connection.commit()
+            cursor.close()
+        finally:
+            connection.close()
+
+    def _fetch(self, cursor, after_ts, after_id):
+        query = f"SELECT id, updated_at, {', '.join(SPOT_SELECT_COLUMNS)} FROM spots WHERE name IS NOT NULL"
+        if after_ts is None:
+            cursor.execute(query + " ORDER BY updated_at, id LIMIT %s", (self.batch,))
+        else:
+            cursor.execute(
+                query + " AND (updated_at > %s OR (updated_at = %s AND id > %s)) ORDER BY updated_at, id LIMIT %s",
+                (after_ts, after_ts, after_id, self.batch),
+            )
+        return cursor.fetchall()
+
+    def _apply(self, cursor, cards) -> int:
+        if self.columns:
+            # 既存カードのみ更新（place_id で結合した派生表を使い1往復で更新）
+            cols = ('place_id',) + tuple(c for c in self.columns if c != 'place_id')
+            index = [CARD_SYNC_COLUMNS.index(c) for c in cols]
+            first = 'SELECT ' + ', '.join(f"%s AS {c}" for c in cols)
+            rest = 'SELECT ' + ', '.join(['%s'] * len(cols))
+            derived = ' UNION ALL '.join([first] + [rest] * (len(cards) - 1))
+            updates = ', '.join(update_expression(c, f"s.{c}", alias='c') for c in cols[1:])
+            cursor.execute(
+                f"UPDATE cards c JOIN ({derived}) s ON s.place_id = c.place_id SET {updates}",
+                [card[i] for card in cards for i in index],
+            )
+            return cursor.rowcount
+
+        cols = ', '.join(CARD_SYNC_COLUMNS)
+        updates = ', '.join(update_expression(c, f"VALUES({c})") for c in CARD_SYNC_COLUMNS if c != 'place_id')
+        cursor.executemany(
+            f"INSERT INTO cards ({cols}, created_at, updated_at) "
+            f"VALUES ({', '.join(['%s'] * len(CARD_SYNC_COLUMNS))}, NOW(), NOW()) "
+            f"ON DUPLICATE KEY UPDATE {updates}, updated_at = NOW()",
+            cards,
+        )
+        return len(cards)
+
+    def run_once(self) -> Dict[str, object]:
+        """水位線以降の変更を同期。戻り値: {'rows': 変更行数, 'applied': 反映行数, 'batches', 'watermark'}"""
+        stats = {'rows': 0, 'applied': 0, 'batches': 0, 'watermark': None}
+        source = get_connection(self.config, database=self.source_db)
+        target = get_connection(self.config, database=self.target_db)
+        src_cursor = source.cursor()
+        dst_cursor = target.cursor()
+        try:
+            self._ensure_state_table(dst_cursor)
+            wm_ts, wm_id = self.watermark(dst_cursor)
+            previous = (wm_ts, wm_id) if wm_ts else None
+            target.commit()
+            # 秒精度の取りこぼし対策で少し手前から読み直す
+            after_ts, after_id = (wm_ts - timedelta(seconds=SYNC_OVERLAP_SEC), 0) if wm_ts else (None, 0)
+            while True:
+                rows = self._fetch(src_cursor, after_ts, after_id)
+                source.commit()  # REPEATABLE READ のスナップショットを更新
+                if not rows:
+                    break
+                after_id, after_ts = rows[-1][0], rows[-1][1]
+                cards = [spot_to_card(row[2:]) for row in rows]
+                stats['applied'] += self._apply(dst_cursor, cards)
+                # 読み直し区間では水位線を戻さない
+                if wm_ts is None or (after_ts, after_id) > (wm_ts, wm_id):
+                    wm_ts, wm_id = after_ts, after_id
+                dst_cursor.execute(
+                    "INSERT INTO sync_watermarks (name, source_updated_at, source_id, rows_applied, updated_at) "
+                    "VALUES (%s, %s, %s, %s, NOW()) ON DUPLICATE KEY UPDATE "
+                    "source_updated_at = VALUES(source_updated_at), source_id = VALUES(source_id), "
+                    "rows_applied = rows_applied + VALUES(rows_applied), updated_at = NOW()",
+                    (self.name, wm_ts, wm_id, len(rows)),
+                )
+                target.commit()
+                # 読み直し区間の行は変更件数に含めない
+                stats['rows'] += sum(1 for row in rows if previous is None or (row[1], row[0]) > previous)
+                stats['batches'] += 1
+                if len(rows) < self.batch:
+                    break
+            stats['watermark'] = (wm_ts, wm_id)
+            return stats
+        except Exception:
+            target.rollback()
+            raise
+        finally:
+            src_cursor.close()
+            dst_cursor.close()
+            source.close()
+            target.close()
+
+    def run_forever(self, interval: float):
+        """interval 秒ごとに run_once（Ctrl-C で停止）"""
+        print(f"🔁 差分同期 {self.name}: {interval:.0f}秒間隔で実行（Ctrl-C で停止）")
+        try:
+            while True:
+                started = time.time()
+                try:
+                    print_sync_result(self.name, self.run_once(), time.time() - started)
+                except Exception as e:
+                    print(f"❌ 同期エラー: {e}")
+                time.sleep(max(0.0, interval - (time.time() - started)))
+        except KeyboardInterrupt:
+            print("\n⏹️ 差分同期を停止しました")
+
+
+def print_sync_result(name: str, stats: Dict[str, object], elapsed: float):
+    wm_ts, wm_id = stats['watermark'] or (None, 0)
+    print(f"🔄 {name}: 変更 {stats['rows']}件 / 反映 {stats['applied']}件 ({stats['batches']}バッチ, {elapsed:.1f}秒)"
+          f" 水位線 updated_at={wm_ts} id={wm_id}")
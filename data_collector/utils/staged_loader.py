@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+大量投入用のステージング（TSV）と LOAD DATA LOCAL INFILE による一括取り込み
+- 収集中は整形済みのカード・レビュー・スポットを .cache/staging/<name>/ の TSV に追記するだけ（DB往復なし）
+- 取り込み時は一時テーブルへ LOAD DATA LOCAL INFILE し、集合演算のSQLで cards / review_comments / spots へ反映
+  - place_id が既存の行はスキップ（ステージ内の重複は一時テーブルの一意キーで除外）
+  - レビューは今回新規作成したカードの分だけ挿入
+- TSV は1行目が列名、NULL は \\N、タブ・改行・バックスラッシュはエスケープ（MySQL の既定形式）
+- 中断しても追記済みの行は残り、同じ name で再開すると続きから追記する（取り込み成功後に削除）
+MySQL 側で local_infile が有効になっている必要がある（SET GLOBAL local_infile = 1）
+"""
+
+import os
+import shutil
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from utils.bulk_writer import CARD_COLUMNS, SPOT_COLUMNS, card_values, review_text
+from utils.db_pool import get_connection
+
+_BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+STAGING_DIR = os.path.join(_BASE_DIR, ".cache", "staging")
+
+REVIEW_COLUMNS = ('place_id', 'comment')
+
+_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+
+
+def _field(value) -> str:
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return str(value).translate(_ESCAPES)
+
+
+class _StageFile:
+    """列名ヘッダ付きで行を追記するTSV。key_column の値で重複を除外"""
+
+    def __init__(self, path: str, columns: Sequence[str], key_column: Optional[str] = None):
+        self.path = path
+        self.columns = tuple(columns)
+        self.key_index = self.columns.index(key_column) if key_column else None
+        self.keys = set()
+        self.rows = 0
+        if os.path.exists(path):
+            self._resume()
+        self.file = open(path, 'a', encoding='utf-8', newline='')
+        if self.file.tell() == 0:
+            self.file.write('\t'.join(self.columns) + '\n')
+
+    def _resume(self):
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end < len(data):
+                # 書き込み途中で止まった末尾の行を捨てる
+                f.truncate(end)
+        lines = data[:end].decode('utf-8').split('\n')[:-1]
+        if lines and tuple(lines[0].split('\t')) != self.columns:
+            raise ValueError(f"ステージングファイルの列が一致しません: {self.path}")
+        for line in lines[1:]:
+            self.rows += 1
+            if self.key_index is not None:
+                self.keys.add(line.split('\t')[self.key_index])
+
+    def add(self, values: Sequence) -> bool:
+        if self.key_index is not None:
+            key = _field(values[self.key_index])
+            if key in self.keys:
+                return False
+            self.keys.add(key)
+        self.file.write('\t'.join(_field(v) for v in values) + '\n')
+        self.rows += 1
+        return True
+
+    def close(self):
+        self.file.flush()
+        self.file.close()
+
+
+class StagingWriter:
+    """カード（+レビュー）とスポットをステージングTSVへ追記"""
+
+    def __init__(self, name: str, directory: str = STAGING_DIR, fresh: bool = False):
+        self.name = name
+        self.path = os.path.join(directory, name)
+        if fresh and os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(self.path, exist_ok=True)
+        self._files: Dict[str, _StageFile] = {}
+        # 前回の追記分を開き直す（ステージ済みのplace_idを重複除外に使う）
+        for table in ('cards', 'reviews', 'spots'):
+            path = os.path.join(self.path, f"{table}.tsv")
+            if os.path.exists(path) and os.path.getsize(path):
+                columns = _header(path)
+                self._files[table] = _StageFile(path, columns, 'place_id' if table != 'reviews' else None)
+        self.resumed = bool(self._files)
+
+    def _file(self, table: str, columns: Sequence[str], key_column: Optional[str]) -> _StageFile:
+        if table not in self._files:
+            self._files[table] = _StageFile(os.path.join(self.path, f"{table}.tsv"), columns, key_column)
+        return self._files[table]
+
+    def is_staged(self, place_id: str, table: str = 'cards') -> bool:
+        stage = self._files.get(table)
+        return stage is not None and _field(place_id) in stage.keys
+
+    def add_card(self, card: Dict) -> bool:
+        """format_place_data 形式のカードを追記（同じplace_idは1回だけ）。レビューは card['reviews']"""
+        if not card.get('place_id'):
+            return False
+        if self.is_staged(card['place_id']):
+            return False
+        cards = self._file('cards', CARD_COLUMNS, 'place_id')
+        # レビューを先に書く（カード行が途中で切れても、孤立したレビューは取り込まれない）
+        reviews = self._file('reviews', REVIEW_COLUMNS, None)
+        for review in card.get('reviews') or []:
+            if review.get('text'):
+                reviews.add((card['place_id'], review_text(review['text'])))
+        return cards.add(card_values(card))
+
+    def add_spot(self, spot: Dict, columns: Sequence[str] = SPOT_COLUMNS) -> bool:
+        """spots の1行を追記（columns は最初の追記で固定）"""
+        if not spot.get('place_id'):
+            return False
+        stage = self._file('spots', columns, 'place_id')
+        return stage.add([spot.get(col) for col in stage.columns])
+
+    def counts(self) -> Dict[str, int]:
+        return {table: f.rows for table, f in self._files.items()}
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+
+def _header(path: str) -> List[str]:
+    with open(path, encoding='utf-8') as f:
+        return f.readline().rstrip('\n').split('\t')
+
+
+def _load_file(cursor, path: str, table: str, columns: Iterable[str]):
+    cursor.execute(
+        f"LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE {table} CHARACTER SET utf8mb4 "
+        f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' IGNORE 1 LINES ({', '.join(columns)})",
+        (path,),
+    )
+    return cursor.rowcount
+
+
+def _stage_table(cursor, table: str, source: str, columns: Sequence[str]):
+    """本テーブルと同じ型の一時テーブル（place_id 一意 + 既存フラグ）
+    キーと既存フラグは CREATE 内で宣言する（一時テーブルでも ALTER TABLE は暗黙のコミットになり、
+    load_staged のトランザクションが途中で確定してしまうため）"""
+    cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {table}")
+    cursor.execute(f"CREATE TEMPORARY TABLE {table} (UNIQUE KEY (place_id), existing TINYINT NOT NULL DEFAULT 0) "
+                   f"SELECT {', '.join(columns)} FROM {source} WHERE 1 = 0")
+
+
+def _merge(cursor, stage: str, target: str, columns: Sequence[str]) -> Dict[str, int]:
+    cursor.execute(f"UPDATE {stage} s JOIN {target} t ON t.place_id = s.place_id SET s.existing = 1")
+    existing = cursor.rowcount
+    cols = ', '.join(columns)
+    cursor.execute(f"INSERT INTO {target} ({cols}, created_at, updated_at) "
+                   f"SELECT {cols}, NOW(), NOW() FROM {stage} WHERE existing = 0")
+    return {'inserted': cursor.rowcount, 'existing': existing}
+
+
+def load_staged(config: Dict, name: str, directory: str = STAGING_DIR, keep: bool = False) -> Dict[str, int]:
+    """ステージングTSVを一括取り込み（1トランザクション）。成功したらファイルを削除（keep=True で残す）
+    戻り値: {'staged', 'inserted', 'existing', 'reviews', 'spots_staged', 'spots_inserted', 'spots_existing'}"""
+    path = os.path.join(directory, name)
+    files = {table: os.path.join(path, f"{table}.tsv") for table in ('cards', 'reviews', 'spots')}
+    result = dict.fromkeys(('staged', 'inserted', 'existing', 'reviews',
+                            'spots_staged', 'spots_inserted', 'spots_existing'), 0)
+    if not any(os.path.exists(f) for f in files.values()):
+        return result
+
+    connection = get_connection(config, allow_local_infile=True)
+    cursor = connection.cursor()
+    try:
+        if os.path.exists(files['cards']):
+            columns = _header(files['cards'])
+            _stage_table(cursor, 'stage_cards', 'cards', columns)
+            result['staged'] = _load_file(cursor, files['cards'], 'stage_cards', columns)
+            merged = _merge(cursor, 'stage_cards', 'cards', columns)
+            result['inserted'], result['existing'] = merged['inserted'], merged['existing']
+
+            if os.path.exists(files['reviews']):
+                cursor.execute("DROP TEMPORARY TABLE IF EXISTS stage_reviews")
+                cursor.execute("CREATE TEMPORARY TABLE stage_reviews (place_id VARCHAR(255) NOT NULL, "
+                               "comment TEXT, KEY (place_id)) CHARACTER SET utf8mb4")
+                _load_file(cursor, files['reviews'], 'stage_reviews', REVIEW_COLUMNS)
+                cursor.execute(
+                    "INSERT INTO review_comments (comment, card_id, created_at, updated_at) "
+                    "SELECT r.comment, c.id, NOW(), NOW() FROM "
+                    "(SELECT DISTINCT place_id, comment FROM stage_reviews) r "
+                    "JOIN stage_cards s ON s.place_id = r.place_id AND s.existing = 0 "
+                    "JOIN cards c ON c.place_id = r.place_id"
+                )
+                result['reviews'] = cursor.rowcount
+
+        if os.path.exists(files['spots']):
+            columns = _header(files['spots'])
+            _stage_table(cursor, 'stage_spots', 'spots', columns)
+            result['spots_staged'] = _load_file(cursor, files['spots'], 'stage_spots', columns)
+            merged = _merge(cursor, 'stage_spots', 'spots', columns)
+            result['spots_inserted'], result['spots_existing'] = merged['inserted'], merged['existing']
+
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+    if not keep:
+        shutil.rmtree(path, ignore_errors=True)
+    return result
+
+
+def print_load_result(result: Dict[str, int]):
+    if result['staged']:
+        print(f"📥 一括取り込み(cards): ステージ{result['staged']}件 → {result['inserted']}件挿入, "
+              f"{result['existing']}件既存スキップ, レビュー{result['reviews']}件")
+    if result['spots_staged']:
+        print(f"📥 一括取り込み(spots): ステージ{result['spots_staged']}件 → {result['spots_inserted']}件挿入, "
+              f"{result['spots_existing']}件既存スキップ")
@@ -7,16 +7,16 @@
 """
 
 import requests
-import mysql.connector
 import time
 import os
-import re
 from dotenv import load_dotenv
 from utils.request_guard import (
     get_json,
     already_fetched_place,
     mark_fetched_place,
 )
+from utils.db_pool import get_connection, db_config
+from utils.region_resolver import address_prefecture, resolver
 
 # 環境変数読み込み
 load_dotenv()
@@ -28,13 +28,7 @@ class YoshokuRegionalCollector:
             raise ValueError("GOOGLE_API_KEY environment variable is required")
 
         # DB接続情報
-        self.db_config = {
-            'host': 'localhost',
-            'user': 'Haruto',
-            'password': os.getenv('MYSQL_PASSWORD'),
-            'database': 'swipe_app_production',
-            'charset': 'utf8mb4'
-        }
+        self.db_config = db_config('swipe_app_production')
 
         # 地域別主要都市定義
         self.regional_cities = {
@@ -82,50 +76,18 @@ class YoshokuRegionalCollector:
             'ステーキハウス', 'グリル料理', 'ワインバー', '洋風レストラン'
         ]
 
-        # 都道府県→地域マッピング
-        self.prefecture_to_region = {
-            '北海道': 'hokkaido',
-            '青森': 'tohoku', '岩手': 'tohoku', '宮城': 'tohoku',
-            '秋田': 'tohoku', '山形': 'tohoku', '福島': 'tohoku',
-            '茨城': 'kanto', '栃木': 'kanto', '群馬': 'kanto',
-            '埼玉': 'kanto', '千葉': 'kanto', '東京': 'kanto', '神奈川': 'kanto',
-            '新潟': 'chubu', '富山': 'chubu', '石川': 'chubu',
-            '福井': 'chubu', '山梨': 'chubu', '長野': 'chubu',
-            '岐阜': 'chubu', '静岡': 'chubu', '愛知': 'chubu',
-            '三重': 'kansai', '滋賀': 'kansai', '京都': 'kansai',
-            '大阪': 'kansai', '兵庫': 'kansai', '奈良': 'kansai', '和歌山': 'kansai',
-            '鳥取': 'chugoku_shikoku', '島根': 'chugoku_shikoku', '岡山': 'chugoku_shikoku',
-            '広島': 'chugoku_shikoku', '山口': 'chugoku_shikoku',
-            '徳島': 'chugoku_shikoku', '香川': 'chugoku_shikoku',
-            '愛媛': 'chugoku_shikoku', '高知': 'chugoku_shikoku',
-            '福岡': 'kyushu_okinawa', '佐賀': 'kyushu_okinawa', '長崎': 'kyushu_okinawa',
-            '熊本': 'kyushu_okinawa', '大分': 'kyushu_okinawa', '宮崎': 'kyushu_okinawa',
-            '鹿児島': 'kyushu_okinawa', '沖縄': 'kyushu_okinawa'
-        }
+        # 都道府県→地域（utils/region_resolver.py の collector 区分）
+        self.region_resolver = resolver('collector')
 
     def extract_prefecture_realtime(self, address):
-        """住所から都道府県をリアルタイム抽出"""
-        if not address:
-            return None
-
-        for prefecture in self.prefecture_to_region.keys():
-            if prefecture in address:
-                return prefecture
-
-        if '東京都' in address:
-            return '東京'
-        elif '京都府' in address:
-            return '京都'
-        elif '大阪府' in address:
-            return '大阪'
-
-        return None
+        """住所から都道府県をリアルタイム抽出（utils/region_resolver.py）"""
+        return address_prefecture(address)
 
     def get_region_from_address(self, address):
         """住所から地域を取得"""
         prefecture = self.extract_prefecture_realtime(address)
         if prefecture:
-            return self.prefecture_to_region.get(prefecture)
+            return self.region_resolver.region_of(prefecture)
         return None
 
     def search_places(self, query, location):
@@ -169,7 +131,7 @@ class YoshokuRegionalCollector:
     def save_to_database(self, spot_data):
         """データベースに保存"""
         try:
-            connection = mysql.connector.connect(**self.db_config)
+            connection = get_connection(self.db_config)
             cursor = connection.cursor()
 
             # 重複チェック